@@ -0,0 +1,140 @@
+"""Benchmark de entradas comprimidas: tempo ponta a ponta contra o CSV simples.
+
+Gera um CSV sintético, grava versões .csv.gz, .csv.bz2, .csv.zst e .zip e
+roda o PipelineIngestao sobre cada uma no moto, em memória e em streaming.
+O moto não tem rede, então cada GET recebe uma latência fixa e um tempo de
+transferência pela banda indicada: é aí que o arquivo menor economiza, e é
+isso que a descompressão precisa pagar.
+
+Uso:
+    python -m benchmarks.benchmark_compressao --tamanho 100MB --banda-mb-s 50
+"""
+import argparse
+import bz2
+import gzip
+import json
+import os
+import shutil
+import statistics
+import tempfile
+import time
+import zipfile
+
+import boto3
+from moto import mock_aws
+
+from benchmarks.gerador_csv import converter_tamanho, gerar_csv
+
+BUCKET_RAW = "benchmark-raw"
+
+FORMATOS = ('csv', 'csv.gz', 'csv.bz2', 'csv.zst', 'zip')
+
+
+def comprimir(caminho_csv: str, formato: str) -> str:
+    """Grava o CSV no formato indicado, em fluxo; retorna o caminho."""
+    import pyarrow as pa
+    
+    if formato == 'csv':
+        return caminho_csv
+    destino = f"{caminho_csv[:-len('.csv')]}.{formato}"
+    if formato == 'zip':
+        with zipfile.ZipFile(destino, 'w', zipfile.ZIP_DEFLATED) as arquivo_zip:
+            arquivo_zip.write(caminho_csv, os.path.basename(caminho_csv))
+        return destino
+    
+    abrir = {
+        'csv.gz': lambda: gzip.open(destino, 'wb'),
+        'csv.bz2': lambda: bz2.open(destino, 'wb'),
+        'csv.zst': lambda: pa.output_stream(destino, compression='zstd'),
+    }[formato]
+    with open(caminho_csv, 'rb') as entrada, abrir() as saida:
+        shutil.copyfileobj(entrada, saida, 8 * 1024 * 1024)
+    return destino
+
+
+def _simular_rede(cliente_s3, latencia_s: float, banda_mb_s: float):
+    """Latência antes de cada requisição e transferência dos GETs pela banda."""
+    eventos = cliente_s3.s3.meta.events
+    eventos.register('before-send.s3', lambda **_: time.sleep(latencia_s))
+    if banda_mb_s:
+        eventos.register(
+            'after-call.s3.GetObject',
+            lambda parsed, **_: time.sleep(
+                parsed.get('ContentLength', 0) / (banda_mb_s * 1024 ** 2)
+            )
+        )
+
+
+def medir(caminho: str, chave: str, streaming: bool, repeticoes: int, cliente_s3) -> dict:
+    """Roda o pipeline sobre o objeto e mede a mediana das repetições."""
+    from src.config.settings import config
+    from src.ingestion.pipeline import PipelineIngestao
+    
+    config.processamento.modo_streaming = streaming
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        resultado = PipelineIngestao(cliente_s3=cliente_s3).processar_arquivo(BUCKET_RAW, chave)
+        tempos.append(time.perf_counter() - inicio)
+        if not resultado['sucesso']:
+            raise RuntimeError(resultado['erro'])
+    return {
+        'tamanho_objeto_mb': round(os.path.getsize(caminho) / 1024 ** 2, 2),
+        'linhas': resultado['linhas'],
+        'p50_s': round(statistics.median(tempos), 3),
+        'min_s': round(min(tempos), 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tamanho", default="100MB", help="Tamanho do CSV descomprimido")
+    parser.add_argument("--formatos", default=",".join(FORMATOS))
+    parser.add_argument("--modos", default="memoria,streaming")
+    parser.add_argument("--repeticoes", type=int, default=3)
+    parser.add_argument("--latencia-ms", type=float, default=20.0)
+    parser.add_argument("--banda-mb-s", type=float, default=50.0,
+                        help="Banda de download; 0 desliga")
+    parser.add_argument("--saida", help="Grava os resultados em JSON neste arquivo")
+    args = parser.parse_args()
+    
+    from src.config.settings import config
+    from src.utils.s3_utils import ClienteS3
+    
+    resultados = []
+    with tempfile.TemporaryDirectory() as diretorio, mock_aws():
+        s3 = boto3.client('s3', region_name='us-east-1')
+        s3.create_bucket(Bucket=BUCKET_RAW)
+        s3.create_bucket(Bucket=config.s3.bucket_data_lake)
+        cliente_s3 = ClienteS3(regiao='us-east-1')
+        
+        caminho_csv = os.path.join(diretorio, "benchmark.csv")
+        gerar_csv(caminho_csv, converter_tamanho(args.tamanho))
+        tamanho_csv = os.path.getsize(caminho_csv)
+        caminhos = {formato: comprimir(caminho_csv, formato)
+                    for formato in args.formatos.split(",")}
+        for caminho in caminhos.values():
+            s3.upload_file(caminho, BUCKET_RAW, f"input/{os.path.basename(caminho)}")
+        _simular_rede(cliente_s3, args.latencia_ms / 1000, args.banda_mb_s)
+        
+        for modo in args.modos.split(","):
+            for formato, caminho in caminhos.items():
+                resultado = {
+                    'formato': formato,
+                    'modo': modo,
+                    **medir(caminho, f"input/{os.path.basename(caminho)}", modo == "streaming",
+                            args.repeticoes, cliente_s3),
+                }
+                resultado['mb_csv_por_s'] = round(tamanho_csv / 1024 ** 2 / resultado['p50_s'], 2)
+                resultados.append(resultado)
+                print(f"{modo:>9} {formato:>8}: objeto {resultado['tamanho_objeto_mb']:8.2f} MB  "
+                      f"p50 {resultado['p50_s']:7.3f}s  "
+                      f"{resultado['mb_csv_por_s']:7.2f} MB de CSV/s")
+    
+    if args.saida:
+        with open(args.saida, 'w') as arquivo:
+            json.dump(resultados, arquivo, indent=2)
+
+
+if __name__ == "__main__":
+    main()
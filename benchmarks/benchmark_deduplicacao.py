@@ -0,0 +1,98 @@
+"""Benchmark de deduplicação: `drop_duplicates` no DataFrame inteiro vs. hash em lotes.
+
+Cada estratégia roda num subprocesso próprio sobre o mesmo CSV sintético,
+com taxas alta e baixa de duplicatas.
+
+Uso:
+    python -m benchmarks.benchmark_deduplicacao --tamanho 200MB --taxas 0.01,0.5
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.benchmark_streaming import _pico_rss_mb
+from benchmarks.gerador_csv import converter_tamanho, gerar_csv
+
+ESTRATEGIAS = ("drop_duplicates", "hash_em_lotes")
+
+
+def executar_estrategia(estrategia: str, caminho_csv: str, tamanho_lote: int) -> dict:
+    """Deduplica o CSV com a estratégia indicada e mede tempo e pico de RSS."""
+    import pandas as pd
+    from src.ingestion.deduplicacao import DeduplicadorHash
+    
+    inicio = time.perf_counter()
+    tempo_dedup = 0.0
+    
+    if estrategia == "drop_duplicates":
+        df = pd.read_csv(caminho_csv)
+        lidas = len(df)
+        marco = time.perf_counter()
+        restantes = len(df.drop_duplicates())
+        tempo_dedup = time.perf_counter() - marco
+    else:
+        lidas = restantes = 0
+        with DeduplicadorHash() as deduplicador:
+            for lote in pd.read_csv(caminho_csv, chunksize=tamanho_lote):
+                lidas += len(lote)
+                marco = time.perf_counter()
+                restantes += len(deduplicador.filtrar(lote))
+                tempo_dedup += time.perf_counter() - marco
+    
+    return {
+        'estrategia': estrategia,
+        'linhas': lidas,
+        'duplicatas_removidas': lidas - restantes,
+        'segundos_total': round(time.perf_counter() - inicio, 3),
+        'segundos_dedup': round(tempo_dedup, 3),
+        'linhas_por_s_dedup': int(lidas / tempo_dedup) if tempo_dedup else None,
+        'pico_rss_mb': round(_pico_rss_mb(), 1),
+    }
+
+
+def _rodar_subprocesso(estrategia: str, caminho_csv: str, tamanho_lote: int) -> dict:
+    comando = [sys.executable, "-m", "benchmarks.benchmark_deduplicacao",
+               "--executar", estrategia, "--csv", caminho_csv, "--tamanho-lote", str(tamanho_lote)]
+    saida = subprocess.run(comando, check=True, capture_output=True, text=True)
+    return json.loads(saida.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tamanho", default="200MB")
+    parser.add_argument("--taxas", default="0.01,0.5", help="Taxas de duplicatas a testar")
+    parser.add_argument("--tamanho-lote", type=int, default=100_000)
+    parser.add_argument("--saida", help="Grava os resultados em JSON neste arquivo")
+    parser.add_argument("--executar", choices=ESTRATEGIAS, help=argparse.SUPPRESS)
+    parser.add_argument("--csv", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    
+    if args.executar:
+        print(json.dumps(executar_estrategia(args.executar, args.csv, args.tamanho_lote)))
+        return
+    
+    resultados = []
+    with tempfile.TemporaryDirectory() as diretorio:
+        for taxa in map(float, args.taxas.split(",")):
+            caminho = os.path.join(diretorio, f"duplicatas_{taxa}.csv")
+            gerar_csv(caminho, converter_tamanho(args.tamanho), taxa_duplicatas=taxa)
+            
+            for estrategia in ESTRATEGIAS:
+                resultado = _rodar_subprocesso(estrategia, caminho, args.tamanho_lote)
+                resultado['taxa_duplicatas'] = taxa
+                resultados.append(resultado)
+                print(f"taxa {taxa:<5} {estrategia:>16}: dedup {resultado['segundos_dedup']:6.2f}s "
+                      f"({resultado['duplicatas_removidas']} removidas)  "
+                      f"pico RSS {resultado['pico_rss_mb']:7.1f} MB")
+    
+    if args.saida:
+        with open(args.saida, 'w') as arquivo:
+            json.dump(resultados, arquivo, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""Benchmark dos estágios concorrentes: tempo total contra a soma e o maior dos estágios.
+
+Grava um CSV sintético no S3 simulado de `benchmarks.s3_local` (latência e
+banda por requisição) e mede cada estágio sozinho: o download pelo
+LeitorS3Paralelo, a conversão em lotes para destinos em memória (leitura do
+CSV e Parquet, só CPU) e o upload multipart do Parquet resultante. Depois
+roda o PipelineIngestao em memória (estágios em sequência), em lotes como
+antes e com STAGED_PIPELINE. Sobrepostos, o tempo total deve se aproximar
+do maior estágio em vez da soma deles.
+
+Uso:
+    python -m benchmarks.benchmark_estagios --tamanho 100MB --latencia-ms 20 --banda-mb-s 20
+"""
+import argparse
+import io
+import json
+import os
+import statistics
+import tempfile
+import time
+
+from benchmarks.gerador_csv import converter_tamanho, gerar_csv
+from benchmarks.s3_local import S3Simulado
+
+BUCKET_RAW = "benchmark-raw"
+CHAVE = "input/benchmark.csv"
+
+
+def _mediana_segundos(funcao, repeticoes: int) -> float:
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append(time.perf_counter() - inicio)
+    return round(statistics.median(tempos), 3)
+
+
+def medir_estagios(cliente_s3, motor: str, repeticoes: int) -> dict:
+    """Tempo de cada estágio sozinho: download, conversão (CPU) e upload."""
+    from src.config.settings import config
+    from src.ingestion.pipeline import criar_processador
+    from src.ingestion.opcoes_parquet import OpcoesParquet
+    
+    opcoes_s3 = {'tamanho_parte_mb': config.s3.tamanho_parte_mb,
+                 'concorrencia': config.s3.concorrencia}
+    
+    def baixar():
+        with cliente_s3.abrir_leitura(BUCKET_RAW, CHAVE, **opcoes_s3) as origem:
+            while origem.read(8 * 1024 * 1024):
+                pass
+    
+    csv = cliente_s3.s3.objetos[(BUCKET_RAW, CHAVE)]
+    saidas = {}
+    
+    def converter():
+        saidas['parquet'] = io.BytesIO()
+        processador = criar_processador(motor, OpcoesParquet.de_config(config.processamento))
+        processador.processar_em_lotes(csv, saidas['parquet'], arquivo_origem=CHAVE,
+                                       tamanho_lote=config.processamento.tamanho_lote)
+    
+    def enviar():
+        with cliente_s3.abrir_escrita(config.s3.bucket_data_lake, "benchmark/estagio.parquet",
+                                      **opcoes_s3) as destino:
+            destino.write(saidas['parquet'].getvalue())
+    
+    estagios = {'download_s': _mediana_segundos(baixar, repeticoes)}
+    estagios['conversao_s'] = _mediana_segundos(converter, repeticoes)
+    estagios['upload_s'] = _mediana_segundos(enviar, repeticoes)
+    estagios['bytes_parquet'] = len(saidas['parquet'].getvalue())
+    return estagios
+
+
+def medir_pipeline(cliente_s3, motor: str, modo: str, repeticoes: int) -> dict:
+    """Tempo total do PipelineIngestao em memória, em lotes ou em estágios."""
+    from src.config.settings import config
+    from src.ingestion.pipeline import PipelineIngestao
+    
+    config.processamento.modo_streaming = modo == "lotes"
+    config.processamento.estagios_concorrentes = modo == "estagios"
+    resultado = {}
+    
+    def processar():
+        pipeline = PipelineIngestao(cliente_s3=cliente_s3, motor=motor)
+        resultado.update(pipeline.processar_arquivo(BUCKET_RAW, CHAVE))
+        if not resultado['sucesso']:
+            raise RuntimeError(resultado['erro'])
+    
+    segundos = _mediana_segundos(processar, repeticoes)
+    return {'modo': modo, 'estrategia': resultado['estrategia'], 'linhas': resultado['linhas'],
+            'p50_s': segundos}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tamanho", default="100MB", help="Tamanho do CSV")
+    parser.add_argument("--motor", default="arrow")
+    parser.add_argument("--latencia-ms", type=float, default=20.0)
+    parser.add_argument("--banda-mb-s", type=float, default=20.0, help="Banda de cada conexão")
+    parser.add_argument("--profundidade-fila", type=int, default=2)
+    parser.add_argument("--repeticoes", type=int, default=3)
+    parser.add_argument("--saida", help="Grava os resultados em JSON neste arquivo")
+    args = parser.parse_args()
+    
+    from src.config.settings import config
+    from src.utils.s3_utils import ClienteS3
+    
+    config.processamento.manifesto_ingestao = False
+    config.processamento.indice_deduplicacao = ""
+    config.processamento.profundidade_fila_estagios = args.profundidade_fila
+    config.processamento.limite_memoria_mb = 1024 * 1024  # o modo em memória não cai para lotes
+    config.processamento.tamanho_max_arquivo_mb = 0
+    cliente_s3 = ClienteS3()
+    cliente_s3.s3 = S3Simulado(latencia_s=args.latencia_ms / 1000, banda_mb_s=args.banda_mb_s)
+    with tempfile.TemporaryDirectory() as diretorio:
+        caminho = os.path.join(diretorio, "benchmark.csv")
+        gerar_csv(caminho, converter_tamanho(args.tamanho))
+        with open(caminho, 'rb') as arquivo:
+            cliente_s3.s3.objetos[(BUCKET_RAW, CHAVE)] = arquivo.read()
+    
+    estagios = medir_estagios(cliente_s3, args.motor, args.repeticoes)
+    soma = estagios['download_s'] + estagios['conversao_s'] + estagios['upload_s']
+    maior = max(estagios['download_s'], estagios['conversao_s'], estagios['upload_s'])
+    print(f"estágios sozinhos: download {estagios['download_s']:.2f}s, "
+          f"conversão {estagios['conversao_s']:.2f}s, upload {estagios['upload_s']:.2f}s "
+          f"(soma {soma:.2f}s, maior {maior:.2f}s)")
+    
+    resultados = []
+    for modo in ("memoria", "lotes", "estagios"):
+        resultado = medir_pipeline(cliente_s3, args.motor, modo, args.repeticoes)
+        resultado['fracao_da_soma'] = round(resultado['p50_s'] / soma, 2)
+        resultado['fracao_do_maior'] = round(resultado['p50_s'] / maior, 2)
+        resultados.append(resultado)
+        print(f"{modo:>9}: {resultado['p50_s']:7.2f}s  {resultado['fracao_da_soma']:5.2f}x a soma  "
+              f"{resultado['fracao_do_maior']:5.2f}x o maior estágio")
+    
+    if args.saida:
+        with open(args.saida, 'w') as arquivo:
+            json.dump({'estagios': estagios, 'pipeline': resultados}, arquivo, indent=2)
+
+
+if __name__ == "__main__":
+    main()
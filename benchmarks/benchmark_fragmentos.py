@@ -0,0 +1,102 @@
+"""Benchmark da leitura em fragmentos: escala de 1 a N processos contra o streaming.
+
+Gera um CSV sintético num diretório temporário e roda o PipelineIngestao
+com o ClienteArquivosLocal (sem rede, para medir só a conversão), primeiro
+em streaming e depois em fragmentos com cada quantidade de processos
+(PARSE_WORKERS). Os processos são criados com spawn, então cada rodada paga
+a partida do pool; em máquinas com uma CPU só aparece esse custo.
+
+Uso:
+    python -m benchmarks.benchmark_fragmentos --tamanho 500MB --processos 2,4,8
+"""
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import time
+
+from benchmarks.gerador_csv import converter_tamanho, gerar_csv
+
+BUCKET_RAW = "benchmark-raw"
+CHAVE = "input/benchmark.csv"
+
+
+def medir(raiz: str, motor: str, processos: int, repeticoes: int) -> dict:
+    """Roda o pipeline com `processos` de leitura (1 = streaming) e mede a mediana."""
+    from src.config.settings import config
+    from src.ingestion.pipeline import PipelineIngestao
+    from src.utils.armazenamento_local import ClienteArquivosLocal
+    
+    config.processamento.modo_streaming = processos == 1
+    config.processamento.processos_leitura = processos
+    tempos = []
+    for _ in range(repeticoes):
+        pipeline = PipelineIngestao(cliente_s3=ClienteArquivosLocal(raiz), motor=motor)
+        inicio = time.perf_counter()
+        resultado = pipeline.processar_arquivo(BUCKET_RAW, CHAVE)
+        tempos.append(time.perf_counter() - inicio)
+        if not resultado['sucesso']:
+            raise RuntimeError(resultado['erro'])
+    return {
+        'estrategia': resultado['estrategia'],
+        'linhas': resultado['linhas'],
+        'p50_s': round(statistics.median(tempos), 3),
+        'min_s': round(min(tempos), 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tamanho", default="200MB", help="Tamanho do CSV")
+    parser.add_argument("--processos", default=None,
+                        help="Quantidades de processos, separadas por vírgula "
+                             "(padrão: 2 até as CPUs)")
+    parser.add_argument("--tamanho-fragmento-mb", type=int, default=16)
+    parser.add_argument("--motores", default="pandas,arrow")
+    parser.add_argument("--repeticoes", type=int, default=3)
+    parser.add_argument("--saida", help="Grava os resultados em JSON neste arquivo")
+    args = parser.parse_args()
+    
+    from src.config.settings import config
+    
+    cpus = os.cpu_count() or 1
+    processos = ([int(p) for p in args.processos.split(",")] if args.processos
+                 else [p for p in (2, 4, 8, 16) if p <= max(2, cpus)])
+    config.processamento.tamanho_fragmento_mb = args.tamanho_fragmento_mb
+    config.processamento.colunas_particao = []
+    
+    resultados = []
+    with tempfile.TemporaryDirectory() as raiz:
+        caminho = os.path.join(raiz, BUCKET_RAW, CHAVE)
+        os.makedirs(os.path.dirname(caminho))
+        gerar_csv(caminho, converter_tamanho(args.tamanho))
+        tamanho_mb = os.path.getsize(caminho) / 1024 ** 2
+        if tamanho_mb < 2 * args.tamanho_fragmento_mb:
+            parser.error("--tamanho precisa de ao menos dois fragmentos")
+        print(f"CSV de {tamanho_mb:.1f} MB, fragmentos de {args.tamanho_fragmento_mb} MB, "
+              f"{cpus} CPUs")
+        
+        for motor in args.motores.split(","):
+            base = None
+            for quantidade in [1] + processos:
+                resultado = {'motor': motor, 'processos': quantidade,
+                             **medir(raiz, motor, quantidade, args.repeticoes)}
+                base = base or resultado
+                if resultado['linhas'] != base['linhas']:
+                    raise RuntimeError(f"{resultado['linhas']} linhas com {quantidade} processos, "
+                                       f"{base['linhas']} em streaming")
+                resultado['mb_por_s'] = round(tamanho_mb / resultado['p50_s'], 2)
+                resultado['aceleracao'] = round(base['p50_s'] / resultado['p50_s'], 2)
+                resultados.append(resultado)
+                print(f"{motor:>6} {resultado['estrategia']:>10} x{quantidade:<2}: "
+                      f"p50 {resultado['p50_s']:7.3f}s  {resultado['mb_por_s']:7.2f} MB/s  "
+                      f"{resultado['aceleracao']:5.2f}x")
+    
+    if args.saida:
+        with open(args.saida, 'w') as arquivo:
+            json.dump(resultados, arquivo, indent=2)
+
+
+if __name__ == "__main__":
+    main()
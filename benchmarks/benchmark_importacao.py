@@ -0,0 +1,99 @@
+"""Benchmark de cold start baseado em `python -X importtime`.
+
+Mede, em interpretadores novos, o tempo de importar o handler da Lambda e de
+criar o cliente S3 da primeira invocação, e lista os módulos mais caros.
+Com `--limite-ms`, termina com erro se a mediana passar do limite, o que
+permite usá-lo como verificação de regressão no CI.
+
+Uso:
+    python -m benchmarks.benchmark_importacao --repeticoes 5 --limite-ms 400
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+MODULO_ALVO = "src.lambda_functions.csv_ingestor"
+MODULOS_PESADOS = ("pandas", "pyarrow", "numpy")
+
+CODIGO_COLD_START = f"""
+import json, sys, time
+inicio = time.perf_counter()
+import {MODULO_ALVO} as handler
+importado = time.perf_counter()
+handler.obter_cliente_s3()
+fim = time.perf_counter()
+print(json.dumps({{
+    'importacao_ms': (importado - inicio) * 1000,
+    'cold_start_ms': (fim - inicio) * 1000,
+    'pesados_carregados': [m for m in {MODULOS_PESADOS!r} if m in sys.modules],
+}}))
+"""
+
+
+def medir_importtime() -> list:
+    """Executa `-X importtime` e retorna (módulo, próprio_us, acumulado_us) por módulo."""
+    saida = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {MODULO_ALVO}"],
+        capture_output=True, text=True, check=True,
+    )
+    modulos = []
+    for linha in saida.stderr.splitlines():
+        if not linha.startswith("import time:") or "cumulative" in linha:
+            continue
+        proprio, acumulado, nome = linha[len("import time:"):].split("|")
+        modulos.append((nome.strip(), int(proprio), int(acumulado)))
+    return modulos
+
+
+def medir_cold_start() -> dict:
+    """Mede importação + criação do cliente S3 num interpretador novo."""
+    saida = subprocess.run(
+        [sys.executable, "-c", CODIGO_COLD_START],
+        capture_output=True, text=True, check=True,
+        env={"AWS_DEFAULT_REGION": "us-east-1", "AWS_LAMBDA_FUNCTION_NAME": "benchmark",
+             "PATH": ""},
+    )
+    return json.loads(saida.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeticoes", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10, help="Quantos módulos mais caros listar")
+    parser.add_argument("--limite-ms", type=float,
+                        help="Falha se a mediana do cold start passar deste valor")
+    parser.add_argument("--saida", help="Grava os resultados em JSON neste arquivo")
+    args = parser.parse_args()
+    
+    medicoes = [medir_cold_start() for _ in range(args.repeticoes)]
+    modulos = medir_importtime()
+    
+    resultado = {
+        'importacao_ms_mediana': round(statistics.median(m['importacao_ms'] for m in medicoes), 1),
+        'cold_start_ms_mediana': round(statistics.median(m['cold_start_ms'] for m in medicoes), 1),
+        'pesados_carregados': medicoes[0]['pesados_carregados'],
+        'modulos_mais_caros': [
+            {'modulo': nome, 'acumulado_ms': round(acumulado / 1000, 1)}
+            for nome, _, acumulado in sorted(modulos, key=lambda m: -m[2])[:args.top]
+        ],
+    }
+    
+    print(f"Importação do handler: {resultado['importacao_ms_mediana']} ms (mediana)")
+    print(f"Cold start (import + cliente S3): {resultado['cold_start_ms_mediana']} ms (mediana)")
+    print(f"Módulos pesados carregados no import: {resultado['pesados_carregados'] or 'nenhum'}")
+    for modulo in resultado['modulos_mais_caros']:
+        print(f"  {modulo['acumulado_ms']:8.1f} ms  {modulo['modulo']}")
+    
+    if args.saida:
+        with open(args.saida, 'w') as arquivo:
+            json.dump(resultado, arquivo, indent=2)
+    
+    if args.limite_ms and resultado['cold_start_ms_mediana'] > args.limite_ms:
+        sys.exit(f"Cold start acima do limite: {resultado['cold_start_ms_mediana']} ms "
+                 f"> {args.limite_ms} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""Benchmark do índice de deduplicação: conjunto exato vs. filtro de Bloom.
+
+Para cada tamanho de partição, mede o custo de consulta por linha, a taxa
+real de falsos positivos (consultando hashes que nunca foram inseridos), o
+tamanho serializado e o tempo de carga do índice.
+
+Uso:
+    python -m benchmarks.benchmark_indice_dedup --tamanhos 1000000,10000000
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+
+from src.ingestion.indice_deduplicacao import ConjuntoHashes, FiltroBloom
+
+
+def medir(tipo: str, existentes: np.ndarray, consultas: np.ndarray, ausentes: np.ndarray,
+          taxa_fp: float) -> dict:
+    """Constrói o índice, consulta e mede custo, falsos positivos e tamanho."""
+    inicio = time.perf_counter()
+    if tipo == "bloom":
+        indice = FiltroBloom(capacidade=len(existentes), taxa_falsos_positivos=taxa_fp)
+    else:
+        indice = ConjuntoHashes()
+    indice.adicionar(existentes)
+    construcao = time.perf_counter() - inicio
+    
+    inicio = time.perf_counter()
+    indice.contem(consultas)
+    consulta = time.perf_counter() - inicio
+    
+    serializado = indice.serializar()
+    inicio = time.perf_counter()
+    type(indice).desserializar(serializado)
+    carga = time.perf_counter() - inicio
+    
+    return {
+        'tipo': tipo,
+        'linhas_indexadas': len(existentes),
+        'construcao_s': round(construcao, 3),
+        'ns_por_consulta': round(consulta / len(consultas) * 1e9, 1),
+        'taxa_falsos_positivos': float(indice.contem(ausentes).mean()),
+        'tamanho_mb': round(len(serializado) / 1024 ** 2, 2),
+        'carga_s': round(carga, 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tamanhos", default="1000000,10000000")
+    parser.add_argument("--consultas", type=int, default=1_000_000)
+    parser.add_argument("--taxa-fp", type=float, default=0.001)
+    parser.add_argument("--saida", help="Grava os resultados em JSON neste arquivo")
+    args = parser.parse_args()
+    
+    rng = np.random.default_rng(42)
+    resultados = []
+    for tamanho in map(int, args.tamanhos.split(",")):
+        existentes = rng.integers(0, 2 ** 63, tamanho, dtype=np.uint64)
+        ausentes = rng.integers(2 ** 63, 2 ** 64 - 1, args.consultas, dtype=np.uint64)
+        # Metade das consultas já está no índice (reenvio parcial)
+        metade = args.consultas // 2
+        consultas = np.concatenate([existentes[:metade], ausentes[:metade]])
+        
+        for tipo in ("hashes", "bloom"):
+            resultado = medir(tipo, existentes, consultas, ausentes, args.taxa_fp)
+            resultados.append(resultado)
+            print(f"{tamanho:>11} {tipo:>7}: {resultado['ns_por_consulta']:7.1f} ns/linha  "
+                  f"FP {resultado['taxa_falsos_positivos']:.5f}  "
+                  f"{resultado['tamanho_mb']:8.2f} MB  carga {resultado['carga_s']:.3f}s")
+    
+    if args.saida:
+        with open(args.saida, 'w') as arquivo:
+            json.dump(resultados, arquivo, indent=2)
+
+
+if __name__ == "__main__":
+    main()
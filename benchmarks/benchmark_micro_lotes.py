@@ -0,0 +1,121 @@
+"""Benchmark de micro-lotes: objetos/s e arquivos gerados contra um Parquet por evento.
+
+Divide um CSV sintético em muitos objetos pequenos no S3 simulado de
+`benchmarks.s3_local` (latência e banda por requisição) e os ingere de duas
+formas: um evento por objeto, cada um com o seu PipelineIngestao, como a
+Lambda faz sem MICRO_BATCH; e em micro-lotes do tamanho de um lote SQS.
+A sobrecarga de invocar a Lambda por evento não entra na medição.
+
+Uso:
+    python -m benchmarks.benchmark_micro_lotes --objetos 1000 --tamanho-objeto 20KB
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+from benchmarks.gerador_csv import converter_tamanho, gerar_csv
+from benchmarks.s3_local import S3Simulado
+
+BUCKET_RAW = "benchmark-raw"
+
+
+def criar_objetos(s3: S3Simulado, quantidade: int, tamanho_objeto: int) -> list:
+    """Grava `quantidade` CSVs de ~`tamanho_objeto` bytes; retorna (bucket, chave, etag, bytes)."""
+    with tempfile.TemporaryDirectory() as diretorio:
+        caminho = os.path.join(diretorio, "base.csv")
+        gerar_csv(caminho, quantidade * tamanho_objeto)
+        with open(caminho, 'rb') as arquivo:
+            cabecalho = arquivo.readline()
+            linhas = arquivo.readlines()
+    
+    por_objeto = max(1, len(linhas) // quantidade)
+    arquivos = []
+    for i in range(quantidade):
+        corpo = cabecalho + b"".join(linhas[i * por_objeto:(i + 1) * por_objeto])
+        chave = f"input/eventos/{i:06d}.csv"
+        s3.objetos[(BUCKET_RAW, chave)] = corpo
+        arquivos.append((BUCKET_RAW, chave, None, len(corpo)))
+    return arquivos
+
+
+def medir(modo: str, arquivos: list, tamanho_lote: int, cliente_s3, motor: str) -> dict:
+    """Ingere os objetos por evento ou em micro-lotes; conta objetos/s e Parquets gravados."""
+    from src.config.settings import config
+    from src.ingestion.pipeline import PipelineIngestao
+    
+    s3 = cliente_s3.s3
+    for chave in [chave for bucket, chave in s3.objetos if bucket == config.s3.bucket_data_lake]:
+        del s3.objetos[(config.s3.bucket_data_lake, chave)]
+    
+    inicio = time.perf_counter()
+    if modo == "por_evento":
+        resultados = [
+            PipelineIngestao(cliente_s3=cliente_s3, motor=motor).processar_arquivo(*arquivo)
+            for arquivo in arquivos
+        ]
+    else:
+        resultados = []
+        for i in range(0, len(arquivos), tamanho_lote):
+            pipeline = PipelineIngestao(cliente_s3=cliente_s3, motor=motor)
+            resultados.extend(pipeline.processar_micro_lote(arquivos[i:i + tamanho_lote]))
+    segundos = time.perf_counter() - inicio
+    
+    falhas = [resultado['erro'] for resultado in resultados if not resultado['sucesso']]
+    if falhas:
+        raise RuntimeError(falhas[0])
+    parquets = [dados for (bucket, _), dados in s3.objetos.items()
+                if bucket == config.s3.bucket_data_lake]
+    return {
+        'modo': modo,
+        'objetos': len(arquivos),
+        'linhas': sum(resultado['linhas'] for resultado in resultados),
+        'segundos': round(segundos, 3),
+        'objetos_por_s': round(len(arquivos) / segundos, 1),
+        'arquivos_parquet': len(parquets),
+        'tamanho_medio_parquet_kb': round(
+            sum(map(len, parquets)) / max(1, len(parquets)) / 1024, 1
+        ),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--objetos", type=int, default=1000)
+    parser.add_argument("--tamanho-objeto", default="20KB")
+    parser.add_argument("--tamanho-lote", type=int, default=100,
+                        help="Objetos por micro-lote (o tamanho do lote SQS)")
+    parser.add_argument("--motor", default="pandas")
+    parser.add_argument("--latencia-ms", type=float, default=20.0)
+    parser.add_argument("--banda-mb-s", type=float, default=50.0)
+    parser.add_argument("--saida", help="Grava os resultados em JSON neste arquivo")
+    args = parser.parse_args()
+    
+    from src.config.settings import config
+    from src.utils.s3_utils import ClienteS3
+    
+    config.processamento.micro_lotes = True
+    config.processamento.manifesto_ingestao = False
+    cliente_s3 = ClienteS3()
+    cliente_s3.s3 = S3Simulado(latencia_s=args.latencia_ms / 1000, banda_mb_s=args.banda_mb_s)
+    arquivos = criar_objetos(cliente_s3.s3, args.objetos, converter_tamanho(args.tamanho_objeto))
+    
+    resultados = []
+    for modo in ("por_evento", "micro_lote"):
+        resultado = medir(modo, arquivos, args.tamanho_lote, cliente_s3, args.motor)
+        resultados.append(resultado)
+        print(f"{modo:>10}: {resultado['segundos']:7.2f}s  "
+              f"{resultado['objetos_por_s']:8.1f} objetos/s  "
+              f"{resultado['arquivos_parquet']:5d} Parquets de "
+              f"{resultado['tamanho_medio_parquet_kb']:8.1f} KB")
+    if resultados[0]['linhas'] != resultados[1]['linhas']:
+        raise RuntimeError("Micro-lotes gravaram um número diferente de linhas")
+    
+    if args.saida:
+        with open(args.saida, 'w') as arquivo:
+            json.dump(resultados, arquivo, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""Benchmark dos motores de processamento: pandas vs. Arrow.
+
+Executa o fluxo completo em memória (ler, limpar, metadados, Parquet) de cada
+motor sobre CSVs estreitos e largos, cada execução num subprocesso próprio
+para isolar o pico de RSS.
+
+Uso:
+    python -m benchmarks.benchmark_motores --tamanho 100MB
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.benchmark_streaming import _pico_rss_mb
+from benchmarks.gerador_csv import converter_tamanho, gerar_csv
+
+FORMATOS = {
+    'estreito': 0,   # 6 colunas
+    'largo': 94,     # 100 colunas
+}
+
+
+def executar_motor(motor: str, caminho_csv: str) -> dict:
+    """Processa o CSV com o motor indicado e mede tempo e pico de RSS."""
+    from src.ingestion.pipeline import criar_processador
+    
+    processador = criar_processador(motor)
+    with open(caminho_csv, 'rb') as arquivo:
+        dados = arquivo.read()
+    
+    inicio = time.perf_counter()
+    processador.ler_csv(dados)
+    processador.limpar_dados()
+    processador.adicionar_colunas_metadados(arquivo_origem=caminho_csv)
+    parquet = processador.converter_para_parquet()
+    segundos = time.perf_counter() - inicio
+    
+    return {
+        'motor': motor,
+        'linhas': processador.obter_estatisticas()['row_count'],
+        'segundos': round(segundos, 3),
+        'mb_por_s': round(len(dados) / 1024 ** 2 / segundos, 1),
+        'pico_rss_mb': round(_pico_rss_mb(), 1),
+        'tamanho_parquet_mb': round(len(parquet) / 1024 ** 2, 2),
+    }
+
+
+def _rodar_subprocesso(motor: str, caminho_csv: str) -> dict:
+    comando = [sys.executable, "-m", "benchmarks.benchmark_motores",
+               "--executar", motor, "--csv", caminho_csv]
+    saida = subprocess.run(comando, check=True, capture_output=True, text=True)
+    return json.loads(saida.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tamanho", default="100MB")
+    parser.add_argument("--motores", default="pandas,arrow")
+    parser.add_argument("--formatos", default=",".join(FORMATOS))
+    parser.add_argument("--saida", help="Grava os resultados em JSON neste arquivo")
+    parser.add_argument("--executar", help=argparse.SUPPRESS)
+    parser.add_argument("--csv", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    
+    if args.executar:
+        print(json.dumps(executar_motor(args.executar, args.csv)))
+        return
+    
+    resultados = []
+    with tempfile.TemporaryDirectory() as diretorio:
+        for formato in args.formatos.split(","):
+            caminho = os.path.join(diretorio, f"{formato}.csv")
+            gerar_csv(caminho, converter_tamanho(args.tamanho), colunas_extras=FORMATOS[formato])
+            
+            for motor in args.motores.split(","):
+                resultado = _rodar_subprocesso(motor, caminho)
+                resultado['formato'] = formato
+                resultados.append(resultado)
+                print(f"{formato:>9} {motor:>7}: {resultado['segundos']:7.2f}s "
+                      f"{resultado['mb_por_s']:7.1f} MB/s  "
+                      f"pico RSS {resultado['pico_rss_mb']:7.1f} MB")
+    
+    if args.saida:
+        with open(args.saida, 'w') as arquivo:
+            json.dump(resultados, arquivo, indent=2)
+
+
+if __name__ == "__main__":
+    main()
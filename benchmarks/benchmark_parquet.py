@@ -0,0 +1,165 @@
+"""Benchmark das opções do escritor Parquet: tamanho, tempo de escrita e de varredura.
+
+Para cada CSV (os de `data/sample` e um sintético do tamanho pedido) e cada
+configuração (codec e nível, row groups, ordenação, dicionário, bloom,
+estatísticas), grava o Parquet em memória e mede o tamanho, o tempo de
+escrita, a leitura completa e uma leitura filtrada por igualdade numa
+coluna, como uma consulta do Athena. Os row groups lidos na leitura
+filtrada são os que as estatísticas min/max não conseguem descartar.
+
+Uso:
+    python -m benchmarks.benchmark_parquet --tamanho 100MB --saida parquet.json
+"""
+import argparse
+import glob
+import json
+import os
+import statistics
+import tempfile
+import time
+
+from benchmarks.gerador_csv import converter_tamanho, gerar_csv
+
+# Nome -> argumentos de OpcoesParquet; a ordenação usa a coluna filtrada
+CONFIGURACOES = {
+    'snappy': {},
+    'gzip': {'compressao': 'gzip'},
+    'zstd-1': {'compressao': 'zstd', 'nivel_compressao': 1},
+    'zstd-3': {'compressao': 'zstd', 'nivel_compressao': 3},
+    'zstd-9': {'compressao': 'zstd', 'nivel_compressao': 9},
+    'zstd-3-rg64k': {'compressao': 'zstd', 'nivel_compressao': 3,
+                     'linhas_por_row_group': 64 * 1024},
+    'zstd-3-rg1m': {'compressao': 'zstd', 'nivel_compressao': 3,
+                    'linhas_por_row_group': 1024 * 1024},
+    'zstd-3-ordenado': {'compressao': 'zstd', 'nivel_compressao': 3,
+                        'linhas_por_row_group': 64 * 1024, 'ordenar': True},
+    'zstd-3-bloom': {'compressao': 'zstd', 'nivel_compressao': 3,
+                     'linhas_por_row_group': 64 * 1024, 'bloom': True},
+    'zstd-3-sem-dicionario': {'compressao': 'zstd', 'nivel_compressao': 3,
+                              'colunas_dicionario': False},
+    'zstd-3-sem-estatisticas': {'compressao': 'zstd', 'nivel_compressao': 3,
+                                'estatisticas': False},
+}
+
+
+def _mediana_segundos(funcao, repeticoes: int):
+    """Mediana do tempo de `funcao` e o resultado da última chamada."""
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        resultado = funcao()
+        tempos.append(time.perf_counter() - inicio)
+    return statistics.median(tempos), resultado
+
+
+def _row_groups_lidos(metadados, indice_coluna: int, valor) -> int:
+    """Row groups cujas estatísticas não descartam `coluna == valor`."""
+    lidos = 0
+    for i in range(metadados.num_row_groups):
+        estatisticas = metadados.row_group(i).column(indice_coluna).statistics
+        if estatisticas is None or not estatisticas.has_min_max:
+            lidos += 1
+        elif estatisticas.min <= valor <= estatisticas.max:
+            lidos += 1
+    return lidos
+
+
+def medir_configuracao(tabela, nome: str, coluna_filtro: str, repeticoes: int) -> dict:
+    """Grava a tabela com a configuração e mede escrita e varreduras."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    from src.ingestion.opcoes_parquet import OpcoesParquet, suporta_bloom
+    
+    argumentos = dict(CONFIGURACOES[nome])
+    if argumentos.pop('ordenar', False):
+        argumentos['colunas_ordenacao'] = [coluna_filtro]
+    if argumentos.pop('bloom', False):
+        if not suporta_bloom():
+            return {'configuracao': nome, 'ignorada': 'pyarrow sem bloom filters'}
+        argumentos['colunas_bloom'] = [coluna_filtro]
+    opcoes = OpcoesParquet(**argumentos)
+    
+    escrita, dados = _mediana_segundos(lambda: opcoes.converter(tabela), repeticoes)
+    leitura, _ = _mediana_segundos(lambda: pq.read_table(pa.BufferReader(dados)), repeticoes)
+    
+    valor = tabela.column(coluna_filtro)[tabela.num_rows // 2].as_py()
+    filtrada, resultado = _mediana_segundos(
+        lambda: pq.read_table(pa.BufferReader(dados), filters=[(coluna_filtro, '==', valor)]),
+        repeticoes,
+    )
+    metadados = pq.ParquetFile(pa.BufferReader(dados)).metadata
+    return {
+        'configuracao': nome,
+        'tamanho_mb': round(len(dados) / 1024 ** 2, 3),
+        'escrita_s': round(escrita, 4),
+        'leitura_s': round(leitura, 4),
+        'leitura_filtrada_s': round(filtrada, 4),
+        'linhas_filtradas': resultado.num_rows,
+        'row_groups': metadados.num_row_groups,
+        'row_groups_lidos': _row_groups_lidos(
+            metadados, tabela.schema.get_field_index(coluna_filtro), valor
+        ),
+    }
+
+
+def carregar_tabela(caminho_csv: str):
+    """Lê o CSV como a ingestão faria (motor Arrow, com metadados)."""
+    from src.ingestion.processador_arrow import ProcessadorArrow
+    
+    processador = ProcessadorArrow()
+    with open(caminho_csv, 'rb') as arquivo:
+        processador.ler_csv(arquivo.read())
+    processador.limpar_dados()
+    processador.adicionar_colunas_metadados(arquivo_origem=os.path.basename(caminho_csv))
+    return processador.tabela
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--amostras", default="data/sample/*.csv",
+                        help="CSVs reais a medir (glob); vazio para nenhum")
+    parser.add_argument("--tamanho", default="100MB",
+                        help="Tamanho do CSV sintético; vazio para nenhum")
+    parser.add_argument("--coluna-filtro", default="cidade",
+                        help="Coluna filtrada e ordenada; sem ela, a primeira coluna")
+    parser.add_argument("--configuracoes", default=",".join(CONFIGURACOES))
+    parser.add_argument("--repeticoes", type=int, default=3)
+    parser.add_argument("--saida", help="Grava os resultados em JSON neste arquivo")
+    args = parser.parse_args()
+    
+    resultados = []
+    with tempfile.TemporaryDirectory() as diretorio:
+        entradas = sorted(glob.glob(args.amostras)) if args.amostras else []
+        if args.tamanho:
+            caminho = os.path.join(diretorio, f"sintetico-{args.tamanho}.csv")
+            gerar_csv(caminho, converter_tamanho(args.tamanho), colunas_extras=10)
+            entradas.append(caminho)
+        
+        for caminho in entradas:
+            tabela = carregar_tabela(caminho)
+            coluna = args.coluna_filtro
+            if coluna not in tabela.column_names:
+                coluna = tabela.column_names[0]
+            print(f"{os.path.basename(caminho)}: {tabela.num_rows} linhas, "
+                  f"{os.path.getsize(caminho) / 1024 ** 2:.2f} MB de CSV, filtro em {coluna}")
+            
+            for nome in args.configuracoes.split(","):
+                resultado = {'arquivo': os.path.basename(caminho),
+                             **medir_configuracao(tabela, nome, coluna, args.repeticoes)}
+                resultados.append(resultado)
+                if 'ignorada' in resultado:
+                    print(f"  {nome:>24}: ignorada ({resultado['ignorada']})")
+                    continue
+                print(f"  {nome:>24}: {resultado['tamanho_mb']:9.3f} MB  "
+                      f"escrita {resultado['escrita_s']:7.3f}s  "
+                      f"leitura {resultado['leitura_s']:7.3f}s  "
+                      f"filtrada {resultado['leitura_filtrada_s']:7.3f}s  "
+                      f"row groups {resultado['row_groups_lidos']}/{resultado['row_groups']}")
+    
+    if args.saida:
+        with open(args.saida, 'w') as arquivo:
+            json.dump(resultados, arquivo, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""Benchmark de vazão: GET/PUT únicos vs. leitura paralela e upload multipart.
+
+Roda contra o S3 simulado de `benchmarks.s3_local`, que injeta latência e
+limita a banda por conexão, então a diferença medida vem da concorrência.
+
+Uso:
+    python -m benchmarks.benchmark_s3_stream --tamanho 128MB --concorrencias 1,4,8
+"""
+import argparse
+import json
+import os
+import time
+
+from benchmarks.gerador_csv import converter_tamanho
+from benchmarks.s3_local import MB, S3Simulado
+from src.utils.s3_stream import EscritorMultipartS3, LeitorS3Paralelo
+
+BUCKET = "benchmark"
+
+
+def _medir(descricao: str, tamanho: int, funcao) -> dict:
+    inicio = time.perf_counter()
+    funcao()
+    segundos = time.perf_counter() - inicio
+    resultado = {
+        'operacao': descricao,
+        'segundos': round(segundos, 3),
+        'mb_por_s': round(tamanho / MB / segundos, 1),
+    }
+    print(f"{descricao:>28}: {resultado['segundos']:7.2f}s  {resultado['mb_por_s']:8.1f} MB/s")
+    return resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tamanho", default="128MB")
+    parser.add_argument("--tamanho-parte-mb", type=int, default=8)
+    parser.add_argument("--concorrencias", default="1,4,8")
+    parser.add_argument("--latencia-ms", type=float, default=20.0)
+    parser.add_argument("--banda-mb-s", type=float, default=50.0,
+                        help="Banda de cada conexão simulada")
+    parser.add_argument("--saida", help="Grava os resultados em JSON neste arquivo")
+    args = parser.parse_args()
+    
+    s3 = S3Simulado(latencia_s=args.latencia_ms / 1000, banda_mb_s=args.banda_mb_s)
+    tamanho = converter_tamanho(args.tamanho)
+    dados = os.urandom(tamanho)
+    s3.objetos[(BUCKET, "objeto")] = dados
+    parte = args.tamanho_parte_mb * MB
+    resultados = []
+    
+    resultados.append(_medir("get_object inteiro", tamanho,
+                             lambda: s3.get_object(Bucket=BUCKET, Key="objeto")['Body'].read()))
+    for concorrencia in map(int, args.concorrencias.split(",")):
+        def ler():
+            with LeitorS3Paralelo(s3, BUCKET, "objeto", parte, concorrencia) as leitor:
+                while leitor.read(MB):
+                    pass
+        resultados.append(_medir(f"leitura paralela x{concorrencia}", tamanho, ler))
+    
+    resultados.append(_medir("put_object inteiro", tamanho,
+                             lambda: s3.put_object(Bucket=BUCKET, Key="saida", Body=dados)))
+    for concorrencia in map(int, args.concorrencias.split(",")):
+        def escrever():
+            with EscritorMultipartS3(s3, BUCKET, "saida", parte, concorrencia) as escritor:
+                for inicio in range(0, tamanho, MB):
+                    escritor.write(dados[inicio:inicio + MB])
+        resultados.append(_medir(f"upload multipart x{concorrencia}", tamanho, escrever))
+    
+    if args.saida:
+        with open(args.saida, 'w') as arquivo:
+            json.dump(resultados, arquivo, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""Benchmark de pico de memória: conversão em memória vs. em lotes.
+
+Cada modo roda num subprocesso próprio para que o pico de RSS
+(`ru_maxrss`) reflita apenas aquela conversão.
+
+Uso:
+    python -m benchmarks.benchmark_streaming --tamanhos 100MB,1GB
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.gerador_csv import converter_tamanho, gerar_csv
+
+MODOS = ("memoria", "lotes")
+
+
+def _pico_rss_mb(quem: int = resource.RUSAGE_SELF) -> float:
+    # ru_maxrss é KB no Linux e bytes no macOS
+    pico = resource.getrusage(quem).ru_maxrss
+    return pico / 1024 ** 2 if sys.platform == "darwin" else pico / 1024
+
+
+def executar_modo(modo: str, caminho_csv: str, tamanho_lote: int) -> dict:
+    """Converte o CSV no modo indicado e mede tempo e pico de RSS."""
+    from src.ingestion.csv_processor import ProcessadorCSV
+    
+    processador = ProcessadorCSV()
+    inicio = time.perf_counter()
+    
+    with tempfile.TemporaryFile() as destino:
+        if modo == "memoria":
+            # Replica o caminho atual: bytes do S3 -> DataFrame -> bytes Parquet
+            with open(caminho_csv, 'rb') as arquivo:
+                dados = arquivo.read()
+            processador.ler_csv(dados)
+            processador.limpar_dados()
+            processador.adicionar_colunas_metadados(arquivo_origem=caminho_csv)
+            destino.write(processador.converter_para_parquet())
+            linhas = len(processador.df)
+        else:
+            with open(caminho_csv, 'rb') as arquivo:
+                linhas = processador.processar_em_lotes(
+                    arquivo, destino, arquivo_origem=caminho_csv, tamanho_lote=tamanho_lote
+                )['row_count']
+        tamanho_saida = destino.tell()
+    
+    return {
+        'modo': modo,
+        'linhas': linhas,
+        'segundos': round(time.perf_counter() - inicio, 3),
+        'pico_rss_mb': round(_pico_rss_mb(), 1),
+        'tamanho_parquet_mb': round(tamanho_saida / 1024 ** 2, 2),
+    }
+
+
+def _rodar_subprocesso(modo: str, caminho_csv: str, tamanho_lote: int) -> dict:
+    comando = [
+        sys.executable, "-m", "benchmarks.benchmark_streaming",
+        "--executar", modo, "--csv", caminho_csv, "--tamanho-lote", str(tamanho_lote),
+    ]
+    saida = subprocess.run(comando, check=True, capture_output=True, text=True)
+    return json.loads(saida.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tamanhos", default="100MB,1GB",
+                        help="Tamanhos dos CSVs sintéticos, separados por vírgula")
+    parser.add_argument("--tamanho-lote", type=int, default=100_000,
+                        help="Linhas por lote no modo em lotes")
+    parser.add_argument("--modos", default=",".join(MODOS))
+    parser.add_argument("--saida", help="Grava os resultados em JSON neste arquivo")
+    parser.add_argument("--executar", choices=MODOS, help=argparse.SUPPRESS)
+    parser.add_argument("--csv", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    
+    if args.executar:
+        print(json.dumps(executar_modo(args.executar, args.csv, args.tamanho_lote)))
+        return
+    
+    resultados = []
+    with tempfile.TemporaryDirectory() as diretorio:
+        for tamanho in args.tamanhos.split(","):
+            caminho = os.path.join(diretorio, f"sintetico_{tamanho.strip()}.csv")
+            gerar_csv(caminho, converter_tamanho(tamanho))
+            tamanho_mb = os.path.getsize(caminho) / 1024 ** 2
+            
+            for modo in args.modos.split(","):
+                resultado = _rodar_subprocesso(modo.strip(), caminho, args.tamanho_lote)
+                resultado['csv_mb'] = round(tamanho_mb, 1)
+                resultados.append(resultado)
+                print(f"{tamanho:>8} {resultado['modo']:>8}: "
+                      f"{resultado['segundos']:8.2f}s  pico RSS {resultado['pico_rss_mb']:8.1f} MB")
+            os.remove(caminho)
+    
+    if args.saida:
+        with open(args.saida, 'w') as arquivo:
+            json.dump(resultados, arquivo, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""Benchmark da validação: linhas por segundo por motor e proporção de inválidas.
+
+Lê um CSV sintético com o motor indicado, como a ingestão faria, e mede
+só o `ValidadorDados.filtrar` em lotes do tamanho pedido, com regras de
+tipo, intervalo, regex, não nulo e unicidade. A quarentena vai para um
+destino em memória, então a escrita do Parquet das rejeitadas entra na
+conta. A primeira chamada compila as regras; as demais usam o cache.
+
+Uso:
+    python -m benchmarks.benchmark_validacao --tamanho 200MB --lote 1000000
+"""
+import argparse
+import io
+import json
+import os
+import statistics
+import tempfile
+import time
+
+from benchmarks.gerador_csv import converter_tamanho, gerar_csv
+
+# Regras sobre as colunas do gerador; `quantidade` vai de 0 a 96, então o
+# máximo define a fração de linhas inválidas
+REGRAS = {
+    "obrigatorias": ["id"],
+    "colunas": {
+        "id": {"tipo": "inteiro", "nao_nulo": True, "unico": True},
+        "valor": {"tipo": "decimal", "min": 0},
+        "quantidade": {"tipo": "inteiro", "min": 0, "max": 96},
+        "nome": {"regex": "^cliente_[0-9]+$"},
+        "data": {"tipo": "data", "nao_nulo": True},
+    },
+}
+
+
+def carregar(caminho_csv: str, motor: str, como_texto: bool):
+    """Lê o CSV com o motor; como texto, a validação também checa os tipos."""
+    from src.ingestion.pipeline import criar_processador
+    
+    processador = criar_processador(motor)
+    with open(caminho_csv, 'rb') as arquivo:
+        dados = arquivo.read()
+    if not como_texto:
+        processador.ler_csv(dados)
+        return processador.df if motor == 'pandas' else processador.tabela
+    if motor == 'pandas':
+        import pandas as pd
+        return pd.read_csv(io.BytesIO(dados), dtype=str)
+    import pyarrow.csv as pacsv
+    colunas = dados[:dados.index(b'\n')].decode().split(',')
+    return pacsv.read_csv(io.BytesIO(dados), convert_options=pacsv.ConvertOptions(
+        column_types={coluna: 'string' for coluna in colunas}
+    ))
+
+
+def medir(dados, tamanho_lote: int, maximo_quantidade: int, repeticoes: int) -> dict:
+    """Valida os dados em lotes e mede a mediana das repetições."""
+    from src.ingestion.validacao import RegrasValidacao, ValidadorDados
+    
+    regras = dict(REGRAS, colunas=dict(REGRAS['colunas']))
+    regras['colunas']['quantidade'] = dict(regras['colunas']['quantidade'], max=maximo_quantidade)
+    regras = RegrasValidacao.de_dict(regras)
+    total = len(dados) if hasattr(dados, 'iloc') else dados.num_rows
+    
+    tempos = []
+    for _ in range(repeticoes):
+        validador = ValidadorDados(regras, abrir_quarentena=io.BytesIO)
+        inicio = time.perf_counter()
+        for posicao in range(0, total, tamanho_lote):
+            lote = dados.iloc[posicao:posicao + tamanho_lote] if hasattr(dados, 'iloc') \
+                else dados.slice(posicao, tamanho_lote)
+            validador.filtrar(lote)
+        tempos.append(time.perf_counter() - inicio)
+        validador.abortar()
+    mediana = statistics.median(tempos)
+    return {
+        'linhas': total,
+        'rejeitadas': validador.linhas_rejeitadas,
+        'p50_s': round(mediana, 4),
+        'milhoes_linhas_por_s': round(total / mediana / 1e6, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tamanho", default="100MB", help="Tamanho do CSV sintético")
+    parser.add_argument("--motores", default="arrow,pandas")
+    parser.add_argument("--lote", type=int, default=1_000_000, help="Linhas por chamada de filtrar")
+    parser.add_argument("--invalidas", default="0,0.01,0.1",
+                        help="Frações aproximadas de linhas fora do intervalo")
+    parser.add_argument("--repeticoes", type=int, default=3)
+    parser.add_argument("--saida", help="Grava os resultados em JSON neste arquivo")
+    args = parser.parse_args()
+    
+    resultados = []
+    with tempfile.TemporaryDirectory() as diretorio:
+        caminho = os.path.join(diretorio, "benchmark.csv")
+        gerar_csv(caminho, converter_tamanho(args.tamanho))
+        for motor in args.motores.split(","):
+            for como_texto in (False, True):
+                dados = carregar(caminho, motor, como_texto)
+                for fracao in (float(valor) for valor in args.invalidas.split(",")):
+                    resultado = {
+                        'motor': motor,
+                        'colunas': 'texto' if como_texto else 'tipadas',
+                        'fracao_invalidas': fracao,
+                        **medir(dados, args.lote, round(96 * (1 - fracao)), args.repeticoes),
+                    }
+                    resultados.append(resultado)
+                    print(f"{motor:>6} {resultado['colunas']:>7} inválidas {fracao:5.2f}: "
+                          f"{resultado['rejeitadas']:>9} rejeitadas  "
+                          f"p50 {resultado['p50_s']:7.3f}s  "
+                          f"{resultado['milhoes_linhas_por_s']:6.2f} M linhas/s")
+    
+    if args.saida:
+        with open(args.saida, 'w') as arquivo:
+            json.dump(resultados, arquivo, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""Gerador de arquivos CSV sintéticos para benchmarks."""
+import numpy as np
+import pandas as pd
+
+LINHAS_POR_BLOCO = 100_000
+BYTES_POR_LINHA_ESTIMADO = 80
+
+CIDADES = np.array([
+    "São Paulo", "Rio de Janeiro", "Belo Horizonte", "Porto Alegre",
+    "Curitiba", "Recife", "Salvador", "Fortaleza", "Manaus", "Brasília",
+])
+
+
+def _gerar_bloco(rng: np.random.Generator, inicio: int, linhas: int,
+                 taxa_duplicatas: float, colunas_extras: int = 0,
+                 tipo_extras: str = "misto") -> pd.DataFrame:
+    ids = np.arange(inicio, inicio + linhas)
+    if taxa_duplicatas > 0:
+        # Repete ids anteriores do próprio bloco para gerar linhas idênticas
+        repetidas = rng.random(linhas) < taxa_duplicatas
+        ids[repetidas] = rng.integers(inicio, inicio + linhas, repetidas.sum())
+    
+    # Todas as colunas derivam do id, então ids repetidos geram linhas idênticas
+    bloco = pd.DataFrame({
+        'id': ids,
+        'nome': np.char.add("cliente_", ids.astype(str)),
+        'cidade': CIDADES[ids % len(CIDADES)],
+        'valor': np.round((ids * 7919 % 100_000) / 100, 2),
+        'quantidade': ids % 97,
+        'data': pd.Timestamp("2024-01-01") + pd.to_timedelta(ids % 366, unit="D"),
+    })
+    
+    # Colunas extras para CSVs largos: numéricas, texto ou alternando as duas
+    for i in range(colunas_extras):
+        if tipo_extras == "numerico" or (tipo_extras == "misto" and i % 2 == 0):
+            bloco[f'metrica_{i}'] = (ids * (i + 3)) % 10_007 / 10
+        else:
+            bloco[f'atributo_{i}'] = np.char.add(f"cat{i}_", (ids % (i + 11)).astype(str))
+    return bloco
+
+
+def gerar_csv(caminho: str, tamanho_bytes: int, taxa_duplicatas: float = 0.0,
+              colunas_extras: int = 0, seed: int = 42, tipo_extras: str = "misto") -> int:
+    """Gera CSV sintético com aproximadamente `tamanho_bytes`; retorna o nº de linhas."""
+    rng = np.random.default_rng(seed)
+    linhas_escritas = 0
+    bytes_por_linha = BYTES_POR_LINHA_ESTIMADO * (1 + colunas_extras / 6)
+    
+    with open(caminho, 'w', encoding='utf-8', newline='') as arquivo:
+        while arquivo.tell() < tamanho_bytes:
+            if linhas_escritas:
+                bytes_por_linha = arquivo.tell() / linhas_escritas
+            restante = (tamanho_bytes - arquivo.tell()) / bytes_por_linha
+            linhas = int(min(LINHAS_POR_BLOCO, max(restante, 100)))
+            bloco = _gerar_bloco(rng, linhas_escritas, linhas, taxa_duplicatas, colunas_extras,
+                                 tipo_extras)
+            bloco.to_csv(arquivo, index=False, header=linhas_escritas == 0)
+            linhas_escritas += len(bloco)
+    
+    return linhas_escritas
+
+
+def converter_tamanho(texto: str) -> int:
+    """Converte '100MB', '1GB' ou '512KB' em bytes."""
+    texto = texto.strip().upper()
+    for sufixo, fator in (("GB", 1024 ** 3), ("MB", 1024 ** 2), ("KB", 1024)):
+        if texto.endswith(sufixo):
+            return int(float(texto[:-len(sufixo)]) * fator)
+    return int(texto)
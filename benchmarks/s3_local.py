@@ -0,0 +1,75 @@
+"""S3 local simulado, com latência e banda por conexão configuráveis.
+
+Implementa o subconjunto da API do cliente boto3 usado pelo pipeline, guardando
+os objetos em memória. Cada chamada dorme `latencia_s` mais o tempo de
+transferência a `banda_mb_s`, como uma conexão HTTP real faria, o que permite
+medir o ganho de concorrência sem rede.
+"""
+import threading
+import time
+import uuid
+from io import BytesIO
+
+MB = 1024 * 1024
+
+
+class S3Simulado:
+    """Cliente S3 em memória com latência injetada."""
+    
+    def __init__(self, latencia_s: float = 0.02, banda_mb_s: float = 50.0):
+        self.latencia_s = latencia_s
+        self.banda_mb_s = banda_mb_s
+        self.objetos = {}
+        self.requisicoes = 0
+        self._uploads = {}
+        self._trava = threading.Lock()
+    
+    def _atrasar(self, quantidade_bytes: int = 0):
+        with self._trava:
+            self.requisicoes += 1
+        atraso = self.latencia_s
+        if self.banda_mb_s:
+            atraso += quantidade_bytes / (self.banda_mb_s * MB)
+        if atraso:
+            time.sleep(atraso)
+    
+    def put_object(self, Bucket: str, Key: str, Body=b"", **_):
+        dados = Body.read() if hasattr(Body, 'read') else bytes(Body)
+        self._atrasar(len(dados))
+        self.objetos[(Bucket, Key)] = dados
+        return {'ETag': f'"{uuid.uuid4().hex}"'}
+    
+    def get_object(self, Bucket: str, Key: str, Range: str = None, **_):
+        dados = self.objetos[(Bucket, Key)]
+        if Range:
+            inicio, fim = Range.replace("bytes=", "").split("-")
+            dados = dados[int(inicio):int(fim) + 1]
+        self._atrasar(len(dados))
+        return {'Body': BytesIO(dados), 'ContentLength': len(dados)}
+    
+    def head_object(self, Bucket: str, Key: str, **_):
+        self._atrasar()
+        return {'ContentLength': len(self.objetos[(Bucket, Key)])}
+    
+    def create_multipart_upload(self, Bucket: str, Key: str, **_):
+        self._atrasar()
+        upload_id = uuid.uuid4().hex
+        self._uploads[upload_id] = {}
+        return {'UploadId': upload_id}
+    
+    def upload_part(self, Bucket: str, Key: str, UploadId: str, PartNumber: int, Body, **_):
+        self._atrasar(len(Body))
+        self._uploads[UploadId][PartNumber] = bytes(Body)
+        return {'ETag': f'"{PartNumber}"'}
+    
+    def complete_multipart_upload(self, Bucket: str, Key: str, UploadId: str,
+                                  MultipartUpload: dict, **_):
+        self._atrasar()
+        partes = self._uploads.pop(UploadId)
+        numeros = [parte['PartNumber'] for parte in MultipartUpload['Parts']]
+        self.objetos[(Bucket, Key)] = b"".join(partes[n] for n in numeros)
+        return {}
+    
+    def abort_multipart_upload(self, Bucket: str, Key: str, UploadId: str, **_):
+        self._uploads.pop(UploadId, None)
+        return {}
@@ -0,0 +1,259 @@
+"""Suíte de benchmarks ponta a ponta do PipelineIngestao contra o moto.
+
+Para cada perfil de CSV sintético (estreito, largo, numérico, texto, com
+muitas duplicatas) e cada tamanho, sobe o arquivo num S3 moto e roda
+`processar_arquivo` várias vezes, num subprocesso próprio para isolar o pico
+de RSS. Mede vazão (linhas/s, MB/s), percentis de latência, pico de memória
+e o tempo por etapa da instrumentação. Com `--armazenamento local`, o CSV
+fica num diretório lido por memory map (ClienteArquivosLocal), sem a
+emulação HTTP do moto: sobra só o custo de CPU do pipeline.
+
+O resultado é um JSON com o commit, as versões e os parâmetros, para
+comparar execuções entre commits.
+
+Uso:
+    python -m benchmarks.suite --tamanhos 1MB,10MB,100MB --saida antes.json
+    python -m benchmarks.suite --tamanhos 1MB,10MB,100MB --saida depois.json
+    python -m benchmarks.suite --comparar antes.json depois.json
+    python -m benchmarks.suite --tamanhos 100MB --armazenamento moto,local
+"""
+import argparse
+import io
+import json
+import math
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+from benchmarks.benchmark_streaming import _pico_rss_mb
+from benchmarks.gerador_csv import converter_tamanho, gerar_csv
+
+# Perfil -> parâmetros do gerador
+PERFIS = {
+    'estreito': {'colunas_extras': 0},
+    'largo': {'colunas_extras': 94},
+    'numerico': {'colunas_extras': 30, 'tipo_extras': 'numerico'},
+    'texto': {'colunas_extras': 30, 'tipo_extras': 'texto'},
+    'duplicatas': {'colunas_extras': 0, 'taxa_duplicatas': 0.5},
+}
+
+BUCKET_RAW = "benchmark-raw"
+CHAVE = "input/benchmark.csv"
+
+
+def percentil(valores: list, p: float) -> float:
+    """Percentil por posição mais próxima (sem interpolação)."""
+    ordenados = sorted(valores)
+    posicao = max(1, math.ceil(p / 100 * len(ordenados)))
+    return ordenados[posicao - 1]
+
+
+@contextmanager
+def _armazenamento(tipo: str, caminho_csv: str):
+    """Cliente com o CSV em BUCKET_RAW/CHAVE, no moto ou num diretório local."""
+    from src.config.settings import config
+    
+    if tipo == "local":
+        from src.utils.armazenamento_local import ClienteArquivosLocal
+        with tempfile.TemporaryDirectory() as raiz:
+            destino = os.path.join(raiz, BUCKET_RAW, *CHAVE.split('/'))
+            os.makedirs(os.path.dirname(destino))
+            shutil.copyfile(caminho_csv, destino)
+            yield ClienteArquivosLocal(raiz)
+        return
+    
+    import boto3
+    from moto import mock_aws
+    from src.utils.s3_utils import ClienteS3
+    with mock_aws():
+        s3 = boto3.client('s3', region_name='us-east-1')
+        s3.create_bucket(Bucket=BUCKET_RAW)
+        s3.create_bucket(Bucket=config.s3.bucket_data_lake)
+        s3.upload_file(caminho_csv, BUCKET_RAW, CHAVE)
+        yield ClienteS3(regiao='us-east-1')
+
+
+def executar_cenario(caminho_csv: str, repeticoes: int, motor: str, streaming: bool,
+                     armazenamento: str = "moto") -> dict:
+    """Roda o pipeline sobre o CSV no armazenamento indicado e mede cada repetição."""
+    from src.config.settings import config
+    from src.ingestion.pipeline import PipelineIngestao
+    from src.utils.instrumentacao import Instrumentacao
+    
+    config.processamento.modo_streaming = streaming
+    tamanho = os.path.getsize(caminho_csv)
+    
+    with _armazenamento(armazenamento, caminho_csv) as cliente_s3:
+        # O moto guarda o CSV em memória; o pico do pipeline é medido acima disto
+        rss_base = _pico_rss_mb()
+        
+        latencias = []
+        etapas = {}
+        linhas = 0
+        # Uma execução de aquecimento (imports, caches) quando há repetições
+        for repeticao in range(repeticoes + (1 if repeticoes > 1 else 0)):
+            instrumentacao = Instrumentacao(habilitada=True, emf=False, saida=io.StringIO())
+            pipeline = PipelineIngestao(cliente_s3=cliente_s3, motor=motor,
+                                        instrumentacao=instrumentacao)
+            inicio = time.perf_counter()
+            resultado = pipeline.processar_arquivo(BUCKET_RAW, CHAVE)
+            segundos = time.perf_counter() - inicio
+            if not resultado['sucesso']:
+                raise RuntimeError(resultado['erro'])
+            if repeticoes > 1 and repeticao == 0:
+                continue
+            latencias.append(segundos)
+            linhas = resultado['linhas']
+            for nome, campos in resultado['etapas'].items():
+                etapas.setdefault(nome, []).append(campos['duracao_ms'])
+    
+    mediana = percentil(latencias, 50)
+    pico = _pico_rss_mb()
+    return {
+        'linhas': linhas,
+        'tamanho_mb': round(tamanho / 1024 ** 2, 2),
+        'repeticoes': len(latencias),
+        'latencia_s': {
+            'p50': round(mediana, 4),
+            'p90': round(percentil(latencias, 90), 4),
+            'p99': round(percentil(latencias, 99), 4),
+            'min': round(min(latencias), 4),
+            'max': round(max(latencias), 4),
+        },
+        'linhas_por_s': round(linhas / mediana, 1),
+        'mb_por_s': round(tamanho / 1024 ** 2 / mediana, 2),
+        'pico_rss_mb': round(pico, 1),
+        'pico_rss_pipeline_mb': round(pico - rss_base, 1),
+        'etapas_p50_ms': {nome: round(percentil(tempos, 50), 3) for nome, tempos in etapas.items()},
+    }
+
+
+def _rodar_subprocesso(caminho_csv: str, repeticoes: int, motor: str, streaming: bool,
+                       armazenamento: str) -> dict:
+    comando = [sys.executable, "-m", "benchmarks.suite", "--executar", caminho_csv,
+               "--repeticoes", str(repeticoes), "--motor", motor, "--armazenamento", armazenamento]
+    if streaming:
+        comando.append("--streaming")
+    # A última linha do stdout é o resultado
+    saida = subprocess.run(comando, check=True, capture_output=True, text=True)
+    return json.loads(saida.stdout.strip().splitlines()[-1])
+
+
+def _ambiente() -> dict:
+    """Commit, versões e máquina, para saber o que está sendo comparado."""
+    import pandas as pd
+    import pyarrow as pa
+    
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], check=True,
+                                capture_output=True, text=True).stdout.strip()
+        sujo = bool(subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"],
+                                   check=True, capture_output=True, text=True).stdout.strip())
+    except (OSError, subprocess.CalledProcessError):
+        commit, sujo = None, None
+    return {
+        'commit': commit,
+        'alteracoes_locais': sujo,
+        'data': datetime.now(timezone.utc).isoformat(),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'pyarrow': pa.__version__,
+        'plataforma': platform.platform(),
+        'cpus': os.cpu_count(),
+    }
+
+
+def comparar(caminho_antes: str, caminho_depois: str):
+    """Imprime a variação de vazão, latência e memória entre duas execuções."""
+    with open(caminho_antes) as arquivo:
+        antes = json.load(arquivo)
+    with open(caminho_depois) as arquivo:
+        depois = json.load(arquivo)
+    
+    def chave(resultado):
+        return (resultado['perfil'], resultado['tamanho'], resultado['motor'],
+                resultado['streaming'], resultado.get('armazenamento', 'moto'))
+    
+    anteriores = {chave(r): r for r in antes['resultados']}
+    print(f"{antes['ambiente']['commit']} -> {depois['ambiente']['commit']}")
+    for resultado in depois['resultados']:
+        anterior = anteriores.get(chave(resultado))
+        if anterior is None:
+            continue
+        vazao = resultado['mb_por_s'] / anterior['mb_por_s']
+        p50 = resultado['latencia_s']['p50'] / anterior['latencia_s']['p50']
+        memoria = resultado['pico_rss_pipeline_mb'] - anterior['pico_rss_pipeline_mb']
+        print(f"{'/'.join(str(c) for c in chave(resultado)):>40}: vazão x{vazao:5.2f}  "
+              f"p50 x{p50:5.2f}  pico {memoria:+8.1f} MB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--perfis", default=",".join(PERFIS))
+    parser.add_argument("--tamanhos", default="1MB,10MB,100MB",
+                        help="Tamanhos dos CSVs, de 1MB a 1GB")
+    parser.add_argument("--repeticoes", type=int, default=5)
+    parser.add_argument("--motores", default="pandas,arrow")
+    parser.add_argument("--modos", default="memoria,streaming")
+    parser.add_argument("--armazenamento", default="moto",
+                        help="moto, local (diretório com memory map) "
+                             "ou ambos separados por vírgula")
+    parser.add_argument("--saida", help="Grava os resultados em JSON neste arquivo")
+    parser.add_argument("--comparar", nargs=2, metavar=("ANTES", "DEPOIS"))
+    parser.add_argument("--executar", help=argparse.SUPPRESS)
+    parser.add_argument("--motor", default="pandas", help=argparse.SUPPRESS)
+    parser.add_argument("--streaming", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    
+    if args.comparar:
+        comparar(*args.comparar)
+        return
+    if args.executar:
+        print(json.dumps(executar_cenario(args.executar, args.repeticoes, args.motor,
+                                          args.streaming, args.armazenamento)))
+        return
+    
+    resultados = []
+    with tempfile.TemporaryDirectory() as diretorio:
+        for perfil in args.perfis.split(","):
+            for tamanho in args.tamanhos.split(","):
+                caminho = os.path.join(diretorio, f"{perfil}-{tamanho}.csv")
+                gerar_csv(caminho, converter_tamanho(tamanho), **PERFIS[perfil])
+                
+                cenarios = [(motor, modo, armazenamento)
+                            for armazenamento in args.armazenamento.split(",")
+                            for motor in args.motores.split(",")
+                            for modo in args.modos.split(",")]
+                for motor, modo, armazenamento in cenarios:
+                    resultado = {
+                        'perfil': perfil,
+                        'tamanho': tamanho,
+                        'motor': motor,
+                        'streaming': modo == "streaming",
+                        'armazenamento': armazenamento,
+                        **_rodar_subprocesso(caminho, args.repeticoes, motor, modo == "streaming",
+                                             armazenamento),
+                    }
+                    resultados.append(resultado)
+                    print(f"{perfil:>10} {tamanho:>6} {motor:>6} {modo:>9} {armazenamento:>5}: "
+                          f"p50 {resultado['latencia_s']['p50']:8.3f}s "
+                          f"p90 {resultado['latencia_s']['p90']:8.3f}s "
+                          f"{resultado['mb_por_s']:7.2f} MB/s "
+                          f"{resultado['linhas_por_s']:11.0f} linhas/s "
+                          f"pico +{resultado['pico_rss_pipeline_mb']:7.1f} MB")
+                os.remove(caminho)
+    
+    documento = {'ambiente': _ambiente(), 'parametros': vars(args), 'resultados': resultados}
+    if args.saida:
+        with open(args.saida, 'w') as arquivo:
+            json.dump(documento, arquivo, indent=2)
+
+
+if __name__ == "__main__":
+    main()
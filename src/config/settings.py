@@ -3,10 +3,12 @@ Configurações do pipeline de ingestão de dados.
 """
 import os
 from dataclasses import dataclass
-from typing import List
-from dotenv import load_dotenv
+from typing import List, Optional
 
-load_dotenv()
+# Na Lambda a configuração vem do ambiente; o .env só existe em desenvolvimento
+if "AWS_LAMBDA_FUNCTION_NAME" not in os.environ:
+    from dotenv import load_dotenv
+    load_dotenv()
 
 
 @dataclass
@@ -14,7 +16,7 @@ class ConfigAWS:
     """Configurações AWS."""
     regiao: str = os.getenv("AWS_REGION", "us-east-1")
     id_conta: str = os.getenv("AWS_ACCOUNT_ID", "")
-    
+
 
 @dataclass
 class ConfigS3:
@@ -23,19 +25,94 @@ class ConfigS3:
     bucket_data_lake: str = os.getenv("DATA_LAKE_BUCKET_NAME", "my-data-lake-bucket")
     prefixo_processados: str = os.getenv("PROCESSED_PREFIX", "processed/")
     prefixo_falhas: str = os.getenv("FAILED_PREFIX", "failed/")
-    
+    tamanho_parte_mb: int = int(os.getenv("S3_PART_SIZE_MB", "8"))
+    concorrencia: int = int(os.getenv("S3_MAX_CONCURRENCY", "4"))
+    backend_armazenamento: str = os.getenv("STORAGE_BACKEND", "s3")  # "s3" ou "local"
+    raiz_armazenamento_local: str = os.getenv("LOCAL_STORAGE_ROOT", "data")
+
 
 @dataclass
 class ConfigProcessamento:
     """Configurações de processamento."""
     tamanho_max_arquivo_mb: int = int(os.getenv("MAX_FILE_SIZE_MB", "100"))
     tamanho_lote: int = int(os.getenv("BATCH_SIZE", "1000"))
+    modo_streaming: bool = os.getenv("STREAMING_MODE", "false").lower() == "true"
+    limite_memoria_mb: int = int(os.getenv("MEMORY_LIMIT_MB", "0"))  # 0 = detectar
+    processos_leitura: int = int(os.getenv("PARSE_WORKERS", "1"))  # 1 = sem fragmentos
+    # Fragmentos a partir de 2 x SHARD_SIZE_MB: abaixo do MAX_FILE_SIZE_MB padrão (100)
+    tamanho_fragmento_mb: int = int(os.getenv("SHARD_SIZE_MB", "32"))
+    registros_paralelos: int = int(os.getenv("MAX_PARALLEL_RECORDS", "1"))
+    estagios_concorrentes: bool = os.getenv("STAGED_PIPELINE", "false").lower() == "true"
+    profundidade_fila_estagios: int = int(os.getenv("STAGE_QUEUE_DEPTH", "2"))
+    micro_lotes: bool = os.getenv("MICRO_BATCH", "false").lower() == "true"
+    tamanho_max_objeto_micro_lote_kb: int = int(os.getenv("MICRO_BATCH_MAX_OBJECT_KB", "1024"))
+    tamanho_micro_lote_mb: int = int(os.getenv("MICRO_BATCH_MAX_MB", "64"))
+    motor: str = os.getenv("PROCESSING_ENGINE", "pandas")
+    limite_memoria_dedup_mb: int = int(os.getenv("DEDUP_MEMORY_MB", "64"))
+    indice_deduplicacao: str = os.getenv("DEDUP_INDEX", "")  # "", "hashes" ou "bloom"
+    taxa_falsos_positivos_bloom: float = float(os.getenv("DEDUP_BLOOM_FP_RATE", "0.001"))
+    # Dias de ingestão mantidos no índice, um segmento por dia (0 = todos)
+    dias_retencao_indice_dedup: int = int(os.getenv("DEDUP_INDEX_RETENTION_DAYS", "30"))
+    registro_esquemas: bool = os.getenv("SCHEMA_REGISTRY", "false").lower() == "true"
+    manifesto_ingestao: bool = os.getenv("INGESTION_MANIFEST", "false").lower() == "true"
+    coluna_data_evento: str = os.getenv("EVENT_DATE_COLUMN", "")  # vazio = data de ingestão
+    formato_data_evento: str = os.getenv("EVENT_DATE_FORMAT", "")  # ex.: %d/%m/%Y
+    # Formato de data, além do ISO 8601, que o registro de esquemas reconhece
+    formato_data: str = os.getenv("DATE_FORMAT", "")  # ex.: %d/%m/%Y
+    compressao_parquet: str = os.getenv("PARQUET_COMPRESSION", "snappy")
+    nivel_compressao_parquet: Optional[int] = None
+    linhas_por_row_group: Optional[int] = None  # vazio = uma escrita por row group
+    colunas_dicionario_parquet: str = os.getenv("PARQUET_DICTIONARY_COLUMNS", "")  # vazio = todas
+    estatisticas_parquet: str = os.getenv("PARQUET_STATISTICS", "")  # vazio = todas
+    # Partições com Parquet aberto ao mesmo tempo numa escrita em lotes (0 = sem limite)
+    max_arquivos_parquet_abertos: int = int(os.getenv("PARQUET_MAX_OPEN_FILES", "32"))
+    perfil_colunas: bool = os.getenv("PROFILE_COLUMNS", "false").lower() == "true"
+    deteccao_dialeto: bool = os.getenv("DETECT_DIALECT", "false").lower() == "true"
+    tamanho_amostra_dialeto_kb: int = int(os.getenv("DIALECT_SAMPLE_KB", "64"))
+    # JSON ou caminho; vazio = sem validação
+    regras_validacao: str = os.getenv("VALIDATION_RULES", "")
     colunas_particao: List[str] = None
+    colunas_deduplicacao: List[str] = None
+    colunas_ordenacao_parquet: List[str] = None
+    colunas_bloom_parquet: List[str] = None
     
     def __post_init__(self):
+        if self.nivel_compressao_parquet is None and os.getenv("PARQUET_COMPRESSION_LEVEL"):
+            self.nivel_compressao_parquet = int(os.getenv("PARQUET_COMPRESSION_LEVEL"))
+        if self.linhas_por_row_group is None and os.getenv("PARQUET_ROW_GROUP_ROWS"):
+            self.linhas_por_row_group = int(os.getenv("PARQUET_ROW_GROUP_ROWS"))
+        if self.colunas_ordenacao_parquet is None:
+            colunas_str = os.getenv("PARQUET_SORT_COLUMNS", "")
+            self.colunas_ordenacao_parquet = [
+                col.strip() for col in colunas_str.split(",") if col.strip()
+            ]
+        if self.colunas_bloom_parquet is None:
+            colunas_str = os.getenv("PARQUET_BLOOM_FILTER_COLUMNS", "")
+            self.colunas_bloom_parquet = [
+                col.strip() for col in colunas_str.split(",") if col.strip()
+            ]
         if self.colunas_particao is None:
             colunas_str = os.getenv("PARTITION_COLS", "ano,mes,dia")
-            self.colunas_particao = [col.strip() for col in colunas_str.split(",")]
+            self.colunas_particao = [col.strip() for col in colunas_str.split(",") if col.strip()]
+        if self.colunas_deduplicacao is None:
+            # Vazio = todas as colunas formam a chave de deduplicação
+            colunas_str = os.getenv("DEDUP_COLUMNS", "")
+            self.colunas_deduplicacao = [
+                col.strip() for col in colunas_str.split(",") if col.strip()
+            ]
+
+
+@dataclass
+class ConfigCompactacao:
+    """Configurações da compactação de arquivos pequenos do Data Lake."""
+    tamanho_alvo_mb: int = int(os.getenv("COMPACTION_TARGET_MB", "256"))
+    min_arquivos: int = int(os.getenv("COMPACTION_MIN_FILES", "2"))
+    colunas_ordenacao: List[str] = None
+    
+    def __post_init__(self):
+        if self.colunas_ordenacao is None:
+            colunas_str = os.getenv("COMPACTION_SORT_KEY", "")
+            self.colunas_ordenacao = [col.strip() for col in colunas_str.split(",") if col.strip()]
 
 
 @dataclass
@@ -57,6 +134,9 @@ class ConfigLogging:
     """Configurações de logging."""
     nivel_log: str = os.getenv("LOG_LEVEL", "INFO")
     habilitar_xray: bool = os.getenv("ENABLE_XRAY", "true").lower() == "true"
+    metricas: bool = os.getenv("ENABLE_METRICS", "false").lower() == "true"
+    metricas_emf: bool = os.getenv("METRICS_EMF", "true").lower() == "true"
+    namespace_metricas: str = os.getenv("METRICS_NAMESPACE", "CsvIngestao")
 
 
 class Configuracao:
@@ -66,6 +146,7 @@ class Configuracao:
         self.aws = ConfigAWS()
         self.s3 = ConfigS3()
         self.processamento = ConfigProcessamento()
+        self.compactacao = ConfigCompactacao()
         self.glue = ConfigGlue()
         self.notificacao = ConfigNotificacao()
         self.logging = ConfigLogging()
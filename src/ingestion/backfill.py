@@ -0,0 +1,365 @@
+"""Reprocessamento em massa (backfill) dos CSVs de um prefixo do bucket raw.
+
+Percorre o prefixo e roda `PipelineIngestao.processar_arquivo` em cada CSV,
+num pool de processos do tamanho dos núcleos. O progresso fica num
+checkpoint local, então uma execução interrompida retoma de onde parou.
+
+Uso:
+    python -m src.ingestion.backfill input/2024/01/ --processos 8 \\
+        --checkpoint backfill.jsonl --arquivos-por-segundo 20
+
+Com `--local RAIZ`, buckets são subdiretórios de RAIZ e nada vai à AWS.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Callable, Dict, Iterator, Optional
+from ..config.settings import config
+from ..utils.armazenamento import criar_armazenamento
+from ..utils.descompressao import eh_csv
+from ..utils.s3_stream import MB
+from .pipeline import PipelineIngestao
+
+logger = logging.getLogger(__name__)
+
+
+class LimitadorTaxa:
+    """Balde de fichas: libera em média `taxa` unidades por segundo.
+
+    Até `rajada` unidades saem sem espera; um pedido maior que o saldo dorme
+    o tempo necessário para pagar a diferença. Sem `taxa`, não limita.
+    """
+
+    def __init__(
+        self,
+        taxa: Optional[float],
+        rajada: Optional[float] = None,
+        relogio: Callable[[], float] = time.monotonic,
+        dormir: Callable[[float], None] = time.sleep,
+    ):
+        self.taxa = taxa
+        self.capacidade = rajada if rajada is not None else max(1.0, taxa or 0)
+        self.fichas = self.capacidade
+        self.relogio = relogio
+        self.dormir = dormir
+        self._ultimo = relogio()
+
+    def aguardar(self, quantidade: float = 1) -> float:
+        """Consome `quantidade` fichas, dormindo se faltarem. Retorna a espera."""
+        if not self.taxa:
+            return 0.0
+        agora = self.relogio()
+        self.fichas = min(
+            self.capacidade, self.fichas + (agora - self._ultimo) * self.taxa
+        )
+        self._ultimo = agora
+        self.fichas -= quantidade
+        if self.fichas >= 0:
+            return 0.0
+        espera = -self.fichas / self.taxa
+        self.dormir(espera)
+        return espera
+
+
+class ManifestoCheckpoint:
+    """Progresso do backfill num arquivo JSON Lines local, uma linha por CSV.
+
+    Cada resultado é gravado assim que sai. Ao retomar, CSVs com sucesso e
+    mesmos tamanho e ETag são pulados; falhas e arquivos alterados rodam de
+    novo (linhas gravadas antes do ETag no checkpoint comparam só o
+    tamanho). Vale a última linha de cada chave, e uma linha final truncada
+    por uma queda é ignorada.
+    """
+
+    def __init__(self, caminho: Optional[str]):
+        self.caminho = caminho
+        self.concluidos: Dict[str, dict] = {}
+        self._arquivo = None
+        if not caminho:
+            return
+        if os.path.exists(caminho):
+            with open(caminho, encoding="utf-8") as arquivo:
+                for linha in arquivo:
+                    try:
+                        registro = json.loads(linha)
+                    except ValueError:
+                        continue
+                    if registro.get("sucesso"):
+                        self.concluidos[registro["chave"]] = registro
+                    else:
+                        self.concluidos.pop(registro["chave"], None)
+        self._arquivo = open(caminho, "a", encoding="utf-8")
+
+    def concluido(self, chave: str, tamanho: int, etag: Optional[str] = None) -> bool:
+        registro = self.concluidos.get(chave)
+        return (
+            registro is not None
+            and registro.get("tamanho") == tamanho
+            and registro.get("etag", etag) == etag
+        )
+
+    def registrar(self, registro: dict):
+        if registro.get("sucesso"):
+            self.concluidos[registro["chave"]] = registro
+        if self._arquivo is not None:
+            self._arquivo.write(json.dumps(registro, default=str) + "\n")
+            self._arquivo.flush()
+
+    def fechar(self):
+        if self._arquivo is not None:
+            self._arquivo.close()
+            self._arquivo = None
+
+
+def criar_cliente(raiz_local: Optional[str] = None):
+    """Cliente do STORAGE_BACKEND, ou o de diretório local se `raiz_local` for dada."""
+    return criar_armazenamento(raiz_local=raiz_local)
+
+
+# Pipeline de cada processo do pool, criado uma vez pelo inicializador
+_pipeline: Optional[PipelineIngestao] = None
+
+
+def _iniciar_processo(raiz_local: Optional[str], motor: Optional[str]):
+    global _pipeline
+    _pipeline = PipelineIngestao(cliente_s3=criar_cliente(raiz_local), motor=motor)
+
+
+def _processar(
+    bucket: str,
+    chave: str,
+    tamanho: int,
+    etag: Optional[str] = None,
+    forcar: bool = False,
+) -> dict:
+    inicio = time.perf_counter()
+    resultado = _pipeline.processar_arquivo(
+        bucket, chave, etag=etag, tamanho=tamanho, forcar=forcar
+    )
+    return {
+        "chave": chave,
+        "tamanho": tamanho,
+        "etag": etag,
+        "sucesso": resultado["sucesso"],
+        "ignorado": resultado.get("ignorado", False),
+        "linhas": resultado.get("linhas", 0),
+        "segundos": round(time.perf_counter() - inicio, 3),
+        "erro": resultado["erro"],
+    }
+
+
+class Reprocessador:
+    """Roda o pipeline sobre todos os CSVs de um prefixo, em paralelo.
+
+    `processos` <= 1 roda no próprio processo (útil com moto, que não é
+    visto por processos filhos). Os limites de taxa valem para o início de
+    cada arquivo, em arquivos/s e MB/s lidos do bucket raw. Com `forcar`,
+    versões já no manifesto de ingestão são reprocessadas (ex.: depois de
+    uma mudança de lógica) e os Parquet da ingestão anterior, substituídos;
+    por isso `forcar` exige o manifesto (INGESTION_MANIFEST).
+    """
+
+    def __init__(
+        self,
+        processos: Optional[int] = None,
+        checkpoint: Optional[str] = None,
+        arquivos_por_segundo: Optional[float] = None,
+        mb_por_segundo: Optional[float] = None,
+        raiz_local: Optional[str] = None,
+        motor: Optional[str] = None,
+        forcar: bool = False,
+    ):
+        if forcar and not config.processamento.manifesto_ingestao:
+            raise ValueError(
+                "forcar substitui os Parquet registrados no manifesto de ingestão: "
+                "habilite INGESTION_MANIFEST"
+            )
+        self.processos = processos or os.cpu_count() or 1
+        if self.processos > 1 and config.processamento.indice_deduplicacao:
+            # O índice é lido e regravado a cada arquivo; processos paralelos
+            # na mesma partição perderiam as atualizações uns dos outros
+            logger.warning("DEDUP_INDEX habilitado: backfill com um processo só")
+            self.processos = 1
+        self.checkpoint = checkpoint
+        self.limite_arquivos = LimitadorTaxa(arquivos_por_segundo)
+        self.limite_bytes = LimitadorTaxa(
+            mb_por_segundo * MB if mb_por_segundo else None,
+            rajada=mb_por_segundo * MB if mb_por_segundo else None,
+        )
+        self.raiz_local = raiz_local
+        self.motor = motor
+        self.forcar = forcar
+
+    def _pendentes(
+        self, bucket: str, prefixo: str, manifesto: ManifestoCheckpoint, resumo: dict
+    ) -> Iterator[dict]:
+        cliente = criar_cliente(self.raiz_local)
+        for objeto in cliente.iterar_objetos(bucket, prefixo, detalhado=True):
+            if not eh_csv(objeto["key"]):
+                continue
+            if manifesto.concluido(objeto["key"], objeto["size"], objeto.get("etag")):
+                resumo["pulados"] += 1
+                continue
+            self.limite_arquivos.aguardar()
+            self.limite_bytes.aguardar(objeto["size"])
+            yield objeto
+
+    def executar(self, bucket: str, prefixo: str = "") -> dict:
+        """Reprocessa o prefixo e retorna o resumo com linhas/s e bytes/s."""
+        resumo = {
+            "arquivos": 0,
+            "pulados": 0,
+            "falhas": 0,
+            "ja_ingeridos": 0,
+            "linhas": 0,
+            "bytes": 0,
+        }
+        manifesto = ManifestoCheckpoint(self.checkpoint)
+        inicio = time.perf_counter()
+
+        def registrar(registro: dict):
+            manifesto.registrar(registro)
+            resumo["arquivos"] += 1
+            if registro.get("ignorado"):
+                resumo["ja_ingeridos"] += 1
+            elif registro["sucesso"]:
+                resumo["linhas"] += registro["linhas"] or 0
+                resumo["bytes"] += registro["tamanho"]
+            else:
+                resumo["falhas"] += 1
+                logger.error(f"Falha em {registro['chave']}: {registro['erro']}")
+
+        try:
+            pendentes = self._pendentes(bucket, prefixo, manifesto, resumo)
+            if self.processos <= 1:
+                _iniciar_processo(self.raiz_local, self.motor)
+                for objeto in pendentes:
+                    registrar(
+                        _processar(
+                            bucket,
+                            objeto["key"],
+                            objeto["size"],
+                            objeto.get("etag"),
+                            self.forcar,
+                        )
+                    )
+            else:
+                self._executar_pool(bucket, pendentes, registrar)
+        finally:
+            manifesto.fechar()
+
+        segundos = time.perf_counter() - inicio
+        resumo["segundos"] = round(segundos, 3)
+        resumo["linhas_por_s"] = (
+            round(resumo["linhas"] / segundos, 1) if segundos else 0.0
+        )
+        resumo["bytes_por_s"] = (
+            round(resumo["bytes"] / segundos, 1) if segundos else 0.0
+        )
+        logger.info(f"Backfill de {bucket}/{prefixo} concluído: {resumo}")
+        return resumo
+
+    def _executar_pool(
+        self, bucket: str, pendentes: Iterator[dict], registrar: Callable
+    ):
+        # spawn: fork depois de o pyarrow criar threads pode travar o filho
+        contexto = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(
+            max_workers=self.processos,
+            mp_context=contexto,
+            initializer=_iniciar_processo,
+            initargs=(self.raiz_local, self.motor),
+        ) as executor:
+            em_voo = {}
+
+            def coletar(futuros):
+                for futuro in futuros:
+                    objeto = em_voo.pop(futuro)
+                    try:
+                        registro = futuro.result()
+                    except Exception as e:
+                        registro = {
+                            "chave": objeto["key"],
+                            "tamanho": objeto["size"],
+                            "etag": objeto.get("etag"),
+                            "sucesso": False,
+                            "linhas": 0,
+                            "erro": str(e),
+                        }
+                    registrar(registro)
+
+            # No máximo 2 arquivos por processo enfileirados: a listagem e os
+            # limites de taxa acompanham o ritmo real do pool
+            for objeto in pendentes:
+                futuro = executor.submit(
+                    _processar,
+                    bucket,
+                    objeto["key"],
+                    objeto["size"],
+                    objeto.get("etag"),
+                    self.forcar,
+                )
+                em_voo[futuro] = objeto
+                if len(em_voo) >= 2 * self.processos:
+                    prontos, _ = wait(list(em_voo), return_when=FIRST_COMPLETED)
+                    coletar(prontos)
+            coletar(wait(list(em_voo)).done)
+
+
+def main(argumentos=None):
+    parser = argparse.ArgumentParser(
+        description="Reprocessa os CSVs de um prefixo do bucket raw."
+    )
+    parser.add_argument(
+        "prefixo", nargs="?", default="", help="Prefixo dos CSVs no bucket raw"
+    )
+    parser.add_argument("--bucket", default=config.s3.bucket_raw)
+    parser.add_argument("--processos", type=int, default=os.cpu_count())
+    parser.add_argument(
+        "--checkpoint",
+        default="backfill.jsonl",
+        help="Manifesto de progresso (JSON Lines) para retomar a execução",
+    )
+    parser.add_argument("--arquivos-por-segundo", type=float)
+    parser.add_argument("--mb-por-segundo", type=float)
+    parser.add_argument(
+        "--local", metavar="RAIZ", help="Diretório local no lugar do S3"
+    )
+    parser.add_argument("--motor", choices=["pandas", "arrow"])
+    parser.add_argument(
+        "--forcar",
+        action="store_true",
+        help="Reprocessa também as versões já registradas no manifesto de ingestão, "
+        "substituindo os Parquet gravados por elas (exige INGESTION_MANIFEST)",
+    )
+    args = parser.parse_args(argumentos)
+
+    logging.basicConfig(
+        level=config.logging.nivel_log, format="%(asctime)s %(levelname)s %(message)s"
+    )
+    try:
+        reprocessador = Reprocessador(
+            processos=args.processos,
+            checkpoint=args.checkpoint,
+            arquivos_por_segundo=args.arquivos_por_segundo,
+            mb_por_segundo=args.mb_por_segundo,
+            raiz_local=args.local,
+            motor=args.motor,
+            forcar=args.forcar,
+        )
+    except ValueError as e:
+        parser.error(str(e))
+    resumo = reprocessador.executar(args.bucket, args.prefixo)
+    print(json.dumps(resumo, indent=2))
+    return 1 if resumo["falhas"] else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,304 @@
+"""Compactação dos arquivos Parquet pequenos das partições do Data Lake."""
+
+from __future__ import annotations
+
+import json
+import logging
+import posixpath
+from dataclasses import replace
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+from botocore.exceptions import ClientError
+from ..utils.importacao import ModuloTardio
+from ..utils.s3_utils import ClienteS3
+from ..utils.s3_stream import MB
+from .opcoes_parquet import OpcoesParquet
+from .perfil_colunas import PerfilDados, chave_perfil
+
+pa = ModuloTardio("pyarrow")
+pq = ModuloTardio("pyarrow.parquet")
+
+logger = logging.getLogger(__name__)
+
+PREFIXO_DADOS = "data/"
+PREFIXO_COMPACTACAO = "_compactacao/"
+PREFIXO_ARQUIVO_COMPACTADO = "compactado-"
+# Folga para diferenças entre o relógio local e o LastModified do S3
+MARGEM_RELOGIO = timedelta(minutes=5)
+
+
+def agrupar_por_tamanho(arquivos: List[dict], tamanho_alvo: int) -> List[List[dict]]:
+    """Agrupa arquivos em sequência até somarem perto de `tamanho_alvo` bytes."""
+    grupos = []
+    atual = []
+    soma = 0
+    for arquivo in sorted(arquivos, key=lambda a: a["key"]):
+        if atual and soma + arquivo["size"] > tamanho_alvo:
+            grupos.append(atual)
+            atual = []
+            soma = 0
+        atual.append(arquivo)
+        soma += arquivo["size"]
+    if atual:
+        grupos.append(atual)
+    return grupos
+
+
+class CompactadorDataLake:
+    """Junta os Parquet pequenos de cada partição em arquivos de ~`tamanho_alvo_mb`.
+
+    Incremental: só partições com arquivos novos desde a última execução
+    (registrada em `_compactacao/estado.json`) são lidas. Cada grupo de
+    arquivos pequenos vira um arquivo ordenado por `colunas_ordenacao`,
+    gravado com `opcoes_parquet` (codec, row groups etc.).
+
+    A troca é feita por diário: o arquivo compactado é gravado fora de
+    `data/`, o diário com origens e destinos é gravado, e só então o
+    compactado é copiado para a partição e as origens apagadas. Se a
+    execução cair no meio, a próxima conclui os diários pendentes antes de
+    começar, então nenhuma linha se perde nem fica duplicada no fim. Entre
+    a cópia e a remoção das origens (segundos), leitores podem ver as linhas
+    do grupo duas vezes: o S3 não tem renomeação atômica.
+
+    Os perfis de colunas das origens (PROFILE_COLUMNS) são mesclados no do
+    arquivo compactado e trocados junto com ele, pelo mesmo diário.
+
+    Uma partição que falha (ex.: uma coluna gravada como número num arquivo
+    e como texto em outro) é registrada no log e no estado e volta a ser
+    tentada na execução seguinte; as demais seguem normalmente.
+    """
+
+    def __init__(
+        self,
+        cliente_s3: ClienteS3,
+        bucket: str,
+        tamanho_alvo_mb: float = 256,
+        colunas_ordenacao: Optional[List[str]] = None,
+        min_arquivos: int = 2,
+        prefixo_dados: str = PREFIXO_DADOS,
+        prefixo_controle: str = PREFIXO_COMPACTACAO,
+        opcoes_parquet: Optional[OpcoesParquet] = None,
+    ):
+        self.cliente_s3 = cliente_s3
+        self.bucket = bucket
+        self.tamanho_alvo = int(tamanho_alvo_mb * MB)
+        self.colunas_ordenacao = colunas_ordenacao or []
+        # A chave de ordenação da compactação prevalece sobre a da ingestão
+        self.opcoes_parquet = opcoes_parquet or OpcoesParquet()
+        if self.colunas_ordenacao:
+            self.opcoes_parquet = replace(
+                self.opcoes_parquet, colunas_ordenacao=self.colunas_ordenacao
+            )
+        self.min_arquivos = max(2, min_arquivos)
+        self.prefixo_dados = prefixo_dados
+        self.prefixo_controle = prefixo_controle
+        self.chave_estado = f"{prefixo_controle}estado.json"
+
+    def executar(self, agora: Optional[datetime] = None) -> dict:
+        """Compacta as partições alteradas desde a última execução."""
+        agora = agora or datetime.now(timezone.utc)
+        execucao = agora.strftime("%Y%m%dT%H%M%S%f")
+        estatisticas = {
+            "diarios_concluidos": self.concluir_diarios_pendentes(),
+            "particoes_alteradas": 0,
+            "particoes_compactadas": 0,
+            "arquivos_lidos": 0,
+            "arquivos_gerados": 0,
+            "bytes_lidos": 0,
+            "particoes_com_erro": 0,
+        }
+
+        estado = self._estado()
+        desde = estado.get("ultima_execucao")
+        com_erro = []
+        particoes = self._particoes(
+            datetime.fromisoformat(desde) if desde else None,
+            pendentes=estado.get("particoes_com_erro", []),
+        )
+        for particao, arquivos in particoes.items():
+            estatisticas["particoes_alteradas"] += 1
+            pequenos = [a for a in arquivos if a["size"] < self.tamanho_alvo]
+            grupos = [
+                grupo
+                for grupo in agrupar_por_tamanho(pequenos, self.tamanho_alvo)
+                if len(grupo) >= self.min_arquivos
+            ]
+            try:
+                for grupo in grupos:
+                    identificador = f"{execucao}-{estatisticas['arquivos_gerados']:04d}"
+                    self._compactar_grupo(particao, grupo, identificador)
+                    estatisticas["arquivos_lidos"] += len(grupo)
+                    estatisticas["arquivos_gerados"] += 1
+                    estatisticas["bytes_lidos"] += sum(a["size"] for a in grupo)
+            except Exception as e:
+                logger.error(f"Erro ao compactar {particao}: {e}")
+                estatisticas["particoes_com_erro"] += 1
+                com_erro.append(particao)
+                continue
+            if grupos:
+                estatisticas["particoes_compactadas"] += 1
+
+        estado = {"ultima_execucao": agora.isoformat(), "particoes_com_erro": com_erro}
+        self.cliente_s3.escrever_no_s3(
+            json.dumps(estado).encode(), self.bucket, self.chave_estado
+        )
+        logger.info(f"Compactação concluída: {estatisticas}")
+        return estatisticas
+
+    def _estado(self) -> dict:
+        """Última execução e partições que falharam nela; vazio na primeira."""
+        try:
+            return json.loads(
+                self.cliente_s3.ler_csv_do_s3(self.bucket, self.chave_estado)
+            )
+        except ClientError as e:
+            if e.response["Error"]["Code"] not in ("NoSuchKey", "404"):
+                raise
+            return {}
+
+    def _particoes(
+        self, desde: Optional[datetime], pendentes: Optional[List[str]] = None
+    ) -> Dict[str, List[dict]]:
+        """Arquivos Parquet por partição, só das alteradas desde `desde` e das `pendentes`."""
+        particoes = {}
+        objetos = self.cliente_s3.listar_objetos(
+            self.bucket, self.prefixo_dados, detalhado=True
+        )
+        for objeto in objetos:
+            if objeto["key"].endswith(".parquet"):
+                particoes.setdefault(posixpath.dirname(objeto["key"]), []).append(
+                    objeto
+                )
+        if desde is None:
+            return particoes
+
+        limite = desde - MARGEM_RELOGIO
+        pendentes = set(pendentes or [])
+        return {
+            particao: arquivos
+            for particao, arquivos in particoes.items()
+            if particao in pendentes
+            or any(
+                a["last_modified"] >= limite
+                and not posixpath.basename(a["key"]).startswith(
+                    PREFIXO_ARQUIVO_COMPACTADO
+                )
+                for a in arquivos
+            )
+        }
+
+    def _compactar_grupo(self, particao: str, grupo: List[dict], identificador: str):
+        """Grava o grupo como um arquivo ordenado e troca as origens por ele."""
+        tabelas = [
+            pq.read_table(
+                pa.BufferReader(self.cliente_s3.ler_csv_do_s3(self.bucket, a["key"]))
+            )
+            for a in grupo
+        ]
+        # Arquivos antigos podem não ter colunas novas (viram nulas) ou ter tipos
+        # mais estreitos (int32 e int64, int e double viram o mais largo)
+        tabela = pa.concat_tables(tabelas, promote_options="permissive")
+
+        temporario = (
+            f"{self.prefixo_controle}temporarios/{particao}/{identificador}.parquet"
+        )
+        if not self.cliente_s3.escrever_no_s3(
+            self.opcoes_parquet.converter(tabela), self.bucket, temporario
+        ):
+            raise IOError(f"Falha ao gravar {temporario}")
+
+        diario = {
+            "origens": [a["key"] for a in grupo],
+            "temporario": temporario,
+            "destino": f"{particao}/{PREFIXO_ARQUIVO_COMPACTADO}{identificador}.parquet",
+        }
+        perfil = self._perfil_grupo(grupo, tabela)
+        if perfil is not None:
+            diario["perfil_temporario"] = chave_perfil(temporario)
+            diario["perfil_destino"] = chave_perfil(diario["destino"])
+            if not self.cliente_s3.escrever_no_s3(
+                perfil.serializar(), self.bucket, diario["perfil_temporario"]
+            ):
+                raise IOError(f"Falha ao gravar {diario['perfil_temporario']}")
+        chave_diario = f"{self.prefixo_controle}diarios/{identificador}.json"
+        if not self.cliente_s3.escrever_no_s3(
+            json.dumps(diario).encode(), self.bucket, chave_diario
+        ):
+            raise IOError(f"Falha ao gravar {chave_diario}")
+
+        self._aplicar_diario(chave_diario, diario)
+        logger.info(
+            f"{particao}: {len(grupo)} arquivos -> {diario['destino']} "
+            f"({tabela.num_rows} linhas)"
+        )
+
+    def _perfil_grupo(
+        self, grupo: List[dict], tabela: pa.Table
+    ) -> Optional[PerfilDados]:
+        """Perfil do arquivo compactado: a mescla dos perfis das origens, sem reler os dados.
+
+        Se alguma origem não tem perfil, ele é calculado da tabela lida (com
+        PROFILE_COLUMNS) ou o compactado fica sem perfil.
+        """
+        perfil = PerfilDados()
+        for arquivo in grupo:
+            try:
+                perfil.mesclar(
+                    PerfilDados.desserializar(
+                        self.cliente_s3.ler_csv_do_s3(
+                            self.bucket, chave_perfil(arquivo["key"])
+                        )
+                    )
+                )
+            except ClientError as e:
+                if e.response["Error"]["Code"] not in ("NoSuchKey", "404"):
+                    raise
+                break
+        else:
+            return perfil
+        return (
+            PerfilDados().atualizar(tabela)
+            if self.opcoes_parquet.perfil_colunas
+            else None
+        )
+
+    def _aplicar_diario(self, chave_diario: str, diario: dict):
+        """Publica o arquivo compactado (e o perfil) e apaga as origens; pode ser repetido."""
+        copias = [(diario["temporario"], diario["destino"])]
+        if diario.get("perfil_temporario"):
+            copias.append((diario["perfil_temporario"], diario["perfil_destino"]))
+        for temporario, destino in copias:
+            if (
+                self.cliente_s3.obter_metadados_objeto(self.bucket, temporario)
+                is not None
+            ):
+                if not self.cliente_s3.copiar_objeto(
+                    self.bucket, temporario, self.bucket, destino
+                ):
+                    raise IOError(f"Falha ao publicar {destino}")
+        # Perfis de origens que não os tinham não existem; apagá-los não é erro
+        remocao = self.cliente_s3.deletar_objetos(
+            self.bucket,
+            diario["origens"]
+            + [chave_perfil(origem) for origem in diario["origens"]]
+            + [temporario for temporario, _ in copias],
+        )
+        if remocao["erros"]:
+            # O diário fica para a próxima execução terminar a remoção
+            raise IOError(
+                f"Falha ao remover {len(remocao['erros'])} arquivos de origem"
+            )
+        self.cliente_s3.deletar_objeto(self.bucket, chave_diario)
+
+    def concluir_diarios_pendentes(self) -> int:
+        """Conclui trocas interrompidas por uma execução anterior."""
+        pendentes = self.cliente_s3.listar_objetos(
+            self.bucket, f"{self.prefixo_controle}diarios/"
+        )
+        for chave_diario in pendentes:
+            logger.warning(f"Concluindo compactação interrompida: {chave_diario}")
+            diario = json.loads(
+                self.cliente_s3.ler_csv_do_s3(self.bucket, chave_diario)
+            )
+            self._aplicar_diario(chave_diario, diario)
+        return len(pendentes)
@@ -1,45 +1,283 @@
 """Processador de dados CSV."""
-import pandas as pd
-import pyarrow.parquet as pq
+from __future__ import annotations
+
 from datetime import datetime
 from io import BytesIO
+from typing import BinaryIO, Iterable, List, Optional, Tuple, Union
 import logging
+from ..utils.estagios import em_segundo_plano
+from ..utils.importacao import ModuloTardio
+from .deduplicacao import DeduplicadorHash
+from .dialeto import Dialeto
+from .opcoes_parquet import OpcoesParquet
+from .particionamento import EscritorParticionado, Particionador
+from .perfil_colunas import PerfilDados
+from .registro_esquemas import DesvioEsquema, PlanoTipos, inferir_plano
+
+# Importados só no primeiro uso, para não pesar no cold start da Lambda
+pd = ModuloTardio("pandas")
+pa = ModuloTardio("pyarrow")
 
 logger = logging.getLogger(__name__)
 
 
+class ArquivoSemLinhas(ValueError):
+    """O CSV não tem nenhuma linha a gravar depois da limpeza."""
+
+
 class ProcessadorCSV:
     """Processa arquivos CSV e converte para Parquet."""
     
-    def __init__(self):
+    def __init__(self, opcoes_parquet: Optional[OpcoesParquet] = None):
         self.df = None
+        self.amostra = None
+        self.opcoes_parquet = opcoes_parquet or OpcoesParquet()
     
-    def ler_csv(self, dados: bytes, delimitador: str = ',') -> pd.DataFrame:
-        """Lê CSV de bytes."""
-        self.df = pd.read_csv(BytesIO(dados), sep=delimitador)
+    @property
+    def dados(self) -> Optional[pd.DataFrame]:
+        return self.df
+    
+    def ler_csv(self, dados: bytes, delimitador: str = ',',
+                plano: Optional[PlanoTipos] = None,
+                dialeto: Optional[Dialeto] = None) -> pd.DataFrame:
+        """Lê CSV de bytes; com `plano`, usa os tipos dele em vez de inferir.
+        
+        `dialeto` (detectado pelo pipeline) substitui `delimitador`.
+        """
+        # Um mmap (ClienteArquivosLocal.ler_buffer) é lido direto, sem cópia para um BytesIO;
+        # ele volta ao início porque é relido no desvio de esquema
+        if hasattr(dados, 'read'):
+            dados.seek(0)
+            fonte = dados
+        else:
+            fonte = BytesIO(dados)
+        self.df = next(self._ler_lotes(fonte, dialeto or Dialeto(delimitador), plano))
         logger.info(f"CSV lido: {len(self.df)} linhas")
         return self.df
     
-    def limpar_dados(self) -> pd.DataFrame:
-        """Remove duplicatas e linhas vazias."""
-        self.df = self.df.drop_duplicates().dropna(how='all')
+    @staticmethod
+    def _ler_lotes(fonte, dialeto: Dialeto, plano: Optional[PlanoTipos] = None,
+                   tamanho_lote: Optional[int] = None, texto: Optional[List[str]] = None):
+        """Gera o CSV inteiro (ou lotes, com `tamanho_lote`) como DataFrames.
+        
+        Erros de conversão com o plano viram DesvioEsquema. Sem plano, as
+        colunas em `texto` são lidas como texto e as demais inferidas.
+        """
+        argumentos = dialeto.argumentos_pandas()
+        if plano:
+            argumentos.update(plano.argumentos_pandas())
+        elif texto:
+            argumentos['dtype'] = {coluna: 'str' for coluna in texto}
+        try:
+            if tamanho_lote is None:
+                lote = pd.read_csv(fonte, **argumentos)
+                yield plano.conformar(lote) if plano else lote
+                return
+            # Fechar o leitor solta `fonte` sem fechá-la, para que possa ser relida
+            with pd.read_csv(fonte, chunksize=tamanho_lote, **argumentos) as lotes:
+                for lote in lotes:
+                    yield plano.conformar(lote) if plano else lote
+        except DesvioEsquema:
+            raise
+        except (ValueError, TypeError, OverflowError) as e:
+            if plano is None:
+                raise
+            raise DesvioEsquema(f"CSV não segue o plano v{plano.versao}: {e}") from e
+    
+    def aplicar_plano(self, plano: PlanoTipos) -> pd.DataFrame:
+        """Converte o DataFrame lido sem plano para os tipos do plano."""
+        self.df = plano.aplicar(self.df)
         return self.df
     
-    def adicionar_colunas_metadados(self, arquivo_origem: str) -> pd.DataFrame:
-        """Adiciona colunas de metadados e particionamento."""
-        agora = datetime.now()
-        self.df['data_ingestao'] = agora
-        self.df['arquivo_origem'] = arquivo_origem
-        self.df['ano'] = agora.year
-        self.df['mes'] = agora.month
-        self.df['dia'] = agora.day
+    def limpar_dados(self, colunas_chave: Optional[List[str]] = None,
+                     filtros: Optional[list] = None) -> pd.DataFrame:
+        """Remove linhas vazias e duplicatas (opcionalmente só por `colunas_chave`).
+        
+        `filtros` são objetos com `filtrar(df)` aplicados em seguida, como o
+        índice de deduplicação entre arquivos.
+        """
+        self.df = self.df.dropna(how='all').drop_duplicates(subset=colunas_chave or None)
+        for filtro in filtros or []:
+            self.df = filtro.filtrar(self.df)
+        return self.df
+    
+    def adicionar_colunas_metadados(self, arquivo_origem: str,
+                                    agora: Optional[datetime] = None,
+                                    particionador: Optional[Particionador] = None) -> pd.DataFrame:
+        """Adiciona colunas de metadados e particionamento.
+        
+        Com um `particionador` com data de evento, ano/mes/dia vêm dos dados.
+        """
+        self.df = self._adicionar_metadados(self.df, arquivo_origem, agora or datetime.now(),
+                                            particionador)
         return self.df
     
+    @staticmethod
+    def _adicionar_metadados(df: pd.DataFrame, arquivo_origem: str, agora: datetime,
+                             particionador: Optional[Particionador] = None) -> pd.DataFrame:
+        df['data_ingestao'] = agora
+        df['arquivo_origem'] = arquivo_origem
+        for nome, valor in (particionador or Particionador()).colunas_data(df, agora).items():
+            df[nome] = valor
+        return df
+    
     def converter_para_parquet(self) -> bytes:
         """Converte DataFrame para Parquet comprimido."""
-        buffer = BytesIO()
-        self.df.to_parquet(buffer, compression='snappy', index=False)
-        return buffer.getvalue()
+        return self.opcoes_parquet.converter(pa.Table.from_pandas(self.df, preserve_index=False))
+    
+    def converter_em_particoes(self, particionador: Particionador
+                               ) -> List[Tuple[str, bytes, int, Optional[PerfilDados]]]:
+        """Converte o DataFrame em um Parquet por partição: [(caminho, bytes, linhas, perfil)]."""
+        return particionador.converter(pa.Table.from_pandas(self.df, preserve_index=False),
+                                       self.opcoes_parquet)
+    
+    def processar_em_lotes(self, fonte: Union[bytes, BinaryIO], destino: BinaryIO,
+                           arquivo_origem: str, tamanho_lote: int = 1000,
+                           delimitador: str = ',',
+                           colunas_chave: Optional[List[str]] = None,
+                           limite_memoria_dedup_mb: float = 64,
+                           filtros: Optional[list] = None,
+                           plano: Optional[PlanoTipos] = None,
+                           particionador: Optional[Particionador] = None,
+                           dialeto: Optional[Dialeto] = None,
+                           lotes: Optional[Iterable[pd.DataFrame]] = None,
+                           profundidade_fila: int = 0,
+                           tipos: Optional[PlanoTipos] = None) -> dict:
+        """Converte CSV para Parquet lote a lote, com memória limitada.
+        
+        Cada lote de `tamanho_lote` linhas é limpo, recebe os metadados e é
+        gravado como um row group em `destino`, então o pico de memória depende
+        do tamanho do lote e não do arquivo. Duplicatas são removidas entre
+        todos os lotes por um DeduplicadorHash e depois pelos `filtros`. Com
+        `plano`, os tipos vêm dele; o primeiro lote lido fica em `amostra`.
+        Sem plano, cada lote infere os próprios tipos e é convertido para
+        `tipos` ou, sem eles, para os do primeiro lote alargados (inteiros
+        anuláveis, categorias e colunas vazias como texto). Um lote que não
+        converte, ou que traz números numa coluna de texto, levanta
+        DesvioEsquema com o plano que comporta também ele: os tipos do
+        arquivo já gravado não mudam, então a conversão é refeita desde o
+        início com esse plano em `tipos`, que lê as colunas de texto como
+        texto.
+        
+        Com `particionador`, `destino` é uma função que recebe o caminho da
+        partição e abre o arquivo dela; cada lote é dividido entre as
+        partições e cada uma vira um Parquet.
+        
+        `lotes` são DataFrames já lidos (ex.: pelo LeitorFragmentos), no
+        lugar da leitura de `fonte`. Com `profundidade_fila`, a leitura corre
+        numa thread à parte, até esse número de lotes à frente da escrita.
+        """
+        if isinstance(fonte, (bytes, bytearray)):
+            fonte = BytesIO(fonte)
+        if lotes is None:
+            texto = [nome for nome, tipo in tipos.colunas.items()
+                     if tipo == 'string'] if tipos else None
+            lotes = self._ler_lotes(fonte, dialeto or Dialeto(delimitador), plano, tamanho_lote,
+                                    texto)
+        lotes = em_segundo_plano(lotes, profundidade_fila, nome="leitura_csv")
+        
+        agora = datetime.now()
+        if particionador is None:
+            escritor = EscritorParticionado(lambda _: destino, Particionador(), self.opcoes_parquet,
+                                            fechar_destinos=False)
+        else:
+            escritor = EscritorParticionado(destino, particionador, self.opcoes_parquet)
+        esquema = None
+        total_linhas = 0
+        grupos = 0
+        
+        deduplicador = DeduplicadorHash(colunas_chave, limite_memoria_dedup_mb)
+        self.amostra = None
+        
+        try:
+            for lote in lotes:
+                if self.amostra is None:
+                    self.amostra = lote.copy()
+                    if plano is None and tipos is None:
+                        tipos = self._tipos_do_primeiro_lote(lote)
+                if plano is None:
+                    lote = self._converter_lote(lote, tipos)
+                lote = deduplicador.filtrar(lote.dropna(how='all'))
+                for filtro in filtros or []:
+                    lote = filtro.filtrar(lote)
+                if lote.empty:
+                    continue
+                lote = self._adicionar_metadados(lote, arquivo_origem, agora, particionador)
+                tabela = pa.Table.from_pandas(lote, preserve_index=False)
+                
+                if esquema is None:
+                    esquema = tabela.schema
+                else:
+                    tabela = self._ajustar_ao_esquema(tabela, esquema)
+                
+                escritor.escrever(tabela)
+                total_linhas += tabela.num_rows
+                grupos += 1
+        except BaseException:
+            escritor.abortar()
+            raise
+        finally:
+            # Para a leitura antes de a fonte ser fechada ou relida
+            lotes.close()
+            deduplicador.fechar()
+        escritor.fechar()
+        
+        if esquema is None:
+            raise ArquivoSemLinhas("CSV sem linhas válidas para converter")
+        
+        self.df = None
+        logger.info(f"CSV convertido em lotes: {total_linhas} linhas, {grupos} row groups, "
+                    f"{len(escritor.linhas)} partições, "
+                    f"{deduplicador.linhas_removidas} duplicatas removidas")
+        nomes = escritor.esquema.names
+        return {
+            'row_count': total_linhas,
+            'column_count': len(nomes),
+            'columns': list(nomes),
+            'row_groups': grupos,
+            'duplicates_removed': deduplicador.linhas_removidas,
+            'partitions': dict(escritor.linhas),
+            'parts': dict(escritor.partes),
+            'profiles': dict(escritor.perfis)
+        }
+    
+    @staticmethod
+    def _tipos_do_primeiro_lote(lote: pd.DataFrame) -> PlanoTipos:
+        """Tipos do primeiro lote alargados; uma coluna ainda vazia vira texto."""
+        tipos = inferir_plano(lote).alargado()
+        for coluna in lote.columns:
+            if lote[coluna].isna().all():
+                tipos.colunas[str(coluna)] = 'string'
+        return tipos
+    
+    @staticmethod
+    def _converter_lote(lote: pd.DataFrame, tipos: PlanoTipos) -> pd.DataFrame:
+        """Converte um lote lido sem plano para `tipos`, ou levanta DesvioEsquema."""
+        try:
+            convertido = tipos.aplicar(lote)
+        except DesvioEsquema as e:
+            raise DesvioEsquema(f"Lote fora dos tipos do início do arquivo: {e}",
+                                plano=tipos.comportar(lote)) from e
+        # Texto lido como número perde a forma original ("007" viraria "7")
+        lidas_como_numero = [
+            nome for nome, tipo in tipos.colunas.items()
+            if tipo == 'string' and not pd.api.types.is_string_dtype(lote[nome].dtype)
+            and lote[nome].notna().any()
+        ]
+        if lidas_como_numero:
+            raise DesvioEsquema(f"Colunas de texto lidas com outro tipo: {lidas_como_numero}",
+                                plano=tipos.comportar(lote))
+        return convertido
+    
+    @staticmethod
+    def _ajustar_ao_esquema(tabela: pa.Table, esquema: pa.Schema) -> pa.Table:
+        """Converte um lote para o esquema do primeiro lote gravado."""
+        if tabela.schema.equals(esquema):
+            return tabela
+        try:
+            return tabela.select(esquema.names).cast(esquema)
+        except (KeyError, pa.ArrowInvalid, pa.ArrowNotImplementedError) as e:
+            raise ValueError(f"Esquema do lote diverge do primeiro lote: {e}") from e
     
     def validar_dataframe(self, colunas_obrigatorias: list = None) -> bool:
         """Valida se DataFrame está OK e tem colunas obrigatórias."""
@@ -54,13 +292,16 @@ class ProcessadorCSV:
         
         return True
     
-    def obter_estatisticas(self) -> dict:
-        """Retorna estatísticas básicas do DataFrame."""
+    def obter_estatisticas(self, perfil: bool = False) -> dict:
+        """Retorna estatísticas básicas do DataFrame; com `perfil`, também o de cada coluna."""
         if self.df is None:
             return {}
         
-        return {
+        estatisticas = {
             'row_count': len(self.df),
             'column_count': len(self.df.columns),
             'columns': list(self.df.columns)
         }
+        if perfil:
+            estatisticas['profile'] = PerfilDados().atualizar(self.df).para_dict()
+        return estatisticas
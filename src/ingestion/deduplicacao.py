@@ -0,0 +1,187 @@
+"""Deduplicação em streaming por hash de linha."""
+
+from __future__ import annotations
+
+import logging
+import os
+import shutil
+import tempfile
+from typing import List, Optional
+from ..utils.importacao import ModuloTardio
+
+np = ModuloTardio("numpy")
+pd = ModuloTardio("pandas")
+
+logger = logging.getLogger(__name__)
+
+BYTES_POR_HASH = 8
+_MULTIPLICADOR = 0x100000001B3  # primo do FNV-1a de 64 bits
+
+
+def _colunas_como_numpy(dados, colunas: Optional[List[str]]) -> list:
+    """Extrai as colunas (DataFrame ou pa.Table) como arrays NumPy."""
+    nomes = colunas or list(
+        dados.columns if hasattr(dados, "iloc") else dados.column_names
+    )
+    if hasattr(dados, "iloc"):
+        return [dados[nome].to_numpy() for nome in nomes]
+    return [dados.column(nome).to_numpy() for nome in nomes]
+
+
+def _hash_coluna(array: np.ndarray) -> np.ndarray:
+    """Hash de cada valor da coluna, o mesmo para o mesmo valor em qualquer tipo.
+
+    O tipo inferido muda de um arquivo (ou motor) para outro: uma coluna de
+    inteiros com um vazio vira float64, um int8 do plano vira int64. Por
+    isso inteiros e floats com valor inteiro são hasheados como int64 (1 e
+    1.0 coincidem) e datas e horários, como nanossegundos desde a época.
+    """
+    tipo = array.dtype.kind
+    if tipo == "M":
+        array = array.astype("datetime64[ns]").view(np.int64)
+    elif (
+        tipo == "u"
+        and array.dtype.itemsize == 8
+        and len(array)
+        and array.max() > np.iinfo(np.int64).max
+    ):
+        return pd.util.hash_array(array)
+    if tipo in "iuM":
+        return pd.util.hash_array(array.astype(np.int64, copy=False))
+    if tipo == "f":
+        array = array.astype(np.float64, copy=False)
+        with np.errstate(invalid="ignore"):
+            inteiros = (
+                np.isfinite(array)
+                & (np.floor(array) == array)
+                & (np.abs(array) < 2.0**63)
+            )
+        hashes = pd.util.hash_array(array)
+        if inteiros.any():
+            hashes[inteiros] = pd.util.hash_array(array[inteiros].astype(np.int64))
+        return hashes
+    return pd.util.hash_array(array, categorize=True)
+
+
+def hash_linhas(dados, colunas: Optional[List[str]] = None) -> np.ndarray:
+    """Calcula um hash uint64 por linha de um DataFrame ou pa.Table.
+
+    Cada coluna é hasheada de forma vetorizada (`pandas.util.hash_array`, sem
+    montar DataFrame) e os hashes são combinados coluna a coluna. Com
+    `colunas`, só esse subconjunto entra na chave. Números e datas são
+    hasheados pelo valor, não pelo tipo (ver `_hash_coluna`).
+    """
+    arrays = _colunas_como_numpy(dados, colunas)
+    if not arrays:
+        return np.zeros(0, dtype=np.uint64)
+
+    resultado = np.zeros(len(arrays[0]), dtype=np.uint64)
+    with np.errstate(over="ignore"):
+        for array in arrays:
+            resultado ^= _hash_coluna(array)
+            resultado *= np.uint64(_MULTIPLICADOR)
+    return resultado
+
+
+class DeduplicadorHash:
+    """Remove linhas já vistas, inclusive entre lotes diferentes.
+
+    Guarda apenas o hash de 64 bits de cada linha distinta, em execuções
+    (runs) ordenadas que são mescladas em potências de dois; a busca é um
+    `searchsorted` vetorizado por run. Quando os hashes em memória passam de
+    `limite_memoria_mb`, eles vão para um arquivo `.npy` em disco, consultado
+    via memory map. A chance de colisão entre linhas distintas é de ~n²/2⁶⁵.
+    """
+
+    def __init__(
+        self,
+        colunas_chave: Optional[List[str]] = None,
+        limite_memoria_mb: float = 64,
+        diretorio_spill: Optional[str] = None,
+    ):
+        self.colunas_chave = colunas_chave or None
+        self.limite_bytes = int(limite_memoria_mb * 1024 * 1024)
+        self._diretorio_base = diretorio_spill
+        self._diretorio_spill = None
+        self._runs = []
+        self._runs_em_disco = []
+        self.linhas_vistas = 0
+        self.linhas_removidas = 0
+
+    @property
+    def hashes_em_memoria(self) -> int:
+        return sum(len(run) for run in self._runs)
+
+    def filtrar(self, dados):
+        """Retorna `dados` (DataFrame ou pa.Table) sem as linhas já vistas."""
+        mascara = self.mascara_novas(hash_linhas(dados, self.colunas_chave))
+        if mascara.all():
+            return dados
+        if hasattr(dados, "iloc"):
+            return dados[mascara]
+        return dados.filter(mascara)
+
+    def mascara_novas(self, hashes: np.ndarray) -> np.ndarray:
+        """Marca a primeira ocorrência de cada hash ainda não visto."""
+        unicos, primeiras = np.unique(hashes, return_index=True)
+        novos = ~self._contem(unicos)
+
+        mascara = np.zeros(len(hashes), dtype=bool)
+        mascara[primeiras[novos]] = True
+        self._adicionar(unicos[novos])
+
+        self.linhas_vistas += len(hashes)
+        self.linhas_removidas += len(hashes) - int(novos.sum())
+        return mascara
+
+    def _contem(self, valores: np.ndarray) -> np.ndarray:
+        encontrados = np.zeros(len(valores), dtype=bool)
+        for run in self._runs + self._runs_em_disco:
+            if len(run) == 0:
+                continue
+            posicoes = np.searchsorted(run, valores)
+            validas = posicoes < len(run)
+            encontrados[validas] |= run[posicoes[validas]] == valores[validas]
+        return encontrados
+
+    def _adicionar(self, valores: np.ndarray):
+        if len(valores) == 0:
+            return
+        self._runs.append(valores)
+
+        # Mescla runs de tamanho parecido para manter O(log n) runs
+        while len(self._runs) > 1 and len(self._runs[-2]) <= 2 * len(self._runs[-1]):
+            ultimo = self._runs.pop()
+            self._runs[-1] = np.sort(np.concatenate([self._runs[-1], ultimo]))
+
+        if self.hashes_em_memoria * BYTES_POR_HASH > self.limite_bytes:
+            self._despejar_em_disco()
+
+    def _despejar_em_disco(self):
+        if self._diretorio_spill is None:
+            self._diretorio_spill = tempfile.mkdtemp(
+                prefix="dedup-", dir=self._diretorio_base
+            )
+
+        run = np.sort(np.concatenate(self._runs))
+        caminho = os.path.join(
+            self._diretorio_spill, f"run-{len(self._runs_em_disco):05d}.npy"
+        )
+        np.save(caminho, run)
+        self._runs_em_disco.append(np.load(caminho, mmap_mode="r"))
+        self._runs = []
+        logger.info(f"Deduplicação: {len(run)} hashes despejados em {caminho}")
+
+    def fechar(self):
+        """Libera os hashes e remove os arquivos despejados em disco."""
+        self._runs = []
+        self._runs_em_disco = []
+        if self._diretorio_spill is not None:
+            shutil.rmtree(self._diretorio_spill, ignore_errors=True)
+            self._diretorio_spill = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.fechar()
@@ -0,0 +1,305 @@
+"""Detecção do dialeto de um CSV (delimitador, codificação, aspas, cabeçalho) por uma amostra."""
+
+import codecs
+import csv
+import io
+import logging
+import re
+from collections import Counter
+from dataclasses import asdict, dataclass
+from itertools import islice
+from typing import Dict, List, Optional
+from ..utils.importacao import ModuloTardio
+
+pv = ModuloTardio("pyarrow.csv")
+
+logger = logging.getLogger(__name__)
+
+# Em ordem de preferência no empate
+DELIMITADORES = (",", ";", "\t", "|")
+ASPAS = ('"', "'")
+
+# Registros da amostra considerados na detecção
+REGISTROS_AMOSTRA = 50
+
+# Bytes do início do arquivo usados por padrão (DIALECT_SAMPLE_KB)
+TAMANHO_AMOSTRA = 64 * 1024
+
+# Tipos de valor comparados entre a primeira linha e as seguintes para achar o cabeçalho
+_TIPOS_VALOR = (
+    ("numero", re.compile(r"^\s*[+-]?(\d+([.,]\d*)?|[.,]\d+)([eE][+-]?\d+)?\s*$")),
+    ("data", re.compile(r"^\s*\d{1,4}[-/]\d{1,2}[-/]\d{1,4}.*$")),
+)
+
+_BOMS = (
+    (codecs.BOM_UTF8, "utf-8-sig"),
+    (codecs.BOM_UTF16_LE, "utf-16"),
+    (codecs.BOM_UTF16_BE, "utf-16"),
+)
+
+
+class ArquivoNaoCSV(ValueError):
+    """A amostra não é texto delimitado (ex.: planilha ou binário renomeado para .csv)."""
+
+
+@dataclass
+class Dialeto:
+    """Como ler um CSV: o padrão é o que os processadores sempre assumiram."""
+
+    delimitador: str = ","
+    codificacao: str = "utf-8"
+    aspas: str = '"'
+    tem_cabecalho: bool = True
+    linhas_ignoradas: int = (
+        0  # linhas antes do cabeçalho, como o título de um relatório
+    )
+    colunas: int = 0
+
+    @property
+    def eh_padrao(self) -> bool:
+        return (
+            self.delimitador,
+            self.codificacao,
+            self.aspas,
+            self.tem_cabecalho,
+            self.linhas_ignoradas,
+        ) == (",", "utf-8", '"', True, 0)
+
+    def nomes_colunas(self) -> List[str]:
+        """Nomes gerados para um CSV sem cabeçalho."""
+        return [f"coluna_{i}" for i in range(1, self.colunas + 1)]
+
+    def argumentos_pandas(self) -> dict:
+        """Argumentos do `pandas.read_csv` para este dialeto."""
+        argumentos = {
+            "sep": self.delimitador,
+            "encoding": self.codificacao,
+            "quotechar": self.aspas,
+        }
+        if self.linhas_ignoradas:
+            argumentos["skiprows"] = self.linhas_ignoradas
+        if not self.tem_cabecalho:
+            argumentos.update(header=None, names=self.nomes_colunas())
+        return argumentos
+
+    def opcoes_arrow(self) -> dict:
+        """ReadOptions e ParseOptions do `pyarrow.csv` para este dialeto."""
+        # O Arrow pula o BOM do UTF-8 sozinho; outras codificações são transcodificadas
+        codificacao = (
+            "utf8" if self.codificacao in ("utf-8", "utf-8-sig") else self.codificacao
+        )
+        return {
+            "read_options": pv.ReadOptions(
+                use_threads=True,
+                skip_rows=self.linhas_ignoradas,
+                column_names=None if self.tem_cabecalho else self.nomes_colunas(),
+                encoding=codificacao,
+            ),
+            "parse_options": pv.ParseOptions(
+                delimiter=self.delimitador, quote_char=self.aspas
+            ),
+        }
+
+    def _registros(self, amostra: bytes, codificacao: Optional[str] = None):
+        texto = _decodificar(amostra, codificacao or self.codificacao)
+        leitor = csv.reader(
+            io.StringIO(_linhas_completas(texto)),
+            delimiter=self.delimitador,
+            quotechar=self.aspas,
+        )
+        for _ in range(self.linhas_ignoradas):
+            next(leitor, None)
+        return leitor
+
+    def cabecalho(self, amostra: bytes) -> List[str]:
+        """Nomes das colunas; sem cabeçalho, os nomes gerados."""
+        if not self.tem_cabecalho:
+            return self.nomes_colunas()
+        return next(self._registros(amostra), [])
+
+    def confere(self, amostra: bytes) -> bool:
+        """Se a amostra de outro arquivo segue este dialeto (codificação e nº de colunas)."""
+        try:
+            primeiro = next(self._registros(amostra), None)
+        except (UnicodeDecodeError, csv.Error):
+            return False
+        return primeiro is not None and len(primeiro) == self.colunas
+
+    def para_dict(self) -> dict:
+        return asdict(self)
+
+
+def _decodificar(amostra: bytes, codificacao: str) -> str:
+    # Decodificador incremental: um caractere cortado no fim da amostra não é erro
+    return codecs.getincrementaldecoder(codificacao)().decode(amostra, final=False)
+
+
+def _linhas_completas(texto: str) -> str:
+    """Descarta a última linha, possivelmente cortada pelo fim da amostra."""
+    fim = max(texto.rfind("\n"), texto.rfind("\r"))
+    return texto[: fim + 1] if fim >= 0 else texto
+
+
+def detectar_codificacao(amostra: bytes) -> str:
+    """BOM; senão UTF-8 se decodificar; senão Windows-1252; senão Latin-1.
+
+    Uma amostra só com ASCII é UTF-8: se o arquivo tiver Latin-1 depois
+    dela, a leitura falha como falharia sem a detecção.
+    """
+    for bom, codificacao in _BOMS:
+        if amostra.startswith(bom):
+            return codificacao
+    if b"\x00" in amostra:
+        raise ArquivoNaoCSV("Amostra com bytes nulos: não é um CSV de texto")
+    for codificacao in ("utf-8", "cp1252"):
+        try:
+            _decodificar(amostra, codificacao)
+            return codificacao
+        except UnicodeDecodeError:
+            continue
+    return "latin-1"
+
+
+def _detectar_aspas(texto: str, delimitador: str) -> str:
+    """Aspas simples só quando delimitam mais campos que as duplas."""
+    d = re.escape(delimitador)
+    contagens = {
+        aspas: min(
+            len(re.findall(rf"(?:^|{d})[ \t]*{aspas}", texto, re.MULTILINE)),
+            len(re.findall(rf"{aspas}[ \t]*(?:{d}|$)", texto, re.MULTILINE)),
+        )
+        for aspas in ASPAS
+    }
+    return "'" if contagens["'"] > contagens['"'] else '"'
+
+
+def _contar_campos(texto: str, delimitador: str, aspas: str) -> List[tuple]:
+    """(linha física inicial, nº de campos) dos primeiros registros não vazios."""
+    leitor = csv.reader(io.StringIO(texto), delimiter=delimitador, quotechar=aspas)
+    registros = []
+    inicio = 0
+    try:
+        for campos in leitor:
+            if campos:
+                registros.append((inicio, len(campos)))
+                if len(registros) >= REGISTROS_AMOSTRA:
+                    break
+            inicio = leitor.line_num
+    except csv.Error:
+        pass
+    return registros
+
+
+def _escolher_delimitador(texto: str) -> tuple:
+    """(delimitador, aspas, nº de colunas, linhas antes do cabeçalho).
+
+    Cada candidato divide a amostra respeitando aspas; vence o que dá o
+    mesmo nº de colunas (maior que 1) ao maior número de registros, e
+    então mais colunas. Linhas iniciais com outro nº de colunas são
+    preâmbulo.
+    """
+    melhor = None
+    for delimitador in DELIMITADORES:
+        aspas = _detectar_aspas(texto, delimitador)
+        registros = _contar_campos(texto, delimitador, aspas)
+        if not registros:
+            continue
+        colunas, consistentes = Counter(n for _, n in registros).most_common(1)[0]
+        if colunas < 2:
+            continue
+        # Desempate pela ordem de DELIMITADORES: o primeiro com a pontuação fica
+        pontuacao = (consistentes / len(registros), colunas)
+        if melhor is None or pontuacao > melhor[0]:
+            inicio = next(linha for linha, n in registros if n == colunas)
+            melhor = (pontuacao, (delimitador, aspas, colunas, inicio))
+    if melhor is None:
+        return ",", '"', 1, 0
+    return melhor[1]
+
+
+def _tipo_valor(valor: str) -> str:
+    for tipo, padrao in _TIPOS_VALOR:
+        if padrao.match(valor):
+            return tipo
+    return "texto"
+
+
+def _tem_cabecalho(registros: List[List[str]]) -> bool:
+    """Decide se a primeira linha é cabeçalho comparando seus tipos com os das linhas seguintes.
+
+    Só é tratada como dados quando alguma coluna numérica ou de data tem, na primeira
+    linha, o mesmo tipo das linhas abaixo e nenhuma coluna o contradiz; na dúvida
+    (sem linhas abaixo ou só texto) a primeira linha continua sendo o cabeçalho.
+    """
+    if len(registros) < 2:
+        return True
+    primeiro, corpo = registros[0], registros[1:]
+    iguais = diferentes = 0
+    for indice, valor in enumerate(primeiro):
+        tipos = {
+            _tipo_valor(registro[indice])
+            for registro in corpo
+            if indice < len(registro) and registro[indice].strip()
+        }
+        if len(tipos) != 1 or tipos == {"texto"}:
+            continue
+        if tipos == {_tipo_valor(valor)}:
+            iguais += 1
+        else:
+            diferentes += 1
+    return diferentes > 0 or iguais == 0
+
+
+def detectar_dialeto(amostra: bytes) -> Dialeto:
+    """Detecta o dialeto pelos primeiros KB do arquivo."""
+    codificacao = detectar_codificacao(amostra)
+    texto = _linhas_completas(_decodificar(amostra, codificacao))
+    if not texto.strip():
+        return Dialeto(codificacao=codificacao)
+
+    # Só as primeiras linhas entram na análise, com folga para preâmbulo e quebras entre aspas
+    fim = -1
+    for _ in range(2 * REGISTROS_AMOSTRA):
+        fim = texto.find("\n", fim + 1)
+        if fim < 0:
+            break
+    inicio = texto[: fim + 1] if fim >= 0 else texto
+    delimitador, aspas, colunas, linhas_ignoradas = _escolher_delimitador(inicio)
+    dialeto = Dialeto(delimitador, codificacao, aspas, True, linhas_ignoradas, colunas)
+    registros = list(islice(dialeto._registros(amostra), REGISTROS_AMOSTRA))
+    dialeto.tem_cabecalho = _tem_cabecalho(registros)
+    return dialeto
+
+
+class CacheDialetos:
+    """Dialeto por prefixo de origem, reaproveitado entre arquivos do mesmo feed.
+
+    Um dialeto em cache é conferido contra a amostra do arquivo novo
+    (codificação e nº de colunas do cabeçalho); se não servir, é
+    detectado de novo e substituído.
+    """
+
+    def __init__(self, tamanho_amostra: int = TAMANHO_AMOSTRA):
+        self.tamanho_amostra = tamanho_amostra
+        self._dialetos: Dict[str, Dialeto] = {}
+
+    def obter(self, origem: str) -> Optional[Dialeto]:
+        return self._dialetos.get(origem)
+
+    def detectar(self, origem: str, amostra: bytes) -> Dialeto:
+        """Dialeto do feed, conferido contra a amostra ou detectado por ela."""
+        amostra = amostra[: self.tamanho_amostra]
+        dialeto = self._dialetos.get(origem)
+        if dialeto is not None and dialeto.confere(amostra):
+            return dialeto
+
+        novo = detectar_dialeto(amostra)
+        if dialeto is not None:
+            logger.warning(
+                f"Dialeto de {origem or '/'} mudou: "
+                f"{dialeto.para_dict()} -> {novo.para_dict()}"
+            )
+        elif not novo.eh_padrao:
+            logger.info(f"Dialeto detectado para {origem or '/'}: {novo.para_dict()}")
+        self._dialetos[origem] = novo
+        return novo
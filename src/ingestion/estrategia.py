@@ -0,0 +1,115 @@
+"""Escolha da estratégia de processamento pelo tamanho do objeto, antes do download."""
+
+import os
+from typing import Optional
+from ..utils.descompressao import formato_compressao
+
+MB = 1024 * 1024
+
+MEMORIA = "memoria"
+STREAMING = "streaming"
+FRAGMENTOS = "fragmentos"
+MICRO_LOTE = "micro_lote"  # vários objetos pequenos num Parquet (MICRO_BATCH)
+REJEITADO = "rejeitado"
+
+# Pico de RSS do modo em memória em múltiplos do CSV (benchmarks.suite: 6 a 9x)
+FATOR_MEMORIA = 8
+
+# Razão de compressão típica de um CSV: o HEAD dá o tamanho comprimido
+FATOR_COMPRESSAO = 5
+
+# O resto da memória fica para o runtime, as bibliotecas e os buffers de upload
+FRACAO_MEMORIA = 0.75
+
+
+def _limite_cgroup_mb() -> Optional[int]:
+    try:
+        with open("/sys/fs/cgroup/memory.max") as arquivo:
+            limite = arquivo.read().strip()
+    except OSError:
+        return None
+    return int(limite) // MB if limite.isdigit() else None
+
+
+def _memoria_livre_mb() -> Optional[int]:
+    try:
+        with open("/proc/meminfo") as arquivo:
+            for linha in arquivo:
+                if linha.startswith("MemAvailable:"):
+                    return int(linha.split()[1]) // 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+
+def processos_leitura(configurados: int) -> int:
+    """Processos para ler fragmentos (PARSE_WORKERS); numa Lambda, sempre um.
+
+    O pool de processos precisa de /dev/shm, que a Lambda não tem, e
+    dividiria com a invocação a mesma memória e as mesmas vCPUs: a leitura
+    em fragmentos fica para o backfill e para contêineres.
+    """
+    if configurados > 1 and os.getenv("AWS_LAMBDA_FUNCTION_NAME"):
+        return 1
+    return configurados
+
+
+def memoria_disponivel_mb() -> Optional[int]:
+    """Memória da Lambda; fora dela, o menor entre o limite do cgroup e a memória livre."""
+    memoria_lambda = os.getenv("AWS_LAMBDA_FUNCTION_MEMORY_SIZE")
+    if memoria_lambda:
+        return int(memoria_lambda)
+    candidatos = [
+        mb for mb in (_limite_cgroup_mb(), _memoria_livre_mb()) if mb is not None
+    ]
+    return min(candidatos) if candidatos else None
+
+
+def estimar_memoria_mb(tamanho: int, chave: str) -> float:
+    """Pico estimado do modo em memória para um objeto de `tamanho` bytes."""
+    if formato_compressao(chave) is not None:
+        tamanho *= FATOR_COMPRESSAO
+    return tamanho * FATOR_MEMORIA / MB
+
+
+def escolher_estrategia(
+    tamanho: Optional[int],
+    chave: str,
+    limite_arquivo_mb: int,
+    streaming: bool = False,
+    memoria_mb: Optional[int] = None,
+    processos: int = 1,
+    tamanho_fragmento_mb: int = 32,
+    estagios: bool = False,
+    tamanho_parte_mb: int = 8,
+) -> str:
+    """Estratégia para um objeto de `tamanho` bytes (do evento ou de um HEAD).
+
+    Acima de `limite_arquivo_mb` (0 = sem limite), o arquivo é rejeitado
+    sem download. Com mais de um processo de leitura (PARSE_WORKERS), um
+    CSV sem compressão de ao menos dois fragmentos é lido em fragmentos
+    paralelos. Com `streaming` (STREAMING_MODE), em lotes; com `estagios`
+    (STAGED_PIPELINE), em lotes a partir de duas partes de download, para
+    sobrepor download, leitura e upload; senão em memória enquanto o pico
+    estimado couber em `memoria_mb`. Sem o tamanho ou sem a memória
+    disponível, fica em memória, como antes.
+    """
+    if tamanho is not None and limite_arquivo_mb and tamanho > limite_arquivo_mb * MB:
+        return REJEITADO
+    if (
+        processos > 1
+        and tamanho is not None
+        and formato_compressao(chave) is None
+        and tamanho >= 2 * tamanho_fragmento_mb * MB
+    ):
+        return FRAGMENTOS
+    if streaming:
+        return STREAMING
+    if estagios and tamanho is not None and tamanho > tamanho_parte_mb * MB:
+        # Numa parte só, não há download a sobrepor à leitura
+        return STREAMING
+    if tamanho is None or memoria_mb is None:
+        return MEMORIA
+    if estimar_memoria_mb(tamanho, chave) > memoria_mb * FRACAO_MEMORIA:
+        return STREAMING
+    return MEMORIA
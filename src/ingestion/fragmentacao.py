@@ -0,0 +1,274 @@
+"""Leitura paralela de um CSV grande em fragmentos de bytes alinhados aos registros.
+
+Os dados (depois do cabeçalho) são cortados em intervalos de tamanho
+parecido. Um corte raramente cai no fim de um registro, e uma quebra de
+linha entre aspas não termina registro; por isso a leitura tem duas fases,
+ambas no pool de processos:
+
+1. cada processo conta as aspas do seu intervalo; a soma acumulada dá a
+   paridade de aspas em cada corte (ímpar = o corte cai dentro de um campo);
+2. cada processo avança do seu corte até a primeira quebra de linha fora de
+   aspas, lê até a fronteira equivalente depois do corte seguinte e converte
+   o trecho, com o cabeçalho na frente, pelo processador do motor.
+
+Dois fragmentos vizinhos calculam a fronteira entre eles pelo mesmo corte e
+pela mesma paridade, então cada registro é lido uma única vez. Supõe aspas
+no padrão RFC 4180 (aspas dentro de um campo entre aspas são duplicadas) e
+uma codificação em que quebra de linha e aspas são os bytes ASCII.
+"""
+
+import logging
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, replace
+from typing import Iterator, List, Optional
+from .dialeto import Dialeto
+from .registro_esquemas import PlanoTipos
+
+logger = logging.getLogger(__name__)
+
+MB = 1024 * 1024
+
+# Lido além do fim do intervalo para achar a fronteira sem outro GET
+LEITURA_EXTRA = 64 * 1024
+
+# Codificações em que '\n' e as aspas são um byte ASCII
+CODIFICACOES_ASCII = ("utf-8", "utf-8-sig", "cp1252", "latin-1")
+
+
+class CSVNaoFragmentavel(ValueError):
+    """O CSV não pode ser dividido em bytes (ex.: UTF-16 ou cabeçalho maior que a amostra)."""
+
+
+@dataclass
+class Fragmento:
+    """Intervalo bruto [inicio, fim) dos dados e a paridade de aspas em cada corte."""
+
+    indice: int
+    inicio: int
+    fim: int
+    paridade_inicio: int = 0
+    paridade_fim: int = 0
+
+
+def fim_registro(dados: bytes, inicio: int, paridade: int, aspas: bytes) -> int:
+    """Posição logo após a primeira quebra de linha fora de aspas a partir de `inicio`.
+
+    `paridade` é a das aspas antes de `inicio` (1 = dentro de um campo).
+    Retorna -1 se `dados` não tiver uma.
+    """
+    posicao = inicio
+    while True:
+        quebra = dados.find(b"\n", posicao)
+        if quebra < 0:
+            return -1
+        paridade = (paridade + dados.count(aspas, posicao, quebra)) % 2
+        if paridade == 0:
+            return quebra + 1
+        posicao = quebra + 1
+
+
+def limites_cabecalho(amostra: bytes, dialeto: Dialeto) -> tuple:
+    """(início do cabeçalho, início dos registros) em bytes, pelo início do arquivo."""
+    inicio = 0
+    for _ in range(dialeto.linhas_ignoradas):
+        quebra = amostra.find(b"\n", inicio)
+        if quebra < 0:
+            raise CSVNaoFragmentavel("Preâmbulo maior que a amostra")
+        inicio = quebra + 1
+    if not dialeto.tem_cabecalho:
+        return inicio, inicio
+    fim = fim_registro(amostra, inicio, 0, dialeto.aspas.encode())
+    if fim < 0:
+        raise CSVNaoFragmentavel("Cabeçalho maior que a amostra")
+    return inicio, fim
+
+
+# Cliente de armazenamento de cada processo do pool, recebido pelo inicializador
+_cliente = None
+
+
+def _iniciar_processo(cliente):
+    global _cliente
+    _cliente = cliente
+
+
+def _contar_aspas(
+    cliente, bucket: str, chave: str, fragmento: Fragmento, aspas: bytes
+) -> int:
+    cliente = cliente or _cliente
+    dados = cliente.ler_intervalo(
+        bucket, chave, fragmento.inicio, fragmento.fim - fragmento.inicio
+    )
+    return dados.count(aspas)
+
+
+def _ler_fragmento(
+    cliente,
+    bucket: str,
+    chave: str,
+    fragmento: Fragmento,
+    ultimo: bool,
+    cabecalho: bytes,
+    dialeto: Dialeto,
+    processador: type,
+    plano: Optional[PlanoTipos],
+):
+    """Dados do fragmento lidos pelo `processador`, ou None se ele ficou vazio."""
+    cliente = cliente or _cliente
+    aspas = dialeto.aspas.encode()
+    tamanho = fragmento.fim - fragmento.inicio
+    dados = cliente.ler_intervalo(
+        bucket, chave, fragmento.inicio, tamanho + LEITURA_EXTRA
+    )
+
+    # O primeiro fragmento começa nos registros; os demais, na fronteira do seu corte
+    inicio = 0
+    if fragmento.indice > 0:
+        inicio = fim_registro(dados, 0, fragmento.paridade_inicio, aspas)
+    if inicio < 0 or inicio > tamanho:
+        # A fronteira passou do corte seguinte: o fragmento anterior lê até lá
+        return None
+    if ultimo:
+        fim = len(dados)
+    else:
+        fim = fim_registro(dados, tamanho, fragmento.paridade_fim, aspas)
+        while fim < 0:
+            extra = cliente.ler_intervalo(
+                bucket, chave, fragmento.inicio + len(dados), LEITURA_EXTRA
+            )
+            if not extra:
+                fim = len(dados)
+                break
+            dados += extra
+            fim = fim_registro(dados, tamanho, fragmento.paridade_fim, aspas)
+    if fim <= inicio:
+        return None
+
+    leitor = processador()
+    leitor.ler_csv(cabecalho + dados[inicio:fim], plano=plano, dialeto=dialeto)
+    return leitor.dados
+
+
+class LeitorFragmentos:
+    """Iterável com os dados lidos de cada fragmento do CSV, na ordem do arquivo.
+
+    Com `processos` > 1, os fragmentos são lidos num pool de processos
+    (spawn, como no backfill), no máximo `processos` + 1 à frente de quem
+    consome; com 1, no próprio processo. `processador` é a classe do motor
+    (ProcessadorCSV ou ProcessadorArrow), e `plano` fixa os tipos de todos
+    os fragmentos: sem ele, cada um inferiria os seus.
+    """
+
+    def __init__(
+        self,
+        cliente,
+        bucket: str,
+        chave: str,
+        tamanho: int,
+        amostra: bytes,
+        dialeto: Dialeto,
+        processador: type,
+        plano: Optional[PlanoTipos] = None,
+        processos: int = 2,
+        tamanho_fragmento: int = 64 * MB,
+    ):
+        if dialeto.codificacao not in CODIFICACOES_ASCII:
+            raise CSVNaoFragmentavel(
+                f"Codificação {dialeto.codificacao} não pode ser dividida em bytes"
+            )
+        inicio_cabecalho, inicio = limites_cabecalho(amostra, dialeto)
+        self.cliente = cliente
+        self.bucket = bucket
+        self.chave = chave
+        self.cabecalho = bytes(amostra[inicio_cabecalho:inicio])
+        # O preâmbulo fica fora dos fragmentos
+        self.dialeto = replace(dialeto, linhas_ignoradas=0)
+        self.processador = processador
+        self.plano = plano
+        self.processos = max(1, processos)
+        self.fragmentos = self._dividir(inicio, tamanho, tamanho_fragmento)
+
+    def _dividir(
+        self, inicio: int, tamanho: int, tamanho_fragmento: int
+    ) -> List[Fragmento]:
+        """Cortes equidistantes: ao menos um fragmento por processo."""
+        restante = max(0, tamanho - inicio)
+        quantidade = max(self.processos, -(-restante // tamanho_fragmento))
+        # Fragmentos menores que a leitura extra não compensam
+        quantidade = max(1, min(quantidade, restante // LEITURA_EXTRA))
+        passo = -(-restante // quantidade) if restante else 1
+        return [
+            Fragmento(i, posicao, min(posicao + passo, tamanho))
+            for i, posicao in enumerate(range(inicio, max(tamanho, inicio + 1), passo))
+        ]
+
+    def _mapear(self, executor, funcao, tarefas: list) -> Iterator:
+        """Resultados na ordem das tarefas, com no máximo `processos` + 1 pendentes."""
+        if executor is None:
+            for tarefa in tarefas:
+                yield funcao(self.cliente, *tarefa)
+            return
+        pendentes = deque()
+        for tarefa in tarefas:
+            pendentes.append(executor.submit(funcao, None, *tarefa))
+            if len(pendentes) > self.processos:
+                yield pendentes.popleft().result()
+        while pendentes:
+            yield pendentes.popleft().result()
+
+    def _ler(self, executor) -> Iterator:
+        origem = (self.bucket, self.chave)
+        aspas = self.dialeto.aspas.encode()
+
+        # Fase 1: paridade de aspas em cada corte (o último fragmento não precisa)
+        paridade = 0
+        contagens = self._mapear(
+            executor,
+            _contar_aspas,
+            [(*origem, fragmento, aspas) for fragmento in self.fragmentos[:-1]],
+        )
+        for fragmento, contagem in zip(self.fragmentos, contagens):
+            fragmento.paridade_inicio = paridade
+            paridade = (paridade + contagem) % 2
+            fragmento.paridade_fim = paridade
+        self.fragmentos[-1].paridade_inicio = paridade
+
+        # Fase 2: cada fragmento lido e convertido entre as suas fronteiras
+        ultimo = self.fragmentos[-1].indice
+        tarefas = [
+            (
+                *origem,
+                fragmento,
+                fragmento.indice == ultimo,
+                self.cabecalho,
+                self.dialeto,
+                self.processador,
+                self.plano,
+            )
+            for fragmento in self.fragmentos
+        ]
+        for dados in self._mapear(executor, _ler_fragmento, tarefas):
+            if dados is not None:
+                yield dados
+
+    def __iter__(self) -> Iterator:
+        logger.info(
+            f"Lendo {self.bucket}/{self.chave} em {len(self.fragmentos)} fragmentos "
+            f"com {self.processos} processos"
+        )
+        if self.processos == 1:
+            yield from self._ler(None)
+            return
+        # spawn: fork depois de o pyarrow criar threads pode travar o filho
+        executor = ProcessPoolExecutor(
+            max_workers=self.processos,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_iniciar_processo,
+            initargs=(self.cliente,),
+        )
+        try:
+            yield from self._ler(executor)
+        finally:
+            executor.shutdown(cancel_futures=True)
@@ -0,0 +1,328 @@
+"""Índice de deduplicação entre arquivos, persistido no Data Lake."""
+
+from __future__ import annotations
+
+import logging
+import math
+import re
+from datetime import date
+from io import BytesIO
+from typing import List, Optional
+from botocore.exceptions import ClientError
+from ..utils.importacao import ModuloTardio
+from ..utils.s3_utils import ClienteS3
+from .deduplicacao import hash_linhas
+
+np = ModuloTardio("numpy")
+
+logger = logging.getLogger(__name__)
+
+PREFIXO_INDICE = "_indice_dedup/"
+LINHAS_POR_BLOCO = 100_000
+# Segmento diário (dia=AAAA-MM-DD/indice.*) ou o índice único de versões anteriores
+SEGMENTO = re.compile(r"(?:dia=(\d{4}-\d{2}-\d{2})/)?indice\.(npy|npz)")
+
+
+class ConjuntoHashes:
+    """Conjunto exato de hashes uint64, guardado como array ordenado."""
+
+    extensao = "npy"
+
+    def __init__(self, hashes: np.ndarray = None):
+        self.hashes = (
+            np.unique(hashes) if hashes is not None else np.zeros(0, dtype=np.uint64)
+        )
+
+    def __len__(self) -> int:
+        return len(self.hashes)
+
+    def contem(self, hashes: np.ndarray) -> np.ndarray:
+        if len(self.hashes) == 0:
+            return np.zeros(len(hashes), dtype=bool)
+        posicoes = np.minimum(
+            np.searchsorted(self.hashes, hashes), len(self.hashes) - 1
+        )
+        return self.hashes[posicoes] == hashes
+
+    def adicionar(self, hashes: np.ndarray):
+        self.hashes = np.union1d(self.hashes, hashes)
+
+    def serializar(self) -> bytes:
+        buffer = BytesIO()
+        np.save(buffer, self.hashes)
+        return buffer.getvalue()
+
+    @classmethod
+    def desserializar(cls, dados: bytes) -> "ConjuntoHashes":
+        conjunto = cls()
+        conjunto.hashes = np.load(BytesIO(dados))
+        return conjunto
+
+
+class FiltroBloom:
+    """Filtro de Bloom escalável sobre hashes uint64.
+
+    As k posições de cada item saem do próprio hash de 64 bits por hashing
+    duplo (h1 + i*h2). Quando uma camada passa da capacidade, outra é criada
+    com o dobro da capacidade e metade da taxa de falsos positivos, mantendo
+    a taxa total abaixo de ~2x a configurada.
+    """
+
+    extensao = "npz"
+
+    def __init__(
+        self, capacidade: int = 1_000_000, taxa_falsos_positivos: float = 0.001
+    ):
+        self.camadas = []
+        self._nova_camada(capacidade, taxa_falsos_positivos)
+
+    def __len__(self) -> int:
+        return sum(camada["itens"] for camada in self.camadas)
+
+    def _nova_camada(self, capacidade: int, taxa: float):
+        num_bits = math.ceil(-capacidade * math.log(taxa) / math.log(2) ** 2)
+        num_bits += -num_bits % 8
+        self.camadas.append(
+            {
+                "capacidade": capacidade,
+                "taxa": taxa,
+                "num_hashes": max(1, round(num_bits / capacidade * math.log(2))),
+                "bits": np.zeros(num_bits, dtype=bool),
+                "itens": 0,
+            }
+        )
+
+    @staticmethod
+    def _posicoes(camada: dict, hashes: np.ndarray) -> np.ndarray:
+        h1 = hashes & np.uint64(0xFFFFFFFF)
+        h2 = (hashes >> np.uint64(32)) | np.uint64(1)
+        i = np.arange(camada["num_hashes"], dtype=np.uint64)[:, None]
+        with np.errstate(over="ignore"):
+            return (h1 + i * h2) % np.uint64(len(camada["bits"]))
+
+    def contem(self, hashes: np.ndarray) -> np.ndarray:
+        encontrados = np.zeros(len(hashes), dtype=bool)
+        for inicio in range(0, len(hashes), LINHAS_POR_BLOCO):
+            fim = inicio + LINHAS_POR_BLOCO
+            bloco = hashes[inicio:fim]
+            for camada in self.camadas:
+                presentes = camada["bits"][self._posicoes(camada, bloco)].all(axis=0)
+                encontrados[inicio:fim] |= presentes
+        return encontrados
+
+    def adicionar(self, hashes: np.ndarray):
+        for inicio in range(0, len(hashes), LINHAS_POR_BLOCO):
+            fim = inicio + LINHAS_POR_BLOCO
+            bloco = hashes[inicio:fim]
+            camada = self.camadas[-1]
+            if camada["itens"] + len(bloco) > camada["capacidade"]:
+                self._nova_camada(camada["capacidade"] * 2, camada["taxa"] / 2)
+                camada = self.camadas[-1]
+            camada["bits"][self._posicoes(camada, bloco).ravel()] = True
+            camada["itens"] += len(bloco)
+
+    def serializar(self) -> bytes:
+        arrays = {}
+        for i, camada in enumerate(self.camadas):
+            arrays[f"bits_{i}"] = np.packbits(camada["bits"])
+            arrays[f"parametros_{i}"] = np.array(
+                [
+                    camada["capacidade"],
+                    camada["num_hashes"],
+                    camada["itens"],
+                    len(camada["bits"]),
+                ],
+                dtype=np.int64,
+            )
+            arrays[f"taxa_{i}"] = np.array([camada["taxa"]])
+        buffer = BytesIO()
+        np.savez_compressed(buffer, **arrays)
+        return buffer.getvalue()
+
+    @classmethod
+    def desserializar(cls, dados: bytes) -> "FiltroBloom":
+        arquivo = np.load(BytesIO(dados))
+        filtro = cls.__new__(cls)
+        filtro.camadas = []
+        for i in range(sum(1 for nome in arquivo.files if nome.startswith("bits_"))):
+            capacidade, num_hashes, itens, num_bits = arquivo[
+                f"parametros_{i}"
+            ].tolist()
+            filtro.camadas.append(
+                {
+                    "capacidade": capacidade,
+                    "taxa": float(arquivo[f"taxa_{i}"][0]),
+                    "num_hashes": num_hashes,
+                    "bits": np.unpackbits(arquivo[f"bits_{i}"])[:num_bits].astype(bool),
+                    "itens": itens,
+                }
+            )
+        return filtro
+
+
+TIPOS_INDICE = {
+    "hashes": ConjuntoHashes,
+    "bloom": FiltroBloom,
+}
+
+
+class IndiceDeduplicacao:
+    """Índice das linhas já gravadas de uma partição do índice (no pipeline, um feed).
+
+    Fica em `_indice_dedup/<particao>/` no bucket do Data Lake (o prefixo com
+    `_` é ignorado por Athena e Glue), em um segmento por dia de ingestão:
+    `dia=AAAA-MM-DD/indice.*`. `filtrar` remove as linhas cujo hash já está
+    em algum segmento dos últimos `dias_retencao` dias (0 = todos) e as
+    novas passam a fazer parte do segmento de hoje em memória; `salvar` só
+    deve ser chamado depois que o Parquet foi gravado, regrava só o segmento
+    de hoje e apaga os que saíram da janela. Assim, o que é baixado e
+    mantido em memória é limitado pela janela, não pelo histórico do feed.
+    Com `tipo='bloom'` o índice é compacto, mas uma fração
+    `taxa_falsos_positivos` das linhas novas é descartada por engano.
+
+    A atualização do segmento de hoje é leitura-modificação-escrita: duas
+    ingestões simultâneas na mesma partição podem perder a atualização de
+    uma delas (o efeito é só deixar de detectar algumas duplicatas depois).
+    O handler Lambda processa os arquivos de um mesmo feed em sequência.
+    """
+
+    def __init__(
+        self,
+        cliente_s3: ClienteS3,
+        bucket: str,
+        particao: str,
+        tipo: str = "hashes",
+        colunas_chave: Optional[List[str]] = None,
+        taxa_falsos_positivos: float = 0.001,
+        capacidade: int = 1_000_000,
+        prefixo: str = PREFIXO_INDICE,
+        dias_retencao: int = 0,
+        hoje: Optional[date] = None,
+    ):
+        if tipo not in TIPOS_INDICE:
+            raise ValueError(f"Tipo de índice desconhecido: {tipo}")
+        self.cliente_s3 = cliente_s3
+        self.bucket = bucket
+        self.tipo = tipo
+        self.colunas_chave = colunas_chave or None
+        self.taxa_falsos_positivos = taxa_falsos_positivos
+        self.capacidade = capacidade
+        self.dias_retencao = dias_retencao
+        self.hoje = hoje or date.today()
+        self.prefixo = f"{prefixo}{particao.strip('/')}/"
+        self.chave = (
+            f"{self.prefixo}dia={self.hoje.isoformat()}/"
+            f"indice.{TIPOS_INDICE[tipo].extensao}"
+        )
+        self._estrutura = None
+        # Segmentos dos dias anteriores na janela, só para consulta
+        self._anteriores = None
+        self._expirados = []
+        self.linhas_removidas = 0
+        # Com uma lista, `filtrar` guarda nela os hashes que incluiu (ver `manter_somente`)
+        self.inclusoes = None
+
+    @property
+    def estrutura(self):
+        if self._estrutura is None:
+            self._estrutura = self._carregar()
+        return self._estrutura
+
+    @property
+    def anteriores(self) -> list:
+        if self._anteriores is None:
+            self._anteriores = self._carregar_anteriores()
+        return self._anteriores
+
+    def _carregar(self):
+        classe = TIPOS_INDICE[self.tipo]
+        try:
+            dados = self.cliente_s3.ler_csv_do_s3(self.bucket, self.chave)
+        except ClientError as e:
+            if e.response["Error"]["Code"] not in ("NoSuchKey", "404"):
+                raise
+            logger.info(f"Índice de deduplicação novo: s3://{self.bucket}/{self.chave}")
+            if self.tipo == "bloom":
+                return FiltroBloom(self.capacidade, self.taxa_falsos_positivos)
+            return ConjuntoHashes()
+        return classe.desserializar(dados)
+
+    def _carregar_anteriores(self) -> list:
+        """Carrega os segmentos da janela de retenção, exceto o de hoje.
+
+        O índice único de versões anteriores (`indice.*` na raiz da partição)
+        conta como um segmento do dia em que foi gravado pela última vez.
+        """
+        classe = TIPOS_INDICE[self.tipo]
+        segmentos = []
+        for objeto in self.cliente_s3.iterar_objetos(
+            self.bucket, self.prefixo, detalhado=True
+        ):
+            relativa = objeto["key"].replace(self.prefixo, "", 1)
+            encontrado = SEGMENTO.fullmatch(relativa)
+            if not encontrado or encontrado.group(2) != classe.extensao:
+                continue
+            if objeto["key"] == self.chave:
+                continue
+            if encontrado.group(1):
+                dia = date.fromisoformat(encontrado.group(1))
+            else:
+                dia = objeto["last_modified"].date()
+            if self.dias_retencao and (self.hoje - dia).days >= self.dias_retencao:
+                self._expirados.append(objeto["key"])
+                continue
+            segmentos.append(
+                classe.desserializar(
+                    self.cliente_s3.ler_csv_do_s3(self.bucket, objeto["key"])
+                )
+            )
+        return segmentos
+
+    def filtrar(self, dados):
+        """Retorna `dados` sem as linhas já presentes na partição."""
+        hashes = hash_linhas(dados, self.colunas_chave)
+        novas = ~self.estrutura.contem(hashes)
+        for segmento in self.anteriores:
+            novas[novas] = ~segmento.contem(hashes[novas])
+        self.estrutura.adicionar(hashes[novas])
+        if self.inclusoes is not None:
+            self.inclusoes.append(hashes[novas])
+
+        removidas = len(hashes) - int(novas.sum())
+        self.linhas_removidas += removidas
+        if not removidas:
+            return dados
+        if hasattr(dados, "iloc"):
+            return dados[novas]
+        return dados.filter(novas)
+
+    def descartar(self):
+        """Desfaz o que foi adicionado em memória desde o carregamento."""
+        self._estrutura = None
+        self.linhas_removidas = 0
+
+    def manter_somente(self, inclusoes: list):
+        """Refaz o índice em memória só com `inclusoes`, partes de `self.inclusoes`.
+
+        Quando só parte do que foi filtrado chega a ser gravado, os hashes do
+        resto ficam fora do índice salvo e um reenvio não é descartado como
+        duplicata.
+        """
+        self._estrutura = None
+        for hashes in inclusoes:
+            self.estrutura.adicionar(hashes)
+        self.inclusoes = list(inclusoes)
+
+    def salvar(self) -> bool:
+        """Grava o segmento de hoje no Data Lake e apaga os expirados."""
+        if self._estrutura is None:
+            return True
+        if not self.cliente_s3.escrever_no_s3(
+            self._estrutura.serializar(), self.bucket, self.chave
+        ):
+            return False
+        if self._expirados:
+            # Uma falha aqui não invalida o salvamento: o segmento segue ignorado
+            self.cliente_s3.deletar_objetos(self.bucket, self._expirados)
+            self._expirados = []
+        return True
@@ -0,0 +1,89 @@
+"""Manifesto de ingestão: quais versões de cada objeto raw já foram ingeridas."""
+
+from __future__ import annotations
+
+import json
+import logging
+import threading
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+from botocore.exceptions import ClientError
+from ..utils.s3_utils import ClienteS3
+
+logger = logging.getLogger(__name__)
+
+PREFIXO_MANIFESTO = "_manifesto_ingestao/"
+
+
+class ManifestoIngestao:
+    """Registro por (bucket, chave, ETag, tamanho) dos objetos já ingeridos.
+
+    Cada objeto tem uma entrada pequena em
+    `_manifesto_ingestao/<bucket>/<chave>.json` no Data Lake, gravada depois
+    que a ingestão termina com sucesso. Uma entrega repetida da mesma versão
+    (retry de evento, replay de prefixo) é reconhecida pela entrada e custa
+    uma leitura dela, em vez de download, parse e regravação. Um objeto
+    sobrescrito muda de ETag e é ingerido de novo.
+
+    Os destinos gravados são os da ingestão; a compactação pode juntá-los
+    depois em outros arquivos.
+    """
+
+    def __init__(
+        self, cliente_s3: ClienteS3, bucket: str, prefixo: str = PREFIXO_MANIFESTO
+    ):
+        self.cliente_s3 = cliente_s3
+        self.bucket = bucket
+        self.prefixo = prefixo
+        self.metricas: Dict[str, int] = {"ignorados": 0, "novos": 0}
+        self._trava = threading.Lock()
+
+    def _chave(self, bucket: str, chave: str) -> str:
+        return f"{self.prefixo}{bucket}/{chave}.json"
+
+    def ler(self, bucket: str, chave: str) -> Optional[dict]:
+        """Entrada da última versão ingerida do objeto, qualquer que seja, ou None."""
+        try:
+            dados = self.cliente_s3.ler_csv_do_s3(
+                self.bucket, self._chave(bucket, chave)
+            )
+            return json.loads(dados)
+        except ClientError as e:
+            if e.response["Error"]["Code"] not in ("NoSuchKey", "404"):
+                logger.error(f"Erro ao ler manifesto de {bucket}/{chave}: {e}")
+            return None
+
+    def consultar(
+        self, bucket: str, chave: str, etag: str, tamanho: int
+    ) -> Optional[dict]:
+        """Entrada do objeto se esta mesma versão já foi ingerida, senão None."""
+        entrada = self.ler(bucket, chave)
+        ingerido = (
+            entrada is not None
+            and entrada.get("etag") == etag
+            and entrada.get("tamanho") == tamanho
+        )
+        with self._trava:
+            self.metricas["ignorados" if ingerido else "novos"] += 1
+        return entrada if ingerido else None
+
+    def registrar(
+        self,
+        bucket: str,
+        chave: str,
+        etag: str,
+        tamanho: int,
+        destinos: List[str],
+        linhas: int,
+    ) -> bool:
+        """Marca a versão do objeto como ingerida."""
+        entrada = {
+            "etag": etag,
+            "tamanho": tamanho,
+            "destinos": destinos,
+            "linhas": linhas,
+            "ingerido_em": datetime.now(timezone.utc).isoformat(),
+        }
+        return self.cliente_s3.escrever_no_s3(
+            json.dumps(entrada).encode(), self.bucket, self._chave(bucket, chave)
+        )
@@ -0,0 +1,77 @@
+"""Micro-lotes: vários CSVs pequenos gravados num só Parquet por partição.
+
+Fontes que enviam milhares de CSVs de poucos KB por hora gerariam um
+Parquet minúsculo por objeto. Com MICRO_BATCH, os eventos chegam
+acumulados (pela janela de lote de uma fila SQS) e os objetos pequenos de
+um mesmo feed são lidos um a um, concatenados numa tabela Arrow e gravados
+juntos; a coluna `arquivo_origem` continua dizendo de onde veio cada linha.
+"""
+
+import hashlib
+from datetime import datetime
+from typing import Dict, List, Tuple
+from ..utils.importacao import ModuloTardio
+
+pa = ModuloTardio("pyarrow")
+pc = ModuloTardio("pyarrow.compute")
+
+
+def dividir_em_lotes(tamanhos: List[int], limite_bytes: int) -> List[List[int]]:
+    """Índices agrupados em ordem, cada grupo com até `limite_bytes` somados (ao menos um item)."""
+    lotes, atual, soma = [], [], 0
+    for indice, tamanho in enumerate(tamanhos):
+        if atual and soma + tamanho > limite_bytes:
+            lotes.append(atual)
+            atual, soma = [], 0
+        atual.append(indice)
+        soma += tamanho
+    if atual:
+        lotes.append(atual)
+    return lotes
+
+
+def como_tabela(dados) -> "pa.Table":
+    """Tabela Arrow dos dados de um processador (DataFrame ou pa.Table)."""
+    if hasattr(dados, "iloc"):
+        return pa.Table.from_pandas(dados, preserve_index=False)
+    return dados
+
+
+def juntar_tabelas(tabelas: list) -> List[Tuple[List[int], "pa.Table"]]:
+    """Concatena as tabelas de um feed: [(índices das tabelas, tabela)].
+
+    Colunas ausentes viram nulas e tipos compatíveis são promovidos (ex.:
+    int64 e double); tabelas com tipos inconciliáveis ficam em grupos
+    separados, um por esquema.
+    """
+    try:
+        tabela = pa.concat_tables(tabelas, promote_options="permissive")
+        return [(list(range(len(tabelas))), tabela)]
+    except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError):
+        pass
+    grupos: List[Tuple["pa.Schema", List[int]]] = []
+    for indice, tabela in enumerate(tabelas):
+        for esquema, indices in grupos:
+            if esquema.equals(tabela.schema):
+                indices.append(indice)
+                break
+        else:
+            grupos.append((tabela.schema, [indice]))
+    return [
+        (indices, pa.concat_tables([tabelas[i] for i in indices]))
+        for _, indices in grupos
+    ]
+
+
+def contar_por_origem(tabela: "pa.Table") -> Dict[str, int]:
+    """Linhas de cada `arquivo_origem` na tabela."""
+    return {
+        item["values"]: item["counts"]
+        for item in pc.value_counts(tabela.column("arquivo_origem")).to_pylist()
+    }
+
+
+def nome_lote(agora: datetime, chaves: List[str]) -> str:
+    """Nome do Parquet de um micro-lote: a data da ingestão e um resumo das chaves de origem."""
+    resumo = hashlib.sha1("\n".join(sorted(chaves)).encode("utf-8")).hexdigest()[:8]
+    return f"lote-{agora:%Y%m%dT%H%M%S%f}-{resumo}"
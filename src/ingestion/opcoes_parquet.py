@@ -0,0 +1,159 @@
+"""Opções do escritor Parquet: codec, row groups, dicionário, ordenação, bloom e estatísticas."""
+
+from __future__ import annotations
+
+import inspect
+import logging
+from dataclasses import dataclass, field
+from typing import BinaryIO, List, Optional, Union
+from ..utils.importacao import ModuloTardio
+
+pa = ModuloTardio("pyarrow")
+pq = ModuloTardio("pyarrow.parquet")
+
+logger = logging.getLogger(__name__)
+
+CODECS = ("none", "snappy", "gzip", "brotli", "lz4", "zstd")
+
+
+def _lista_ou_booleano(texto: str, padrao: bool) -> Union[bool, List[str]]:
+    """'' -> padrao; 'true'/'false' -> bool; 'a,b' -> ['a', 'b']."""
+    texto = texto.strip()
+    if not texto:
+        return padrao
+    if texto.lower() in ("true", "false"):
+        return texto.lower() == "true"
+    return [coluna.strip() for coluna in texto.split(",") if coluna.strip()]
+
+
+@dataclass
+class OpcoesParquet:
+    """Como os arquivos Parquet são gravados.
+
+    O padrão reproduz o escritor anterior (snappy, dicionário e estatísticas
+    em todas as colunas, row groups do tamanho de cada escrita). Para
+    Athena, zstd e row groups grandes deixam os arquivos menores e as
+    varreduras mais rápidas; ordenar pelas colunas mais filtradas deixa o
+    min/max de cada row group útil para pular dados.
+
+    `colunas_dicionario` e `estatisticas` aceitam True (todas), False
+    (nenhuma) ou uma lista de colunas. Colunas ausentes de uma tabela são
+    ignoradas.
+
+    `perfil_colunas` não muda o Parquet: pede que cada arquivo ganhe ao lado
+    o perfil das suas colunas (ver `perfil_colunas`).
+
+    `max_arquivos_abertos` limita quantas partições uma escrita particionada
+    mantém abertas ao mesmo tempo (0 = sem limite; ver EscritorParticionado).
+    """
+
+    compressao: str = "snappy"
+    nivel_compressao: Optional[int] = None
+    linhas_por_row_group: Optional[int] = None
+    colunas_dicionario: Union[bool, List[str]] = True
+    colunas_ordenacao: List[str] = field(default_factory=list)
+    colunas_bloom: List[str] = field(default_factory=list)
+    estatisticas: Union[bool, List[str]] = True
+    perfil_colunas: bool = False
+    max_arquivos_abertos: int = 0
+
+    def __post_init__(self):
+        self.compressao = self.compressao.lower()
+        if self.compressao not in CODECS:
+            raise ValueError(
+                f"Codec Parquet desconhecido: {self.compressao} "
+                f"(use {', '.join(CODECS)})"
+            )
+
+    @classmethod
+    def de_config(cls, processamento) -> "OpcoesParquet":
+        """Opções a partir do ConfigProcessamento (variáveis PARQUET_*)."""
+        return cls(
+            compressao=processamento.compressao_parquet,
+            nivel_compressao=processamento.nivel_compressao_parquet,
+            linhas_por_row_group=processamento.linhas_por_row_group,
+            colunas_dicionario=_lista_ou_booleano(
+                processamento.colunas_dicionario_parquet, True
+            ),
+            colunas_ordenacao=processamento.colunas_ordenacao_parquet,
+            colunas_bloom=processamento.colunas_bloom_parquet,
+            estatisticas=_lista_ou_booleano(processamento.estatisticas_parquet, True),
+            perfil_colunas=processamento.perfil_colunas,
+            max_arquivos_abertos=processamento.max_arquivos_parquet_abertos,
+        )
+
+    @staticmethod
+    def _presentes(
+        colunas: Union[bool, List[str]], esquema: pa.Schema
+    ) -> Union[bool, List[str]]:
+        if isinstance(colunas, bool):
+            return colunas
+        return [nome for nome in colunas if nome in esquema.names]
+
+    def argumentos_escritor(self, esquema: pa.Schema) -> dict:
+        """Argumentos de `pq.ParquetWriter`/`pq.write_table` para o esquema."""
+        argumentos = {
+            "compression": self.compressao,
+            "use_dictionary": self._presentes(self.colunas_dicionario, esquema),
+            "write_statistics": self._presentes(self.estatisticas, esquema),
+        }
+        if self.nivel_compressao is not None:
+            argumentos["compression_level"] = self.nivel_compressao
+
+        ordenacao = self._presentes(self.colunas_ordenacao, esquema)
+        if ordenacao:
+            # Registra a ordem nos metadados de cada row group
+            argumentos["sorting_columns"] = [
+                pq.SortingColumn(esquema.get_field_index(nome)) for nome in ordenacao
+            ]
+
+        bloom = self._presentes(self.colunas_bloom, esquema)
+        if bloom:
+            if suporta_bloom():
+                argumentos["bloom_filter_options"] = {nome: True for nome in bloom}
+            else:
+                logger.warning(
+                    f"pyarrow {pa.__version__} não grava bloom filters; "
+                    f"ignorando {bloom}"
+                )
+        return argumentos
+
+    def ordenar(self, tabela: pa.Table) -> pa.Table:
+        """Ordena a tabela pelas colunas de ordenação presentes nela."""
+        ordenacao = self._presentes(self.colunas_ordenacao, tabela.schema)
+        if not ordenacao:
+            return tabela
+        return tabela.sort_by([(nome, "ascending") for nome in ordenacao])
+
+    def escrever(self, tabela: pa.Table, destino: Union[str, BinaryIO]):
+        """Grava a tabela inteira (ordenada, se configurado) em `destino`."""
+        tabela = self.ordenar(tabela)
+        pq.write_table(
+            tabela,
+            destino,
+            row_group_size=self.linhas_por_row_group,
+            **self.argumentos_escritor(tabela.schema),
+        )
+
+    def converter(self, tabela: pa.Table) -> bytes:
+        """Converte a tabela em bytes Parquet."""
+        buffer = pa.BufferOutputStream()
+        self.escrever(tabela, buffer)
+        return buffer.getvalue().to_pybytes()
+
+    def abrir_escritor(self, destino: BinaryIO, esquema: pa.Schema) -> pq.ParquetWriter:
+        """ParquetWriter para gravar em partes com estas opções."""
+        return pq.ParquetWriter(destino, esquema, **self.argumentos_escritor(esquema))
+
+
+_suporta_bloom = None
+
+
+def suporta_bloom() -> bool:
+    """Se o pyarrow instalado grava bloom filters (só versões recentes)."""
+    global _suporta_bloom
+    if _suporta_bloom is None:
+        _suporta_bloom = (
+            "bloom_filter_options" in inspect.signature(pq.write_table).parameters
+        )
+    return _suporta_bloom
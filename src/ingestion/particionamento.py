@@ -0,0 +1,274 @@
+"""Particionamento Hive da saída Parquet pelas colunas configuradas."""
+
+from __future__ import annotations
+
+import logging
+from datetime import datetime
+from typing import BinaryIO, Callable, Dict, List, Optional, Tuple
+from urllib.parse import quote
+from ..utils.importacao import ModuloTardio
+from .opcoes_parquet import OpcoesParquet
+from .perfil_colunas import PerfilDados
+
+pa = ModuloTardio("pyarrow")
+pc = ModuloTardio("pyarrow.compute")
+pd = ModuloTardio("pandas")
+
+logger = logging.getLogger(__name__)
+
+PARTICAO_PADRAO_HIVE = "__HIVE_DEFAULT_PARTITION__"
+COLUNAS_COM_ZERO = ("mes", "dia")
+
+
+def formatar_valor(nome: str, valor) -> str:
+    """Valor de partição para o caminho, como em `mes=01`.
+
+    Nulos vão para a partição padrão do Hive.
+    """
+    if valor is None:
+        return PARTICAO_PADRAO_HIVE
+    if nome in COLUNAS_COM_ZERO and isinstance(valor, int):
+        return f"{valor:02d}"
+    return quote(str(valor), safe="")
+
+
+class Particionador:
+    """Divide os dados em partições Hive (`col=valor/...`) pelas `colunas`.
+
+    Com `coluna_data_evento`, as colunas ano/mes/dia saem da data do próprio
+    registro em vez da data de ingestão, e datas inválidas ou vazias caem em
+    `__HIVE_DEFAULT_PARTITION__`. As colunas de partição ficam só no caminho,
+    não dentro dos arquivos, como Athena e Glue esperam.
+    """
+
+    def __init__(
+        self,
+        colunas: Optional[List[str]] = None,
+        coluna_data_evento: Optional[str] = None,
+        formato_data_evento: Optional[str] = None,
+    ):
+        self.colunas = list(colunas or [])
+        self.coluna_data_evento = coluna_data_evento or None
+        self.formato_data_evento = formato_data_evento or None
+
+    def datas_evento(self, dados):
+        """Datas de evento de um DataFrame ou pa.Table; inválidas viram nulo."""
+        if hasattr(dados, "iloc"):
+            serie = dados[self.coluna_data_evento]
+            if pd.api.types.is_datetime64_any_dtype(serie):
+                return serie
+            return pd.to_datetime(
+                serie, format=self.formato_data_evento or "ISO8601", errors="coerce"
+            )
+
+        coluna = dados.column(self.coluna_data_evento)
+        if pa.types.is_timestamp(coluna.type):
+            return coluna
+        if pa.types.is_date(coluna.type):
+            return pc.cast(coluna, pa.timestamp("s"))
+        texto = pc.cast(coluna, pa.string())
+        if self.formato_data_evento is None:
+            # Sem formato, só a parte AAAA-MM-DD de datas ISO
+            texto = pc.utf8_slice_codeunits(texto, 0, 10)
+        return pc.strptime(
+            texto,
+            format=self.formato_data_evento or "%Y-%m-%d",
+            unit="s",
+            error_is_null=True,
+        )
+
+    def colunas_data(self, dados, agora: datetime) -> Dict[str, object]:
+        """Valores de ano/mes/dia: da data de evento, se configurada, senão de `agora`."""
+        if self.coluna_data_evento is None:
+            return {"ano": agora.year, "mes": agora.month, "dia": agora.day}
+        datas = self.datas_evento(dados)
+        if hasattr(datas, "dt"):
+            return {
+                "ano": datas.dt.year.astype("Int64"),
+                "mes": datas.dt.month.astype("Int64"),
+                "dia": datas.dt.day.astype("Int64"),
+            }
+        return {"ano": pc.year(datas), "mes": pc.month(datas), "dia": pc.day(datas)}
+
+    def dividir(self, tabela: pa.Table) -> List[Tuple[str, pa.Table]]:
+        """Separa a tabela em (caminho da partição, linhas dela) numa só passada.
+
+        As linhas são ordenadas pelas colunas de partição e cada partição vira
+        uma fatia contígua, com o tamanho vindo de um group-by vetorizado.
+        """
+        if not self.colunas:
+            return [("", tabela)]
+
+        chaves = tabela.select(self.colunas)
+        for i, campo in enumerate(chaves.schema):
+            if pa.types.is_dictionary(campo.type):
+                valores = pc.cast(chaves.column(i), campo.type.value_type)
+                chaves = chaves.set_column(i, campo.name, valores)
+
+        ordem = pc.sort_indices(
+            chaves, sort_keys=[(nome, "ascending") for nome in self.colunas]
+        )
+        chaves = chaves.take(ordem)
+        dados = tabela.drop_columns(self.colunas).take(ordem)
+        grupos = chaves.group_by(self.colunas, use_threads=False).aggregate(
+            [(self.colunas[0], "count", pc.CountOptions(mode="all"))]
+        )
+
+        partes = []
+        inicio = 0
+        for grupo in grupos.to_pylist():
+            linhas = grupo[f"{self.colunas[0]}_count"]
+            caminho = "/".join(
+                f"{nome}={formatar_valor(nome, grupo[nome])}" for nome in self.colunas
+            )
+            partes.append((caminho, dados.slice(inicio, linhas)))
+            inicio += linhas
+        return partes
+
+    def converter(
+        self, tabela: pa.Table, opcoes: Optional[OpcoesParquet] = None
+    ) -> List[Tuple[str, bytes, int, Optional[PerfilDados]]]:
+        """Converte a tabela em um Parquet por partição: [(caminho, bytes, linhas, perfil)].
+
+        O perfil das colunas só é calculado com `opcoes.perfil_colunas`; senão é None.
+        """
+        opcoes = opcoes or OpcoesParquet()
+        return [
+            (
+                caminho,
+                opcoes.converter(parte),
+                parte.num_rows,
+                PerfilDados().atualizar(parte) if opcoes.perfil_colunas else None,
+            )
+            for caminho, parte in self.dividir(tabela)
+        ]
+
+
+class EscritorParticionado:
+    """Mantém um ParquetWriter por partição, aberto quando ela aparece.
+
+    `abrir_destino(caminho)` cria o arquivo de cada partição. Com
+    `fechar_destinos`, eles são fechados (ou abortados, se tiverem
+    `abortar()`) junto com o escritor. Cada partição aberta segura o buffer
+    do seu destino; com `opcoes.max_arquivos_abertos`, abrir mais uma
+    partição fecha a usada há mais tempo, e se ela voltar a aparecer os
+    dados seguem num novo arquivo: `abrir_destino(caminho, parte)`, com
+    parte 1, 2... `partes` guarda as linhas de cada arquivo da partição.
+    Ao abortar, os arquivos já fechados são removidos se o destino tiver
+    `excluir()`.
+
+    Cada escrita vira um row group. Com `opcoes.linhas_por_row_group`, as
+    linhas de cada partição se acumulam até esse tamanho antes de serem
+    gravadas, para que lotes pequenos não gerem row groups pequenos; a
+    memória passa a incluir um row group por partição aberta. A ordenação
+    configurada vale dentro de cada row group.
+
+    Com `opcoes.perfil_colunas`, `perfis` guarda o perfil das colunas de
+    cada partição, atualizado a cada escrita.
+    """
+
+    def __init__(
+        self,
+        abrir_destino: Callable[[str], BinaryIO],
+        particionador: Particionador,
+        opcoes: Optional[OpcoesParquet] = None,
+        fechar_destinos: bool = True,
+    ):
+        self.abrir_destino = abrir_destino
+        self.particionador = particionador
+        self.opcoes = opcoes or OpcoesParquet()
+        self.fechar_destinos = fechar_destinos
+        self.esquema = None
+        self.linhas: Dict[str, int] = {}
+        self.partes: Dict[str, List[int]] = {}
+        self.perfis: Dict[str, PerfilDados] = {}
+        # Em ordem de uso: o primeiro é o fechado quando passa do limite
+        self._escritores = {}
+        self._pendentes: Dict[str, List[pa.Table]] = {}
+        self._fechados = []
+
+    def escrever(self, tabela: pa.Table, row_group_size: Optional[int] = None):
+        alvo = self.opcoes.linhas_por_row_group
+        for caminho, parte in self.particionador.dividir(tabela):
+            if caminho in self._escritores:
+                self._escritores[caminho] = self._escritores.pop(caminho)
+            else:
+                self._abrir(caminho, parte.schema)
+            self.linhas[caminho] = self.linhas.get(caminho, 0) + parte.num_rows
+            self.partes[caminho][-1] += parte.num_rows
+            if self.opcoes.perfil_colunas:
+                self.perfis.setdefault(caminho, PerfilDados()).atualizar(parte)
+            if not alvo:
+                self._escritores[caminho][1].write_table(
+                    self.opcoes.ordenar(parte), row_group_size=row_group_size
+                )
+                continue
+            pendentes = self._pendentes[caminho]
+            pendentes.append(parte)
+            if sum(p.num_rows for p in pendentes) >= alvo:
+                self._gravar_pendentes(caminho)
+
+    def _abrir(self, caminho: str, esquema: pa.Schema):
+        limite = self.opcoes.max_arquivos_abertos
+        if limite and self.fechar_destinos and len(self._escritores) >= limite:
+            self._fechar_particao(next(iter(self._escritores)))
+        partes = self.partes.setdefault(caminho, [])
+        if partes:
+            destino = self.abrir_destino(caminho, len(partes))
+        else:
+            destino = self.abrir_destino(caminho)
+        partes.append(0)
+        escritor = self.opcoes.abrir_escritor(destino, esquema)
+        self._escritores[caminho] = (destino, escritor)
+        self._pendentes[caminho] = []
+        self.esquema = self.esquema or esquema
+
+    def _fechar_particao(self, caminho: str):
+        self._gravar_pendentes(caminho)
+        destino, escritor = self._escritores.pop(caminho)
+        del self._pendentes[caminho]
+        escritor.close()
+        if self.fechar_destinos:
+            destino.close()
+            self._fechados.append(destino)
+
+    def _gravar_pendentes(self, caminho: str):
+        pendentes = self._pendentes[caminho]
+        if not pendentes:
+            return
+        self._pendentes[caminho] = []
+        tabela = self.opcoes.ordenar(pa.concat_tables(pendentes))
+        self._escritores[caminho][1].write_table(
+            tabela, row_group_size=self.opcoes.linhas_por_row_group
+        )
+
+    def fechar(self):
+        for caminho in list(self._escritores):
+            self._fechar_particao(caminho)
+        self._fechados = []
+
+    def abortar(self):
+        for destino, escritor in self._escritores.values():
+            try:
+                escritor.close()
+            except Exception:
+                pass
+            if self.fechar_destinos:
+                getattr(destino, "abortar", destino.close)()
+        for destino in self._fechados:
+            if hasattr(destino, "excluir"):
+                destino.excluir()
+            else:
+                logger.warning(f"Arquivo já fechado não pode ser removido: {destino}")
+        self._escritores = {}
+        self._pendentes = {}
+        self._fechados = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, tipo_excecao, *_):
+        if tipo_excecao is None:
+            self.fechar()
+        else:
+            self.abortar()
@@ -0,0 +1,383 @@
+"""Perfil das colunas calculado em fluxo: nulos, mín./máx., distintos e histogramas.
+
+Com PROFILE_COLUMNS, cada Parquet gravado no Data Lake ganha ao lado um
+`_<nome>.perfil.json` com o perfil das suas linhas, atualizado a cada lote
+enquanto o arquivo é escrito, sem segunda leitura. Todas as medidas se
+combinam sem os dados (contagens e somas se somam, mín./máx. se comparam,
+os registradores do HyperLogLog ficam com o maior valor e os histogramas
+têm faixas fixas), então o perfil de uma partição é a mescla dos perfis
+dos seus arquivos. O prefixo `_` faz Athena e Glue ignorarem o arquivo.
+
+Uso:
+    python -m src.ingestion.perfil_colunas "data/ano=2024/mes=01/dia=15"
+"""
+
+from __future__ import annotations
+
+import argparse
+import base64
+import json
+import logging
+import math
+import posixpath
+import zlib
+from datetime import date, datetime, time
+from decimal import Decimal
+from typing import Dict, Optional
+from ..utils.importacao import ModuloTardio
+
+np = ModuloTardio("numpy")
+pa = ModuloTardio("pyarrow")
+pc = ModuloTardio("pyarrow.compute")
+pd = ModuloTardio("pandas")
+
+logger = logging.getLogger(__name__)
+
+SUFIXO_PERFIL = ".perfil.json"
+
+# 2^12 registradores: erro padrão de ~1,6% na contagem de distintos
+PRECISAO_HLL = 12
+
+# Faixas do histograma por potência de 2: larguras relativas de ~19%
+SUBDIVISOES_HISTOGRAMA = 4
+# Maior |expoente| de faixa de um float64 (2^-1074 a 2^1024), com folga
+_DESLOCAMENTO_FAIXAS = 1100 * SUBDIVISOES_HISTOGRAMA
+
+
+def chave_perfil(chave_parquet: str) -> str:
+    """Chave do perfil de um Parquet: `dir/x.parquet` -> `dir/_x.perfil.json`."""
+    diretorio, nome = posixpath.split(chave_parquet)
+    if nome.endswith(".parquet"):
+        nome = nome[: -len(".parquet")]
+    return posixpath.join(diretorio, f"_{nome}{SUFIXO_PERFIL}")
+
+
+class HyperLogLog:
+    """Contagem aproximada de distintos sobre hashes uint64."""
+
+    def __init__(
+        self, precisao: int = PRECISAO_HLL, registradores: Optional[np.ndarray] = None
+    ):
+        self.precisao = precisao
+        self.registradores = (
+            registradores
+            if registradores is not None
+            else np.zeros(1 << precisao, dtype=np.uint8)
+        )
+
+    def adicionar(self, hashes: np.ndarray):
+        """Os primeiros `precisao` bits escolhem o registrador; o resto, a posição do 1º bit 1."""
+        if len(hashes) == 0:
+            return
+        hashes = hashes.astype(np.uint64, copy=False)
+        indices = (hashes >> np.uint64(64 - self.precisao)).astype(np.intp)
+        # Um bit de guarda limita a contagem de zeros a 64 - precisao
+        restante = (hashes << np.uint64(self.precisao)) | np.uint64(
+            1 << (self.precisao - 1)
+        )
+        zeros = np.zeros(len(hashes), dtype=np.uint8)
+        for deslocamento in (32, 16, 8, 4, 2, 1):
+            sem_bits = (restante >> np.uint64(64 - deslocamento)) == 0
+            zeros[sem_bits] += deslocamento
+            restante[sem_bits] <<= np.uint64(deslocamento)
+        np.maximum.at(self.registradores, indices, zeros + 1)
+
+    def mesclar(self, outro: "HyperLogLog"):
+        if outro.precisao != self.precisao:
+            raise ValueError(
+                f"HyperLogLog de precisões diferentes: "
+                f"{self.precisao} e {outro.precisao}"
+            )
+        np.maximum(self.registradores, outro.registradores, out=self.registradores)
+
+    def estimar(self) -> int:
+        m = len(self.registradores)
+        alfa = 0.7213 / (1 + 1.079 / m)
+        estimativa = (
+            alfa * m * m / np.sum(np.ldexp(1.0, -self.registradores.astype(np.int32)))
+        )
+        vazios = int(np.count_nonzero(self.registradores == 0))
+        if estimativa <= 2.5 * m and vazios:
+            # Poucos distintos: contagem linear pelos registradores vazios
+            estimativa = m * math.log(m / vazios)
+        return int(round(estimativa))
+
+    def serializar(self) -> str:
+        return base64.b64encode(zlib.compress(self.registradores.tobytes())).decode(
+            "ascii"
+        )
+
+    @classmethod
+    def desserializar(cls, texto: str, precisao: int = PRECISAO_HLL) -> "HyperLogLog":
+        dados = zlib.decompress(base64.b64decode(texto))
+        registradores = np.frombuffer(dados, dtype=np.uint8).copy()
+        return cls(precisao, registradores)
+
+
+def _valor_json(valor):
+    """Mínimo/máximo num tipo que o JSON guarda e que se compara igual depois de relido."""
+    if isinstance(valor, (datetime, date, time)):
+        return valor.isoformat()
+    if isinstance(valor, Decimal):
+        return float(valor)
+    if isinstance(valor, bytes):
+        return None
+    return valor
+
+
+def _faixa(indice: str) -> tuple:
+    """(início, fim) da faixa do histograma: "+k" é [2^(k/S), 2^((k+1)/S)), "-k" o espelho."""
+    if indice == "0":
+        return 0.0, 0.0
+    sinal = -1.0 if indice[0] == "-" else 1.0
+    k = int(indice[1:])
+    limites = (
+        2.0 ** (k / SUBDIVISOES_HISTOGRAMA),
+        2.0 ** ((k + 1) / SUBDIVISOES_HISTOGRAMA),
+    )
+    return (-limites[1], -limites[0]) if sinal < 0 else limites
+
+
+class PerfilColuna:
+    """Linhas, nulos, mín./máx., distintos e, para números, soma e histograma de uma coluna."""
+
+    def __init__(self, tipo: str = ""):
+        self.tipo = tipo
+        self.linhas = 0
+        self.nulos = 0
+        self.minimo = None
+        self.maximo = None
+        self.soma = None
+        self.histograma: Dict[str, int] = {}
+        self.hll = HyperLogLog()
+
+    def atualizar(self, coluna: pa.ChunkedArray):
+        if pa.types.is_dictionary(coluna.type):
+            coluna = pc.cast(coluna, coluna.type.value_type)
+        self.tipo = self.tipo or str(coluna.type)
+        self.linhas += len(coluna)
+        self.nulos += coluna.null_count
+        validos = coluna.drop_null()
+        numerico = pa.types.is_integer(coluna.type) or pa.types.is_floating(coluna.type)
+        if pa.types.is_floating(coluna.type):
+            validos = validos.filter(pc.invert(pc.is_nan(validos)))
+        if (
+            len(validos) == 0
+            or pa.types.is_null(coluna.type)
+            or pa.types.is_nested(coluna.type)
+        ):
+            # Listas e structs: só nulos
+            return
+
+        # Repetições não mudam o HyperLogLog: só os valores únicos do lote são hasheados
+        unicos = pc.unique(validos).to_numpy(zero_copy_only=False)
+        self.hll.adicionar(pd.util.hash_array(unicos, categorize=False))
+        if not (
+            pa.types.is_binary(coluna.type) or pa.types.is_large_binary(coluna.type)
+        ):
+            extremos = pc.min_max(validos).as_py()
+            self._mesclar_extremos(
+                _valor_json(extremos["min"]), _valor_json(extremos["max"])
+            )
+        if numerico:
+            numeros = validos.to_numpy().astype(np.float64)
+            numeros = numeros[np.isfinite(numeros)]
+            self.soma = (self.soma or 0) + float(numeros.sum())
+            self._contar_faixas(numeros)
+
+    def _contar_faixas(self, numeros: np.ndarray):
+        # Um código inteiro por faixa, contado com bincount: sinal * (expoente + deslocamento)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            expoentes = np.floor(np.log2(np.abs(numeros)) * SUBDIVISOES_HISTOGRAMA)
+            codigos = np.where(
+                numeros == 0, 0, np.sign(numeros) * (expoentes + _DESLOCAMENTO_FAIXAS)
+            )
+        base = 2 * _DESLOCAMENTO_FAIXAS
+        contagens = np.bincount(codigos.astype(np.int64) + base)
+        for posicao in np.flatnonzero(contagens):
+            codigo = int(posicao) - base
+            if codigo == 0:
+                indice = "0"
+            else:
+                indice = (
+                    f"{'+' if codigo > 0 else '-'}{abs(codigo) - _DESLOCAMENTO_FAIXAS}"
+                )
+            self.histograma[indice] = self.histograma.get(indice, 0) + int(
+                contagens[posicao]
+            )
+
+    def _mesclar_extremos(self, minimo, maximo):
+        try:
+            if minimo is not None and (self.minimo is None or minimo < self.minimo):
+                self.minimo = minimo
+            if maximo is not None and (self.maximo is None or maximo > self.maximo):
+                self.maximo = maximo
+        except TypeError:
+            # Tipos que não se comparam (ex.: texto num arquivo, número no outro)
+            self.minimo = self.maximo = None
+
+    def mesclar(self, outro: "PerfilColuna"):
+        if not self.tipo or (self.linhas == self.nulos and outro.linhas > outro.nulos):
+            # O tipo de uma coluna só de nulos não diz nada
+            self.tipo = outro.tipo or self.tipo
+        self.linhas += outro.linhas
+        self.nulos += outro.nulos
+        self._mesclar_extremos(outro.minimo, outro.maximo)
+        if outro.soma is not None:
+            self.soma = (self.soma or 0) + outro.soma
+        for indice, contagem in outro.histograma.items():
+            self.histograma[indice] = self.histograma.get(indice, 0) + contagem
+        self.hll.mesclar(outro.hll)
+
+    def para_dict(self) -> dict:
+        validos = self.linhas - self.nulos
+        perfil = {
+            "tipo": self.tipo,
+            "linhas": self.linhas,
+            "nulos": self.nulos,
+            "taxa_nulos": round(self.nulos / self.linhas, 6) if self.linhas else None,
+            "minimo": self.minimo,
+            "maximo": self.maximo,
+            "distintos_aprox": min(self.hll.estimar(), validos),
+            "hll": self.hll.serializar(),
+        }
+        if self.soma is not None:
+            perfil["soma"] = self.soma
+            perfil["media"] = self.soma / validos if validos else None
+            perfil["histograma"] = [
+                [*_faixa(indice), self.histograma[indice]]
+                for indice in sorted(self.histograma, key=lambda i: _faixa(i)[0])
+            ]
+            perfil["faixas"] = dict(self.histograma)
+        return perfil
+
+    @classmethod
+    def de_dict(cls, dados: dict) -> "PerfilColuna":
+        perfil = cls(dados.get("tipo", ""))
+        perfil.linhas = dados["linhas"]
+        perfil.nulos = dados["nulos"]
+        perfil.minimo = dados.get("minimo")
+        perfil.maximo = dados.get("maximo")
+        perfil.soma = dados.get("soma")
+        perfil.histograma = dict(dados.get("faixas", {}))
+        perfil.hll = HyperLogLog.desserializar(dados["hll"])
+        return perfil
+
+
+class PerfilDados:
+    """Perfil de um conjunto de linhas, coluna a coluna, atualizado lote a lote."""
+
+    def __init__(self):
+        self.linhas = 0
+        self.arquivos = 0
+        self.colunas: Dict[str, PerfilColuna] = {}
+
+    def atualizar(self, dados) -> "PerfilDados":
+        """Soma um lote (DataFrame ou pa.Table) ao perfil."""
+        if hasattr(dados, "iloc"):
+            dados = pa.Table.from_pandas(dados, preserve_index=False)
+        self.arquivos = self.arquivos or 1
+        self.linhas += dados.num_rows
+        for nome in dados.column_names:
+            coluna = self.colunas.get(nome)
+            if coluna is None:
+                # Uma coluna que só aparece agora era nula nas linhas anteriores
+                coluna = self.colunas[nome] = PerfilColuna()
+                coluna.linhas = coluna.nulos = self.linhas - dados.num_rows
+            coluna.atualizar(dados.column(nome))
+        for nome, coluna in self.colunas.items():
+            if nome not in dados.column_names:
+                coluna.linhas += dados.num_rows
+                coluna.nulos += dados.num_rows
+        return self
+
+    def mesclar(self, outro: "PerfilDados") -> "PerfilDados":
+        """Soma outro perfil a este, sem os dados (ex.: os arquivos de uma partição)."""
+        for nome in set(self.colunas) | set(outro.colunas):
+            if nome not in self.colunas:
+                self.colunas[nome] = PerfilColuna()
+                self.colunas[nome].linhas = self.colunas[nome].nulos = self.linhas
+            if nome in outro.colunas:
+                self.colunas[nome].mesclar(outro.colunas[nome])
+            else:
+                self.colunas[nome].linhas += outro.linhas
+                self.colunas[nome].nulos += outro.linhas
+        self.linhas += outro.linhas
+        self.arquivos += outro.arquivos
+        return self
+
+    def para_dict(self) -> dict:
+        return {
+            "linhas": self.linhas,
+            "arquivos": self.arquivos,
+            "colunas": {
+                nome: coluna.para_dict() for nome, coluna in self.colunas.items()
+            },
+        }
+
+    @classmethod
+    def de_dict(cls, dados: dict) -> "PerfilDados":
+        perfil = cls()
+        perfil.linhas = dados["linhas"]
+        perfil.arquivos = dados.get("arquivos", 1)
+        perfil.colunas = {
+            nome: PerfilColuna.de_dict(coluna)
+            for nome, coluna in dados["colunas"].items()
+        }
+        return perfil
+
+    def serializar(self) -> bytes:
+        return json.dumps(self.para_dict(), ensure_ascii=False, default=str).encode(
+            "utf-8"
+        )
+
+    @classmethod
+    def desserializar(cls, dados: bytes) -> "PerfilDados":
+        return cls.de_dict(json.loads(dados))
+
+
+def perfil_particao(cliente_s3, bucket: str, particao: str) -> Optional[PerfilDados]:
+    """Perfil de uma partição: a mescla dos perfis dos seus arquivos, sem ler os Parquet.
+
+    Arquivos gravados sem PROFILE_COLUMNS não têm perfil e ficam de fora;
+    retorna None se nenhum tiver.
+    """
+    prefixo = particao.rstrip("/") + "/"
+    perfil = None
+    for chave in cliente_s3.listar_objetos(bucket, prefixo):
+        nome = posixpath.basename(chave)
+        if not (nome.startswith("_") and nome.endswith(SUFIXO_PERFIL)):
+            continue
+        # Só os perfis da própria partição, não os das subpartições
+        if posixpath.dirname(chave) != prefixo.rstrip("/"):
+            continue
+        arquivo = PerfilDados.desserializar(cliente_s3.ler_csv_do_s3(bucket, chave))
+        perfil = arquivo if perfil is None else perfil.mesclar(arquivo)
+    return perfil
+
+
+def main():
+    from ..config.settings import config
+    from ..utils.armazenamento import criar_armazenamento
+
+    parser = argparse.ArgumentParser(
+        description="Perfil das colunas de uma partição do Data Lake"
+    )
+    parser.add_argument(
+        "particao", help="Prefixo da partição, ex.: data/ano=2024/mes=01/dia=15"
+    )
+    parser.add_argument("--bucket", default=config.s3.bucket_data_lake)
+    args = parser.parse_args()
+
+    perfil = perfil_particao(criar_armazenamento(), args.bucket, args.particao)
+    if perfil is None:
+        parser.exit(1, f"Nenhum perfil em {args.bucket}/{args.particao}\n")
+    resumo = perfil.para_dict()
+    for coluna in resumo["colunas"].values():
+        coluna.pop("hll")
+        coluna.pop("faixas", None)
+    print(json.dumps(resumo, ensure_ascii=False, indent=2, default=str))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,62 +1,941 @@
 """Pipeline de ingestão CSV para Data Lake."""
 import logging
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from datetime import datetime
-from ..utils.s3_utils import ClienteS3
+from typing import List
+from ..utils.armazenamento import ArmazenamentoObjetos, criar_armazenamento
+from ..utils.descompressao import formato_compressao, iterar_csvs, nome_base
+from ..utils.instrumentacao import Instrumentacao
 from ..config.settings import config
-from .csv_processor import ProcessadorCSV
+from .csv_processor import ArquivoSemLinhas, ProcessadorCSV
+from .dialeto import CacheDialetos, Dialeto
+from .estrategia import (FRAGMENTOS, MB, MICRO_LOTE, REJEITADO, STREAMING, escolher_estrategia,
+                         memoria_disponivel_mb, processos_leitura)
+from .fragmentacao import CSVNaoFragmentavel, LeitorFragmentos
+from .indice_deduplicacao import IndiceDeduplicacao
+from .manifesto_ingestao import ManifestoIngestao
+from .micro_lotes import como_tabela, contar_por_origem, juntar_tabelas, nome_lote
+from .opcoes_parquet import OpcoesParquet
+from .particionamento import Particionador
+from .perfil_colunas import PerfilDados, chave_perfil
+from .processador_arrow import ProcessadorArrow
+from .registro_esquemas import DesvioEsquema, RegistroEsquemas, inferir_plano
+from .validacao import RegrasValidacao, ValidadorDados
 
 logger = logging.getLogger(__name__)
 
+PREFIXO_DADOS = "data/"
+
+# Bytes lidos do início do CSV para o cabeçalho e a inferência no modo streaming
+TAMANHO_AMOSTRA = 1024 * 1024
+
+# Motores de processamento disponíveis (PROCESSING_ENGINE)
+MOTORES = {
+    'pandas': ProcessadorCSV,
+    'arrow': ProcessadorArrow,
+}
+
+
+def criar_processador(motor: str, opcoes_parquet: OpcoesParquet = None):
+    """Cria o processador do motor indicado."""
+    try:
+        return MOTORES[motor](opcoes_parquet)
+    except KeyError:
+        raise ValueError(f"Motor de processamento desconhecido: {motor}") from None
+
 
 class PipelineIngestao:
     """Pipeline simples de ingestão."""
     
-    def __init__(self):
-        self.cliente_s3 = ClienteS3(regiao=config.aws.regiao)
-        self.processador_csv = ProcessadorCSV()
+    def __init__(self, cliente_s3: ArmazenamentoObjetos = None, motor: str = None,
+                 registro_esquemas: RegistroEsquemas = None,
+                 manifesto: ManifestoIngestao = None,
+                 instrumentacao: Instrumentacao = None,
+                 regras_validacao: RegrasValidacao = None,
+                 cache_dialetos: CacheDialetos = None):
+        self.cliente_s3 = cliente_s3 or criar_armazenamento()
+        self.opcoes_parquet = OpcoesParquet.de_config(config.processamento)
+        self.processador_csv = criar_processador(motor or config.processamento.motor,
+                                                 self.opcoes_parquet)
+        if registro_esquemas is None and config.processamento.registro_esquemas:
+            registro_esquemas = RegistroEsquemas(self.cliente_s3, config.s3.bucket_data_lake)
+        self.registro_esquemas = registro_esquemas
+        if manifesto is None and config.processamento.manifesto_ingestao:
+            manifesto = ManifestoIngestao(self.cliente_s3, config.s3.bucket_data_lake)
+        self.manifesto = manifesto
+        if regras_validacao is None and config.processamento.regras_validacao:
+            regras_validacao = RegrasValidacao.carregar(config.processamento.regras_validacao)
+        self.regras_validacao = regras_validacao
+        if cache_dialetos is None and config.processamento.deteccao_dialeto:
+            cache_dialetos = CacheDialetos(config.processamento.tamanho_amostra_dialeto_kb * 1024)
+        self.cache_dialetos = cache_dialetos
+        self.instrumentacao = instrumentacao or Instrumentacao(
+            habilitada=config.logging.metricas,
+            emf=config.logging.metricas_emf,
+            namespace=config.logging.namespace_metricas
+        )
+        self.situacao_esquema = None
+        self.quarentena = None
+        self.dialeto = None
+        self.particionador = Particionador(
+            config.processamento.colunas_particao,
+            config.processamento.coluna_data_evento,
+            config.processamento.formato_data_evento
+        )
+        self.formatos_data = [config.processamento.formato_data]
     
-    def processar_arquivo(self, bucket: str, chave: str) -> dict:
-        """Processa arquivo CSV do S3."""
+    def processar_arquivo(self, bucket: str, chave: str, etag: str = None,
+                          tamanho: int = None, forcar: bool = False) -> dict:
+        """Processa arquivo CSV do S3.
+        
+        Com o manifesto de ingestão, uma versão já ingerida (mesmo ETag e
+        tamanho) é ignorada, a menos que `forcar`: aí o arquivo é ingerido de
+        novo e os Parquet da ingestão anterior, listados no manifesto, são
+        apagados depois que os novos são gravados (ver `_destinos_a_substituir`).
+        `etag` e `tamanho` podem vir do evento S3; sem eles, um HEAD do objeto
+        os obtém.
+        
+        O tamanho decide a estratégia antes do download: em memória, em
+        lotes (streaming), em fragmentos lidos em paralelo (PARSE_WORKERS)
+        ou, acima de MAX_FILE_SIZE_MB, nenhuma: o objeto vai para
+        FAILED_PREFIX no próprio bucket.
+        """
         resultado = {
             'sucesso': False,
             'origem': f"{bucket}/{chave}",
             'erro': None
         }
         
+        instrumentacao = self.instrumentacao
+        instrumentacao.reiniciar(origem=resultado['origem'])
+        
         try:
             logger.info(f"Processando {bucket}/{chave}")
             
-            # Ler CSV do S3
-            dados_csv = self.cliente_s3.ler_csv_do_s3(bucket, chave)
-            
-            # Processar: ler, limpar, adicionar metadados
-            self.processador_csv.ler_csv(dados_csv)
-            self.processador_csv.limpar_dados()
-            self.processador_csv.adicionar_colunas_metadados(arquivo_origem=chave)
+            versao = None
+            anteriores = []
+            if self.manifesto is not None:
+                with instrumentacao.etapa("manifesto"):
+                    versao = self._versao_origem(bucket, chave, etag, tamanho)
+                    entrada = (versao and not forcar
+                               and self.manifesto.consultar(bucket, chave, *versao))
+                    if forcar:
+                        anteriores = self._destinos_a_substituir(bucket, chave)
+                if entrada:
+                    logger.info(f"{bucket}/{chave} já ingerido (ETag {versao[0]}), ignorando")
+                    resultado.update({
+                        'sucesso': True,
+                        'ignorado': True,
+                        'destino': None,
+                        'destinos': entrada['destinos'],
+                        'linhas': entrada['linhas'],
+                    })
+                    return resultado
+                if versao:
+                    tamanho = versao[1]
             
-            # Converter para Parquet
-            dados_parquet = self.processador_csv.converter_para_parquet()
+            estrategia, tamanho = self._escolher_estrategia(bucket, chave, tamanho)
+            resultado['estrategia'] = estrategia
+            if estrategia == REJEITADO:
+                limite = config.processamento.tamanho_max_arquivo_mb
+                resultado['erro'] = (f"Arquivo de {tamanho / MB:.1f} MB excede "
+                                     f"MAX_FILE_SIZE_MB ({limite} MB)")
+                logger.error(f"{bucket}/{chave}: {resultado['erro']}")
+                resultado['destino_falha'] = self._rotear_para_falhas(bucket, chave)
+                return resultado
             
-            # Caminho particionado por data
             agora = datetime.now()
-            nome_arquivo = chave.split('/')[-1].replace('.csv', '')
-            chave_destino = f"data/ano={agora.year}/mes={agora.month:02d}/dia={agora.day:02d}/{nome_arquivo}.parquet"
+            nome_arquivo = nome_base(chave)
             
-            # Salvar no Data Lake
-            sucesso = self.cliente_s3.escrever_no_s3(
-                dados_parquet,
-                config.s3.bucket_data_lake,
-                chave_destino
-            )
+            indice = self._criar_indice_deduplicacao(chave)
+            filtros = [indice] if indice else []
+            if indice:
+                # Com o índice, um reenvio grava só as linhas novas; o nome
+                # único evita sobrescrever o Parquet com as linhas anteriores
+                nome_arquivo = f"{nome_arquivo}-{agora:%H%M%S%f}"
+            
+            self.situacao_esquema = None
+            self.quarentena = None
+            self.dialeto = None
+            self._sondar_dialeto(bucket, chave)
+            if estrategia == FRAGMENTOS:
+                sucesso, particoes = self._processar_em_fragmentos(bucket, chave, nome_arquivo,
+                                                                   filtros, tamanho)
+            elif estrategia == STREAMING:
+                sucesso, particoes = self._processar_em_lotes(bucket, chave, nome_arquivo, filtros)
+            else:
+                sucesso, particoes = self._processar_em_memoria(bucket, chave, nome_arquivo,
+                                                                filtros)
+            linhas = sum(particoes.values())
+            if self.situacao_esquema:
+                resultado['esquema'] = self.situacao_esquema
+            if self.quarentena:
+                resultado['quarentena'] = self.quarentena
+            if self.dialeto is not None and not self.dialeto.eh_padrao:
+                resultado['dialeto'] = self.dialeto.para_dict()
+            
+            if sucesso and indice:
+                resultado['duplicatas_indice'] = indice.linhas_removidas
+                with instrumentacao.etapa("indice_dedup"):
+                    sucesso = indice.salvar()
             
             if sucesso:
                 resultado['sucesso'] = True
-                resultado['destino'] = f"{config.s3.bucket_data_lake}/{chave_destino}"
-                resultado['linhas'] = len(self.processador_csv.df)
+                destinos = [f"{config.s3.bucket_data_lake}/{chave_destino}"
+                            for chave_destino in particoes]
+                # Um arquivo: o próprio destino; vários: a raiz da tabela
+                resultado['destino'] = destinos[0] if len(destinos) == 1 else (
+                    f"{config.s3.bucket_data_lake}/{PREFIXO_DADOS}" if destinos else None
+                )
+                resultado['destinos'] = destinos
+                resultado['linhas'] = linhas
                 logger.info(f"Sucesso: {resultado['linhas']} linhas processadas")
-            
+                if anteriores:
+                    restantes = self._remover_destinos(
+                        [destino for destino in anteriores if destino not in destinos]
+                    )
+                    resultado['substituidos'] = len(anteriores) - len(restantes)
+                    if restantes:
+                        # Na próxima tentativa, os restantes também serão substituídos
+                        destinos = destinos + restantes
+                        resultado['sucesso'] = False
+                        resultado['erro'] = (f"Parquet anteriores não removidos (linhas "
+                                             f"duplicadas): {restantes}")
+                if versao and not self.manifesto.registrar(bucket, chave, *versao, destinos,
+                                                           linhas):
+                    # A ingestão valeu; sem a entrada, só a próxima entrega não é ignorada
+                    logger.warning(f"Falha ao registrar {bucket}/{chave} no manifesto de ingestão")
+        
         except Exception as e:
             logger.error(f"Erro: {e}")
             resultado['erro'] = str(e)
         
+        if instrumentacao.medicoes:
+            resultado['etapas'] = instrumentacao.resumo()
         return resultado
+    
+    def processar_micro_lote(self, arquivos: List[tuple]) -> List[dict]:
+        """Ingere vários CSVs pequenos com um só Parquet por partição (MICRO_BATCH).
+        
+        `arquivos` são tuplas (bucket, chave, etag, tamanho), como as do
+        evento. Os objetos são baixados em paralelo; cada CSV é lido,
+        validado e limpo como no modo em memória e recebe os próprios
+        metadados (`arquivo_origem` é a chave dele). As tabelas de um mesmo
+        feed são concatenadas e cada partição vira um `lote-*.parquet`.
+        Retorna um resultado por arquivo, na ordem recebida: um arquivo que
+        falha na leitura não impede os demais; uma escrita que falha, só os
+        arquivos com linhas nela.
+        """
+        instrumentacao = self.instrumentacao
+        instrumentacao.reiniciar(origem=f"micro-lote de {len(arquivos)} objetos")
+        agora = datetime.now()
+        # Um índice de deduplicação por feed, criado no primeiro arquivo dele
+        indices_feed = {}
+        
+        def indice_do_feed(chave: str):
+            origem = self._origem(chave)
+            if origem not in indices_feed:
+                indices_feed[origem] = self._criar_indice_deduplicacao(chave)
+                if indices_feed[origem]:
+                    indices_feed[origem].inclusoes = []
+            return indices_feed[origem]
+        
+        resultados = []
+        pendentes = []
+        vistos = set()
+        for bucket, chave, etag, tamanho in arquivos:
+            resultado = {
+                'sucesso': False,
+                'origem': f"{bucket}/{chave}",
+                'erro': None,
+                'estrategia': MICRO_LOTE
+            }
+            resultados.append(resultado)
+            if (bucket, chave) in vistos:
+                # Evento repetido no mesmo lote (a entrega do SQS é "ao menos uma vez")
+                resultado.update({'sucesso': True, 'ignorado': True, 'destino': None,
+                                  'destinos': [], 'linhas': 0})
+                continue
+            vistos.add((bucket, chave))
+            versao = None
+            if self.manifesto is not None:
+                with instrumentacao.etapa("manifesto"):
+                    versao = self._versao_origem(bucket, chave, etag, tamanho)
+                    entrada = versao and self.manifesto.consultar(bucket, chave, *versao)
+                if entrada:
+                    logger.info(f"{bucket}/{chave} já ingerido (ETag {versao[0]}), ignorando")
+                    resultado.update({'sucesso': True, 'ignorado': True, 'destino': None,
+                                      'destinos': entrada['destinos'], 'linhas': entrada['linhas']})
+                    continue
+            pendentes.append({'resultado': resultado, 'versao': versao, 'bucket': bucket,
+                              'chave': chave, 'particoes': {}})
+        
+        with instrumentacao.etapa("s3_get") as etapa:
+            conteudos = self._baixar_objetos([(item['bucket'], item['chave'])
+                                              for item in pendentes])
+            etapa.bytes_entrada = sum(len(conteudo) for conteudo in conteudos
+                                      if not isinstance(conteudo, Exception))
+        
+        # Leitura em ordem, neste processo: o processador guarda o arquivo atual
+        grupos = {}
+        with instrumentacao.etapa("leitura_csv") as etapa:
+            for item, conteudo in zip(pendentes, conteudos):
+                indice = item['indice'] = indice_do_feed(item['chave'])
+                marca = len(indice.inclusoes) if indice else 0
+                try:
+                    if isinstance(conteudo, Exception):
+                        raise conteudo
+                    tabelas = self._ler_para_micro_lote(conteudo, item['chave'], agora,
+                                                        [indice] if indice else [])
+                except Exception as e:
+                    logger.error(f"Erro em {item['resultado']['origem']}: {e}")
+                    item['resultado']['erro'] = str(e)
+                    continue
+                item['hashes'] = indice.inclusoes[marca:] if indice else []
+                if self.situacao_esquema:
+                    item['resultado']['esquema'] = self.situacao_esquema
+                if self.quarentena:
+                    item['resultado']['quarentena'] = self.quarentena
+                if self.dialeto is not None and not self.dialeto.eh_padrao:
+                    item['resultado']['dialeto'] = self.dialeto.para_dict()
+                grupo = grupos.setdefault((item['bucket'], self._origem(item['chave'])), [])
+                grupo.extend((item, tabela) for tabela in tabelas)
+            etapa.linhas = sum(tabela.num_rows for grupo in grupos.values() for _, tabela in grupo)
+        
+        saidas = []
+        with instrumentacao.etapa("parquet") as etapa:
+            for grupo in grupos.values():
+                por_chave = {item['chave']: item for item, _ in grupo}
+                for indices, tabela in juntar_tabelas([tabela for _, tabela in grupo]):
+                    nome = nome_lote(agora, list({grupo[i][0]['chave'] for i in indices}))
+                    for caminho, parte in self.particionador.dividir(tabela):
+                        itens = [(por_chave[chave], linhas)
+                                 for chave, linhas in contar_por_origem(parte).items()]
+                        perfil = None
+                        if self.opcoes_parquet.perfil_colunas:
+                            perfil = PerfilDados().atualizar(parte)
+                        saidas.append((self._chave_destino(caminho, nome),
+                                       self.opcoes_parquet.converter(parte), itens, perfil))
+            etapa.bytes_saida = sum(len(dados) for _, dados, _, _ in saidas)
+        
+        perfis = {}
+        with instrumentacao.etapa("s3_put") as etapa:
+            for chave_destino, dados_parquet, itens, perfil in saidas:
+                sucesso = self.cliente_s3.escrever_no_s3(dados_parquet, config.s3.bucket_data_lake,
+                                                         chave_destino)
+                for item, linhas in itens:
+                    item['particoes'][chave_destino] = linhas
+                    if not sucesso:
+                        item['resultado']['erro'] = f"Falha ao gravar {chave_destino}"
+                if sucesso and perfil is not None:
+                    perfis[chave_destino] = perfil
+            etapa.bytes_saida = sum(len(dados) for _, dados, _, _ in saidas)
+        self._gravar_perfis(perfis)
+        
+        salvos = {}
+        if any(indices_feed.values()):
+            with instrumentacao.etapa("indice_dedup"):
+                for origem, indice in indices_feed.items():
+                    if not indice:
+                        continue
+                    do_feed = [item for item in pendentes if item.get('indice') is indice]
+                    if any(item['resultado']['erro'] for item in do_feed):
+                        # Só as linhas dos arquivos gravados entram no índice: um arquivo
+                        # que falhou, ao ser reenviado, não é descartado como duplicata
+                        indice.manter_somente([hashes for item in do_feed
+                                               if not item['resultado']['erro']
+                                               for hashes in item['hashes']])
+                    salvos[origem] = indice.salvar()
+        for item in pendentes:
+            resultado = item['resultado']
+            if resultado['erro']:
+                continue
+            indice = item['indice']
+            if indice:
+                resultado['duplicatas_indice'] = indice.linhas_removidas
+                if not salvos[self._origem(item['chave'])]:
+                    resultado['erro'] = "Falha ao salvar o índice de deduplicação"
+                    continue
+            destinos = [f"{config.s3.bucket_data_lake}/{chave_destino}"
+                        for chave_destino in item['particoes']]
+            linhas = sum(item['particoes'].values())
+            resultado.update({
+                'sucesso': True,
+                'destino': destinos[0] if len(destinos) == 1 else (
+                    f"{config.s3.bucket_data_lake}/{PREFIXO_DADOS}" if destinos else None
+                ),
+                'destinos': destinos,
+                'linhas': linhas,
+            })
+            if item['versao'] and not self.manifesto.registrar(item['bucket'], item['chave'],
+                                                               *item['versao'], destinos, linhas):
+                logger.warning(f"Falha ao registrar {resultado['origem']} no manifesto de ingestão")
+        
+        logger.info(f"Micro-lote: {len(arquivos)} objetos em {len(saidas)} arquivos Parquet")
+        if instrumentacao.medicoes:
+            etapas = instrumentacao.resumo()
+            for resultado in resultados:
+                resultado['etapas'] = etapas
+        return resultados
+    
+    def _baixar_objetos(self, objetos: List[tuple]) -> list:
+        """Conteúdo de cada (bucket, chave), na ordem, com até S3_MAX_CONCURRENCY GETs simultâneos.
+        
+        Um objeto que falha vem como a exceção, no lugar do conteúdo.
+        """
+        def baixar(objeto: tuple):
+            try:
+                return self.cliente_s3.ler_buffer(*objeto)
+            except Exception as e:
+                return e
+        
+        if len(objetos) <= 1:
+            return [baixar(objeto) for objeto in objetos]
+        with ThreadPoolExecutor(max_workers=max(1, config.s3.concorrencia)) as executor:
+            return list(executor.map(baixar, objetos))
+    
+    def _ler_para_micro_lote(self, conteudo, chave: str, agora: datetime, filtros: list) -> list:
+        """Tabelas Arrow de um objeto do micro-lote (uma por CSV), já limpas e com metadados."""
+        self.situacao_esquema = None
+        self.quarentena = None
+        self.dialeto = None
+        nome_arquivo = nome_base(chave)
+        tabelas = []
+        for membro, fluxo in iterar_csvs(conteudo, chave):
+            dados_csv = fluxo.read()
+            with self._validacao(chave, self._nome_membro(nome_arquivo, membro, chave),
+                                 filtros) as filtros_validados:
+                self._ler_com_plano(dados_csv, chave, self._dialeto_para(chave, dados_csv))
+                self.processador_csv.limpar_dados(
+                    colunas_chave=config.processamento.colunas_deduplicacao,
+                    filtros=filtros_validados
+                )
+            if not self.processador_csv.obter_estatisticas()['row_count']:
+                continue
+            self.processador_csv.adicionar_colunas_metadados(
+                arquivo_origem=chave,
+                agora=agora,
+                particionador=self.particionador
+            )
+            tabelas.append(como_tabela(self.processador_csv.dados))
+        return tabelas
+    
+    def _destinos_a_substituir(self, bucket: str, chave: str) -> List[str]:
+        """Destinos da ingestão anterior do objeto, a apagar num reprocessamento forçado.
+        
+        Levanta ValueError quando substituir não é seguro: com DEDUP_INDEX, o
+        índice já tem as linhas e o arquivo sairia vazio; se um destino não
+        existe mais (a compactação o juntou a outros), as linhas dele ficariam
+        duplicadas.
+        """
+        entrada = self.manifesto.ler(bucket, chave)
+        if entrada is None:
+            return []
+        if config.processamento.indice_deduplicacao:
+            raise ValueError("Reprocessamento forçado com DEDUP_INDEX: o índice descartaria "
+                             "as linhas já ingeridas")
+        faltando = [
+            destino for destino in entrada['destinos']
+            if self.cliente_s3.obter_metadados_objeto(*destino.split('/', 1)) is None
+        ]
+        if faltando:
+            raise ValueError(f"Parquet da ingestão anterior não encontrados (compactados?); "
+                             f"reprocessar duplicaria as linhas: {faltando}")
+        return entrada['destinos']
+    
+    def _remover_destinos(self, destinos: List[str]) -> List[str]:
+        """Apaga Parquet (e os perfis ao lado) de `destinos`; retorna os que falharam."""
+        por_bucket = {}
+        for destino in destinos:
+            bucket, chave = destino.split('/', 1)
+            por_bucket.setdefault(bucket, []).extend([chave, chave_perfil(chave)])
+        restantes = []
+        for bucket, chaves in por_bucket.items():
+            erros = set(self.cliente_s3.deletar_objetos(bucket, chaves)['erros'])
+            restantes.extend(f"{bucket}/{chave}" for chave in chaves[::2] if chave in erros)
+        return restantes
+    
+    def _versao_origem(self, bucket: str, chave: str, etag: str = None,
+                       tamanho: int = None) -> tuple:
+        """(ETag, tamanho) do objeto de origem, ou None se o HEAD falhar."""
+        if etag is None or tamanho is None:
+            metadados = self.cliente_s3.obter_metadados_objeto(bucket, chave)
+            if metadados is None:
+                return None
+            etag, tamanho = metadados['etag'], metadados['size']
+        return etag.strip('"'), int(tamanho)
+    
+    def _escolher_estrategia(self, bucket: str, chave: str, tamanho: int = None) -> tuple:
+        """(estratégia, tamanho) do objeto; sem o tamanho do evento, um HEAD o obtém."""
+        if tamanho is None:
+            with self.instrumentacao.etapa("head"):
+                metadados = self.cliente_s3.obter_metadados_objeto(bucket, chave)
+            if metadados is not None:
+                tamanho = metadados['size']
+        estrategia = escolher_estrategia(
+            tamanho, chave,
+            config.processamento.tamanho_max_arquivo_mb,
+            streaming=config.processamento.modo_streaming,
+            memoria_mb=config.processamento.limite_memoria_mb or memoria_disponivel_mb(),
+            processos=processos_leitura(config.processamento.processos_leitura),
+            tamanho_fragmento_mb=config.processamento.tamanho_fragmento_mb,
+            estagios=config.processamento.estagios_concorrentes,
+            tamanho_parte_mb=config.s3.tamanho_parte_mb
+        )
+        logger.info(f"Estratégia para {chave} ({tamanho} bytes): {estrategia}")
+        return estrategia, tamanho
+    
+    def _rotear_para_falhas(self, bucket: str, chave: str) -> str:
+        """Move o objeto para FAILED_PREFIX no mesmo bucket, sem baixá-lo (cópia no S3)."""
+        chave_falha = f"{config.s3.prefixo_falhas}{chave}"
+        if not self.cliente_s3.copiar_objeto(bucket, chave, bucket, chave_falha):
+            return None
+        if not self.cliente_s3.deletar_objeto(bucket, chave):
+            logger.warning(f"{bucket}/{chave} copiado para {chave_falha}, mas não removido")
+        return f"{bucket}/{chave_falha}"
+    
+    def _gravar_perfis(self, perfis: dict):
+        """Grava o perfil das colunas ao lado de cada Parquet (PROFILE_COLUMNS).
+        
+        O perfil é acessório: uma falha ao gravá-lo não falha a ingestão, só
+        deixa o arquivo fora do perfil da partição.
+        """
+        if not perfis:
+            return
+        with self.instrumentacao.etapa("perfil_colunas") as etapa:
+            serializados = {chave_destino: perfil.serializar()
+                            for chave_destino, perfil in perfis.items()}
+            etapa.bytes_saida = sum(len(dados) for dados in serializados.values())
+            for chave_destino, dados in serializados.items():
+                if not self.cliente_s3.escrever_no_s3(dados, config.s3.bucket_data_lake,
+                                                      chave_perfil(chave_destino)):
+                    logger.warning(f"Falha ao gravar o perfil das colunas de {chave_destino}")
+    
+    def _criar_indice_deduplicacao(self, chave: str):
+        """Cria o índice de deduplicação do feed de `chave`, se habilitado (DEDUP_INDEX).
+        
+        O índice é do feed (o diretório do arquivo no bucket raw), não da
+        partição de saída: um arquivo reenviado em outro dia ainda é comparado
+        com as linhas gravadas do feed em DEDUP_INDEX_RETENTION_DAYS dias.
+        """
+        if not config.processamento.indice_deduplicacao:
+            return None
+        return IndiceDeduplicacao(
+            self.cliente_s3,
+            config.s3.bucket_data_lake,
+            self._origem(chave).strip('/') or '_raiz',
+            tipo=config.processamento.indice_deduplicacao,
+            colunas_chave=config.processamento.colunas_deduplicacao,
+            taxa_falsos_positivos=config.processamento.taxa_falsos_positivos_bloom,
+            dias_retencao=config.processamento.dias_retencao_indice_dedup
+        )
+    
+    @staticmethod
+    def _nome_parte(nome_arquivo: str, parte: int) -> str:
+        """Nome do arquivo de uma partição reaberta (PARQUET_MAX_OPEN_FILES): `<nome>-<parte>`."""
+        return f"{nome_arquivo}-{parte}" if parte else nome_arquivo
+    
+    def _arquivos_gravados(self, estatisticas: dict, nome_arquivo: str) -> dict:
+        """{chave de destino: linhas} de cada Parquet de uma conversão em lotes."""
+        return {
+            self._chave_destino(caminho, self._nome_parte(nome_arquivo, parte)): linhas
+            for caminho, partes in estatisticas['parts'].items()
+            for parte, linhas in enumerate(partes)
+        }
+    
+    @staticmethod
+    def _chave_destino(caminho_particao: str, nome_arquivo: str) -> str:
+        if not caminho_particao:
+            return f"{PREFIXO_DADOS}{nome_arquivo}.parquet"
+        return f"{PREFIXO_DADOS}{caminho_particao}/{nome_arquivo}.parquet"
+    
+    @staticmethod
+    def _nome_membro(nome_arquivo: str, membro: str, chave: str) -> str:
+        """Nome do Parquet de um CSV de um .zip: o do arquivo mais o do membro."""
+        if formato_compressao(chave) != 'zip':
+            return nome_arquivo
+        return f"{nome_arquivo}-{nome_base(membro)}"
+    
+    def _processar_em_memoria(self, bucket: str, chave: str, nome_arquivo: str,
+                              filtros: list) -> tuple:
+        """Carrega o CSV inteiro, processa e grava um Parquet por partição.
+        
+        Um CSV comprimido é baixado comprimido e descomprimido na memória; um
+        .zip é convertido membro a membro. Retorna (sucesso, {chave de
+        destino: linhas}).
+        """
+        instrumentacao = self.instrumentacao
+        
+        # Ler CSV do S3
+        with instrumentacao.etapa("s3_get") as etapa:
+            # Local, um memory map: o parser lê do page cache sem cópia
+            conteudo = [self.cliente_s3.ler_buffer(bucket, chave)]
+            etapa.bytes_entrada = len(conteudo[0])
+        if formato_compressao(chave) is None:
+            with self._validacao(chave, nome_arquivo, filtros) as filtros_validados:
+                return self._converter_em_memoria(conteudo, chave, nome_arquivo, filtros_validados)
+        
+        sucesso, particoes = True, {}
+        for membro, fluxo in iterar_csvs(conteudo[0], chave):
+            with instrumentacao.etapa("descompressao") as etapa:
+                descomprimido = [fluxo.read()]
+                etapa.bytes_saida = len(descomprimido[0])
+            nome_membro = self._nome_membro(nome_arquivo, membro, chave)
+            with self._validacao(chave, nome_membro, filtros) as filtros_validados:
+                sucesso_membro, particoes_membro = self._converter_em_memoria(
+                    descomprimido, chave, nome_membro, filtros_validados
+                )
+            sucesso = sucesso_membro and sucesso
+            particoes.update(particoes_membro)
+        return sucesso, particoes
+    
+    def _converter_em_memoria(self, conteudo: list, chave: str, nome_arquivo: str,
+                              filtros: list) -> tuple:
+        """Converte um CSV em memória; `conteudo` é [bytes], esvaziada após a leitura.
+        
+        A lista transfere a referência dos bytes: assim eles são liberados
+        logo depois do parse, antes da limpeza e da conversão.
+        """
+        instrumentacao = self.instrumentacao
+        dados_csv = conteudo.pop()
+        
+        # Processar: ler, limpar, adicionar metadados
+        with instrumentacao.etapa("leitura_csv") as etapa:
+            self._ler_com_plano(dados_csv, chave, self._dialeto_para(chave, dados_csv))
+            etapa.bytes_entrada = len(dados_csv)
+            etapa.linhas = self.processador_csv.obter_estatisticas()['row_count']
+        del dados_csv
+        with instrumentacao.etapa("limpeza") as etapa:
+            self.processador_csv.limpar_dados(
+                colunas_chave=config.processamento.colunas_deduplicacao,
+                filtros=filtros
+            )
+            linhas_restantes = self.processador_csv.obter_estatisticas()['row_count']
+            etapa.linhas = linhas_restantes
+        if linhas_restantes == 0:
+            logger.info("Nenhuma linha nova para gravar")
+            return True, {}
+        with instrumentacao.etapa("metadados"):
+            self.processador_csv.adicionar_colunas_metadados(
+                arquivo_origem=chave,
+                particionador=self.particionador
+            )
+        
+        # Converter para Parquet, um arquivo por partição
+        with instrumentacao.etapa("parquet") as etapa:
+            arquivos = self.processador_csv.converter_em_particoes(self.particionador)
+            etapa.linhas = sum(linhas for _, _, linhas, _ in arquivos)
+            etapa.bytes_saida = sum(len(dados) for _, dados, _, _ in arquivos)
+        
+        particoes = {}
+        perfis = {}
+        sucesso = True
+        with instrumentacao.etapa("s3_put") as etapa:
+            for caminho, dados_parquet, linhas, perfil in arquivos:
+                chave_destino = self._chave_destino(caminho, nome_arquivo)
+                
+                # Salvar no Data Lake
+                sucesso = self.cliente_s3.escrever_no_s3(
+                    dados_parquet,
+                    config.s3.bucket_data_lake,
+                    chave_destino
+                ) and sucesso
+                particoes[chave_destino] = linhas
+                if perfil is not None:
+                    perfis[chave_destino] = perfil
+            etapa.bytes_saida = sum(len(dados) for _, dados, _, _ in arquivos)
+        self._gravar_perfis(perfis)
+        return sucesso, particoes
+    
+    def _processar_em_lotes(self, bucket: str, chave: str, nome_arquivo: str,
+                            filtros: list) -> tuple:
+        """Converte o CSV em lotes, sem manter entrada ou saída inteiras em memória.
+        
+        Cada partição é gravada em seu próprio upload multipart. Um CSV
+        comprimido é descomprimido em fluxo entre o download e o parser; um
+        .zip é convertido membro a membro. Com STAGED_PIPELINE, a leitura do
+        CSV corre numa thread à parte, à frente do Parquet, enquanto o
+        download antecipa partes e o upload envia as suas em segundo plano.
+        Retorna (sucesso, {chave de destino: linhas}).
+        """
+        opcoes_s3 = {
+            'tamanho_parte_mb': config.s3.tamanho_parte_mb,
+            'concorrencia': config.s3.concorrencia
+        }
+        
+        particoes = {}
+        with self.cliente_s3.abrir_leitura(bucket, chave, **opcoes_s3) as origem, \
+                self.instrumentacao.etapa("conversao_stream") as etapa:
+            for membro, entrada in iterar_csvs(origem, chave):
+                nome_membro = self._nome_membro(nome_arquivo, membro, chave)
+                try:
+                    with self._validacao(chave, nome_membro, filtros,
+                                         opcoes_s3) as filtros_validados:
+                        estatisticas = self._converter_membro_stream(entrada, chave, nome_membro,
+                                                                     filtros_validados, opcoes_s3)
+                except ArquivoSemLinhas:
+                    # Nenhum upload de dados foi aberto, nada chegou a data/
+                    logger.info(f"Nenhuma linha nova para gravar em {membro}")
+                    continue
+                particoes.update(self._arquivos_gravados(estatisticas, nome_membro))
+                self._gravar_perfis({
+                    self._chave_destino(caminho, nome_membro): perfil
+                    for caminho, perfil in estatisticas['profiles'].items()
+                })
+            # Download, descompressão, parse, Parquet e upload se sobrepõem: uma etapa só
+            etapa.bytes_entrada = origem.tell()
+            etapa.linhas = sum(particoes.values())
+        return True, particoes
+    
+    def _processar_em_fragmentos(self, bucket: str, chave: str, nome_arquivo: str,
+                                 filtros: list, tamanho: int) -> tuple:
+        """Lê o CSV em fragmentos de bytes paralelos e grava como o modo em lotes.
+        
+        Só a leitura é paralela: limpeza, deduplicação, filtros, metadados e
+        escrita seguem neste processo, na ordem dos fragmentos, então a saída
+        é a do modo em lotes. Os tipos vêm do plano do feed ou, sem registro,
+        da amostra inicial (alargados); um fragmento fora deles, ou um CSV
+        que não se divide em bytes, faz o arquivo ser convertido em lotes.
+        """
+        opcoes_s3 = {
+            'tamanho_parte_mb': config.s3.tamanho_parte_mb,
+            'concorrencia': config.s3.concorrencia
+        }
+        amostra = self.cliente_s3.ler_inicio(bucket, chave, TAMANHO_AMOSTRA)
+        dialeto = self._dialeto_para(chave, amostra)
+        plano, _ = self._plano_para_stream(amostra, chave, dialeto)
+        if plano is None:
+            if len(amostra) == TAMANHO_AMOSTRA:
+                amostra_completa = amostra[:amostra.rfind(b'\n') + 1]
+            else:
+                amostra_completa = amostra
+            self.processador_csv.ler_csv(amostra_completa, dialeto=dialeto)
+            plano = inferir_plano(self.processador_csv.dados,
+                                  self.formatos_data).alargado()
+        
+        try:
+            leitor = LeitorFragmentos(
+                self.cliente_s3, bucket, chave, tamanho, amostra, dialeto,
+                type(self.processador_csv), plano,
+                processos=processos_leitura(config.processamento.processos_leitura),
+                tamanho_fragmento=config.processamento.tamanho_fragmento_mb * MB
+            )
+        except CSVNaoFragmentavel as e:
+            logger.warning(f"{chave} não será lido em fragmentos: {e}")
+            return self._processar_em_lotes(bucket, chave, nome_arquivo, filtros)
+        
+        with self.instrumentacao.etapa("conversao_fragmentos") as etapa:
+            try:
+                with self._validacao(chave, nome_arquivo, filtros, opcoes_s3) as filtros_validados:
+                    estatisticas = self._converter_stream(None, chave, nome_arquivo,
+                                                          filtros_validados, opcoes_s3, dialeto,
+                                                          plano, lotes=leitor)
+            except ArquivoSemLinhas:
+                logger.info("Nenhuma linha nova para gravar")
+                return True, {}
+            except DesvioEsquema as e:
+                # Nada foi publicado; o modo em lotes refaz o arquivo desde o início
+                logger.warning(f"Fragmento de {chave} fora do plano, convertendo em lotes: {e}")
+                for filtro in filtros:
+                    filtro.descartar()
+                return self._processar_em_lotes(bucket, chave, nome_arquivo, filtros)
+            etapa.bytes_entrada = tamanho
+            etapa.linhas = estatisticas['row_count']
+        self._gravar_perfis({
+            self._chave_destino(caminho, nome_arquivo): perfil
+            for caminho, perfil in estatisticas['profiles'].items()
+        })
+        return True, self._arquivos_gravados(estatisticas, nome_arquivo)
+    
+    def _converter_membro_stream(self, entrada, chave: str, nome_arquivo: str, filtros: list,
+                                 opcoes_s3: dict) -> dict:
+        """Converte um CSV em fluxo com o plano do feed, refazendo num desvio.
+        
+        Num desvio do plano, o arquivo é relido sem ele. Sem plano, um lote
+        cujos tipos mudam depois do início do arquivo traz no DesvioEsquema
+        os tipos alargados, e o arquivo é relido com eles até caber.
+        """
+        amostra = b""
+        if self.registro_esquemas is not None or self.cache_dialetos is not None:
+            amostra = entrada.read(TAMANHO_AMOSTRA)
+            entrada.seek(0)
+        dialeto = self._dialeto_para(chave, amostra)
+        plano, cabecalho = self._plano_para_stream(amostra, chave, dialeto)
+        anterior = tipos = None
+        while True:
+            try:
+                estatisticas = self._converter_stream(entrada, chave, nome_arquivo, filtros,
+                                                      opcoes_s3, dialeto, plano, tipos=tipos)
+                break
+            except DesvioEsquema as e:
+                sem_progresso = plano is None and (
+                    e.plano is None or (tipos is not None and e.plano.colunas == tipos.colunas)
+                )
+                if sem_progresso:
+                    raise
+                # Os uploads parciais foram abortados; relê o arquivo desde o início.
+                # Num .zip, o descarte também desfaz no índice os membros
+                # anteriores: um reenvio deles não será reconhecido como duplicata
+                logger.warning(f"Desvio de esquema em {chave}: {e}")
+                if plano is not None:
+                    self.situacao_esquema = 'desvio'
+                    anterior, plano = plano, None
+                tipos = e.plano
+                entrada.seek(0)
+                for filtro in filtros:
+                    filtro.descartar()
+        if anterior is not None:
+            self.registro_esquemas.registrar(
+                self._origem(chave), cabecalho,
+                tipos or inferir_plano(self.processador_csv.amostra, self.formatos_data),
+                anterior=anterior
+            )
+        return estatisticas
+    
+    def _converter_stream(self, entrada, chave: str, nome_arquivo: str, filtros: list,
+                          opcoes_s3: dict, dialeto: Dialeto, plano=None, lotes=None,
+                          tipos=None) -> dict:
+        def abrir_destino(caminho: str, parte: int = 0):
+            chave_destino = self._chave_destino(caminho, self._nome_parte(nome_arquivo, parte))
+            return self.cliente_s3.abrir_escrita(config.s3.bucket_data_lake, chave_destino,
+                                                 **opcoes_s3)
+        
+        return self.processador_csv.processar_em_lotes(
+            entrada,
+            abrir_destino,
+            arquivo_origem=chave,
+            tamanho_lote=config.processamento.tamanho_lote,
+            colunas_chave=config.processamento.colunas_deduplicacao,
+            limite_memoria_dedup_mb=config.processamento.limite_memoria_dedup_mb,
+            filtros=filtros,
+            plano=plano,
+            particionador=self.particionador,
+            dialeto=dialeto,
+            lotes=lotes,
+            profundidade_fila=(config.processamento.profundidade_fila_estagios
+                               if config.processamento.estagios_concorrentes else 0),
+            tipos=tipos
+        )
+    
+    @contextmanager
+    def _validacao(self, chave: str, nome_arquivo: str, filtros: list, opcoes_s3: dict = None):
+        """Filtros com o validador à frente, se há regras (VALIDATION_RULES).
+        
+        As linhas inválidas vão para `FAILED_PREFIX<origem>/<nome>.parquet`
+        no Data Lake. A quarentena é publicada mesmo que nenhuma linha
+        sobre, e descartada se a conversão falhar.
+        """
+        if self.regras_validacao is None:
+            yield filtros
+            return
+        
+        origem = self._origem(chave)
+        prefixo = f"{config.s3.prefixo_falhas}{origem}/" if origem else config.s3.prefixo_falhas
+        chave_quarentena = f"{prefixo}{nome_arquivo}.parquet"
+        validador = ValidadorDados(
+            self.regras_validacao,
+            abrir_quarentena=lambda: self.cliente_s3.abrir_escrita(
+                config.s3.bucket_data_lake, chave_quarentena, **(opcoes_s3 or {})
+            ),
+            arquivo_origem=chave,
+            opcoes_parquet=self.opcoes_parquet
+        )
+        try:
+            # Valida antes do índice: uma linha rejeitada não é registrada como vista
+            yield [validador] + filtros
+        except ArquivoSemLinhas:
+            self._publicar_quarentena(validador, chave_quarentena)
+            raise
+        except BaseException:
+            validador.abortar()
+            raise
+        self._publicar_quarentena(validador, chave_quarentena)
+    
+    def _publicar_quarentena(self, validador: ValidadorDados, chave_quarentena: str):
+        """Fecha a quarentena e soma as rejeições ao resultado do arquivo."""
+        validador.fechar()
+        if validador.linhas_rejeitadas:
+            quarentena = self.quarentena or {'linhas': 0, 'destinos': [], 'violacoes': {}}
+            quarentena['linhas'] += validador.linhas_rejeitadas
+            quarentena['destinos'].append(f"{config.s3.bucket_data_lake}/{chave_quarentena}")
+            for rotulo, quantidade in validador.violacoes.items():
+                violacoes = quarentena['violacoes']
+                violacoes[rotulo] = violacoes.get(rotulo, 0) + quantidade
+            self.quarentena = quarentena
+    
+    @staticmethod
+    def _origem(chave: str) -> str:
+        """Prefixo do feed no bucket raw: o diretório do arquivo."""
+        return chave.rsplit('/', 1)[0] if '/' in chave else ''
+    
+    def _sondar_dialeto(self, bucket: str, chave: str):
+        """Num feed ainda sem dialeto em cache, detecta-o pelo início do objeto.
+        
+        Um GET com Range busca só a amostra: um arquivo que não é CSV falha
+        aqui, antes do download inteiro. Arquivos comprimidos são detectados
+        depois, pelo início do conteúdo descomprimido.
+        """
+        cache = self.cache_dialetos
+        origem = self._origem(chave)
+        if (cache is None or formato_compressao(chave) is not None
+                or cache.obter(origem) is not None):
+            return
+        with self.instrumentacao.etapa("dialeto") as etapa:
+            amostra = self.cliente_s3.ler_inicio(bucket, chave, cache.tamanho_amostra)
+            etapa.bytes_entrada = len(amostra)
+            cache.detectar(origem, amostra)
+    
+    def _dialeto_para(self, chave: str, amostra: bytes) -> Dialeto:
+        """Dialeto do feed conferido contra o início do arquivo; sem detecção, o padrão."""
+        if self.cache_dialetos is None:
+            return Dialeto()
+        self.dialeto = self.cache_dialetos.detectar(self._origem(chave), amostra)
+        return self.dialeto
+    
+    def _ler_com_plano(self, dados_csv: bytes, chave: str, dialeto: Dialeto):
+        """Lê o CSV com o plano de tipos do feed, inferindo e registrando se preciso."""
+        registro = self.registro_esquemas
+        if registro is None:
+            self.processador_csv.ler_csv(dados_csv, dialeto=dialeto)
+            return
+        
+        origem = self._origem(chave)
+        cabecalho = dialeto.cabecalho(dados_csv[:TAMANHO_AMOSTRA])
+        plano = registro.obter(origem, cabecalho)
+        if plano is not None:
+            try:
+                self.processador_csv.ler_csv(dados_csv, plano=plano, dialeto=dialeto)
+                self.situacao_esquema = 'acerto'
+                return
+            except DesvioEsquema as e:
+                logger.warning(f"Desvio de esquema em {chave}: {e}")
+        
+        # Falha de cache ou desvio: infere, registra e converte para o plano
+        self.processador_csv.ler_csv(dados_csv, dialeto=dialeto)
+        inferido = inferir_plano(self.processador_csv.dados, self.formatos_data)
+        novo = registro.registrar(origem, cabecalho, inferido, anterior=plano)
+        self.processador_csv.aplicar_plano(novo)
+        self.situacao_esquema = 'desvio' if plano is not None else 'falha'
+    
+    def _plano_para_stream(self, amostra: bytes, chave: str, dialeto: Dialeto) -> tuple:
+        """Obtém o plano do feed; numa falha de cache, infere pela amostra inicial."""
+        registro = self.registro_esquemas
+        if registro is None:
+            return None, None
+        
+        origem = self._origem(chave)
+        cabecalho = dialeto.cabecalho(amostra)
+        plano = registro.obter(origem, cabecalho)
+        if plano is not None:
+            self.situacao_esquema = 'acerto'
+            return plano, cabecalho
+        
+        # Só linhas completas da amostra entram na inferência
+        if len(amostra) == TAMANHO_AMOSTRA:
+            amostra = amostra[:amostra.rfind(b'\n') + 1]
+        self.processador_csv.ler_csv(amostra, dialeto=dialeto)
+        inferido = inferir_plano(self.processador_csv.dados, self.formatos_data)
+        plano = registro.registrar(origem, cabecalho, inferido)
+        self.situacao_esquema = 'falha'
+        return plano, cabecalho
@@ -0,0 +1,383 @@
+"""Processador de dados CSV nativo em Arrow."""
+
+from __future__ import annotations
+
+import re
+from datetime import datetime
+from functools import reduce
+from typing import BinaryIO, Iterable, List, Optional, Tuple, Union
+import logging
+from ..utils.estagios import em_segundo_plano
+from ..utils.importacao import ModuloTardio
+from .csv_processor import ArquivoSemLinhas
+from .deduplicacao import DeduplicadorHash
+from .dialeto import Dialeto
+from .opcoes_parquet import OpcoesParquet
+from .particionamento import EscritorParticionado, Particionador
+from .perfil_colunas import PerfilDados
+from .registro_esquemas import INTEIROS, DesvioEsquema, PlanoTipos
+
+np = ModuloTardio("numpy")
+pa = ModuloTardio("pyarrow")
+pc = ModuloTardio("pyarrow.compute")
+pv = ModuloTardio("pyarrow.csv")
+
+logger = logging.getLogger(__name__)
+
+COLUNA_INDICE = "__indice_linha"
+
+# Erro de conversão do leitor de CSV: "In CSV column #1: Row #7: ... invalid value '5.5'"
+ERRO_CONVERSAO = re.compile(r"In CSV column #(\d+):.*invalid value '(.*)'", re.S)
+
+
+class ProcessadorArrow:
+    """Processa CSV e converte para Parquet sem passar por pandas.
+
+    Mesma interface do ProcessadorCSV, mas os dados ficam em uma `pa.Table`
+    lida pelo leitor multithread do `pyarrow.csv`, e limpeza e metadados usam
+    Arrow compute, evitando a ida e volta por colunas object do pandas.
+    """
+
+    def __init__(self, opcoes_parquet: Optional[OpcoesParquet] = None):
+        self.tabela = None
+        self.amostra = None
+        self.opcoes_parquet = opcoes_parquet or OpcoesParquet()
+
+    @property
+    def dados(self) -> Optional[pa.Table]:
+        return self.tabela
+
+    @staticmethod
+    def _opcoes_leitura(dialeto: Dialeto, plano: Optional[PlanoTipos] = None) -> dict:
+        return {
+            **dialeto.opcoes_arrow(),
+            # Como no pandas, campos vazios de texto viram nulos
+            "convert_options": pv.ConvertOptions(
+                column_types=plano.tipos_arrow() if plano else None,
+                timestamp_parsers=plano.analisadores_arrow() if plano else None,
+                strings_can_be_null=True,
+            ),
+        }
+
+    def ler_csv(
+        self,
+        dados: bytes,
+        delimitador: str = ",",
+        plano: Optional[PlanoTipos] = None,
+        dialeto: Optional[Dialeto] = None,
+    ) -> pa.Table:
+        """Lê CSV de bytes; com `plano`, usa os tipos dele em vez de inferir.
+
+        `dialeto` (detectado pelo pipeline) substitui `delimitador`.
+        """
+        opcoes = self._opcoes_leitura(dialeto or Dialeto(delimitador), plano)
+        try:
+            self.tabela = pv.read_csv(pa.BufferReader(dados), **opcoes)
+        except pa.ArrowInvalid as e:
+            if plano is None:
+                raise
+            raise DesvioEsquema(f"CSV não segue o plano v{plano.versao}: {e}") from e
+        logger.info(f"CSV lido: {self.tabela.num_rows} linhas")
+        return self.tabela
+
+    def aplicar_plano(self, plano: PlanoTipos) -> pa.Table:
+        """Converte a tabela lida sem plano para os tipos do plano."""
+        self.tabela = plano.aplicar(self.tabela)
+        return self.tabela
+
+    def limpar_dados(
+        self, colunas_chave: Optional[List[str]] = None, filtros: Optional[list] = None
+    ) -> pa.Table:
+        """Remove linhas vazias e duplicatas (opcionalmente só por `colunas_chave`)."""
+        tabela = self._remover_linhas_vazias(self.tabela)
+        self.tabela = self._remover_duplicatas(tabela, colunas_chave)
+        for filtro in filtros or []:
+            self.tabela = filtro.filtrar(self.tabela)
+        return self.tabela
+
+    @staticmethod
+    def _remover_linhas_vazias(tabela: pa.Table) -> pa.Table:
+        if tabela.num_rows == 0 or tabela.num_columns == 0:
+            return tabela
+        todas_nulas = reduce(pc.and_, (pc.is_null(coluna) for coluna in tabela.columns))
+        return tabela.filter(pc.invert(todas_nulas))
+
+    @staticmethod
+    def _remover_duplicatas(
+        tabela: pa.Table, colunas_chave: Optional[List[str]] = None
+    ) -> pa.Table:
+        """Agrupa pelas chaves e mantém a primeira ocorrência de cada grupo."""
+        if tabela.num_rows == 0:
+            return tabela
+
+        # Colunas do tipo null são sempre iguais e não entram na chave
+        chaves = [
+            nome
+            for nome in (colunas_chave or tabela.column_names)
+            if not pa.types.is_null(tabela.schema.field(nome).type)
+        ]
+        if not chaves:
+            return tabela.slice(0, 1)
+        indices = pa.array(np.arange(tabela.num_rows, dtype=np.int64))
+        primeiras = (
+            tabela.select(chaves)
+            .append_column(COLUNA_INDICE, indices)
+            .group_by(chaves)
+            .aggregate([(COLUNA_INDICE, "min")])
+            .column(f"{COLUNA_INDICE}_min")
+        )
+        return tabela.take(pc.sort_indices(primeiras))
+
+    def adicionar_colunas_metadados(
+        self,
+        arquivo_origem: str,
+        agora: Optional[datetime] = None,
+        particionador: Optional[Particionador] = None,
+    ) -> pa.Table:
+        """Adiciona colunas de metadados e particionamento.
+
+        Com um `particionador` com data de evento, ano/mes/dia vêm dos dados.
+        """
+        self.tabela = self._adicionar_metadados(
+            self.tabela, arquivo_origem, agora or datetime.now(), particionador
+        )
+        return self.tabela
+
+    @staticmethod
+    def _adicionar_metadados(
+        tabela: pa.Table,
+        arquivo_origem: str,
+        agora: datetime,
+        particionador: Optional[Particionador] = None,
+    ) -> pa.Table:
+        linhas = tabela.num_rows
+        colunas = [
+            ("data_ingestao", pa.scalar(agora, pa.timestamp("ns"))),
+            ("arquivo_origem", pa.scalar(arquivo_origem, pa.string())),
+        ]
+        for nome, valor in (
+            (particionador or Particionador()).colunas_data(tabela, agora).items()
+        ):
+            if not isinstance(valor, pa.ChunkedArray):
+                valor = pa.scalar(valor, pa.int64())
+            colunas.append((nome, valor))
+
+        for nome, valor in colunas:
+            if isinstance(valor, pa.Scalar):
+                valor = pa.repeat(valor, linhas)
+            if nome in tabela.column_names:
+                tabela = tabela.drop([nome])
+            tabela = tabela.append_column(nome, valor)
+        return tabela
+
+    def converter_para_parquet(self) -> bytes:
+        """Converte a tabela para Parquet comprimido."""
+        return self.opcoes_parquet.converter(self.tabela)
+
+    def converter_em_particoes(
+        self, particionador: Particionador
+    ) -> List[Tuple[str, bytes, int, Optional[PerfilDados]]]:
+        """Converte a tabela em um Parquet por partição: [(caminho, bytes, linhas, perfil)]."""
+        return particionador.converter(self.tabela, self.opcoes_parquet)
+
+    def processar_em_lotes(
+        self,
+        fonte: Union[bytes, BinaryIO],
+        destino: BinaryIO,
+        arquivo_origem: str,
+        tamanho_lote: int = 1000,
+        delimitador: str = ",",
+        colunas_chave: Optional[List[str]] = None,
+        limite_memoria_dedup_mb: float = 64,
+        filtros: Optional[list] = None,
+        plano: Optional[PlanoTipos] = None,
+        particionador: Optional[Particionador] = None,
+        dialeto: Optional[Dialeto] = None,
+        lotes: Optional[Iterable[pa.Table]] = None,
+        profundidade_fila: int = 0,
+        tipos: Optional[PlanoTipos] = None,
+    ) -> dict:
+        """Converte CSV para Parquet bloco a bloco, com memória limitada.
+
+        O leitor em streaming do Arrow entrega record batches por bloco de
+        bytes; cada um é limpo, recebe os metadados e é gravado em row groups
+        de até `tamanho_lote` linhas. Duplicatas são removidas entre todos os
+        blocos por um DeduplicadorHash e depois pelos `filtros`. Com `plano`,
+        os tipos vêm dele; o primeiro bloco lido fica em `amostra`. Com
+        `particionador`, `destino` é uma função que recebe o caminho da
+        partição e abre o arquivo dela. `lotes` são tabelas já lidas (ex.:
+        pelo LeitorFragmentos), no lugar da leitura de `fonte`. Com
+        `profundidade_fila`, a leitura corre numa thread à parte, até esse
+        número de blocos à frente da escrita.
+
+        O leitor infere os tipos pelo primeiro bloco. Sem plano, `tipos`
+        fixa os tipos lidos, como os alargados de um DesvioEsquema que um
+        bloco fora deles levanta (ver `_ler_blocos`).
+        """
+        if isinstance(fonte, (bytes, bytearray)):
+            fonte = pa.BufferReader(fonte)
+        if lotes is None:
+            lotes = self._ler_blocos(
+                fonte, dialeto or Dialeto(delimitador), plano or tipos
+            )
+        lotes = em_segundo_plano(lotes, profundidade_fila, nome="leitura_csv")
+
+        agora = datetime.now()
+        deduplicador = DeduplicadorHash(colunas_chave, limite_memoria_dedup_mb)
+        if particionador is None:
+            escritor = EscritorParticionado(
+                lambda _: destino,
+                Particionador(),
+                self.opcoes_parquet,
+                fechar_destinos=False,
+            )
+        else:
+            escritor = EscritorParticionado(destino, particionador, self.opcoes_parquet)
+        total_linhas = 0
+        self.amostra = None
+
+        try:
+            for lote in lotes:
+                tabela = (
+                    lote
+                    if isinstance(lote, pa.Table)
+                    else pa.Table.from_batches([lote])
+                )
+                if self.amostra is None:
+                    self.amostra = tabela
+                tabela = self._remover_linhas_vazias(tabela)
+                tabela = deduplicador.filtrar(tabela)
+                for filtro in filtros or []:
+                    tabela = filtro.filtrar(tabela)
+                if tabela.num_rows == 0:
+                    continue
+                tabela = self._adicionar_metadados(
+                    tabela, arquivo_origem, agora, particionador
+                )
+
+                escritor.escrever(tabela, row_group_size=tamanho_lote)
+                total_linhas += tabela.num_rows
+        except BaseException:
+            escritor.abortar()
+            raise
+        finally:
+            # Para a leitura antes de a fonte ser fechada ou relida
+            lotes.close()
+            deduplicador.fechar()
+        escritor.fechar()
+
+        if escritor.esquema is None:
+            raise ArquivoSemLinhas("CSV sem linhas válidas para converter")
+
+        self.tabela = None
+        nomes = escritor.esquema.names
+        logger.info(
+            f"CSV convertido em lotes: {total_linhas} linhas, "
+            f"{len(escritor.linhas)} partições, "
+            f"{deduplicador.linhas_removidas} duplicatas removidas"
+        )
+        return {
+            "row_count": total_linhas,
+            "column_count": len(nomes),
+            "columns": list(nomes),
+            "duplicates_removed": deduplicador.linhas_removidas,
+            "partitions": dict(escritor.linhas),
+            "parts": dict(escritor.partes),
+            "profiles": dict(escritor.perfis),
+        }
+
+    def _ler_blocos(self, fonte, dialeto: Dialeto, plano: Optional[PlanoTipos] = None):
+        """Gera os record batches do CSV.
+
+        Sem plano, colunas vazias no primeiro bloco são relidas como texto,
+        em vez do tipo null que nada depois converte. Um bloco que não
+        converte levanta DesvioEsquema com os tipos alargados na coluna do
+        erro: inteiro vira float se o valor é numérico, o resto vira texto.
+        """
+        leitor = None
+        try:
+            leitor = pv.open_csv(fonte, **self._opcoes_leitura(dialeto, plano))
+            nulas = [
+                campo.name for campo in leitor.schema if pa.types.is_null(campo.type)
+            ]
+            if plano is None and nulas and hasattr(fonte, "seek"):
+                leitor.close()
+                fonte.seek(0)
+                texto = PlanoTipos({nome: "string" for nome in nulas})
+                leitor = pv.open_csv(fonte, **self._opcoes_leitura(dialeto, texto))
+            yield from leitor
+        except pa.ArrowInvalid as e:
+            alargado = _alargar(leitor.schema, plano, e) if leitor else None
+            if alargado is None:
+                if plano is None:
+                    raise
+                raise DesvioEsquema(
+                    f"CSV não segue o plano v{plano.versao}: {e}"
+                ) from e
+            raise DesvioEsquema(
+                f"Bloco fora dos tipos lidos: {e}", plano=alargado
+            ) from e
+
+    def validar_dataframe(self, colunas_obrigatorias: list = None) -> bool:
+        """Valida se a tabela está OK e tem colunas obrigatórias."""
+        if self.tabela is None or self.tabela.num_rows == 0:
+            return False
+
+        if colunas_obrigatorias:
+            colunas_faltantes = set(colunas_obrigatorias) - set(
+                self.tabela.column_names
+            )
+            if colunas_faltantes:
+                logger.warning(f"Colunas obrigatórias faltantes: {colunas_faltantes}")
+                return False
+
+        return True
+
+    def obter_estatisticas(self, perfil: bool = False) -> dict:
+        """Retorna estatísticas básicas da tabela; com `perfil`, também o de cada coluna."""
+        if self.tabela is None:
+            return {}
+
+        estatisticas = {
+            "row_count": self.tabela.num_rows,
+            "column_count": self.tabela.num_columns,
+            "columns": list(self.tabela.column_names),
+        }
+        if perfil:
+            estatisticas["profile"] = PerfilDados().atualizar(self.tabela).para_dict()
+        return estatisticas
+
+
+def _tipo_plano(tipo) -> str:
+    if pa.types.is_integer(tipo):
+        return "Int64"
+    if pa.types.is_floating(tipo):
+        return "float64"
+    if pa.types.is_boolean(tipo):
+        return "bool"
+    if pa.types.is_timestamp(tipo) or pa.types.is_date(tipo):
+        return "datetime"
+    return "string"
+
+
+def _alargar(
+    esquema: pa.Schema, plano: Optional[PlanoTipos], erro: Exception
+) -> Optional[PlanoTipos]:
+    """Plano com a coluna do erro de conversão alargada; None se o erro não diz qual."""
+    encontrado = ERRO_CONVERSAO.search(str(erro))
+    if encontrado is None or int(encontrado.group(1)) >= len(esquema):
+        return None
+    nome = esquema.names[int(encontrado.group(1))]
+    if plano is not None:
+        colunas = dict(plano.colunas)
+    else:
+        colunas = {campo.name: _tipo_plano(campo.type) for campo in esquema}
+    try:
+        float(encontrado.group(2))
+        numerico = True
+    except ValueError:
+        numerico = False
+    colunas[nome] = (
+        "float64" if colunas.get(nome) in INTEIROS and numerico else "string"
+    )
+    return PlanoTipos(colunas, cabecalho=list(esquema.names))
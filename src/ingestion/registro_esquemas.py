@@ -0,0 +1,459 @@
+"""Registro de esquemas: planos de tipos reaproveitados entre arquivos do mesmo feed."""
+
+from __future__ import annotations
+
+import csv
+import hashlib
+import json
+import logging
+import threading
+import warnings
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Tuple
+from botocore.exceptions import ClientError
+from ..utils.importacao import ModuloTardio
+
+np = ModuloTardio("numpy")
+pd = ModuloTardio("pandas")
+pa = ModuloTardio("pyarrow")
+pc = ModuloTardio("pyarrow.compute")
+pv = ModuloTardio("pyarrow.csv")
+
+logger = logging.getLogger(__name__)
+
+PREFIXO_ESQUEMAS = "_esquemas/"
+MAX_CATEGORIAS = 1000
+PROPORCAO_MAX_CATEGORIAS = 0.5
+# Formato de data sempre aceito; outros só se configurados (DATE_FORMAT)
+FORMATO_ISO = "ISO8601"
+
+# Inteiros do menor para o maior; todos anuláveis para não quebrar com vazios
+INTEIROS = ["Int8", "Int16", "Int32", "Int64"]
+TIPOS_PANDAS = {"bool": "boolean"}
+TIPOS_ARROW = {
+    "Int8": "int8",
+    "Int16": "int16",
+    "Int32": "int32",
+    "Int64": "int64",
+    "float64": "float64",
+    "bool": "bool_",
+    "string": "string",
+}
+
+
+class DesvioEsquema(ValueError):
+    """O arquivo não segue o plano de tipos registrado para o feed.
+
+    `plano`, quando conhecido, é um plano alargado que comporta os dados
+    que não couberam: a conversão pode ser refeita com ele.
+    """
+
+    def __init__(self, mensagem: str, plano: Optional["PlanoTipos"] = None):
+        super().__init__(mensagem)
+        self.plano = plano
+
+
+def impressao_digital_cabecalho(colunas: List[str]) -> str:
+    """Identifica um layout de CSV pelos nomes e ordem das colunas."""
+    return hashlib.sha1("\x1f".join(colunas).encode("utf-8")).hexdigest()[:16]
+
+
+def ler_cabecalho(
+    amostra: bytes, delimitador: str = ",", codificacao: str = "utf-8"
+) -> List[str]:
+    """Extrai os nomes das colunas da primeira linha de uma amostra do CSV."""
+    primeira_linha = (
+        amostra.split(b"\n", 1)[0].rstrip(b"\r").decode(codificacao, errors="replace")
+    )
+    return next(csv.reader([primeira_linha], delimiter=delimitador), [])
+
+
+@dataclass
+class PlanoTipos:
+    """Tipo de cada coluna de um layout de CSV.
+
+    Tipos: Int8/Int16/Int32/Int64 (anuláveis), float64, bool, category,
+    string e datetime. `formatos` guarda o formato de cada coluna de data
+    (padrão ISO 8601), usado na leitura em vez de o pandas adivinhar.
+    """
+
+    colunas: Dict[str, str]
+    versao: int = 1
+    cabecalho: List[str] = field(default_factory=list)
+    formatos: Dict[str, str] = field(default_factory=dict)
+
+    @property
+    def colunas_data(self) -> List[str]:
+        return [nome for nome, tipo in self.colunas.items() if tipo == "datetime"]
+
+    def formato(self, nome: str) -> str:
+        return self.formatos.get(nome, FORMATO_ISO)
+
+    def argumentos_pandas(self) -> dict:
+        """Argumentos de `pd.read_csv` que dispensam a inferência de tipos.
+
+        Inteiros são lidos como Int64 e reduzidos em `conformar`: o pandas
+        não acusa estouro ao ler ou converter direto para Int8/Int16/Int32.
+        """
+        return {
+            "dtype": {
+                nome: "Int64" if tipo in INTEIROS else TIPOS_PANDAS.get(tipo, tipo)
+                for nome, tipo in self.colunas.items()
+                if tipo != "datetime"
+            },
+            "parse_dates": self.colunas_data or False,
+            "date_format": {nome: self.formato(nome) for nome in self.colunas_data}
+            or None,
+        }
+
+    def tipos_arrow(self) -> dict:
+        """Tipos por coluna para `pyarrow.csv.ConvertOptions(column_types=...)`."""
+        tipos = {}
+        for nome, tipo in self.colunas.items():
+            if tipo == "datetime":
+                tipos[nome] = pa.timestamp("ns")
+            elif tipo == "category":
+                tipos[nome] = pa.dictionary(pa.int32(), pa.string())
+            else:
+                tipos[nome] = getattr(pa, TIPOS_ARROW[tipo])()
+        return tipos
+
+    def analisadores_arrow(self) -> Optional[list]:
+        """Formatos para `pyarrow.csv.ConvertOptions(timestamp_parsers=...)`."""
+        formatos = sorted({self.formato(nome) for nome in self.colunas_data})
+        if not formatos:
+            return None
+        return [
+            pv.ISO8601 if formato == FORMATO_ISO else formato for formato in formatos
+        ]
+
+    def conformar(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Confere e reduz um DataFrame lido com `argumentos_pandas`.
+
+        Levanta DesvioEsquema se uma coluna de data não foi convertida (o
+        pandas só a deixa como texto) ou se um inteiro não cabe no tipo.
+        """
+        for nome, tipo in self.colunas.items():
+            if tipo == "datetime" and not pd.api.types.is_datetime64_any_dtype(
+                df[nome]
+            ):
+                raise DesvioEsquema(f"Coluna {nome} não é mais uma data")
+            if tipo in INTEIROS:
+                df[nome] = _reduzir_inteiro(df[nome], tipo)
+        return df
+
+    def aplicar(self, dados):
+        """Converte dados lidos sem o plano (DataFrame ou pa.Table) para os tipos dele."""
+        try:
+            if hasattr(dados, "iloc"):
+                dados = dados.copy()
+                for nome, tipo in self.colunas.items():
+                    if tipo == "datetime":
+                        dados[nome] = pd.to_datetime(
+                            dados[nome], format=self.formato(nome)
+                        )
+                    elif tipo in INTEIROS:
+                        dados[nome] = _reduzir_inteiro(
+                            dados[nome].astype("Int64"), tipo
+                        )
+                    else:
+                        dados[nome] = dados[nome].astype(TIPOS_PANDAS.get(tipo, tipo))
+                return dados
+
+            tipos = self.tipos_arrow()
+            for i, nome in enumerate(dados.column_names):
+                if nome not in tipos:
+                    continue
+                coluna = dados.column(nome)
+                if self.formato(nome) != FORMATO_ISO and pa.types.is_string(
+                    coluna.type
+                ):
+                    coluna = pc.strptime(coluna, format=self.formato(nome), unit="ns")
+                dados = dados.set_column(i, nome, pc.cast(coluna, tipos[nome]))
+            return dados
+        except (ValueError, TypeError, pa.ArrowException) as e:
+            raise DesvioEsquema(
+                f"Dados não convertem para o plano v{self.versao}: {e}"
+            ) from e
+
+    def mesclar(self, outro: "PlanoTipos") -> "PlanoTipos":
+        """Plano que comporta os dois: alarga inteiros e cai para texto em conflitos.
+
+        Datas em formatos diferentes também são um conflito.
+        """
+        colunas, formatos = {}, {}
+        for nome, tipo in outro.colunas.items():
+            anterior = self.colunas.get(nome, tipo)
+            if anterior == tipo == "datetime":
+                conhecidos = {
+                    plano.formatos[nome]
+                    for plano in (self, outro)
+                    if nome in plano.formatos
+                }
+                colunas[nome] = "string" if len(conhecidos) > 1 else tipo
+                if len(conhecidos) == 1:
+                    formatos[nome] = conhecidos.pop()
+            elif anterior == tipo:
+                colunas[nome] = tipo
+            elif anterior in INTEIROS and tipo in INTEIROS:
+                colunas[nome] = max(anterior, tipo, key=INTEIROS.index)
+            elif {anterior, tipo} <= set(INTEIROS) | {"float64"}:
+                colunas[nome] = "float64"
+            else:
+                colunas[nome] = "string"
+        return PlanoTipos(colunas, self.versao + 1, outro.cabecalho, formatos)
+
+    def alargado(self) -> "PlanoTipos":
+        """Plano com inteiros em Int64 e categorias como texto, para dados além da amostra."""
+        colunas = {
+            nome: (
+                "Int64"
+                if tipo in INTEIROS
+                else "string" if tipo == "category" else tipo
+            )
+            for nome, tipo in self.colunas.items()
+        }
+        return PlanoTipos(colunas, self.versao, self.cabecalho, dict(self.formatos))
+
+    def comportar(self, dados) -> "PlanoTipos":
+        """Plano alargado que comporta também `dados`, lidos sem plano.
+
+        Colunas sem nenhum valor em `dados` mantêm o tipo deste plano; datas
+        só são reconhecidas em ISO 8601 ou nos formatos deste plano.
+        """
+        inferido = inferir_plano(dados, self.formatos.values())
+        for nome in inferido.colunas:
+            if nome in self.colunas and _vazia(dados, nome):
+                inferido.colunas[nome] = self.colunas[nome]
+        inferido.cabecalho = self.cabecalho
+        return self.mesclar(inferido).alargado()
+
+    def para_json(self) -> str:
+        return json.dumps(
+            {
+                "versao": self.versao,
+                "cabecalho": self.cabecalho,
+                "colunas": self.colunas,
+                "formatos": self.formatos,
+            }
+        )
+
+    @classmethod
+    def de_json(cls, texto: str) -> "PlanoTipos":
+        dados = json.loads(texto)
+        return cls(
+            dados["colunas"],
+            dados["versao"],
+            dados.get("cabecalho", []),
+            dados.get("formatos", {}),
+        )
+
+
+def _menor_inteiro(minimo, maximo) -> str:
+    for tipo in INTEIROS:
+        limites = np.iinfo(tipo.lower())
+        if limites.min <= minimo and maximo <= limites.max:
+            return tipo
+    return "Int64"
+
+
+def _reduzir_inteiro(serie, tipo: str):
+    """Converte uma série Int64 para `tipo`, levantando DesvioEsquema em estouro."""
+    if serie.notna().any():
+        limites = np.iinfo(tipo.lower())
+        if serie.min() < limites.min or serie.max() > limites.max:
+            raise DesvioEsquema(f"Coluna {serie.name} não cabe em {tipo}")
+    return serie.astype(tipo)
+
+
+def _vazia(dados, nome: str) -> bool:
+    if hasattr(dados, "iloc"):
+        return bool(dados[nome].isna().all())
+    coluna = dados.column(nome)
+    return coluna.null_count == len(coluna)
+
+
+def _tipo_texto(distintos: int, nao_nulos: int) -> str:
+    if (
+        0 < distintos <= MAX_CATEGORIAS
+        and distintos <= nao_nulos * PROPORCAO_MAX_CATEGORIAS
+    ):
+        return "category"
+    return "string"
+
+
+def _formato_data_pandas(valores, formatos: List[str]) -> Optional[str]:
+    """Primeiro formato em que todos os valores são datas, sem adivinhar dia e mês."""
+    for formato in formatos:
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            datas = pd.to_datetime(valores, format=formato, errors="coerce")
+        if datas.notna().all():
+            return formato
+    return None
+
+
+def _formato_data_arrow(coluna, formatos: List[str]) -> Optional[str]:
+    for formato in formatos:
+        try:
+            if formato == FORMATO_ISO:
+                pc.cast(coluna, pa.timestamp("ns"))
+            else:
+                pc.strptime(coluna, format=formato, unit="ns")
+        except pa.ArrowException:
+            continue
+        return formato
+    return None
+
+
+def _inferir_coluna_pandas(serie, formatos: List[str]) -> Tuple[str, Optional[str]]:
+    if pd.api.types.is_bool_dtype(serie):
+        return "bool", None
+    if pd.api.types.is_integer_dtype(serie):
+        if serie.notna().any():
+            return _menor_inteiro(serie.min(), serie.max()), None
+        return "Int64", None
+    if pd.api.types.is_float_dtype(serie):
+        valores = serie.dropna()
+        # Inteiros com vazios chegam como float64
+        if (
+            len(valores)
+            and (valores == np.floor(valores)).all()
+            and valores.abs().max() < 2**53
+        ):
+            return _menor_inteiro(valores.min(), valores.max()), None
+        return "float64", None
+    if pd.api.types.is_datetime64_any_dtype(serie):
+        return "datetime", None
+
+    valores = serie.dropna()
+    formato = _formato_data_pandas(valores, formatos) if len(valores) else None
+    if formato is not None:
+        return "datetime", formato
+    return _tipo_texto(valores.nunique(), len(valores)), None
+
+
+def _inferir_coluna_arrow(coluna, formatos: List[str]) -> Tuple[str, Optional[str]]:
+    tipo = coluna.type
+    if pa.types.is_boolean(tipo):
+        return "bool", None
+    if pa.types.is_integer(tipo):
+        extremos = pc.min_max(coluna)
+        if extremos["min"].as_py() is None:
+            return "Int64", None
+        return _menor_inteiro(extremos["min"].as_py(), extremos["max"].as_py()), None
+    if pa.types.is_floating(tipo):
+        return "float64", None
+    if pa.types.is_timestamp(tipo) or pa.types.is_date(tipo):
+        return "datetime", None
+    if pa.types.is_dictionary(tipo):
+        return "category", None
+    nao_nulos = len(coluna) - coluna.null_count
+    formato = _formato_data_arrow(coluna, formatos) if nao_nulos else None
+    if formato is not None:
+        return "datetime", formato
+    return _tipo_texto(pc.count_distinct(coluna).as_py(), nao_nulos), None
+
+
+def inferir_plano(dados, formatos_data: Iterable[str] = ()) -> PlanoTipos:
+    """Infere o plano de tipos de um DataFrame ou pa.Table já lido.
+
+    Texto só vira data se todos os valores seguem um mesmo formato: ISO 8601
+    ou um de `formatos_data` (ex.: "%d/%m/%Y"), que fica no plano. Datas em
+    outros formatos continuam texto: "05/03/2024" é ambígua entre dia e mês.
+    """
+    formatos = [FORMATO_ISO] + [f for f in formatos_data if f and f != FORMATO_ISO]
+    if hasattr(dados, "iloc"):
+        inferidos = {
+            str(nome): _inferir_coluna_pandas(dados[nome], formatos)
+            for nome in dados.columns
+        }
+    else:
+        inferidos = {
+            nome: _inferir_coluna_arrow(dados.column(nome), formatos)
+            for nome in dados.column_names
+        }
+    return PlanoTipos(
+        {nome: tipo for nome, (tipo, _) in inferidos.items()},
+        cabecalho=list(inferidos),
+        formatos={nome: formato for nome, (_, formato) in inferidos.items() if formato},
+    )
+
+
+class RegistroEsquemas:
+    """Planos de tipos por (prefixo de origem, impressão digital do cabeçalho).
+
+    O primeiro arquivo de um layout infere e registra o plano; os seguintes o
+    reaproveitam e pulam a inferência. Se um arquivo não couber no plano
+    (desvio), o plano é alargado e ganha nova versão. Os planos ficam em
+    memória enquanto o container estiver quente e, com `cliente_s3`, também
+    em `_esquemas/` no bucket do Data Lake. `metricas` conta acertos, falhas
+    e desvios.
+    """
+
+    def __init__(
+        self, cliente_s3=None, bucket: str = None, prefixo: str = PREFIXO_ESQUEMAS
+    ):
+        self.cliente_s3 = cliente_s3
+        self.bucket = bucket
+        self.prefixo = prefixo
+        self.metricas = {"acertos": 0, "falhas": 0, "desvios": 0}
+        self._planos = {}
+        self._trava = threading.Lock()
+
+    def _chave(self, origem: str, impressao: str) -> str:
+        origem = origem.strip("/") or "_raiz"
+        return f"{self.prefixo}{origem}/{impressao}.json"
+
+    def obter(self, origem: str, cabecalho: List[str]) -> Optional[PlanoTipos]:
+        """Retorna o plano registrado para o layout, ou None (falha de cache)."""
+        chave = self._chave(origem, impressao_digital_cabecalho(cabecalho))
+        with self._trava:
+            plano = self._planos.get(chave)
+        if plano is None and self.cliente_s3 is not None:
+            plano = self._carregar(chave)
+
+        with self._trava:
+            if plano is None:
+                self.metricas["falhas"] += 1
+            else:
+                self._planos[chave] = plano
+                self.metricas["acertos"] += 1
+        return plano
+
+    def _carregar(self, chave: str) -> Optional[PlanoTipos]:
+        try:
+            return PlanoTipos.de_json(
+                self.cliente_s3.ler_csv_do_s3(self.bucket, chave).decode()
+            )
+        except ClientError as e:
+            if e.response["Error"]["Code"] not in ("NoSuchKey", "404"):
+                logger.error(f"Erro ao carregar plano de tipos {chave}: {e}")
+            return None
+
+    def registrar(
+        self,
+        origem: str,
+        cabecalho: List[str],
+        plano: PlanoTipos,
+        anterior: Optional[PlanoTipos] = None,
+    ) -> PlanoTipos:
+        """Registra o plano inferido; com `anterior`, conta um desvio e alarga o plano."""
+        if anterior is not None:
+            plano = anterior.mesclar(plano)
+        chave = self._chave(origem, impressao_digital_cabecalho(cabecalho))
+
+        with self._trava:
+            self._planos[chave] = plano
+            if anterior is not None:
+                self.metricas["desvios"] += 1
+                logger.warning(
+                    f"Desvio de esquema em {origem}: "
+                    f"plano atualizado para v{plano.versao}"
+                )
+
+        if self.cliente_s3 is not None:
+            self.cliente_s3.escrever_no_s3(
+                plano.para_json().encode(), self.bucket, chave
+            )
+        return plano
@@ -0,0 +1,390 @@
+"""Validação declarativa de linhas, com quarentena das linhas inválidas."""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+from dataclasses import dataclass, field
+from typing import BinaryIO, Callable, Dict, List, Optional, Tuple
+from ..utils.importacao import ModuloTardio
+from .deduplicacao import DeduplicadorHash, hash_linhas
+from .opcoes_parquet import OpcoesParquet
+
+np = ModuloTardio("numpy")
+pa = ModuloTardio("pyarrow")
+pc = ModuloTardio("pyarrow.compute")
+
+logger = logging.getLogger(__name__)
+
+COLUNA_ERROS = "erros_validacao"
+COLUNA_ORIGEM = "arquivo_origem"
+
+# Formato textual aceito para cada tipo, quando a coluna foi lida como texto
+PADROES_TIPO = {
+    "inteiro": r"^\s*[+-]?\d+\s*$",
+    "decimal": r"^\s*[+-]?(\d+\.?\d*|\.\d+)([eE][+-]?\d+)?\s*$",
+    "booleano": r"^\s*(?i:true|false|1|0)\s*$",
+    "data": r"^\s*\d{4}-\d{2}-\d{2}([ T]\d{2}:\d{2}(:\d{2}(\.\d+)?)?)?\s*$",
+}
+TIPOS = tuple(PADROES_TIPO) + ("texto",)
+
+# Tipo Arrow para o qual o texto válido é convertido, para intervalo e unicidade
+TIPOS_CONVERSAO = {
+    "inteiro": "int64",
+    "decimal": "float64",
+    "data": "timestamp[us]",
+}
+
+
+class ErroValidacao(ValueError):
+    """O arquivo inteiro é inválido (ex.: falta uma coluna obrigatória)."""
+
+
+@dataclass
+class RegraColuna:
+    """Restrições de uma coluna; None desliga a restrição."""
+
+    tipo: Optional[str] = None
+    nao_nulo: bool = False
+    unico: bool = False
+    min: Optional[object] = None
+    max: Optional[object] = None
+    regex: Optional[str] = None
+
+    def __post_init__(self):
+        if self.tipo is not None and self.tipo not in TIPOS:
+            raise ValueError(
+                f"Tipo de validação desconhecido: {self.tipo} "
+                f"(use {', '.join(TIPOS)})"
+            )
+
+
+@dataclass
+class RegrasValidacao:
+    """Regras de validação de um feed, declaradas em JSON.
+
+    Exemplo:
+        {"obrigatorias": ["id"],
+         "colunas": {"id": {"tipo": "inteiro", "nao_nulo": true, "unico": true},
+                     "idade": {"tipo": "inteiro", "min": 0, "max": 150},
+                     "email": {"regex": "^[^@]+@[^@]+$"}}}
+    """
+
+    colunas: Dict[str, RegraColuna] = field(default_factory=dict)
+    obrigatorias: List[str] = field(default_factory=list)
+
+    @classmethod
+    def de_dict(cls, dados: dict) -> "RegrasValidacao":
+        return cls(
+            colunas={
+                nome: RegraColuna(**regra)
+                for nome, regra in dados.get("colunas", {}).items()
+            },
+            obrigatorias=list(dados.get("obrigatorias", [])),
+        )
+
+    @classmethod
+    def carregar(cls, origem: str) -> "RegrasValidacao":
+        """Regras de um arquivo JSON ou do próprio JSON (VALIDATION_RULES)."""
+        if origem.lstrip().startswith("{"):
+            return cls.de_dict(json.loads(origem))
+        with open(os.path.expanduser(origem), encoding="utf-8") as arquivo:
+            return cls.de_dict(json.load(arquivo))
+
+
+def _compativel(tipo: str, tipo_arrow) -> bool:
+    """Se a coluna já foi lida num tipo que satisfaz a regra."""
+    if tipo == "inteiro":
+        return pa.types.is_integer(tipo_arrow)
+    if tipo == "decimal":
+        return (
+            pa.types.is_integer(tipo_arrow)
+            or pa.types.is_floating(tipo_arrow)
+            or pa.types.is_decimal(tipo_arrow)
+        )
+    if tipo == "booleano":
+        return pa.types.is_boolean(tipo_arrow)
+    if tipo == "data":
+        return pa.types.is_timestamp(tipo_arrow) or pa.types.is_date(tipo_arrow)
+    return True
+
+
+def _eh_texto(tipo_arrow) -> bool:
+    return pa.types.is_string(tipo_arrow) or pa.types.is_large_string(tipo_arrow)
+
+
+def _converter(coluna, invalidas, tipo_arrow):
+    """Texto já validado pelo padrão do tipo convertido para `tipo_arrow`; inválidos viram nulo."""
+    validas = pc.if_else(invalidas, pa.scalar(None, coluna.type), coluna)
+    # O cast do Arrow não aceita espaços nem o sinal "+" que os padrões aceitam
+    validas = pc.utf8_ltrim(pc.utf8_rtrim_whitespace(validas), characters=" \t+")
+    try:
+        return pc.cast(validas, tipo_arrow)
+    except pa.ArrowInvalid:
+        # Inteiros além do int64
+        return pc.cast(validas, pa.float64())
+
+
+def _numpy(mascara) -> np.ndarray:
+    return mascara.to_numpy(zero_copy_only=False).astype(bool, copy=False)
+
+
+# Verificação compilada: coluna Arrow -> [(regra, máscara de linhas inválidas)]
+Verificacao = Callable[[object], List[Tuple[str, "np.ndarray"]]]
+
+
+class ValidadorDados:
+    """Separa as linhas que violam as regras e as grava numa quarentena Parquet.
+
+    É um filtro do processador (`filtrar(dados)`, como o índice de
+    deduplicação), então vale para pandas e Arrow, em memória e em lotes.
+    As regras são compiladas uma vez por esquema (nomes e tipos das colunas
+    com regra) em funções do `pyarrow.compute` que produzem máscaras: uma
+    coluna já lida no tipo certo não paga a checagem de tipo, e uma coluna
+    de texto é checada por regex vetorizada. Unicidade vale no arquivo
+    inteiro, entre lotes, com um DeduplicadorHash por coluna.
+
+    As linhas inválidas vão, com todas as colunas como texto e a lista de
+    regras violadas em `erros_validacao`, para o arquivo aberto por
+    `abrir_quarentena()` na primeira rejeição. Falta de coluna obrigatória
+    invalida o arquivo todo e levanta ErroValidacao.
+    """
+
+    def __init__(
+        self,
+        regras: RegrasValidacao,
+        abrir_quarentena: Optional[Callable[[], BinaryIO]] = None,
+        arquivo_origem: str = "",
+        opcoes_parquet: Optional[OpcoesParquet] = None,
+    ):
+        self.regras = regras
+        self.abrir_quarentena = abrir_quarentena
+        self.arquivo_origem = arquivo_origem
+        self.opcoes_parquet = opcoes_parquet or OpcoesParquet()
+        self._compiladas: Dict[tuple, List[Tuple[str, Verificacao]]] = {}
+        self._iniciar()
+
+    def _iniciar(self):
+        self.linhas_validadas = 0
+        self.linhas_rejeitadas = 0
+        self.violacoes: Dict[str, int] = {}
+        self._unicos = {
+            nome: DeduplicadorHash()
+            for nome, regra in self.regras.colunas.items()
+            if regra.unico
+        }
+        self._destino = None
+        self._escritor = None
+        self._esquema_quarentena = None
+
+    # Compilação
+
+    def compilar(self, tipos: Dict[str, object]) -> List[Tuple[str, Verificacao]]:
+        """Verificações das colunas com regra para estes tipos Arrow (em cache)."""
+        assinatura = tuple((nome, str(tipo)) for nome, tipo in tipos.items())
+        compiladas = self._compiladas.get(assinatura)
+        if compiladas is None:
+            compiladas = [
+                (nome, self._compilar_coluna(nome, self.regras.colunas[nome], tipo))
+                for nome, tipo in tipos.items()
+            ]
+            self._compiladas[assinatura] = compiladas
+            logger.info(f"Regras de validação compiladas para {len(tipos)} colunas")
+        return compiladas
+
+    def _compilar_coluna(
+        self, nome: str, regra: RegraColuna, tipo_arrow
+    ) -> Verificacao:
+        # Tudo que depende só do tipo é decidido aqui, uma vez
+        checagem_tipo = None
+        if (
+            regra.tipo
+            and not pa.types.is_null(tipo_arrow)
+            and not _compativel(regra.tipo, tipo_arrow)
+        ):
+            if _eh_texto(tipo_arrow):
+                checagem_tipo = "padrao"
+            elif regra.tipo == "inteiro" and pa.types.is_floating(tipo_arrow):
+                checagem_tipo = "inteiro"
+            else:
+                checagem_tipo = "incompativel"
+
+        # Intervalo e unicidade sobre texto usam o valor convertido para o
+        # tipo da regra: compara números como números e hashear um int64 é
+        # bem mais barato que hashear a string
+        tipo_conversao = None
+        if checagem_tipo == "padrao" and (
+            regra.min is not None or regra.max is not None or regra.unico
+        ):
+            tipo_conversao = pa.type_for_alias(TIPOS_CONVERSAO[regra.tipo])
+        limites = {}
+        for operacao, valor in (("less", regra.min), ("greater", regra.max)):
+            if valor is None or pa.types.is_null(tipo_arrow):
+                continue
+            alvo = tipo_conversao or tipo_arrow
+            escalar = pa.scalar(valor)
+            if pa.types.is_temporal(alvo) and not pa.types.is_temporal(escalar.type):
+                escalar = escalar.cast(alvo)
+            limites[operacao] = escalar
+        regex = regra.regex
+
+        def verificar(coluna) -> List[Tuple[str, np.ndarray]]:
+            falhas = []
+            if regra.nao_nulo:
+                falhas.append(("nao_nulo", _numpy(pc.is_null(coluna))))
+
+            valores = coluna
+            if checagem_tipo == "padrao":
+                casam = pc.match_substring_regex(coluna, PADROES_TIPO[regra.tipo])
+                invalidas = pc.invert(pc.fill_null(casam, True))
+                falhas.append(("tipo", _numpy(invalidas)))
+                if tipo_conversao is not None:
+                    valores = _converter(coluna, invalidas, tipo_conversao)
+            elif checagem_tipo == "inteiro":
+                fracionarios = pc.not_equal(coluna, pc.floor(coluna))
+                falhas.append(("tipo", _numpy(pc.fill_null(fracionarios, False))))
+            elif checagem_tipo == "incompativel":
+                falhas.append(("tipo", _numpy(pc.is_valid(coluna))))
+
+            if limites and checagem_tipo != "incompativel":
+                fora = [
+                    getattr(pc, operacao)(valores, limite)
+                    for operacao, limite in limites.items()
+                ]
+                fora = fora[0] if len(fora) == 1 else pc.or_(*fora)
+                falhas.append(("intervalo", _numpy(pc.fill_null(fora, False))))
+
+            if regex is not None:
+                texto = (
+                    coluna if _eh_texto(coluna.type) else pc.cast(coluna, pa.string())
+                )
+                casam = pc.match_substring_regex(texto, regex)
+                falhas.append(("regex", _numpy(pc.invert(pc.fill_null(casam, True)))))
+
+            if regra.unico:
+                # Nulos (e texto fora do tipo) não contam como repetição; a
+                # primeira ocorrência é válida
+                presentes = np.flatnonzero(_numpy(pc.is_valid(valores)))
+                novas = self._unicos[nome].mascara_novas(
+                    hash_linhas(pa.table({nome: valores}).take(presentes))
+                )
+                repetidas = np.zeros(len(coluna), dtype=bool)
+                repetidas[presentes[~novas]] = True
+                falhas.append(("unico", repetidas))
+            return falhas
+
+        return verificar
+
+    # Aplicação
+
+    def _colunas(self, dados) -> Dict[str, object]:
+        """Colunas com regra como arrays Arrow, verificando as obrigatórias."""
+        nomes = list(dados.columns if hasattr(dados, "iloc") else dados.column_names)
+        faltantes = [nome for nome in self.regras.obrigatorias if nome not in nomes]
+        if faltantes:
+            raise ErroValidacao(f"Colunas obrigatórias faltantes: {faltantes}")
+
+        colunas = {}
+        for nome in self.regras.colunas:
+            if nome not in nomes:
+                continue
+            if hasattr(dados, "iloc"):
+                colunas[nome] = pa.array(dados[nome], from_pandas=True)
+            else:
+                colunas[nome] = dados.column(nome)
+        return colunas
+
+    def filtrar(self, dados):
+        """Retorna `dados` sem as linhas inválidas, que vão para a quarentena."""
+        colunas = self._colunas(dados)
+        quantidade = len(dados) if hasattr(dados, "iloc") else dados.num_rows
+        self.linhas_validadas += quantidade
+
+        invalidas = np.zeros(quantidade, dtype=bool)
+        falhas = []
+        tipos = {nome: coluna.type for nome, coluna in colunas.items()}
+        for nome, verificar in self.compilar(tipos):
+            for regra, mascara in verificar(colunas[nome]):
+                if mascara.any():
+                    falhas.append((f"{nome}:{regra}", mascara))
+                    invalidas |= mascara
+        if not falhas:
+            return dados
+
+        for rotulo, mascara in falhas:
+            self.violacoes[rotulo] = self.violacoes.get(rotulo, 0) + int(mascara.sum())
+        self.linhas_rejeitadas += int(invalidas.sum())
+        self._quarentenar(dados, invalidas, falhas)
+        if hasattr(dados, "iloc"):
+            return dados[~invalidas]
+        return dados.filter(pa.array(~invalidas))
+
+    def _quarentenar(self, dados, invalidas: np.ndarray, falhas: list):
+        if hasattr(dados, "iloc"):
+            rejeitadas = pa.Table.from_pandas(dados[invalidas], preserve_index=False)
+        else:
+            rejeitadas = dados.filter(pa.array(invalidas))
+
+        # Os rótulos só são montados para as linhas rejeitadas
+        posicoes = np.flatnonzero(invalidas)
+        erros = np.full(len(posicoes), "", dtype=object)
+        for rotulo, mascara in falhas:
+            marcadas = mascara[posicoes]
+            erros[marcadas] = np.where(
+                erros[marcadas] == "", rotulo, erros[marcadas] + "," + rotulo
+            )
+
+        # Tudo como texto: o esquema não muda entre lotes e o valor original é preservado
+        tabela = pa.table(
+            [pc.cast(coluna, pa.string()) for coluna in rejeitadas.columns]
+            + [
+                pa.array(erros, pa.string()),
+                pa.array([self.arquivo_origem] * len(posicoes), pa.string()),
+            ],
+            names=rejeitadas.column_names + [COLUNA_ERROS, COLUNA_ORIGEM],
+        )
+        if self._escritor is None:
+            if self.abrir_quarentena is None:
+                return
+            self._destino = self.abrir_quarentena()
+            self._esquema_quarentena = tabela.schema
+            self._escritor = self.opcoes_parquet.abrir_escritor(
+                self._destino, tabela.schema
+            )
+        elif not tabela.schema.equals(self._esquema_quarentena):
+            tabela = tabela.select(self._esquema_quarentena.names)
+        self._escritor.write_table(tabela)
+
+    # Ciclo de vida
+
+    def fechar(self):
+        """Publica a quarentena, se houve linhas rejeitadas."""
+        if self._escritor is not None:
+            self._escritor.close()
+            self._destino.close()
+            self._escritor = None
+        for deduplicador in self._unicos.values():
+            deduplicador.fechar()
+        if self.linhas_rejeitadas:
+            logger.warning(
+                f"{self.linhas_rejeitadas} de {self.linhas_validadas} linhas "
+                f"em quarentena: {self.violacoes}"
+            )
+
+    def abortar(self):
+        """Descarta a quarentena parcial."""
+        if self._escritor is not None:
+            try:
+                self._escritor.close()
+            except Exception:
+                pass
+            getattr(self._destino, "abortar", self._destino.close)()
+            self._escritor = None
+        for deduplicador in self._unicos.values():
+            deduplicador.fechar()
+
+    def descartar(self):
+        """Desfaz tudo desde o início, para reler o arquivo (desvio de esquema)."""
+        self.abortar()
+        self._iniciar()
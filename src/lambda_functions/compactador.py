@@ -0,0 +1,38 @@
+"""Função Lambda agendada para compactar arquivos pequenos do Data Lake."""
+
+import json
+import logging
+import sys
+import os
+
+# Configurar caminho para imports locais
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "../.."))
+
+from src.config.settings import config  # noqa: E402
+from src.ingestion.compactacao import CompactadorDataLake  # noqa: E402
+from src.ingestion.opcoes_parquet import OpcoesParquet  # noqa: E402
+from src.utils.s3_utils import ClienteS3  # noqa: E402
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+
+def lambda_handler(evento, contexto):
+    """Handler Lambda - compacta as partições alteradas desde a última execução."""
+    logger.info(f"Evento recebido: {json.dumps(evento, default=str)}")
+
+    try:
+        compactador = CompactadorDataLake(
+            ClienteS3(regiao=config.aws.regiao),
+            config.s3.bucket_data_lake,
+            tamanho_alvo_mb=config.compactacao.tamanho_alvo_mb,
+            colunas_ordenacao=config.compactacao.colunas_ordenacao,
+            min_arquivos=config.compactacao.min_arquivos,
+            opcoes_parquet=OpcoesParquet.de_config(config.processamento),
+        )
+        estatisticas = compactador.executar()
+        return {"statusCode": 200, "body": json.dumps(estatisticas)}
+
+    except Exception as e:
+        logger.exception("Erro na compactação")
+        return {"statusCode": 500, "body": json.dumps({"erro": str(e)})}
@@ -3,49 +3,214 @@ import json
 import logging
 import sys
 import os
+import posixpath
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator
 
 # Configurar caminho para imports locais
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../..'))
 
-from src.ingestion.pipeline import PipelineIngestao
+from src.config.settings import config  # noqa: E402
+from src.ingestion.dialeto import CacheDialetos  # noqa: E402
+from src.ingestion.manifesto_ingestao import ManifestoIngestao  # noqa: E402
+from src.ingestion.micro_lotes import dividir_em_lotes  # noqa: E402
+from src.ingestion.pipeline import PipelineIngestao  # noqa: E402
+from src.ingestion.registro_esquemas import RegistroEsquemas  # noqa: E402
+from src.utils.descompressao import eh_csv  # noqa: E402
+from src.utils.logger import configurar_logging  # noqa: E402
+from src.utils.s3_utils import ClienteS3  # noqa: E402
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
+# Eventos structlog (ex.: medições por etapa, ENABLE_METRICS) saem em JSON
+configurar_logging(config.logging.nivel_log)
+
+# Reaproveitados entre invocações enquanto o container estiver quente
+_cliente_s3 = None
+_registro_esquemas = None
+_manifesto = None
+_cache_dialetos = None
+
+
+def obter_cliente_s3() -> ClienteS3:
+    """Retorna o cliente S3 do container, criando-o na primeira invocação."""
+    global _cliente_s3
+    if _cliente_s3 is None:
+        _cliente_s3 = ClienteS3(
+            regiao=config.aws.regiao,
+            max_conexoes=max(10, config.processamento.registros_paralelos * config.s3.concorrencia)
+        )
+    return _cliente_s3
+
+
+def obter_registro_esquemas() -> RegistroEsquemas:
+    """Retorna o registro de esquemas do container, se habilitado (SCHEMA_REGISTRY)."""
+    global _registro_esquemas
+    if _registro_esquemas is None and config.processamento.registro_esquemas:
+        _registro_esquemas = RegistroEsquemas(obter_cliente_s3(), config.s3.bucket_data_lake)
+    return _registro_esquemas
+
+
+def obter_manifesto_ingestao() -> ManifestoIngestao:
+    """Retorna o manifesto de ingestão do container, se habilitado (INGESTION_MANIFEST)."""
+    global _manifesto
+    if _manifesto is None and config.processamento.manifesto_ingestao:
+        _manifesto = ManifestoIngestao(obter_cliente_s3(), config.s3.bucket_data_lake)
+    return _manifesto
+
+
+def obter_cache_dialetos() -> CacheDialetos:
+    """Retorna o cache de dialetos do container, se habilitado (DETECT_DIALECT)."""
+    global _cache_dialetos
+    if _cache_dialetos is None and config.processamento.deteccao_dialeto:
+        _cache_dialetos = CacheDialetos(config.processamento.tamanho_amostra_dialeto_kb * 1024)
+    return _cache_dialetos
+
+
+def processar_registro(cliente_s3: ClienteS3, bucket: str, chave: str,
+                       etag: str = None, tamanho: int = None) -> dict:
+    """Processa um arquivo e anota a duração no resultado."""
+    logger.info(f"Processando {bucket}/{chave}")
+    inicio = time.perf_counter()
+    
+    # Um pipeline por registro: o processador guarda estado do arquivo atual
+    pipeline = PipelineIngestao(cliente_s3=cliente_s3, registro_esquemas=obter_registro_esquemas(),
+                                manifesto=obter_manifesto_ingestao(),
+                                cache_dialetos=obter_cache_dialetos())
+    resultado = pipeline.processar_arquivo(bucket, chave, etag=etag, tamanho=tamanho)
+    resultado['duracao_s'] = round(time.perf_counter() - inicio, 3)
+    
+    if resultado.get('ignorado'):
+        logger.info(f"Ignorado: {bucket}/{chave} já ingerido")
+    elif resultado['sucesso']:
+        logger.info(f"Sucesso: {resultado['destino']} em {resultado['duracao_s']}s")
+    else:
+        logger.error(f"Falha: {resultado['erro']}")
+    return resultado
+
+
+def processar_micro_lote(cliente_s3: ClienteS3, arquivos: list) -> list:
+    """Processa objetos pequenos juntos (MICRO_BATCH) e anota a duração do lote nos resultados."""
+    logger.info(f"Processando micro-lote de {len(arquivos)} objetos")
+    inicio = time.perf_counter()
+    
+    pipeline = PipelineIngestao(cliente_s3=cliente_s3, registro_esquemas=obter_registro_esquemas(),
+                                manifesto=obter_manifesto_ingestao(),
+                                cache_dialetos=obter_cache_dialetos())
+    resultados = pipeline.processar_micro_lote(arquivos)
+    duracao = round(time.perf_counter() - inicio, 3)
+    for resultado in resultados:
+        resultado['duracao_s'] = duracao
+        if not resultado['sucesso']:
+            logger.error(f"Falha: {resultado['origem']}: {resultado['erro']}")
+    return resultados
+
+
+def registros_s3(evento: dict) -> Iterator[tuple]:
+    """(registro S3, id da mensagem SQS) de um evento S3 direto (id None) ou de um lote SQS.
+    
+    Na fila, cada mensagem traz uma notificação do S3; a janela de lote da
+    fonte de eventos acumula várias numa invocação.
+    """
+    for registro in evento.get('Records', []):
+        if registro.get('eventSource') != 'aws:sqs':
+            yield registro, None
+            continue
+        try:
+            corpo = json.loads(registro['body'])
+        except ValueError:
+            logger.warning(f"Mensagem {registro.get('messageId')} não é JSON, ignorando")
+            continue
+        # O s3:TestEvent, enviado ao configurar a notificação, não tem Records
+        for registro_s3 in corpo.get('Records', []):
+            yield registro_s3, registro['messageId']
+
+
+def agrupar_por_feed(indices: list, arquivos: list) -> list:
+    """Separa os registros em grupos que podem ser processados em paralelo.
+    
+    Com o índice de deduplicação (DEDUP_INDEX), os arquivos de um mesmo feed
+    ficam num só grupo, processado em sequência: em paralelo, um regravaria o
+    índice do feed sem as linhas do outro. Sem o índice, cada arquivo é um grupo.
+    """
+    if not config.processamento.indice_deduplicacao:
+        return [[i] for i in indices]
+    grupos = {}
+    for i in indices:
+        # O feed é o diretório do arquivo no bucket raw, como no pipeline
+        grupos.setdefault(posixpath.dirname(arquivos[i][1]), []).append(i)
+    return list(grupos.values())
+
 
 def lambda_handler(evento, contexto):
-    """Handler Lambda - processa eventos S3."""
+    """Handler Lambda - processa eventos S3, diretos ou em lotes de uma fila SQS."""
     logger.info(f"Evento recebido: {json.dumps(evento)}")
-    
-    resultados = []
+    mensagens = []
     
     try:
-        # Processar cada arquivo do evento S3
-        for registro in evento.get('Records', []):
+        arquivos = []
+        for registro, id_mensagem in registros_s3(evento):
             bucket = registro['s3']['bucket']['name']
-            chave = registro['s3']['object']['key']
+            objeto = registro['s3']['object']
+            chave = objeto['key']
             
-            # Ignorar arquivos não-CSV
-            if not chave.lower().endswith('.csv'):
+            # Ignorar arquivos não-CSV (CSVs comprimidos e .zip são aceitos)
+            if not eh_csv(chave):
                 logger.info(f"Ignorando arquivo não-CSV: {chave}")
                 continue
+            # Arquivos rejeitados pelo pipeline são movidos para lá: não reprocessar
+            if chave.startswith(config.s3.prefixo_falhas):
+                logger.info(f"Ignorando arquivo em {config.s3.prefixo_falhas}: {chave}")
+                continue
             
-            logger.info(f"Processando {bucket}/{chave}")
-            
-            # Processar arquivo
-            pipeline = PipelineIngestao()
-            resultado = pipeline.processar_arquivo(bucket, chave)
-            resultados.append(resultado)
-            
-            if resultado['sucesso']:
-                logger.info(f"Sucesso: {resultado['destino']}")
-            else:
-                logger.error(f"Falha: {resultado['erro']}")
+            # ETag e tamanho do evento poupam o HEAD do manifesto de ingestão
+            arquivos.append((bucket, chave, objeto.get('eTag'), objeto.get('size')))
+            mensagens.append(id_mensagem)
+        
+        cliente_s3 = obter_cliente_s3()
+        resultados = [None] * len(arquivos)
+        individuais = list(range(len(arquivos)))
+        
+        # Objetos pequenos do evento vão juntos para um Parquet por partição
+        if config.processamento.micro_lotes:
+            limite = config.processamento.tamanho_max_objeto_micro_lote_kb * 1024
+            pequenos = [i for i, arquivo in enumerate(arquivos)
+                        if arquivo[3] is not None and int(arquivo[3]) <= limite]
+            individuais = sorted(set(individuais) - set(pequenos))
+            lotes = dividir_em_lotes([int(arquivos[i][3]) for i in pequenos],
+                                     config.processamento.tamanho_micro_lote_mb * 1024 * 1024)
+            for lote in lotes:
+                indices = [pequenos[j] for j in lote]
+                resultados_lote = processar_micro_lote(cliente_s3, [arquivos[i] for i in indices])
+                for i, resultado in zip(indices, resultados_lote):
+                    resultados[i] = resultado
+        
+        # Processar os demais arquivos, até MAX_PARALLEL_RECORDS ao mesmo tempo
+        grupos = agrupar_por_feed(individuais, arquivos)
+        paralelismo = max(1, min(config.processamento.registros_paralelos, len(grupos)))
+        
+        def processar_grupo(grupo: list) -> list:
+            return [processar_registro(cliente_s3, *arquivos[i]) for i in grupo]
+        
+        if paralelismo == 1:
+            for i in individuais:
+                resultados[i] = processar_registro(cliente_s3, *arquivos[i])
+        else:
+            with ThreadPoolExecutor(max_workers=paralelismo) as executor:
+                for grupo, resultados_grupo in zip(grupos, executor.map(processar_grupo, grupos)):
+                    for i, resultado in zip(grupo, resultados_grupo):
+                        resultados[i] = resultado
         
         # Resposta
         contador_sucesso = sum(1 for r in resultados if r['sucesso'])
+        if _registro_esquemas is not None:
+            logger.info(f"Registro de esquemas: {_registro_esquemas.metricas}")
+        if _manifesto is not None:
+            logger.info(f"Manifesto de ingestão: {_manifesto.metricas}")
         
-        return {
+        resposta = {
             'statusCode': 200 if contador_sucesso == len(resultados) else 207,
             'body': json.dumps({
                 'processados': len(resultados),
@@ -53,10 +218,30 @@ def lambda_handler(evento, contexto):
                 'resultados': resultados
             })
         }
-        
+        return _com_falhas_sqs(resposta, evento, [
+            id_mensagem for id_mensagem, resultado in zip(mensagens, resultados)
+            if not resultado['sucesso']
+        ])
+    
     except Exception as e:
         logger.exception("Erro no handler Lambda")
-        return {
+        resposta = {
             'statusCode': 500,
             'body': json.dumps({'erro': str(e)})
         }
+        return _com_falhas_sqs(resposta, evento, [
+            registro.get('messageId') for registro in evento.get('Records', [])
+        ])
+
+
+def _com_falhas_sqs(resposta: dict, evento: dict, falhas: list) -> dict:
+    """Num lote SQS, lista as mensagens a reentregar (ReportBatchItemFailures).
+    
+    As demais saem da fila.
+    """
+    if not any(registro.get('eventSource') == 'aws:sqs' for registro in evento.get('Records', [])):
+        return resposta
+    resposta['batchItemFailures'] = [
+        {'itemIdentifier': id_mensagem} for id_mensagem in dict.fromkeys(falhas) if id_mensagem
+    ]
+    return resposta
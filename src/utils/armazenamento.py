@@ -0,0 +1,91 @@
+"""Interface de armazenamento de objetos usada pelo pipeline e escolha do backend.
+
+O pipeline, a compactação, o backfill e os índices só usam os métodos de
+ArmazenamentoObjetos, implementados pelo ClienteS3 (boto3) e pelo
+ClienteArquivosLocal (diretório local, com memory maps). STORAGE_BACKEND
+escolhe qual deles `criar_armazenamento` devolve.
+"""
+
+from typing import BinaryIO, Iterable, Iterator, Optional, Protocol
+from ..config.settings import config
+from .armazenamento_local import ClienteArquivosLocal
+from .s3_utils import ClienteS3
+
+BACKENDS = ("s3", "local")
+
+# Subdiretório de cada bucket na raiz local: o layout data/raw -> data/processed
+DIRETORIOS_LOCAIS = {
+    "raw": "raw",
+    "data_lake": "processed",
+}
+
+
+class ArmazenamentoObjetos(Protocol):
+    """Operações de armazenamento de que o pipeline depende."""
+
+    def ler_csv_do_s3(self, bucket: str, chave: str) -> bytes: ...
+
+    def ler_buffer(self, bucket: str, chave: str): ...
+
+    def ler_inicio(self, bucket: str, chave: str, tamanho: int) -> bytes: ...
+
+    def ler_intervalo(
+        self, bucket: str, chave: str, inicio: int, tamanho: int
+    ) -> bytes: ...
+
+    def abrir_leitura(self, bucket: str, chave: str, **opcoes) -> BinaryIO: ...
+
+    def escrever_no_s3(self, dados: bytes, bucket: str, chave: str) -> bool: ...
+
+    def abrir_escrita(self, bucket: str, chave: str, **opcoes) -> BinaryIO: ...
+
+    def copiar_objeto(
+        self,
+        bucket_origem: str,
+        chave_origem: str,
+        bucket_destino: str,
+        chave_destino: str,
+    ) -> bool: ...
+
+    def deletar_objeto(self, bucket: str, chave: str) -> bool: ...
+
+    def deletar_objetos(self, bucket: str, chaves: Iterable[str], **opcoes) -> dict: ...
+
+    def iterar_objetos(
+        self, bucket: str, prefixo: str = "", detalhado: bool = False
+    ) -> Iterator: ...
+
+    def listar_objetos(
+        self, bucket: str, prefixo: str = "", detalhado: bool = False
+    ) -> list: ...
+
+    def obter_metadados_objeto(self, bucket: str, chave: str) -> Optional[dict]: ...
+
+
+def criar_armazenamento(
+    backend: Optional[str] = None, raiz_local: Optional[str] = None
+) -> ArmazenamentoObjetos:
+    """Cria o cliente do backend (STORAGE_BACKEND: "s3" ou "local").
+
+    O backend local usa LOCAL_STORAGE_ROOT com o bucket raw em `raw/` e o
+    Data Lake em `processed/`. Com `raiz_local`, o backend é local e cada
+    bucket vira um subdiretório com o próprio nome (o `--local` do backfill).
+    """
+    if raiz_local:
+        return ClienteArquivosLocal(raiz_local)
+
+    backend = backend or config.s3.backend_armazenamento
+    if backend == "local":
+        return ClienteArquivosLocal(
+            config.s3.raiz_armazenamento_local,
+            {
+                config.s3.bucket_raw: DIRETORIOS_LOCAIS["raw"],
+                config.s3.bucket_data_lake: DIRETORIOS_LOCAIS["data_lake"],
+            },
+        )
+    if backend == "s3":
+        return ClienteS3(regiao=config.aws.regiao)
+    raise ValueError(
+        f"Backend de armazenamento desconhecido: {backend} "
+        f"(use {', '.join(BACKENDS)})"
+    )
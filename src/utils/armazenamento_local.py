@@ -0,0 +1,248 @@
+"""Armazenamento em diretório local com a mesma interface do ClienteS3.
+
+Cada bucket é um subdiretório da raiz (ou o indicado em `diretorios`) e
+cada chave, um caminho relativo a ele (`<raiz>/<bucket>/<chave>`). Serve
+para rodar o pipeline e o backfill sem AWS, sobre uma cópia local dos
+dados. As leituras usam memory maps: o CSV vai do page cache ao parser
+sem cópia intermediária.
+"""
+
+import io
+import logging
+import mmap
+import os
+import shutil
+from datetime import datetime, timezone
+from typing import Dict, Iterable, Iterator, Optional, Union
+from botocore.exceptions import ClientError
+from .importacao import ModuloTardio
+
+pa = ModuloTardio("pyarrow")
+
+logger = logging.getLogger(__name__)
+
+# Sufixo dos arquivos em escrita; some no rename final e é ignorado na listagem
+SUFIXO_PARCIAL = ".parcial"
+
+
+def _etag(estado: os.stat_result) -> str:
+    # Sem ETag no disco; tamanho + mtime identificam a versão do arquivo
+    return f"{estado.st_size:x}-{estado.st_mtime_ns:x}"
+
+
+def _nao_encontrado(bucket: str, chave: str) -> ClientError:
+    """O mesmo erro que o boto3 lança, para quem trata NoSuchKey continuar funcionando."""
+    return ClientError(
+        {"Error": {"Code": "NoSuchKey", "Message": f"{bucket}/{chave} não existe"}},
+        "GetObject",
+    )
+
+
+class EscritorArquivoLocal(io.FileIO):
+    """Arquivo de escrita que só aparece no destino ao ser fechado com sucesso."""
+
+    def __init__(self, caminho: str):
+        os.makedirs(os.path.dirname(caminho), exist_ok=True)
+        self.caminho = caminho
+        self.caminho_parcial = f"{caminho}.{os.getpid()}{SUFIXO_PARCIAL}"
+        super().__init__(self.caminho_parcial, "wb")
+
+    def close(self):
+        if self.closed:
+            return
+        super().close()
+        os.replace(self.caminho_parcial, self.caminho)
+
+    def __exit__(self, tipo, valor, rastro):
+        # Uma exceção no bloco with descarta o arquivo em vez de publicá-lo pela metade
+        if tipo is not None:
+            self.abortar()
+        else:
+            self.close()
+
+    def abortar(self):
+        """Descarta o que foi escrito."""
+        if not self.closed:
+            super().close()
+        if os.path.exists(self.caminho_parcial):
+            os.remove(self.caminho_parcial)
+
+    def excluir(self):
+        """Remove o arquivo já publicado por `close`."""
+        if os.path.exists(self.caminho):
+            os.remove(self.caminho)
+
+
+class ClienteArquivosLocal:
+    """Substituto do ClienteS3 que lê e grava num diretório local."""
+
+    def __init__(self, raiz: str, diretorios: Optional[Dict[str, str]] = None):
+        self.raiz = os.path.abspath(raiz)
+        self.diretorios = diretorios or {}
+
+    def _caminho(self, bucket: str, chave: str = "") -> str:
+        return os.path.join(
+            self.raiz, self.diretorios.get(bucket, bucket), *chave.split("/")
+        )
+
+    def ler_csv_do_s3(self, bucket: str, chave: str) -> bytes:
+        """Lê arquivo local."""
+        logger.info(f"Lendo {bucket}/{chave}")
+        try:
+            with open(self._caminho(bucket, chave), "rb") as arquivo:
+                return arquivo.read()
+        except FileNotFoundError:
+            raise _nao_encontrado(bucket, chave) from None
+
+    def ler_buffer(self, bucket: str, chave: str) -> Union[mmap.mmap, bytes]:
+        """Mapeia o arquivo em memória, somente leitura, sem copiá-lo.
+
+        O mmap aceita o protocolo de buffer (pa.BufferReader, len, fatias) e
+        a interface de arquivo (read, seek); o mapeamento é desfeito quando
+        o último uso é coletado.
+        """
+        logger.info(f"Mapeando {bucket}/{chave}")
+        try:
+            with open(self._caminho(bucket, chave), "rb") as arquivo:
+                if os.fstat(arquivo.fileno()).st_size == 0:
+                    # mmap não mapeia arquivos vazios
+                    return b""
+                return mmap.mmap(arquivo.fileno(), 0, access=mmap.ACCESS_READ)
+        except FileNotFoundError:
+            raise _nao_encontrado(bucket, chave) from None
+
+    def ler_inicio(self, bucket: str, chave: str, tamanho: int) -> bytes:
+        """Lê só os primeiros `tamanho` bytes do arquivo."""
+        try:
+            with open(self._caminho(bucket, chave), "rb") as arquivo:
+                return arquivo.read(tamanho)
+        except FileNotFoundError:
+            raise _nao_encontrado(bucket, chave) from None
+
+    def ler_intervalo(
+        self, bucket: str, chave: str, inicio: int, tamanho: int
+    ) -> bytes:
+        """Lê até `tamanho` bytes a partir de `inicio`, pelo memory map do arquivo."""
+        mapa = self.ler_buffer(bucket, chave)
+        try:
+            fim = inicio + tamanho
+            return mapa[inicio:fim]
+        finally:
+            if isinstance(mapa, mmap.mmap):
+                mapa.close()
+
+    def abrir_leitura(self, bucket: str, chave: str, **_) -> "pa.MemoryMappedFile":
+        """Abre o arquivo para leitura em streaming, como memory map do Arrow.
+
+        O leitor de CSV do Arrow lê blocos do map sem cópia; para os demais
+        (pandas, gzip, zipfile) ele é um arquivo binário comum.
+        """
+        logger.info(f"Abrindo leitura {bucket}/{chave}")
+        try:
+            return pa.memory_map(self._caminho(bucket, chave), "r")
+        except FileNotFoundError:
+            raise _nao_encontrado(bucket, chave) from None
+
+    def escrever_no_s3(self, dados: bytes, bucket: str, chave: str) -> bool:
+        """Escreve arquivo local."""
+        try:
+            logger.info(f"Escrevendo {bucket}/{chave}")
+            with EscritorArquivoLocal(self._caminho(bucket, chave)) as arquivo:
+                arquivo.write(dados)
+            return True
+        except Exception as e:
+            logger.error(f"Erro ao escrever arquivo local: {e}")
+            return False
+
+    def abrir_escrita(self, bucket: str, chave: str, **_) -> EscritorArquivoLocal:
+        """Abre arquivo de escrita, publicado no destino ao ser fechado."""
+        logger.info(f"Abrindo escrita {bucket}/{chave}")
+        return EscritorArquivoLocal(self._caminho(bucket, chave))
+
+    def copiar_objeto(
+        self,
+        bucket_origem: str,
+        chave_origem: str,
+        bucket_destino: str,
+        chave_destino: str,
+    ) -> bool:
+        """Copia arquivo local."""
+        try:
+            destino = self._caminho(bucket_destino, chave_destino)
+            os.makedirs(os.path.dirname(destino), exist_ok=True)
+            shutil.copyfile(self._caminho(bucket_origem, chave_origem), destino)
+            return True
+        except Exception as e:
+            logger.error(f"Erro ao copiar arquivo local: {e}")
+            return False
+
+    def deletar_objeto(self, bucket: str, chave: str) -> bool:
+        """Deleta arquivo local; ausente conta como deletado, como no S3."""
+        try:
+            os.remove(self._caminho(bucket, chave))
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.error(f"Erro ao deletar arquivo local: {e}")
+            return False
+        return True
+
+    def deletar_objetos(self, bucket: str, chaves: Iterable[str], **_) -> dict:
+        """Deleta vários arquivos: {'deletados': n, 'erros': [chaves]}."""
+        resultado = {"deletados": 0, "erros": []}
+        for chave in chaves:
+            if self.deletar_objeto(bucket, chave):
+                resultado["deletados"] += 1
+            else:
+                resultado["erros"].append(chave)
+        return resultado
+
+    def iterar_objetos(
+        self, bucket: str, prefixo: str = "", detalhado: bool = False
+    ) -> Iterator:
+        """Percorre os arquivos cujo caminho relativo começa com `prefixo`, em ordem."""
+        base = self._caminho(bucket)
+        # Só desce no diretório que contém o prefixo, não no bucket inteiro
+        inicio = (
+            self._caminho(bucket, prefixo.rsplit("/", 1)[0]) if "/" in prefixo else base
+        )
+        for diretorio, subdiretorios, arquivos in os.walk(inicio):
+            subdiretorios.sort()
+            for nome in sorted(arquivos):
+                if nome.endswith(SUFIXO_PARCIAL):
+                    continue
+                caminho = os.path.join(diretorio, nome)
+                chave = os.path.relpath(caminho, base).replace(os.sep, "/")
+                if not chave.startswith(prefixo):
+                    continue
+                if detalhado:
+                    estado = os.stat(caminho)
+                    yield {
+                        "key": chave,
+                        "size": estado.st_size,
+                        "last_modified": datetime.fromtimestamp(
+                            estado.st_mtime, timezone.utc
+                        ),
+                        "etag": _etag(estado),
+                    }
+                else:
+                    yield chave
+
+    def listar_objetos(
+        self, bucket: str, prefixo: str = "", detalhado: bool = False
+    ) -> list:
+        """Lista os arquivos do prefixo."""
+        return list(self.iterar_objetos(bucket, prefixo, detalhado))
+
+    def obter_metadados_objeto(self, bucket: str, chave: str) -> Optional[dict]:
+        """Tamanho e data de modificação do arquivo, ou None se não existir."""
+        try:
+            estado = os.stat(self._caminho(bucket, chave))
+        except OSError:
+            return None
+        return {
+            "size": estado.st_size,
+            "etag": _etag(estado),
+            "last_modified": datetime.fromtimestamp(estado.st_mtime, timezone.utc),
+            "content_type": "",
+        }
@@ -0,0 +1,166 @@
+"""Leitura em fluxo de CSVs comprimidos (.csv.gz, .csv.bz2, .csv.zst) e de arquivos .zip."""
+
+import bz2
+import gzip
+import io
+import posixpath
+import zipfile
+from typing import BinaryIO, Callable, Iterator, Optional, Tuple, Union
+from .importacao import ModuloTardio
+
+pa = ModuloTardio("pyarrow")
+
+# Extensão -> formato; .zip pode conter vários CSVs
+FORMATOS = {
+    ".gz": "gzip",
+    ".bz2": "bz2",
+    ".zst": "zstd",
+    ".zip": "zip",
+}
+
+EXTENSOES_CSV = (".csv", ".csv.gz", ".csv.bz2", ".csv.zst", ".zip")
+
+
+def eh_csv(chave: str) -> bool:
+    """Se a chave é um CSV, comprimido ou não, ou um .zip de CSVs."""
+    return chave.lower().endswith(EXTENSOES_CSV)
+
+
+def formato_compressao(chave: str) -> Optional[str]:
+    """Formato de compressão pela extensão da chave, ou None para CSV simples."""
+    return FORMATOS.get(posixpath.splitext(chave.lower())[1])
+
+
+def nome_base(chave: str) -> str:
+    """Nome do arquivo sem diretório, sem a compressão e sem o .csv."""
+    nome = posixpath.basename(chave)
+    if formato_compressao(nome):
+        nome = posixpath.splitext(nome)[0]
+    if nome.lower().endswith(".csv"):
+        nome = nome[: -len(".csv")]
+    return nome
+
+
+class _FonteSemFechar(io.RawIOBase):
+    """Repassa leituras à fonte sem fechá-la: o pyarrow fecha o arquivo que recebe."""
+
+    def __init__(self, fonte: BinaryIO):
+        super().__init__()
+        self._fonte = fonte
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        if hasattr(self._fonte, "readinto"):
+            return self._fonte.readinto(buffer)
+        # mmap (ClienteArquivosLocal.ler_buffer) só tem read
+        dados = self._fonte.read(len(buffer))
+        buffer[: len(dados)] = dados
+        return len(dados)
+
+
+def _abrir_zstd(fonte: BinaryIO):
+    # O pyarrow já traz zstd; evita uma dependência só para isso
+    return pa.CompressedInputStream(
+        pa.PythonFile(_FonteSemFechar(fonte), mode="r"), "zstd"
+    )
+
+
+DESCOMPRESSORES = {
+    "gzip": lambda fonte: gzip.GzipFile(fileobj=fonte, mode="rb"),
+    "bz2": lambda fonte: bz2.BZ2File(fonte, mode="rb"),
+    "zstd": _abrir_zstd,
+}
+
+
+class LeitorDescomprimido(io.RawIOBase):
+    """Arquivo somente-leitura com o conteúdo descomprimido de `fonte`.
+
+    Descomprime à medida que é lido, então a memória não depende do tamanho
+    do arquivo. `seek(0)` volta ao início recomeçando a descompressão (a
+    fonte precisa aceitar seek); outras posições não são suportadas.
+    """
+
+    def __init__(self, fonte: BinaryIO, abrir: Callable[[BinaryIO], BinaryIO]):
+        super().__init__()
+        self._fonte = fonte
+        self._abrir = abrir
+        self._fluxo = abrir(fonte)
+        self._posicao = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return self._fonte.seekable()
+
+    def tell(self) -> int:
+        return self._posicao
+
+    def seek(self, deslocamento: int, origem: int = io.SEEK_SET) -> int:
+        if origem == io.SEEK_CUR:
+            deslocamento += self._posicao
+        elif origem != io.SEEK_SET:
+            raise io.UnsupportedOperation(
+                "Fluxo descomprimido não aceita seek a partir do fim"
+            )
+        if deslocamento == self._posicao:
+            return self._posicao
+        if deslocamento != 0:
+            raise io.UnsupportedOperation("Fluxo descomprimido só volta ao início")
+        self._fonte.seek(0)
+        self._fluxo = self._abrir(self._fonte)
+        self._posicao = 0
+        return 0
+
+    def readinto(self, buffer) -> int:
+        # Preenche o buffer inteiro, como o LeitorS3Paralelo: quem lê uma
+        # amostra de N bytes recebe N bytes, salvo no fim do arquivo
+        copiados = 0
+        while copiados < len(buffer):
+            dados = self._fluxo.read(len(buffer) - copiados)
+            if not dados:
+                break
+            fim = copiados + len(dados)
+            buffer[copiados:fim] = dados
+            copiados = fim
+        self._posicao += copiados
+        return copiados
+
+    def close(self):
+        if not self.closed:
+            self._fluxo.close()
+        super().close()
+
+
+def iterar_csvs(
+    fonte: Union[bytes, BinaryIO], chave: str
+) -> Iterator[Tuple[str, BinaryIO]]:
+    """Gera (nome, arquivo) de cada CSV do objeto `chave`, já descomprimido.
+
+    Um CSV simples é a própria fonte; um .gz/.bz2/.zst é descomprimido em
+    fluxo; um .zip gera cada CSV dele, na ordem do arquivo. Ler membros de
+    um .zip exige uma fonte com seek (o índice fica no fim do arquivo).
+    """
+    if isinstance(fonte, (bytes, bytearray)):
+        fonte = io.BytesIO(fonte)
+    formato = formato_compressao(chave)
+
+    if formato is None:
+        yield posixpath.basename(chave), fonte
+    elif formato == "zip":
+        with zipfile.ZipFile(fonte) as arquivo_zip:
+            for membro in arquivo_zip.infolist():
+                nome = membro.filename
+                if (
+                    membro.is_dir()
+                    or nome.startswith("__MACOSX/")
+                    or not nome.lower().endswith(".csv")
+                ):
+                    continue
+                with arquivo_zip.open(membro) as fluxo:
+                    yield nome, fluxo
+    else:
+        with LeitorDescomprimido(fonte, DESCOMPRESSORES[formato]) as fluxo:
+            yield posixpath.basename(chave), fluxo
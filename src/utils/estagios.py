@@ -0,0 +1,98 @@
+"""Estágios concorrentes ligados por filas limitadas.
+
+Na conversão em lotes, o download (read-ahead do LeitorS3Paralelo), a
+leitura do CSV, o Parquet e o upload (partes em segundo plano do
+EscritorMultipartS3) podem correr ao mesmo tempo. `em_segundo_plano` põe
+um gerador, como o leitor de lotes, numa thread própria: ele produz à
+frente do consumidor até `capacidade` itens e espera quando a fila enche,
+então a memória fica limitada e o tempo total tende ao do estágio mais
+lento em vez da soma de todos.
+"""
+
+import logging
+import queue
+import threading
+from typing import Iterable, Iterator, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+_FIM = object()
+
+# Intervalo em que um produtor bloqueado na fila cheia confere se deve parar
+_ESPERA_S = 0.1
+
+
+class _Erro:
+    __slots__ = ("excecao",)
+
+    def __init__(self, excecao: BaseException):
+        self.excecao = excecao
+
+
+def em_segundo_plano(
+    itens: Iterable[T], capacidade: int = 2, nome: str = "estagio"
+) -> Iterator[T]:
+    """Itera `itens` numa thread à parte, com até `capacidade` itens prontos à frente.
+
+    Os itens chegam na ordem e uma exceção do produtor é relançada no
+    consumidor, no ponto em que ele chegaria. Se o consumidor parar antes
+    do fim (break, exceção ou `close()`), o produtor é interrompido no
+    próximo item e a thread termina antes do retorno, então a fonte (um
+    arquivo, um stream do S3) pode ser reposicionada ou fechada em
+    seguida. Com `capacidade` 0, itera na própria thread.
+    """
+    if capacidade <= 0:
+        yield from itens
+        return
+
+    fila = queue.Queue(maxsize=capacidade)
+    parar = threading.Event()
+
+    def colocar(item) -> bool:
+        while not parar.is_set():
+            try:
+                fila.put(item, timeout=_ESPERA_S)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produzir():
+        iterador = iter(itens)
+        try:
+            for item in iterador:
+                if not colocar(item):
+                    break
+        except BaseException as e:
+            colocar(_Erro(e))
+        else:
+            colocar(_FIM)
+        finally:
+            fechar = getattr(iterador, "close", None)
+            if fechar is not None:
+                try:
+                    fechar()
+                except Exception as e:
+                    logger.warning(f"Erro ao fechar o estágio {nome}: {e}")
+
+    thread = threading.Thread(target=produzir, name=nome, daemon=True)
+    thread.start()
+    try:
+        while True:
+            item = fila.get()
+            if item is _FIM:
+                return
+            if isinstance(item, _Erro):
+                raise item.excecao
+            yield item
+    finally:
+        parar.set()
+        # Libera um produtor que espera vaga e aguarda a thread largar a fonte
+        while thread.is_alive():
+            try:
+                fila.get(timeout=_ESPERA_S)
+            except queue.Empty:
+                pass
+        thread.join()
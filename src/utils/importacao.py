@@ -0,0 +1,24 @@
+"""Importação tardia de dependências pesadas."""
+
+import importlib
+
+
+class ModuloTardio:
+    """Proxy que só importa o módulo no primeiro acesso a um atributo.
+
+    Usado para pandas/pyarrow: importá-los custa centenas de milissegundos,
+    e o cold start da Lambda não deve pagar isso antes de haver um CSV.
+    """
+
+    def __init__(self, nome: str):
+        self._nome = nome
+        self._modulo = None
+
+    def __getattr__(self, atributo: str):
+        if self._modulo is None:
+            self._modulo = importlib.import_module(self._nome)
+        return getattr(self._modulo, atributo)
+
+    def __repr__(self) -> str:
+        estado = "carregado" if self._modulo is not None else "não carregado"
+        return f"<ModuloTardio {self._nome} ({estado})>"
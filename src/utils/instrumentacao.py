@@ -0,0 +1,212 @@
+"""Instrumentação por etapa: tempo, CPU, bytes, linhas e memória.
+
+Cada etapa medida vira um evento structlog com os campos e, opcionalmente,
+uma linha no CloudWatch Embedded Metric Format (EMF) na saída padrão, que a
+Lambda transforma em métricas sem chamadas à API do CloudWatch.
+"""
+
+import json
+import sys
+import time
+from typing import Dict, List, Optional, TextIO
+from .logger import obter_logger
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# ru_maxrss vem em KB no Linux e em bytes no macOS
+_DIVISOR_MAXRSS = 1024 * 1024 if sys.platform == "darwin" else 1024
+
+NAMESPACE_PADRAO = "CsvIngestao"
+
+METRICAS_EMF = (
+    ("duracao_ms", "Milliseconds"),
+    ("cpu_ms", "Milliseconds"),
+    ("linhas", "Count"),
+    ("bytes_entrada", "Bytes"),
+    ("bytes_saida", "Bytes"),
+    ("memoria_processo_pico_mb", "Megabytes"),
+    ("memoria_aumento_pico_mb", "Megabytes"),
+)
+
+
+def memoria_processo_pico_mb() -> Optional[float]:
+    """Maior memória residente do processo desde que ele começou (high-water mark), em MB."""
+    if resource is None:
+        return None
+    return round(
+        resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / _DIVISOR_MAXRSS, 1
+    )
+
+
+class MedicaoEtapa:
+    """Medição de uma etapa; quem a usa preenche linhas e bytes.
+
+    A CPU é a do processo inteiro (inclui as threads de download e upload
+    da etapa). A memória não é da etapa: `memoria_processo_pico_mb` é o
+    maior uso do processo desde que ele começou (o ru_maxrss), que numa
+    Lambda reaproveitada inclui invocações anteriores. Quanto a etapa
+    elevou esse pico vai em `memoria_aumento_pico_mb`; zero quer dizer que
+    ela coube na memória que o processo já tinha usado.
+    """
+
+    __slots__ = (
+        "nome",
+        "linhas",
+        "bytes_entrada",
+        "bytes_saida",
+        "duracao_ms",
+        "cpu_ms",
+        "memoria_processo_pico_mb",
+        "memoria_aumento_pico_mb",
+        "erro",
+        "_instrumentacao",
+        "_inicio",
+        "_inicio_cpu",
+        "_inicio_memoria",
+    )
+
+    def __init__(self, instrumentacao: "Instrumentacao", nome: str):
+        self.nome = nome
+        self.linhas = None
+        self.bytes_entrada = None
+        self.bytes_saida = None
+        self.duracao_ms = None
+        self.cpu_ms = None
+        self.memoria_processo_pico_mb = None
+        self.memoria_aumento_pico_mb = None
+        self.erro = None
+        self._instrumentacao = instrumentacao
+
+    def __enter__(self):
+        self._inicio_memoria = memoria_processo_pico_mb()
+        self._inicio_cpu = time.process_time()
+        self._inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, tipo_excecao, *_):
+        self.duracao_ms = round((time.perf_counter() - self._inicio) * 1000, 3)
+        self.cpu_ms = round((time.process_time() - self._inicio_cpu) * 1000, 3)
+        self.memoria_processo_pico_mb = memoria_processo_pico_mb()
+        if self.memoria_processo_pico_mb is not None:
+            self.memoria_aumento_pico_mb = round(
+                self.memoria_processo_pico_mb - self._inicio_memoria, 1
+            )
+        if tipo_excecao is not None:
+            self.erro = tipo_excecao.__name__
+        self._instrumentacao._registrar(self)
+        return False
+
+    def campos(self) -> dict:
+        """Campos preenchidos da medição, sem os vazios."""
+        valores = {
+            "etapa": self.nome,
+            "duracao_ms": self.duracao_ms,
+            "cpu_ms": self.cpu_ms,
+            "linhas": self.linhas,
+            "bytes_entrada": self.bytes_entrada,
+            "bytes_saida": self.bytes_saida,
+            "memoria_processo_pico_mb": self.memoria_processo_pico_mb,
+            "memoria_aumento_pico_mb": self.memoria_aumento_pico_mb,
+            "erro": self.erro,
+        }
+        return {nome: valor for nome, valor in valores.items() if valor is not None}
+
+
+class _EtapaInativa:
+    """Etapa que não mede nada; atribuições são descartadas."""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        return False
+
+    def __setattr__(self, nome, valor):
+        pass
+
+
+_ETAPA_INATIVA = _EtapaInativa()
+
+
+class Instrumentacao:
+    """Mede etapas com `with instrumentacao.etapa("nome") as etapa:`.
+
+    Desabilitada, `etapa()` devolve sempre o mesmo objeto inerte: o custo é
+    uma chamada de método por etapa. `propriedades` (ex.: o arquivo de
+    origem) acompanham cada evento e cada linha EMF, sem virar dimensão.
+    """
+
+    def __init__(
+        self,
+        habilitada: bool = False,
+        emf: bool = True,
+        namespace: str = NAMESPACE_PADRAO,
+        saida: Optional[TextIO] = None,
+        **propriedades
+    ):
+        self.habilitada = habilitada
+        self.emf = emf
+        self.namespace = namespace
+        self.saida = saida
+        self.propriedades = propriedades
+        self.medicoes: List[MedicaoEtapa] = []
+        self._logger = obter_logger(__name__) if self.habilitada else None
+
+    def etapa(self, nome: str):
+        if not self.habilitada:
+            return _ETAPA_INATIVA
+        return MedicaoEtapa(self, nome)
+
+    def reiniciar(self, **propriedades):
+        """Descarta as medições e troca as propriedades (ex.: novo arquivo)."""
+        self.medicoes = []
+        self.propriedades = propriedades
+
+    def resumo(self) -> Dict[str, dict]:
+        """Campos de cada etapa medida, por nome; etapas repetidas são somadas."""
+        resumo = {}
+        for medicao in self.medicoes:
+            campos = medicao.campos()
+            campos.pop("etapa")
+            atual = resumo.setdefault(medicao.nome, {})
+            for nome, valor in campos.items():
+                if nome in ("memoria_processo_pico_mb", "erro") or nome not in atual:
+                    atual[nome] = valor
+                else:
+                    atual[nome] = round(atual[nome] + valor, 3)
+        return resumo
+
+    def _registrar(self, medicao: MedicaoEtapa):
+        self.medicoes.append(medicao)
+        campos = medicao.campos()
+        self._logger.info("etapa_concluida", **self.propriedades, **campos)
+        if self.emf:
+            self._emitir_emf(campos)
+
+    def _emitir_emf(self, campos: dict):
+        metricas = [
+            {"Name": nome, "Unit": unidade}
+            for nome, unidade in METRICAS_EMF
+            if nome in campos
+        ]
+        documento = {
+            "_aws": {
+                "Timestamp": int(time.time() * 1000),
+                "CloudWatchMetrics": [
+                    {
+                        "Namespace": self.namespace,
+                        "Dimensions": [["etapa"]],
+                        "Metrics": metricas,
+                    }
+                ],
+            },
+            **self.propriedades,
+            **campos,
+        }
+        saida = self.saida or sys.stdout
+        saida.write(json.dumps(documento, default=str) + "\n")
@@ -0,0 +1,242 @@
+"""Leitura e escrita de objetos S3 em streaming."""
+
+import io
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+MB = 1024 * 1024
+TAMANHO_MINIMO_PARTE = 5 * MB  # mínimo do S3 para partes que não são a última
+
+
+class LeitorS3Paralelo(io.RawIOBase):
+    """Arquivo somente-leitura sobre um objeto S3, lido por GETs com Range.
+
+    Mantém até `concorrencia` partes de `tamanho_parte` bytes sendo baixadas à
+    frente da posição atual, então a memória fica limitada a
+    `concorrencia * tamanho_parte` e a transferência usa várias conexões.
+    """
+
+    def __init__(
+        self,
+        s3,
+        bucket: str,
+        chave: str,
+        tamanho_parte: int = 8 * MB,
+        concorrencia: int = 4,
+        tamanho: int = None,
+    ):
+        super().__init__()
+        self.s3 = s3
+        self.bucket = bucket
+        self.chave = chave
+        self.tamanho_parte = tamanho_parte
+        self.concorrencia = max(1, concorrencia)
+        if tamanho is None:
+            tamanho = s3.head_object(Bucket=bucket, Key=chave)["ContentLength"]
+        self.tamanho = tamanho
+        self._posicao = 0
+        self._partes = {}
+        self._executor = ThreadPoolExecutor(max_workers=self.concorrencia)
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._posicao
+
+    def seek(self, deslocamento: int, origem: int = io.SEEK_SET) -> int:
+        if origem == io.SEEK_CUR:
+            deslocamento += self._posicao
+        elif origem == io.SEEK_END:
+            deslocamento += self.tamanho
+        self._posicao = max(0, deslocamento)
+        return self._posicao
+
+    def _baixar_parte(self, indice: int) -> bytes:
+        inicio = indice * self.tamanho_parte
+        fim = min(inicio + self.tamanho_parte, self.tamanho) - 1
+        resposta = self.s3.get_object(
+            Bucket=self.bucket, Key=self.chave, Range=f"bytes={inicio}-{fim}"
+        )
+        return resposta["Body"].read()
+
+    def _obter_parte(self, indice: int) -> bytes:
+        total_partes = -(-self.tamanho // self.tamanho_parte)
+        janela = range(indice, min(indice + self.concorrencia, total_partes))
+
+        # Descarta partes fora da janela (já consumidas ou após um seek)
+        for antiga in [i for i in self._partes if i not in janela]:
+            self._partes.pop(antiga).cancel()
+
+        for i in janela:
+            if i not in self._partes:
+                self._partes[i] = self._executor.submit(self._baixar_parte, i)
+
+        return self._partes[indice].result()
+
+    def readinto(self, buffer) -> int:
+        if self.closed:
+            raise ValueError("Leitura em arquivo fechado")
+
+        # Preenche o buffer inteiro, atravessando partes se preciso
+        copiados = 0
+        while copiados < len(buffer) and self._posicao < self.tamanho:
+            indice, deslocamento = divmod(self._posicao, self.tamanho_parte)
+            parte = self._obter_parte(indice)
+            quantidade = min(len(buffer) - copiados, len(parte) - deslocamento)
+            fim_buffer, fim_parte = copiados + quantidade, deslocamento + quantidade
+            buffer[copiados:fim_buffer] = parte[deslocamento:fim_parte]
+            copiados += quantidade
+            self._posicao += quantidade
+        return copiados
+
+    def readall(self) -> bytes:
+        pedacos = []
+        while True:
+            pedaco = self.read(self.tamanho_parte)
+            if not pedaco:
+                return b"".join(pedacos)
+            pedacos.append(pedaco)
+
+    def close(self):
+        if not self.closed:
+            for futuro in self._partes.values():
+                futuro.cancel()
+            self._partes.clear()
+            self._executor.shutdown(wait=False)
+        super().close()
+
+
+class EscritorMultipartS3(io.RawIOBase):
+    """Arquivo somente-escrita que envia os dados como upload multipart.
+
+    Cada `tamanho_parte` bytes escritos viram uma parte enviada em segundo
+    plano; no máximo `concorrencia` partes ficam em memória ao mesmo tempo.
+    Objetos menores que uma parte são gravados com um único `put_object`.
+    Se o bloco `with` terminar com exceção, o upload é abortado.
+    """
+
+    def __init__(
+        self,
+        s3,
+        bucket: str,
+        chave: str,
+        tamanho_parte: int = 8 * MB,
+        concorrencia: int = 4,
+    ):
+        super().__init__()
+        if tamanho_parte < TAMANHO_MINIMO_PARTE:
+            raise ValueError(
+                f"tamanho_parte deve ser ao menos {TAMANHO_MINIMO_PARTE} bytes"
+            )
+        self.s3 = s3
+        self.bucket = bucket
+        self.chave = chave
+        self.tamanho_parte = tamanho_parte
+        self._buffer = bytearray()
+        self._escritos = 0
+        self._upload_id = None
+        self._futuros = []
+        self._vagas = threading.BoundedSemaphore(max(1, concorrencia))
+        self._executor = ThreadPoolExecutor(max_workers=max(1, concorrencia))
+
+    def writable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._escritos
+
+    def write(self, dados) -> int:
+        if self.closed:
+            raise ValueError("Escrita em arquivo fechado")
+        self._buffer += dados
+        self._escritos += len(dados)
+        while len(self._buffer) >= self.tamanho_parte:
+            self._enviar_parte(bytes(self._buffer[: self.tamanho_parte]))
+            del self._buffer[: self.tamanho_parte]
+        return len(dados)
+
+    def _enviar_parte(self, dados: bytes):
+        if self._upload_id is None:
+            resposta = self.s3.create_multipart_upload(
+                Bucket=self.bucket, Key=self.chave
+            )
+            self._upload_id = resposta["UploadId"]
+
+        numero = len(self._futuros) + 1
+        self._vagas.acquire()  # backpressure: espera uma parte em voo terminar
+        futuro = self._executor.submit(self._upload_parte, numero, dados)
+        futuro.add_done_callback(lambda _: self._vagas.release())
+        self._futuros.append(futuro)
+
+    def _upload_parte(self, numero: int, dados: bytes) -> dict:
+        resposta = self.s3.upload_part(
+            Bucket=self.bucket,
+            Key=self.chave,
+            UploadId=self._upload_id,
+            PartNumber=numero,
+            Body=dados,
+        )
+        return {"PartNumber": numero, "ETag": resposta["ETag"]}
+
+    def close(self):
+        if self.closed:
+            return
+        try:
+            if self._upload_id is None:
+                self.s3.put_object(
+                    Bucket=self.bucket, Key=self.chave, Body=bytes(self._buffer)
+                )
+            else:
+                if self._buffer:
+                    self._enviar_parte(bytes(self._buffer))
+                partes = [futuro.result() for futuro in self._futuros]
+                self.s3.complete_multipart_upload(
+                    Bucket=self.bucket,
+                    Key=self.chave,
+                    UploadId=self._upload_id,
+                    MultipartUpload={"Parts": partes},
+                )
+            logger.info(
+                f"Escrito s3://{self.bucket}/{self.chave} ({self._escritos} bytes)"
+            )
+        except Exception:
+            self.abortar()
+            raise
+        finally:
+            self._buffer = bytearray()
+            self._executor.shutdown(wait=True)
+            super().close()
+
+    def abortar(self):
+        """Cancela o upload multipart e descarta as partes já enviadas."""
+        for futuro in self._futuros:
+            futuro.cancel()
+        if self._upload_id is not None:
+            try:
+                self.s3.abort_multipart_upload(
+                    Bucket=self.bucket, Key=self.chave, UploadId=self._upload_id
+                )
+            except Exception as e:
+                logger.error(f"Erro ao abortar upload multipart: {e}")
+            self._upload_id = None
+        self._buffer = bytearray()
+        self._executor.shutdown(wait=False)
+        if not self.closed:
+            super().close()
+
+    def excluir(self):
+        """Remove o objeto já publicado por `close` (ex.: a conversão falhou depois)."""
+        self.s3.delete_object(Bucket=self.bucket, Key=self.chave)
+
+    def __exit__(self, tipo, valor, rastreamento):
+        if tipo is not None:
+            self.abortar()
+        else:
+            self.close()
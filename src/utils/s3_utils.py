@@ -1,15 +1,72 @@
 """Utilitários para AWS S3."""
 import boto3
 import logging
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from itertools import islice
+from typing import Iterable, Iterator, List, Optional, Tuple
+from botocore.config import Config
+from botocore.exceptions import ClientError
+from .s3_stream import LeitorS3Paralelo, EscritorMultipartS3, MB
 
 logger = logging.getLogger(__name__)
 
+# Máximo de chaves por chamada de delete_objects
+LIMITE_DELETE_OBJECTS = 1000
+
+
+def _em_lotes(itens: Iterable, tamanho: int) -> Iterator[list]:
+    iterador = iter(itens)
+    while True:
+        lote = list(islice(iterador, tamanho))
+        if not lote:
+            return
+        yield lote
+
+
+def _descrever(obj: dict) -> dict:
+    return {'key': obj['Key'], 'size': obj['Size'], 'last_modified': obj['LastModified'],
+            'etag': obj['ETag'].strip('"')}
+
+
+def _mapear_limitado(funcao, itens: Iterable, concorrencia: int) -> Iterator[tuple]:
+    """Aplica `funcao` aos itens em threads, gerando (item, resultado) na ordem.
+    
+    No máximo 2x `concorrencia` itens ficam pendentes, então a entrada pode
+    ser um gerador grande sem ser materializada.
+    """
+    pendentes = deque()
+    with ThreadPoolExecutor(max_workers=concorrencia) as executor:
+        for item in itens:
+            pendentes.append((item, executor.submit(funcao, item)))
+            if len(pendentes) >= 2 * concorrencia:
+                item_pronto, futuro = pendentes.popleft()
+                yield item_pronto, futuro.result()
+        while pendentes:
+            item_pronto, futuro = pendentes.popleft()
+            yield item_pronto, futuro.result()
+
 
 class ClienteS3:
     """Cliente simplificado para operações S3."""
     
-    def __init__(self, regiao: str = "us-east-1"):
-        self.s3 = boto3.client('s3', region_name=regiao)
+    def __init__(self, regiao: str = "us-east-1", max_conexoes: int = 10):
+        # Clientes boto3 são thread-safe; o pool precisa comportar as threads que o usam
+        self.regiao = regiao
+        self.max_conexoes = max_conexoes
+        self.s3 = boto3.client(
+            's3',
+            region_name=regiao,
+            config=Config(max_pool_connections=max_conexoes)
+        )
+    
+    def __getstate__(self):
+        # O cliente boto3 não é serializável: outro processo (ex.: leitura em
+        # fragmentos) recria o seu com os mesmos parâmetros
+        return {'regiao': self.regiao, 'max_conexoes': self.max_conexoes}
+    
+    def __setstate__(self, estado: dict):
+        self.__init__(**estado)
     
     def ler_csv_do_s3(self, bucket: str, chave: str) -> bytes:
         """Lê arquivo do S3."""
@@ -17,6 +74,33 @@ class ClienteS3:
         resposta = self.s3.get_object(Bucket=bucket, Key=chave)
         return resposta['Body'].read()
     
+    def ler_buffer(self, bucket: str, chave: str) -> bytes:
+        """Conteúdo do objeto para o parser; no S3, os bytes baixados (ver ClienteArquivosLocal)."""
+        return self.ler_csv_do_s3(bucket, chave)
+    
+    def ler_inicio(self, bucket: str, chave: str, tamanho: int) -> bytes:
+        """Lê só os primeiros `tamanho` bytes do objeto (GET com Range)."""
+        logger.info(f"Lendo {tamanho} bytes iniciais de s3://{bucket}/{chave}")
+        return self.ler_intervalo(bucket, chave, 0, tamanho)
+    
+    def ler_intervalo(self, bucket: str, chave: str, inicio: int, tamanho: int) -> bytes:
+        """Lê até `tamanho` bytes a partir de `inicio` (GET com Range); além do fim, b""."""
+        try:
+            resposta = self.s3.get_object(Bucket=bucket, Key=chave,
+                                          Range=f"bytes={inicio}-{inicio + tamanho - 1}")
+        except ClientError as e:
+            # Objeto vazio ou início depois do fim: o Range é inválido
+            if e.response['Error']['Code'] == 'InvalidRange':
+                return b""
+            raise
+        return resposta['Body'].read()
+    
+    def abrir_leitura(self, bucket: str, chave: str, tamanho_parte_mb: int = 8,
+                      concorrencia: int = 4) -> LeitorS3Paralelo:
+        """Abre objeto do S3 como arquivo lido por GETs paralelos com Range."""
+        logger.info(f"Abrindo leitura s3://{bucket}/{chave}")
+        return LeitorS3Paralelo(self.s3, bucket, chave, tamanho_parte_mb * MB, concorrencia)
+    
     def escrever_no_s3(self, dados: bytes, bucket: str, chave: str) -> bool:
         """Escreve dados no S3."""
         try:
@@ -27,13 +111,20 @@ class ClienteS3:
             logger.error(f"Erro ao escrever no S3: {e}")
             return False
     
-    def copiar_objeto(self, bucket_origem: str, chave_origem: str, 
-                     bucket_destino: str, chave_destino: str) -> bool:
+    def abrir_escrita(self, bucket: str, chave: str, tamanho_parte_mb: int = 8,
+                      concorrencia: int = 4) -> EscritorMultipartS3:
+        """Abre arquivo de escrita que envia as partes ao S3 conforme são produzidas."""
+        logger.info(f"Abrindo escrita s3://{bucket}/{chave}")
+        return EscritorMultipartS3(self.s3, bucket, chave, tamanho_parte_mb * MB, concorrencia)
+    
+    def copiar_objeto(self, bucket_origem: str, chave_origem: str,
+                      bucket_destino: str, chave_destino: str) -> bool:
         """Copia objeto de um local S3 para outro."""
         try:
             origem = {'Bucket': bucket_origem, 'Key': chave_origem}
             self.s3.copy(origem, bucket_destino, chave_destino)
-            logger.info(f"Copiado de {bucket_origem}/{chave_origem} para {bucket_destino}/{chave_destino}")
+            logger.info(f"Copiado de {bucket_origem}/{chave_origem} "
+                        f"para {bucket_destino}/{chave_destino}")
             return True
         except Exception as e:
             logger.error(f"Erro ao copiar objeto: {e}")
@@ -49,23 +140,159 @@ class ClienteS3:
             logger.error(f"Erro ao deletar objeto: {e}")
             return False
     
-    def listar_objetos(self, bucket: str, prefixo: str = "") -> list:
-        """Lista objetos no bucket com prefixo opcional."""
+    def iterar_objetos(self, bucket: str, prefixo: str = "", detalhado: bool = False) -> Iterator:
+        """Percorre todos os objetos do prefixo, página a página (1000 por chamada).
+        
+        Com `detalhado`, gera dicts com key, size, last_modified e etag; senão, chaves.
+        """
+        paginador = self.s3.get_paginator('list_objects_v2')
+        for pagina in paginador.paginate(Bucket=bucket, Prefix=prefixo):
+            for obj in pagina.get('Contents', []):
+                yield _descrever(obj) if detalhado else obj['Key']
+    
+    def listar_prefixos(self, bucket: str, prefixo: str = "", delimitador: str = "/") -> List[str]:
+        """Lista os "subdiretórios" imediatos de um prefixo."""
+        return self._listar_nivel(bucket, prefixo, delimitador)[1]
+    
+    def _listar_nivel(self, bucket: str, prefixo: str, delimitador: str = "/") -> tuple:
+        """Objetos e subprefixos imediatos de um prefixo: (objetos, prefixos)."""
+        paginador = self.s3.get_paginator('list_objects_v2')
+        objetos, prefixos = [], []
+        for pagina in paginador.paginate(Bucket=bucket, Prefix=prefixo, Delimiter=delimitador):
+            objetos.extend(pagina.get('Contents', []))
+            prefixos.extend(item['Prefix'] for item in pagina.get('CommonPrefixes', []))
+        return objetos, prefixos
+    
+    def iterar_objetos_paralelo(self, bucket: str, prefixo: str = "", detalhado: bool = False,
+                                concorrencia: int = 8) -> Iterator:
+        """Como `iterar_objetos`, mas lista os subprefixos de `prefixo` em paralelo.
+        
+        Útil em layouts particionados (`ano=/mes=/...`), onde cada subprefixo
+        é paginado independentemente. A ordem dos objetos não é garantida.
+        """
+        # Objetos soltos no próprio prefixo saem direto; os subprefixos, em paralelo
+        objetos, subprefixos = self._listar_nivel(bucket, prefixo)
+        for obj in objetos:
+            yield _descrever(obj) if detalhado else obj['Key']
+        if not subprefixos:
+            return
+        
+        with ThreadPoolExecutor(max_workers=min(concorrencia, len(subprefixos))) as executor:
+            futuros = [
+                executor.submit(lambda sub: list(self.iterar_objetos(bucket, sub, detalhado)), sub)
+                for sub in subprefixos
+            ]
+            for futuro in as_completed(futuros):
+                yield from futuro.result()
+    
+    def listar_objetos(self, bucket: str, prefixo: str = "", detalhado: bool = False) -> list:
+        """Lista todos os objetos no bucket com prefixo opcional.
+        
+        Com `detalhado`, retorna dicts com key, size, last_modified e etag.
+        """
         try:
-            resposta = self.s3.list_objects_v2(Bucket=bucket, Prefix=prefixo)
-            if 'Contents' in resposta:
-                return [obj['Key'] for obj in resposta['Contents']]
-            return []
+            return list(self.iterar_objetos(bucket, prefixo, detalhado))
         except Exception as e:
             logger.error(f"Erro ao listar objetos: {e}")
             return []
     
+    def deletar_objetos(self, bucket: str, chaves: Iterable[str], concorrencia: int = 4) -> dict:
+        """Deleta objetos em lotes de 1000 com `delete_objects`.
+        
+        Retorna {'deletados': n, 'erros': [chaves que falharam]}.
+        """
+        resultado = {'deletados': 0, 'erros': []}
+        
+        def deletar_lote(lote: List[str]) -> List[str]:
+            try:
+                resposta = self.s3.delete_objects(
+                    Bucket=bucket,
+                    Delete={'Objects': [{'Key': chave} for chave in lote], 'Quiet': True}
+                )
+                return [erro['Key'] for erro in resposta.get('Errors', [])]
+            except Exception as e:
+                logger.error(f"Erro ao deletar lote de {len(lote)} objetos: {e}")
+                return list(lote)
+        
+        lotes = _em_lotes(chaves, LIMITE_DELETE_OBJECTS)
+        for lote, erros in _mapear_limitado(deletar_lote, lotes, concorrencia):
+            resultado['deletados'] += len(lote) - len(erros)
+            resultado['erros'].extend(erros)
+        logger.info(f"Deletados {resultado['deletados']} objetos de s3://{bucket} "
+                    f"({len(resultado['erros'])} erros)")
+        return resultado
+    
+    def copiar_objetos(self, copias: Iterable[Tuple[str, str, str, str]],
+                       concorrencia: Optional[int] = None) -> dict:
+        """Copia objetos em paralelo no servidor, reaproveitando o pool do cliente.
+        
+        `copias` são tuplas (bucket_origem, chave_origem, bucket_destino,
+        chave_destino). Retorna {'copiados': n, 'erros': [copias que falharam]}.
+        """
+        concorrencia = concorrencia or self.max_conexoes
+        resultado = {'copiados': 0, 'erros': []}
+        
+        def copiar(copia: tuple) -> bool:
+            bucket_origem, chave_origem, bucket_destino, chave_destino = copia
+            origem = {'Bucket': bucket_origem, 'Key': chave_origem}
+            try:
+                try:
+                    self.s3.copy_object(CopySource=origem, Bucket=bucket_destino, Key=chave_destino)
+                except ClientError as e:
+                    if e.response['Error']['Code'] != 'InvalidRequest':
+                        raise
+                    # Acima de 5 GB o CopyObject não serve; cópia multipart gerenciada
+                    self.s3.copy(origem, bucket_destino, chave_destino)
+            except Exception as e:
+                # Uma cópia que falha (inclusive a multipart) não interrompe as demais
+                logger.error(f"Erro ao copiar {bucket_origem}/{chave_origem}: {e}")
+                return False
+            return True
+        
+        for copia, sucesso in _mapear_limitado(copiar, copias, concorrencia):
+            if sucesso:
+                resultado['copiados'] += 1
+            else:
+                resultado['erros'].append(copia)
+        logger.info(f"Copiados {resultado['copiados']} objetos ({len(resultado['erros'])} erros)")
+        return resultado
+    
+    def mover_objetos(self, bucket_origem: str, chaves: Iterable[str], bucket_destino: str,
+                      prefixo_destino: str, prefixo_origem: str = "") -> dict:
+        """Move objetos para `prefixo_destino` (cópia + remoção em lote).
+        
+        `prefixo_origem` é retirado do começo das chaves no destino. Só as
+        origens copiadas com sucesso são removidas. Uma chave cujo destino é
+        ela mesma não é copiada nem removida e volta em `erros`.
+        """
+        copias = []
+        em_si_mesmas = []
+        for chave in chaves:
+            destino = (prefixo_destino + chave[len(prefixo_origem):]
+                       if chave.startswith(prefixo_origem) else prefixo_destino + chave)
+            if (bucket_destino, destino) == (bucket_origem, chave):
+                # Copiar e depois remover a origem apagaria o único exemplar
+                em_si_mesmas.append(chave)
+            else:
+                copias.append((bucket_origem, chave, bucket_destino, destino))
+        if em_si_mesmas:
+            logger.warning(f"{len(em_si_mesmas)} objetos com destino igual à origem "
+                           f"não foram movidos")
+        copia = self.copiar_objetos(copias)
+        falhas = {c[1] for c in copia['erros']}
+        remocao = self.deletar_objetos(bucket_origem, [c[1] for c in copias if c[1] not in falhas])
+        return {
+            'movidos': remocao['deletados'],
+            'erros': em_si_mesmas + [c[1] for c in copia['erros']] + remocao['erros']
+        }
+    
     def obter_metadados_objeto(self, bucket: str, chave: str) -> dict:
         """Obtém metadados de um objeto S3."""
         try:
             resposta = self.s3.head_object(Bucket=bucket, Key=chave)
             return {
                 'size': resposta.get('ContentLength', 0),
+                'etag': resposta.get('ETag', '').strip('"'),
                 'last_modified': resposta.get('LastModified'),
                 'content_type': resposta.get('ContentType', '')
             }
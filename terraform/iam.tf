@@ -39,6 +39,11 @@ resource "aws_iam_role_policy" "lambda_policy" {
         Effect = "Allow"
         Action = ["logs:*"]
         Resource = "*"
+      },
+      {
+        Effect = "Allow"
+        Action = ["sqs:ReceiveMessage", "sqs:DeleteMessage", "sqs:GetQueueAttributes"]
+        Resource = "arn:aws:sqs:${var.aws_region}:*:${var.project_name}-eventos-raw"
       }
     ]
   })
@@ -22,6 +22,8 @@ resource "aws_lambda_function" "csv_ingestor" {
       RAW_BUCKET_NAME       = aws_s3_bucket.raw_data.id
       DATA_LAKE_BUCKET_NAME = aws_s3_bucket.data_lake.id
       GLUE_DATABASE         = aws_glue_catalog_database.data_lake.name
+      INGESTION_MANIFEST    = "true"
+      MICRO_BATCH           = var.micro_batch_enabled ? "true" : "false"
     }
   }
   
@@ -36,3 +38,42 @@ resource "aws_lambda_permission" "allow_s3" {
   principal     = "s3.amazonaws.com"
   source_arn    = aws_s3_bucket.raw_data.arn
 }
+
+# Função Lambda para compactar arquivos pequenos do Data Lake
+resource "aws_lambda_function" "compactador" {
+  filename         = data.archive_file.lambda_zip.output_path
+  function_name    = "${var.project_name}-compactador"
+  role            = aws_iam_role.lambda_execution.arn
+  handler         = "lambda_functions.compactador.lambda_handler"
+  source_code_hash = data.archive_file.lambda_zip.output_base64sha256
+  runtime         = "python3.9"
+  timeout         = 900
+  memory_size     = 3008
+  
+  environment {
+    variables = {
+      DATA_LAKE_BUCKET_NAME = aws_s3_bucket.data_lake.id
+      COMPACTION_TARGET_MB  = "256"
+    }
+  }
+}
+
+# Agendamento diário, antes do Glue Crawler (2h UTC)
+resource "aws_cloudwatch_event_rule" "compactacao_diaria" {
+  name                = "${var.project_name}-compactacao-diaria"
+  schedule_expression = "cron(0 1 * * ? *)"
+}
+
+resource "aws_cloudwatch_event_target" "compactacao_diaria" {
+  rule = aws_cloudwatch_event_rule.compactacao_diaria.name
+  arn  = aws_lambda_function.compactador.arn
+}
+
+# Permissão EventBridge → Lambda
+resource "aws_lambda_permission" "allow_eventbridge_compactador" {
+  statement_id  = "AllowEventBridgeInvoke"
+  action        = "lambda:InvokeFunction"
+  function_name = aws_lambda_function.compactador.function_name
+  principal     = "events.amazonaws.com"
+  source_arn    = aws_cloudwatch_event_rule.compactacao_diaria.arn
+}
@@ -46,24 +46,28 @@ resource "aws_s3_bucket_public_access_block" "data_lake" {
   restrict_public_buckets = true
 }
 
-# Notificação S3 → Lambda
+# Notificação S3 → Lambda, ou S3 → SQS no modo de micro-lotes
 resource "aws_s3_bucket_notification" "raw_data_notification" {
   bucket = aws_s3_bucket.raw_data.id
   
-  lambda_function {
-    lambda_function_arn = aws_lambda_function.csv_ingestor.arn
-    events              = ["s3:ObjectCreated:*"]
-    filter_suffix       = ".csv"
+  # CSVs simples, comprimidos e .zip de CSVs
+  dynamic "lambda_function" {
+    for_each = var.micro_batch_enabled ? [] : [".csv", ".csv.gz", ".csv.bz2", ".csv.zst", ".zip"]
+    content {
+      lambda_function_arn = aws_lambda_function.csv_ingestor.arn
+      events              = ["s3:ObjectCreated:*"]
+      filter_suffix       = lambda_function.value
+    }
   }
   
-  depends_on = [aws_lambda_permission.allow_s3]
-}
-  lambda_function {
-    lambda_function_arn = aws_lambda_function.csv_ingestor.arn
-    events              = ["s3:ObjectCreated:*"]
-    filter_prefix       = "input/"
-    filter_suffix       = ".csv"
+  dynamic "queue" {
+    for_each = var.micro_batch_enabled ? [".csv", ".csv.gz", ".csv.bz2", ".csv.zst", ".zip"] : []
+    content {
+      queue_arn     = aws_sqs_queue.eventos_raw[0].arn
+      events        = ["s3:ObjectCreated:*"]
+      filter_suffix = queue.value
+    }
   }
   
-  depends_on = [aws_lambda_permission.allow_s3]
+  depends_on = [aws_lambda_permission.allow_s3, aws_sqs_queue_policy.eventos_raw]
 }
@@ -0,0 +1,46 @@
+# Fila de eventos do bucket raw, usada no modo de micro-lotes (micro_batch_enabled)
+resource "aws_sqs_queue" "eventos_raw_dlq" {
+  count                     = var.micro_batch_enabled ? 1 : 0
+  name                      = "${var.project_name}-eventos-raw-dlq"
+  message_retention_seconds = 1209600
+}
+
+resource "aws_sqs_queue" "eventos_raw" {
+  count = var.micro_batch_enabled ? 1 : 0
+  name  = "${var.project_name}-eventos-raw"
+  
+  # Acima do timeout da Lambda, para um lote em andamento não ser reentregue
+  visibility_timeout_seconds = 6 * aws_lambda_function.csv_ingestor.timeout
+  
+  redrive_policy = jsonencode({
+    deadLetterTargetArn = aws_sqs_queue.eventos_raw_dlq[0].arn
+    maxReceiveCount     = 5
+  })
+}
+
+# Permissão S3 → SQS
+resource "aws_sqs_queue_policy" "eventos_raw" {
+  count     = var.micro_batch_enabled ? 1 : 0
+  queue_url = aws_sqs_queue.eventos_raw[0].id
+  
+  policy = jsonencode({
+    Version = "2012-10-17"
+    Statement = [{
+      Effect    = "Allow"
+      Principal = { Service = "s3.amazonaws.com" }
+      Action    = "sqs:SendMessage"
+      Resource  = aws_sqs_queue.eventos_raw[0].arn
+      Condition = { ArnEquals = { "aws:SourceArn" = aws_s3_bucket.raw_data.arn } }
+    }]
+  })
+}
+
+# SQS → Lambda: a janela de lote acumula eventos; só as mensagens com falha voltam à fila
+resource "aws_lambda_event_source_mapping" "eventos_raw" {
+  count                              = var.micro_batch_enabled ? 1 : 0
+  event_source_arn                   = aws_sqs_queue.eventos_raw[0].arn
+  function_name                      = aws_lambda_function.csv_ingestor.arn
+  batch_size                         = var.micro_batch_size
+  maximum_batching_window_in_seconds = var.micro_batch_window_seconds
+  function_response_types            = ["ReportBatchItemFailures"]
+}
@@ -49,3 +49,21 @@ variable "log_retention_days" {
   type        = number
   default     = 7
 }
+
+variable "micro_batch_enabled" {
+  description = "Entregar os eventos do bucket raw por uma fila SQS e ingerir os CSVs pequenos em micro-lotes"
+  type        = bool
+  default     = false
+}
+
+variable "micro_batch_window_seconds" {
+  description = "Janela de lote da fila: tempo máximo acumulando eventos antes de invocar a Lambda"
+  type        = number
+  default     = 60
+}
+
+variable "micro_batch_size" {
+  description = "Máximo de eventos por invocação no modo de micro-lotes"
+  type        = number
+  default     = 500
+}
@@ -0,0 +1,122 @@
+"""
+Testes para o armazenamento em diretório local.
+"""
+
+import gzip
+import mmap
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+from botocore.exceptions import ClientError
+from src.config.settings import config
+from src.ingestion.csv_processor import ProcessadorCSV
+from src.ingestion.pipeline import PipelineIngestao
+from src.ingestion.processador_arrow import ProcessadorArrow
+from src.utils.armazenamento_local import ClienteArquivosLocal
+
+
+def teste_leitura_escrita_e_listagem(tmp_path):
+    """Testa gravação, listagem por prefixo e o erro NoSuchKey do S3 em chave ausente."""
+    cliente = ClienteArquivosLocal(str(tmp_path))
+    assert cliente.escrever_no_s3(b"a", "bucket", "data/ano=2024/x.parquet")
+    assert cliente.escrever_no_s3(b"bb", "bucket", "data/ano=2025/y.parquet")
+    assert cliente.escrever_no_s3(b"c", "bucket", "outro/z.csv")
+
+    assert cliente.listar_objetos("bucket", "data/") == [
+        "data/ano=2024/x.parquet",
+        "data/ano=2025/y.parquet",
+    ]
+    assert (
+        cliente.listar_objetos("bucket", "data/ano=2025", detalhado=True)[0]["size"]
+        == 2
+    )
+    assert cliente.ler_csv_do_s3("bucket", "outro/z.csv") == b"c"
+    with pytest.raises(ClientError) as erro:
+        cliente.ler_csv_do_s3("bucket", "nao/existe.csv")
+    assert erro.value.response["Error"]["Code"] == "NoSuchKey"
+
+
+def teste_escrita_abortada_nao_publica_arquivo(tmp_path):
+    """Testa que só a escrita fechada com sucesso aparece no destino."""
+    cliente = ClienteArquivosLocal(str(tmp_path))
+    destino = cliente.abrir_escrita("bucket", "data/a.parquet")
+    destino.write(b"parcial")
+    assert cliente.listar_objetos("bucket") == []
+
+    destino.abortar()
+    assert cliente.listar_objetos("bucket") == []
+    assert not list(tmp_path.rglob("*.parcial"))
+
+    with cliente.abrir_escrita("bucket", "data/a.parquet") as destino:
+        destino.write(b"ok")
+    assert cliente.ler_csv_do_s3("bucket", "data/a.parquet") == b"ok"
+
+    with pytest.raises(RuntimeError):
+        with cliente.abrir_escrita("bucket", "data/a.parquet") as destino:
+            destino.write(b"novo, mas incomple")
+            raise RuntimeError("falha no meio da escrita")
+    assert cliente.ler_csv_do_s3("bucket", "data/a.parquet") == b"ok"
+    assert not list(tmp_path.rglob("*.parcial"))
+
+
+def teste_leitura_por_memory_map(tmp_path):
+    """Testa que as leituras mapeiam o arquivo e que os dois motores leem delas."""
+    cliente = ClienteArquivosLocal(str(tmp_path))
+    cliente.escrever_no_s3(b"id,nome\n1,Ana\n2,Bruno\n", "bucket", "input/a.csv")
+    cliente.escrever_no_s3(b"", "bucket", "input/vazio.csv")
+
+    buffer = cliente.ler_buffer("bucket", "input/a.csv")
+    assert isinstance(buffer, mmap.mmap)
+    assert ProcessadorArrow().ler_csv(buffer).num_rows == 2
+    assert len(ProcessadorCSV().ler_csv(buffer)) == 2
+    assert cliente.ler_buffer("bucket", "input/vazio.csv") == b""
+    with cliente.abrir_leitura("bucket", "input/a.csv") as arquivo:
+        assert isinstance(arquivo, pa.MemoryMappedFile)
+        assert arquivo.read(7) == b"id,nome"
+
+
+@pytest.mark.parametrize("chave", ["input/vendas.csv", "input/vendas.csv.gz"])
+@pytest.mark.parametrize("streaming", [False, True])
+def teste_pipeline_local_de_raw_para_processed(monkeypatch, tmp_path, streaming, chave):
+    """Testa o backend local (STORAGE_BACKEND=local): lê data/raw e grava em data/processed."""
+    monkeypatch.setattr(config.s3, "backend_armazenamento", "local")
+    monkeypatch.setattr(config.s3, "raiz_armazenamento_local", str(tmp_path))
+    monkeypatch.setattr(config.processamento, "modo_streaming", streaming)
+    monkeypatch.setattr(config.processamento, "colunas_particao", [])
+    conteudo = b"id,nome\n1,Ana\n2,Bruno\n"
+    entrada = tmp_path / "raw" / chave
+    entrada.parent.mkdir(parents=True)
+    entrada.write_bytes(gzip.compress(conteudo) if chave.endswith(".gz") else conteudo)
+
+    pipeline = PipelineIngestao()
+    resultado = pipeline.processar_arquivo(config.s3.bucket_raw, chave)
+
+    assert isinstance(pipeline.cliente_s3, ClienteArquivosLocal)
+    assert resultado["sucesso"], resultado["erro"]
+    assert resultado["linhas"] == 2
+    assert (
+        pq.read_table(tmp_path / "processed" / "data" / "vendas.parquet").num_rows == 2
+    )
+
+
+@pytest.mark.parametrize("motor", ["pandas", "arrow"])
+def teste_desvio_de_esquema_rele_o_memory_map(monkeypatch, tmp_path, motor):
+    """Testa que o desvio de esquema relê o mmap do backend local desde o início."""
+    monkeypatch.setattr(config.s3, "backend_armazenamento", "local")
+    monkeypatch.setattr(config.s3, "raiz_armazenamento_local", str(tmp_path))
+    monkeypatch.setattr(config.processamento, "registro_esquemas", True)
+    monkeypatch.setattr(config.processamento, "colunas_particao", [])
+    entrada = tmp_path / "raw" / "vendas"
+    entrada.mkdir(parents=True)
+    (entrada / "a.csv").write_bytes(b"id,uf\n1,SP\n2,RJ\n")
+    (entrada / "b.csv").write_bytes(b"id,uf\n300,SP\n301,RJ\n302,MG\n")
+
+    pipeline = PipelineIngestao(motor=motor)
+    situacoes = []
+    for chave in ("vendas/a.csv", "vendas/b.csv"):
+        resultado = pipeline.processar_arquivo(config.s3.bucket_raw, chave)
+        assert resultado["sucesso"], resultado["erro"]
+        situacoes.append(resultado["esquema"])
+
+    assert situacoes == ["falha", "desvio"]
+    assert resultado["linhas"] == 3
@@ -0,0 +1,111 @@
+"""
+Testes para o reprocessamento em massa (backfill).
+"""
+
+import json
+import pytest
+import boto3
+from moto import mock_aws
+from src.config.settings import config
+from src.ingestion.backfill import LimitadorTaxa, Reprocessador
+from src.utils.armazenamento_local import ClienteArquivosLocal
+from src.utils.s3_utils import ClienteS3
+
+
+def csv_vendas(inicio, linhas=3):
+    corpo = "".join(f"{i},{i * 10}\n" for i in range(inicio, inicio + linhas))
+    return f"id,valor\n{corpo}".encode()
+
+
+@pytest.fixture
+def cliente_s3():
+    """Fixture para criar cliente S3 mockado com buckets."""
+    with mock_aws():
+        s3 = boto3.client("s3", region_name="us-east-1")
+        s3.create_bucket(Bucket="raw-bucket")
+        s3.create_bucket(Bucket=config.s3.bucket_data_lake)
+        yield ClienteS3(regiao="us-east-1")
+
+
+def teste_limitador_taxa_espaca_pedidos():
+    """Testa que o balde de fichas dorme o necessário para manter a taxa."""
+    relogio = [0.0]
+    esperas = []
+
+    def dormir(segundos):
+        esperas.append(segundos)
+        relogio[0] += segundos
+
+    limitador = LimitadorTaxa(2, relogio=lambda: relogio[0], dormir=dormir)
+    for _ in range(5):
+        limitador.aguardar()
+
+    # 2 fichas iniciais, depois uma a cada 0,5 s
+    assert esperas == [0.5, 0.5, 0.5]
+    assert LimitadorTaxa(None).aguardar(10**9) == 0.0
+
+
+def teste_backfill_retoma_pelo_checkpoint(cliente_s3, tmp_path):
+    """Testa que o backfill processa o prefixo e, ao retomar, pula o que já foi feito."""
+    for i in range(3):
+        cliente_s3.escrever_no_s3(
+            csv_vendas(i * 10), "raw-bucket", f"input/2024/vendas-{i}.csv"
+        )
+    cliente_s3.escrever_no_s3(b"ignorar", "raw-bucket", "input/2024/LEIAME.txt")
+    checkpoint = str(tmp_path / "backfill.jsonl")
+
+    resumo = Reprocessador(processos=1, checkpoint=checkpoint).executar(
+        "raw-bucket", "input/"
+    )
+
+    assert resumo["arquivos"] == 3
+    assert resumo["falhas"] == 0
+    assert resumo["linhas"] == 9
+    assert resumo["bytes"] > 0 and resumo["linhas_por_s"] > 0
+    assert len(cliente_s3.listar_objetos(config.s3.bucket_data_lake, "data/")) == 3
+    with open(checkpoint) as arquivo:
+        assert sorted(json.loads(linha)["chave"] for linha in arquivo) == [
+            f"input/2024/vendas-{i}.csv" for i in range(3)
+        ]
+
+    # Um arquivo novo e dois alterados, um deles com o mesmo tamanho (só o
+    # ETag muda): só eles rodam na retomada
+    cliente_s3.escrever_no_s3(csv_vendas(100), "raw-bucket", "input/2024/vendas-3.csv")
+    cliente_s3.escrever_no_s3(
+        csv_vendas(0, linhas=5), "raw-bucket", "input/2024/vendas-0.csv"
+    )
+    cliente_s3.escrever_no_s3(csv_vendas(30), "raw-bucket", "input/2024/vendas-1.csv")
+    resumo = Reprocessador(processos=1, checkpoint=checkpoint).executar(
+        "raw-bucket", "input/"
+    )
+
+    assert resumo["pulados"] == 1
+    assert resumo["arquivos"] == 3
+    assert resumo["linhas"] == 11
+
+
+def teste_backfill_forcado_exige_o_manifesto_de_ingestao(monkeypatch):
+    """Testa que forcar sem o manifesto é recusado: não haveria o que substituir."""
+    monkeypatch.setattr(config.processamento, "manifesto_ingestao", False)
+
+    with pytest.raises(ValueError, match="INGESTION_MANIFEST"):
+        Reprocessador(processos=1, forcar=True)
+
+
+def teste_backfill_local_em_pool_de_processos(tmp_path):
+    """Testa o backfill sobre um diretório local com mais de um processo."""
+    local = ClienteArquivosLocal(str(tmp_path))
+    for i in range(4):
+        local.escrever_no_s3(csv_vendas(i * 10), "raw", f"input/vendas-{i}.csv")
+
+    reprocessador = Reprocessador(
+        processos=2, checkpoint=None, raiz_local=str(tmp_path)
+    )
+    resumo = reprocessador.executar("raw", "input/")
+
+    assert resumo["arquivos"] == 4
+    assert resumo["falhas"] == 0
+    assert resumo["linhas"] == 12
+    gerados = local.listar_objetos(config.s3.bucket_data_lake, "data/")
+    assert len(gerados) == 4
+    assert all(chave.endswith(".parquet") for chave in gerados)
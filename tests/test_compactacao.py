@@ -0,0 +1,129 @@
+"""
+Testes para a compactação de arquivos pequenos do Data Lake.
+"""
+
+import io
+import json
+from datetime import datetime, timedelta, timezone
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+import boto3
+from moto import mock_aws
+from src.ingestion.compactacao import CompactadorDataLake
+from src.utils.s3_utils import ClienteS3
+
+BUCKET = "lake-bucket"
+
+
+@pytest.fixture
+def cliente_s3():
+    """Fixture para criar cliente S3 mockado com bucket."""
+    with mock_aws():
+        s3 = boto3.client("s3", region_name="us-east-1")
+        s3.create_bucket(Bucket=BUCKET)
+        yield ClienteS3(regiao="us-east-1")
+
+
+def gravar_parquet(cliente_s3, chave, ids):
+    buffer = io.BytesIO()
+    pq.write_table(pa.table({"id": ids, "valor": [i * 10 for i in ids]}), buffer)
+    cliente_s3.escrever_no_s3(buffer.getvalue(), BUCKET, chave)
+
+
+def ler_parquet(cliente_s3, chave):
+    return pq.read_table(io.BytesIO(cliente_s3.ler_csv_do_s3(BUCKET, chave)))
+
+
+def teste_compacta_particao_em_arquivo_ordenado(cliente_s3):
+    """Testa que os arquivos pequenos viram um só, ordenado, e as origens somem."""
+    gravar_parquet(cliente_s3, "data/ano=2024/mes=01/dia=05/a.parquet", [3, 1])
+    gravar_parquet(cliente_s3, "data/ano=2024/mes=01/dia=05/b.parquet", [2, 5])
+    gravar_parquet(cliente_s3, "data/ano=2024/mes=01/dia=05/c.parquet", [4])
+    gravar_parquet(cliente_s3, "data/ano=2024/mes=01/dia=06/d.parquet", [9])
+    compactador = CompactadorDataLake(cliente_s3, BUCKET, colunas_ordenacao=["id"])
+
+    estatisticas = compactador.executar()
+
+    chaves = cliente_s3.listar_objetos(BUCKET, "data/")
+    assert estatisticas["arquivos_lidos"] == 3
+    assert estatisticas["particoes_compactadas"] == 1
+    assert len([c for c in chaves if "dia=05" in c]) == 1
+    assert "data/ano=2024/mes=01/dia=06/d.parquet" in chaves
+    compactado = next(c for c in chaves if "dia=05" in c)
+    assert ler_parquet(cliente_s3, compactado).column("id").to_pylist() == [
+        1,
+        2,
+        3,
+        4,
+        5,
+    ]
+    assert cliente_s3.listar_objetos(BUCKET, "_compactacao/temporarios/") == []
+
+
+def teste_execucao_incremental_so_le_particoes_alteradas(cliente_s3):
+    """Testa que a segunda execução ignora partições sem arquivos novos."""
+    gravar_parquet(cliente_s3, "data/ano=2024/mes=01/dia=05/a.parquet", [1])
+    gravar_parquet(cliente_s3, "data/ano=2024/mes=01/dia=05/b.parquet", [2])
+    compactador = CompactadorDataLake(cliente_s3, BUCKET)
+    primeira = datetime.now(timezone.utc) - timedelta(hours=1)
+    compactador.executar(agora=primeira)
+
+    sem_mudancas = compactador.executar(agora=primeira + timedelta(minutes=30))
+    gravar_parquet(cliente_s3, "data/ano=2024/mes=01/dia=05/c.parquet", [3])
+    com_arquivo_novo = compactador.executar()
+
+    assert sem_mudancas["particoes_alteradas"] == 0
+    assert com_arquivo_novo["particoes_alteradas"] == 1
+    assert com_arquivo_novo["arquivos_lidos"] == 2
+
+
+def teste_conclui_troca_interrompida(cliente_s3):
+    """Testa que um diário pendente é concluído na execução seguinte."""
+    gravar_parquet(cliente_s3, "data/ano=2024/mes=01/dia=05/a.parquet", [1])
+    gravar_parquet(cliente_s3, "_compactacao/temporarios/x.parquet", [1, 2])
+    diario = {
+        "origens": ["data/ano=2024/mes=01/dia=05/a.parquet"],
+        "temporario": "_compactacao/temporarios/x.parquet",
+        "destino": "data/ano=2024/mes=01/dia=05/compactado-x.parquet",
+    }
+    cliente_s3.escrever_no_s3(
+        json.dumps(diario).encode(), BUCKET, "_compactacao/diarios/x.json"
+    )
+
+    estatisticas = CompactadorDataLake(cliente_s3, BUCKET).executar()
+
+    assert estatisticas["diarios_concluidos"] == 1
+    assert cliente_s3.listar_objetos(BUCKET, "data/") == [
+        "data/ano=2024/mes=01/dia=05/compactado-x.parquet"
+    ]
+    assert cliente_s3.listar_objetos(BUCKET, "_compactacao/diarios/") == []
+
+
+def teste_promove_tipos_e_isola_particao_com_erro(cliente_s3):
+    """Testa a promoção de int e double e o isolamento de uma partição incompatível."""
+    gravar_parquet(cliente_s3, "data/ano=2024/mes=01/dia=05/a.parquet", [1, 2])
+    gravar_parquet(cliente_s3, "data/ano=2024/mes=01/dia=05/b.parquet", [3.5])
+    gravar_parquet(cliente_s3, "data/ano=2024/mes=01/dia=06/c.parquet", [1])
+    gravar_parquet(cliente_s3, "data/ano=2024/mes=01/dia=06/d.parquet", ["x"])
+    compactador = CompactadorDataLake(cliente_s3, BUCKET, colunas_ordenacao=["id"])
+    primeira = datetime.now(timezone.utc) - timedelta(hours=1)
+
+    estatisticas = compactador.executar(agora=primeira)
+
+    assert estatisticas["particoes_compactadas"] == 1
+    assert estatisticas["particoes_com_erro"] == 1
+    compactado = next(
+        c for c in cliente_s3.listar_objetos(BUCKET, "data/") if "dia=05" in c
+    )
+    assert ler_parquet(cliente_s3, compactado).column("id").to_pylist() == [
+        1.0,
+        2.0,
+        3.5,
+    ]
+    estado = json.loads(cliente_s3.ler_csv_do_s3(BUCKET, "_compactacao/estado.json"))
+    assert estado["particoes_com_erro"] == ["data/ano=2024/mes=01/dia=06"]
+
+    # Sem arquivos novos, a partição que falhou é tentada de novo
+    segunda = compactador.executar(agora=primeira + timedelta(minutes=30))
+    assert segunda["particoes_alteradas"] == 1 and segunda["particoes_com_erro"] == 1
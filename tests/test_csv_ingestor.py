@@ -0,0 +1,177 @@
+"""
+Testes para o handler Lambda.
+"""
+
+import json
+import subprocess
+import sys
+import pytest
+import boto3
+from moto import mock_aws
+from src.config.settings import config
+from src.lambda_functions import csv_ingestor
+
+
+@pytest.fixture
+def bucket_raw(monkeypatch):
+    """Fixture com buckets mockados e três CSVs no bucket raw."""
+    monkeypatch.setattr(csv_ingestor, "_cliente_s3", None)
+    with mock_aws():
+        s3 = boto3.client("s3", region_name="us-east-1")
+        s3.create_bucket(Bucket="raw-bucket")
+        s3.create_bucket(Bucket=config.s3.bucket_data_lake)
+        for nome in ("a", "b", "c"):
+            s3.put_object(
+                Bucket="raw-bucket",
+                Key=f"input/{nome}.csv",
+                Body=b"id,valor\n1,10\n2,20\n",
+            )
+        yield "raw-bucket"
+
+
+def criar_evento(bucket, chaves):
+    """Monta um evento S3 com um registro por chave."""
+    return {
+        "Records": [
+            {"s3": {"bucket": {"name": bucket}, "object": {"key": chave}}}
+            for chave in chaves
+        ]
+    }
+
+
+@pytest.mark.parametrize("paralelismo", [1, 3])
+def teste_handler_processa_registros(bucket_raw, monkeypatch, paralelismo):
+    """Testa processamento sequencial e concorrente com resultados por registro."""
+    monkeypatch.setattr(config.processamento, "registros_paralelos", paralelismo)
+    chaves = ["input/a.csv", "input/b.csv", "input/leiame.txt", "input/c.csv"]
+
+    resposta = csv_ingestor.lambda_handler(criar_evento(bucket_raw, chaves), None)
+    corpo = json.loads(resposta["body"])
+
+    assert resposta["statusCode"] == 200
+    assert corpo["processados"] == 3
+    assert [r["origem"] for r in corpo["resultados"]] == [
+        f"{bucket_raw}/input/{nome}.csv" for nome in ("a", "b", "c")
+    ]
+    assert all("duracao_s" in r for r in corpo["resultados"])
+
+
+def teste_handler_retorna_207_com_falha_parcial(bucket_raw, monkeypatch):
+    """Testa status 207 quando parte dos registros falha."""
+    monkeypatch.setattr(config.processamento, "registros_paralelos", 2)
+    evento = criar_evento(bucket_raw, ["input/a.csv", "input/inexistente.csv"])
+
+    resposta = csv_ingestor.lambda_handler(evento, None)
+    corpo = json.loads(resposta["body"])
+
+    assert resposta["statusCode"] == 207
+    assert corpo["sucesso"] == 1
+    assert corpo["resultados"][1]["erro"]
+
+
+def teste_handler_processa_em_sequencia_arquivos_do_mesmo_feed(bucket_raw, monkeypatch):
+    """Testa que, com o índice de deduplicação, um feed não é processado em paralelo."""
+    monkeypatch.setattr(config.processamento, "registros_paralelos", 3)
+    monkeypatch.setattr(config.processamento, "indice_deduplicacao", "hashes")
+    s3 = boto3.client("s3", region_name="us-east-1")
+    s3.put_object(Bucket=bucket_raw, Key="outro/d.csv", Body=b"id,valor\n1,10\n")
+
+    assert csv_ingestor.agrupar_por_feed(
+        [0, 1, 2],
+        [
+            (bucket_raw, "input/a.csv"),
+            (bucket_raw, "outro/d.csv"),
+            (bucket_raw, "input/b.csv"),
+        ],
+    ) == [[0, 2], [1]]
+
+    evento = criar_evento(bucket_raw, ["input/a.csv", "outro/d.csv", "input/b.csv"])
+    corpo = json.loads(csv_ingestor.lambda_handler(evento, None)["body"])
+
+    # b.csv repete as linhas de a.csv: o índice gravado por a.csv já as contém
+    assert [r["linhas"] for r in corpo["resultados"]] == [2, 1, 0]
+
+
+def teste_cliente_s3_reaproveitado_entre_invocacoes(bucket_raw):
+    """Testa que o container quente reaproveita o mesmo cliente S3."""
+    csv_ingestor.lambda_handler(criar_evento(bucket_raw, ["input/a.csv"]), None)
+    cliente = csv_ingestor._cliente_s3
+
+    csv_ingestor.lambda_handler(criar_evento(bucket_raw, ["input/b.csv"]), None)
+
+    assert cliente is not None
+    assert csv_ingestor._cliente_s3 is cliente
+
+
+def teste_importar_handler_nao_carrega_pandas():
+    """Testa que o cold start não importa pandas nem pyarrow."""
+    codigo = (
+        "import sys, src.lambda_functions.csv_ingestor; "
+        "print('pandas' in sys.modules or 'pyarrow' in sys.modules)"
+    )
+    saida = subprocess.run(
+        [sys.executable, "-c", codigo], capture_output=True, text=True, check=True
+    )
+
+    assert saida.stdout.strip() == "False"
+
+
+def teste_handler_sqs_em_micro_lote(bucket_raw, monkeypatch):
+    """Testa um lote SQS: objetos pequenos juntos, grandes à parte e falhas reentregues."""
+    monkeypatch.setattr(config.processamento, "micro_lotes", True)
+    monkeypatch.setattr(config.processamento, "tamanho_max_objeto_micro_lote_kb", 1)
+    monkeypatch.setattr(config.processamento, "colunas_particao", [])
+    s3 = boto3.client("s3", region_name="us-east-1")
+    s3.put_object(
+        Bucket=bucket_raw,
+        Key="input/grande.csv",
+        Body=b"id,valor\n" + b"".join(b"%d,1\n" % i for i in range(300)),
+    )
+    objetos = [
+        ("input/a.csv", 20),
+        ("input/b.csv", 20),
+        ("input/grande.csv", 2000),
+        ("input/inexistente.csv", 20),
+    ]
+    evento = {
+        "Records": [
+            {
+                "eventSource": "aws:sqs",
+                "messageId": f"m{i}",
+                "body": json.dumps(
+                    {
+                        "Records": [
+                            {
+                                "s3": {
+                                    "bucket": {"name": bucket_raw},
+                                    "object": {"key": chave, "size": tamanho},
+                                }
+                            }
+                        ]
+                    }
+                ),
+            }
+            for i, (chave, tamanho) in enumerate(objetos)
+        ]
+        + [
+            {
+                "eventSource": "aws:sqs",
+                "messageId": "teste",
+                "body": json.dumps({"Event": "s3:TestEvent"}),
+            }
+        ]
+    }
+
+    resposta = csv_ingestor.lambda_handler(evento, None)
+    corpo = json.loads(resposta["body"])
+
+    assert resposta["statusCode"] == 207
+    assert resposta["batchItemFailures"] == [{"itemIdentifier": "m3"}]
+    assert [r["estrategia"] for r in corpo["resultados"]] == [
+        "micro_lote",
+        "micro_lote",
+        "memoria",
+        "micro_lote",
+    ]
+    assert corpo["resultados"][0]["destinos"] == corpo["resultados"][1]["destinos"]
+    assert corpo["resultados"][2]["linhas"] == 300
@@ -146,3 +146,77 @@ def teste_workflow_completo(processador_csv, dados_csv_exemplo):
     # 6. Obter estatísticas
     estatisticas = processador_csv.obter_estatisticas()
     assert estatisticas['row_count'] == 3
+
+
+def teste_processar_em_lotes_gera_row_groups(processador_csv, dados_csv_exemplo):
+    """Testa conversão em lotes com um row group por lote."""
+    import pyarrow.parquet as pq
+    
+    destino = BytesIO()
+    estatisticas = processador_csv.processar_em_lotes(
+        dados_csv_exemplo, destino, arquivo_origem="test.csv", tamanho_lote=2
+    )
+    
+    arquivo = pq.ParquetFile(BytesIO(destino.getvalue()))
+    assert estatisticas['row_groups'] == 2
+    assert arquivo.metadata.num_row_groups == 2
+    assert arquivo.metadata.num_rows == estatisticas['row_count'] == 3  # duplicata no 2º lote
+    assert 'arquivo_origem' in arquivo.schema_arrow.names
+
+
+def teste_processar_em_lotes_remove_duplicatas_no_lote(processador_csv, dados_csv_exemplo):
+    """Testa que duplicatas dentro do mesmo lote são removidas."""
+    destino = BytesIO()
+    estatisticas = processador_csv.processar_em_lotes(
+        dados_csv_exemplo, destino, arquivo_origem="test.csv", tamanho_lote=10
+    )
+    
+    df = pd.read_parquet(BytesIO(destino.getvalue()))
+    assert estatisticas['row_count'] == 3
+    assert df['data_ingestao'].nunique() == 1
+
+
+def teste_processar_em_lotes_coluna_vazia_no_primeiro_lote(processador_csv):
+    """Testa que uma coluna vazia no primeiro lote e com texto depois é gravada como texto."""
+    import pyarrow.parquet as pq
+    
+    linhas = [f"{i},,{i * 2}" for i in range(4)] + [f"{i},nota {i},{i * 2}" for i in range(4, 6)]
+    conteudo = ("id,obs,valor\n" + "\n".join(linhas) + "\n").encode()
+    
+    destino = BytesIO()
+    estatisticas = processador_csv.processar_em_lotes(
+        conteudo, destino, arquivo_origem="test.csv", tamanho_lote=4
+    )
+    
+    tabela = pq.read_table(BytesIO(destino.getvalue()))
+    assert estatisticas['row_count'] == 6
+    assert str(tabela.schema.field('obs').type) in ('string', 'large_string')
+    assert tabela.column('obs').to_pylist() == [None] * 4 + ["nota 4", "nota 5"]
+    assert tabela.column('valor').to_pylist() == [0, 2, 4, 6, 8, 10]
+
+
+def teste_processar_em_lotes_tipo_muda_depois_do_primeiro_lote(processador_csv):
+    """Testa que decimal ou texto numa coluna inteira pede tipos alargados, que a releitura usa."""
+    import pyarrow.parquet as pq
+    from src.ingestion.registro_esquemas import DesvioEsquema
+    
+    linhas = [f"{i},{i},{i}" for i in range(4)] + ["4,5.5,abc", "5,6,007"]
+    conteudo = ("id,valor,codigo\n" + "\n".join(linhas) + "\n").encode()
+    
+    with pytest.raises(DesvioEsquema) as erro:
+        processador_csv.processar_em_lotes(
+            conteudo, BytesIO(), arquivo_origem="test.csv", tamanho_lote=4
+        )
+    tipos = erro.value.plano
+    assert (tipos.colunas['id'], tipos.colunas['valor'], tipos.colunas['codigo']) == \
+        ('Int64', 'float64', 'string')
+    
+    destino = BytesIO()
+    estatisticas = processador_csv.processar_em_lotes(
+        conteudo, destino, arquivo_origem="test.csv", tamanho_lote=4, tipos=tipos
+    )
+    
+    tabela = pq.read_table(BytesIO(destino.getvalue()))
+    assert estatisticas['row_count'] == 6
+    assert tabela.column('valor').to_pylist() == [0.0, 1.0, 2.0, 3.0, 5.5, 6.0]
+    assert tabela.column('codigo').to_pylist() == ["0", "1", "2", "3", "abc", "007"]
@@ -0,0 +1,73 @@
+"""
+Testes para a deduplicação por hash.
+"""
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+from src.ingestion.deduplicacao import DeduplicadorHash, hash_linhas
+
+
+def teste_hash_linhas_iguais_para_linhas_iguais():
+    """Testa que linhas iguais têm o mesmo hash e diferentes não."""
+    df = pd.DataFrame({"id": [1, 2, 1], "nome": ["a", "b", "a"]})
+
+    hashes = hash_linhas(df)
+
+    assert hashes.dtype == np.uint64
+    assert hashes[0] == hashes[2]
+    assert hashes[0] != hashes[1]
+
+
+def teste_hash_linhas_independe_do_tipo_inferido():
+    """Testa que o mesmo valor tem o mesmo hash como int, float, int8 ou data em outra unidade."""
+    inteiros = pd.DataFrame({"id": [1, 2, 3], "nome": ["a", "b", None]})
+    com_vazio = pd.DataFrame({"id": [1.0, 2.0, 3.0], "nome": ["a", "b", np.nan]})
+    arrow = pa.table({"id": pa.array([1, 2, 3], pa.int8()), "nome": ["a", "b", None]})
+
+    assert (hash_linhas(inteiros) == hash_linhas(com_vazio)).all()
+    assert (hash_linhas(inteiros) == hash_linhas(arrow)).all()
+    assert (
+        hash_linhas(pd.DataFrame({"id": [1.5]}))[0]
+        != hash_linhas(pd.DataFrame({"id": [1]}))[0]
+    )
+    datas = pa.table({"dia": pa.array([19723], pa.date32())})
+    horarios = pa.table({"dia": pa.array([19723 * 86400], pa.timestamp("s"))})
+    assert hash_linhas(datas)[0] == hash_linhas(horarios)[0]
+
+
+def teste_remove_duplicatas_entre_lotes():
+    """Testa que linhas repetidas em lotes diferentes são removidas."""
+    deduplicador = DeduplicadorHash()
+
+    lote1 = deduplicador.filtrar(pd.DataFrame({"id": [1, 2, 2], "valor": [10, 20, 20]}))
+    lote2 = deduplicador.filtrar(pd.DataFrame({"id": [2, 3], "valor": [20, 30]}))
+
+    assert lote1["id"].tolist() == [1, 2]
+    assert lote2["id"].tolist() == [3]
+    assert deduplicador.linhas_removidas == 2
+
+
+def teste_deduplica_por_colunas_chave_em_tabela_arrow():
+    """Testa deduplicação por subconjunto de colunas numa pa.Table."""
+    deduplicador = DeduplicadorHash(colunas_chave=["id"])
+    tabela = pa.table({"id": [1, 1, 2], "valor": [10, 11, 20]})
+
+    resultado = deduplicador.filtrar(tabela)
+
+    assert resultado.column("valor").to_pylist() == [10, 20]
+
+
+def teste_despeja_em_disco_ao_passar_do_limite(tmp_path):
+    """Testa que os hashes vão para disco e continuam sendo consultados."""
+    with DeduplicadorHash(
+        limite_memoria_mb=0.001, diretorio_spill=str(tmp_path)
+    ) as deduplicador:
+        for inicio in range(0, 1000, 100):
+            deduplicador.filtrar(pd.DataFrame({"id": range(inicio, inicio + 100)}))
+
+        assert deduplicador._runs_em_disco
+        repetidas = deduplicador.filtrar(pd.DataFrame({"id": [5, 505, 2000]}))
+
+    assert repetidas["id"].tolist() == [2000]
+    assert not list(tmp_path.iterdir())
@@ -0,0 +1,105 @@
+"""
+Testes para a leitura de CSVs comprimidos.
+"""
+
+import bz2
+import gzip
+import io
+import zipfile
+import boto3
+import pyarrow as pa
+import pytest
+from moto import mock_aws
+from src.config.settings import config
+from src.ingestion.pipeline import PipelineIngestao
+from src.utils.descompressao import eh_csv, iterar_csvs, nome_base
+from src.utils.s3_utils import ClienteS3
+
+CSV = b"id,nome\n1,Ana\n2,Bruno\n3,Carla\n"
+
+
+def _zstd(dados: bytes) -> bytes:
+    buffer = pa.BufferOutputStream()
+    with pa.CompressedOutputStream(buffer, "zstd") as saida:
+        saida.write(dados)
+    return buffer.getvalue().to_pybytes()
+
+
+def _zip(membros: dict) -> bytes:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as arquivo_zip:
+        for nome, dados in membros.items():
+            arquivo_zip.writestr(nome, dados)
+    return buffer.getvalue()
+
+
+@pytest.mark.parametrize(
+    "chave,comprimir",
+    [
+        ("vendas.csv.gz", gzip.compress),
+        ("vendas.csv.bz2", bz2.compress),
+        ("vendas.csv.zst", _zstd),
+    ],
+)
+def teste_descomprime_em_fluxo_e_volta_ao_inicio(chave, comprimir):
+    """Testa a descompressão de cada formato, lida em partes e relida após seek(0)."""
+    assert eh_csv(chave) and nome_base(chave) == "vendas"
+
+    csvs = iterar_csvs(io.BytesIO(comprimir(CSV)), chave)
+    nome, fluxo = next(csvs)
+
+    assert nome == chave
+    assert fluxo.read(10) == CSV[:10]
+    assert fluxo.read() == CSV[10:]
+    fluxo.seek(0)
+    assert fluxo.read() == CSV
+
+
+def teste_zip_gera_so_os_csvs():
+    """Testa que um .zip gera cada CSV dele e ignora diretórios e outros arquivos."""
+    dados = _zip(
+        {
+            "a.csv": CSV,
+            "leia-me.txt": b"x",
+            "sub/b.CSV": b"id\n9\n",
+            "__MACOSX/a.csv": b"lixo",
+        }
+    )
+
+    assert [(nome, fluxo.read()) for nome, fluxo in iterar_csvs(dados, "lote.zip")] == [
+        ("a.csv", CSV),
+        ("sub/b.CSV", b"id\n9\n"),
+    ]
+    assert not eh_csv("lote.json.gz")
+
+
+@pytest.mark.parametrize("streaming", [False, True])
+def teste_pipeline_ingere_gzip_e_zip(monkeypatch, streaming):
+    """Testa que o pipeline ingere .csv.gz e cada CSV de um .zip em seu próprio Parquet."""
+    monkeypatch.setattr(config.processamento, "modo_streaming", streaming)
+    monkeypatch.setattr(config.processamento, "colunas_particao", [])
+    with mock_aws():
+        s3 = boto3.client("s3", region_name="us-east-1")
+        s3.create_bucket(Bucket="raw-bucket")
+        s3.create_bucket(Bucket=config.s3.bucket_data_lake)
+        cliente_s3 = ClienteS3(regiao="us-east-1")
+        cliente_s3.escrever_no_s3(
+            gzip.compress(CSV), "raw-bucket", "input/vendas.csv.gz"
+        )
+        cliente_s3.escrever_no_s3(
+            _zip({"norte.csv": CSV, "sul.csv": CSV}), "raw-bucket", "input/lote.zip"
+        )
+        pipeline = PipelineIngestao(cliente_s3=cliente_s3)
+
+        resultado_gzip = pipeline.processar_arquivo("raw-bucket", "input/vendas.csv.gz")
+        resultado_zip = pipeline.processar_arquivo("raw-bucket", "input/lote.zip")
+
+        assert resultado_gzip["sucesso"], resultado_gzip["erro"]
+        assert resultado_gzip["linhas"] == 3
+        assert resultado_zip["sucesso"], resultado_zip["erro"]
+        assert resultado_zip["linhas"] == 6
+        assert cliente_s3.listar_objetos(config.s3.bucket_data_lake, "data/") == [
+            "data/lote-norte.parquet",
+            "data/lote-sul.parquet",
+            "data/vendas.parquet",
+        ]
@@ -0,0 +1,117 @@
+"""
+Testes para a detecção do dialeto do CSV.
+"""
+
+import io
+import boto3
+import pyarrow.parquet as pq
+import pytest
+from moto import mock_aws
+from src.config.settings import config
+from src.ingestion.csv_processor import ProcessadorCSV
+from src.ingestion.dialeto import ArquivoNaoCSV, CacheDialetos, detectar_dialeto
+from src.ingestion.pipeline import PipelineIngestao
+from src.ingestion.processador_arrow import ProcessadorArrow
+from src.utils.s3_utils import ClienteS3
+
+CSV_RELATORIO = (
+    "Relatório de vendas\n\nid;nome;valor\n1;João;1,5\n2;Conceição;2,0\n"
+).encode("cp1252")
+
+
+@pytest.mark.parametrize(
+    "dados,esperado,colunas",
+    [
+        (
+            CSV_RELATORIO,
+            {"delimitador": ";", "codificacao": "cp1252", "linhas_ignoradas": 2},
+            ["id", "nome", "valor"],
+        ),
+        (
+            b"1\tAna\t3\n2\tBia\t4\n",
+            {"delimitador": "\t", "tem_cabecalho": False},
+            ["coluna_1", "coluna_2", "coluna_3"],
+        ),
+        (
+            b"id|nome\n1|'a|b'\n2|'c'\n",
+            {"delimitador": "|", "aspas": "'"},
+            ["id", "nome"],
+        ),
+    ],
+)
+@pytest.mark.parametrize("processador", [ProcessadorCSV, ProcessadorArrow])
+def teste_detecta_dialeto_e_processadores_leem_com_ele(
+    processador, dados, esperado, colunas
+):
+    """Testa delimitador, codificação, preâmbulo, cabeçalho e aspas, lidos pelos dois motores."""
+    dialeto = detectar_dialeto(dados)
+
+    assert {campo: getattr(dialeto, campo) for campo in esperado} == esperado
+    assert dialeto.cabecalho(dados) == colunas
+    leitor = processador()
+    leitor.ler_csv(dados, dialeto=dialeto)
+    assert leitor.obter_estatisticas()["columns"] == colunas
+    assert leitor.obter_estatisticas()["row_count"] == 2
+
+
+@pytest.mark.parametrize(
+    "dados,tem_cabecalho",
+    [
+        (b"id,2024,01/2024\n1,10,2024-01-05\n2,20,2024-02-05\n", True),
+        (b"id,nome\n1,Ana\n2,Bia\n", True),
+        (b"1,10,2024-01-05\n2,20,2024-02-05\n", False),
+        (b"1,2\n", True),
+    ],
+)
+def teste_cabecalho_comparado_com_os_tipos_das_linhas_seguintes(dados, tem_cabecalho):
+    """Testa que nomes numéricos ou de data só viram dados se tiverem o tipo das linhas abaixo."""
+    assert detectar_dialeto(dados).tem_cabecalho is tem_cabecalho
+
+
+def teste_cache_confere_dialeto_e_rejeita_binario():
+    """Testa que o cache reaproveita o dialeto do feed, redetecta se mudar e recusa binários."""
+    cache = CacheDialetos()
+
+    primeiro = cache.detectar("input", CSV_RELATORIO)
+    assert cache.detectar("input", CSV_RELATORIO) is primeiro
+    assert cache.detectar("input", b"a,b\n1,2\n").delimitador == ","
+    with pytest.raises(ArquivoNaoCSV):
+        detectar_dialeto(b"PK\x03\x04\x14\x00\x00\x00\x08\x00")
+
+
+@pytest.mark.parametrize("streaming", [False, True])
+def teste_pipeline_detecta_dialeto_com_get_parcial(monkeypatch, streaming):
+    """Testa a ingestão de um CSV ';' em Windows-1252 sondando só o primeiro arquivo do feed."""
+    monkeypatch.setattr(config.processamento, "modo_streaming", streaming)
+    monkeypatch.setattr(config.processamento, "colunas_particao", [])
+    monkeypatch.setattr(config.processamento, "deteccao_dialeto", True)
+    with mock_aws():
+        s3 = boto3.client("s3", region_name="us-east-1")
+        s3.create_bucket(Bucket="raw-bucket")
+        s3.create_bucket(Bucket=config.s3.bucket_data_lake)
+        cliente_s3 = ClienteS3(regiao="us-east-1")
+        cliente_s3.escrever_no_s3(CSV_RELATORIO, "raw-bucket", "input/vendas.csv")
+        cliente_s3.escrever_no_s3(CSV_RELATORIO, "raw-bucket", "input/vendas2.csv")
+        ranges = []
+        cliente_s3.s3.meta.events.register(
+            "provide-client-params.s3.GetObject",
+            lambda params, **_: ranges.append(params.get("Range")),
+        )
+        pipeline = PipelineIngestao(cliente_s3=cliente_s3)
+
+        resultados = [
+            pipeline.processar_arquivo("raw-bucket", chave)
+            for chave in ("input/vendas.csv", "input/vendas2.csv")
+        ]
+
+        assert all(resultado["sucesso"] for resultado in resultados), resultados
+        assert resultados[0]["dialeto"]["delimitador"] == ";"
+        # Uma sondagem com Range para o feed; o segundo arquivo usa o cache
+        assert (
+            ranges.count(f"bytes=0-{pipeline.cache_dialetos.tamanho_amostra - 1}") == 1
+        )
+        objeto = s3.get_object(
+            Bucket=config.s3.bucket_data_lake, Key="data/vendas.parquet"
+        )["Body"].read()
+        tabela = pq.read_table(io.BytesIO(objeto))
+        assert tabela.column("nome").to_pylist() == ["João", "Conceição"]
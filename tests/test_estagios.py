@@ -0,0 +1,102 @@
+"""
+Testes para os estágios concorrentes com filas limitadas.
+"""
+
+import io
+import threading
+import time
+import boto3
+import pyarrow.parquet as pq
+import pytest
+from moto import mock_aws
+from src.config.settings import config
+from src.ingestion.estrategia import MB, MEMORIA, STREAMING, escolher_estrategia
+from src.ingestion.pipeline import PipelineIngestao
+from src.utils.estagios import em_segundo_plano
+from src.utils.s3_utils import ClienteS3
+
+
+def teste_em_segundo_plano_limita_fila_e_propaga_erros():
+    """Testa a ordem, o limite de itens à frente do consumidor e a exceção do produtor."""
+    produzidos = []
+
+    def produtor():
+        for i in range(10):
+            produzidos.append(i)
+            yield i
+        raise ValueError("linha inválida")
+
+    itens = em_segundo_plano(produtor(), capacidade=2)
+    assert next(itens) == 0
+    time.sleep(0.3)
+    # Um entregue, dois na fila e um esperando vaga
+    assert len(produzidos) <= 4
+    with pytest.raises(ValueError, match="linha inválida"):
+        assert list(itens) == list(range(1, 10))
+
+
+def teste_em_segundo_plano_interrompe_produtor_ao_fechar():
+    """Testa que fechar o consumidor encerra o produtor, na thread dele, antes de retornar."""
+    fechado = []
+
+    def produtor():
+        try:
+            i = 0
+            while True:
+                yield i
+                i += 1
+        finally:
+            fechado.append(threading.current_thread().name)
+
+    itens = em_segundo_plano(produtor(), capacidade=3, nome="leitura_teste")
+    for i in itens:
+        if i == 5:
+            break
+    itens.close()
+
+    assert fechado == ["leitura_teste"]
+    assert not any(thread.name == "leitura_teste" for thread in threading.enumerate())
+    assert list(em_segundo_plano(iter([1, 2, 3]), capacidade=0)) == [1, 2, 3]
+
+
+@pytest.mark.parametrize("motor", ["pandas", "arrow"])
+def teste_pipeline_em_estagios_converte_como_em_memoria(monkeypatch, motor):
+    """Testa que STAGED_PIPELINE põe arquivos de várias partes em lotes sem mudar a saída."""
+    assert (
+        escolher_estrategia(20 * MB, "a.csv", 100, memoria_mb=4096, estagios=True)
+        == STREAMING
+    )
+    assert (
+        escolher_estrategia(5 * MB, "a.csv", 100, memoria_mb=4096, estagios=True)
+        == MEMORIA
+    )
+
+    monkeypatch.setattr(config.processamento, "colunas_particao", [])
+    monkeypatch.setattr(config.processamento, "tamanho_lote", 500)
+    conteudo = b"id,valor\n" + b"".join(b"%d,%d\n" % (i, i * 3) for i in range(5_000))
+    with mock_aws():
+        s3 = boto3.client("s3", region_name="us-east-1")
+        s3.create_bucket(Bucket="raw-bucket")
+        s3.create_bucket(Bucket=config.s3.bucket_data_lake)
+        s3.put_object(Bucket="raw-bucket", Key="input/dados.csv", Body=conteudo)
+        cliente_s3 = ClienteS3(regiao="us-east-1")
+
+        tabelas = {}
+        for estagios in (False, True):
+            monkeypatch.setattr(config.processamento, "estagios_concorrentes", estagios)
+            monkeypatch.setattr(config.processamento, "modo_streaming", estagios)
+            resultado = PipelineIngestao(
+                cliente_s3=cliente_s3, motor=motor
+            ).processar_arquivo("raw-bucket", "input/dados.csv")
+            assert resultado["sucesso"], resultado["erro"]
+            chave = resultado["destinos"][0].split("/", 1)[1]
+            tabelas[resultado["estrategia"]] = pq.read_table(
+                io.BytesIO(cliente_s3.ler_csv_do_s3(config.s3.bucket_data_lake, chave))
+            )
+
+    assert set(tabelas) == {MEMORIA, STREAMING}
+    # A deduplicação em memória do motor arrow não preserva a ordem das linhas
+    assert (
+        tabelas[STREAMING].select(["id", "valor"]).sort_by("id").to_pydict()
+        == tabelas[MEMORIA].select(["id", "valor"]).sort_by("id").to_pydict()
+    )
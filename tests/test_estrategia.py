@@ -0,0 +1,162 @@
+"""
+Testes para a escolha da estratégia de processamento pelo tamanho.
+"""
+
+import io
+import boto3
+import pyarrow.parquet as pq
+import pytest
+from moto import mock_aws
+from src.config.settings import config
+from src.ingestion.estrategia import (
+    FRAGMENTOS,
+    MB,
+    MEMORIA,
+    REJEITADO,
+    STREAMING,
+    escolher_estrategia,
+    processos_leitura,
+)
+from src.ingestion.pipeline import PipelineIngestao
+from src.utils.s3_utils import ClienteS3
+
+
+@pytest.mark.parametrize(
+    "tamanho,chave,streaming,memoria_mb,esperado",
+    [
+        (101 * MB, "input/a.csv", False, 4096, REJEITADO),
+        (101 * MB, "input/a.csv", True, None, REJEITADO),
+        (10 * MB, "input/a.csv", False, 512, MEMORIA),
+        (10 * MB, "input/a.csv", True, 512, STREAMING),
+        (60 * MB, "input/a.csv", False, 512, STREAMING),
+        (10 * MB, "input/a.csv.gz", False, 512, STREAMING),
+        (60 * MB, "input/a.csv", False, None, MEMORIA),
+        (None, "input/a.csv", False, 512, MEMORIA),
+    ],
+)
+def teste_escolhe_estrategia_por_tamanho_e_memoria(
+    tamanho, chave, streaming, memoria_mb, esperado
+):
+    """Testa o limite de tamanho, o STREAMING_MODE e a estimativa de memória (com compressão)."""
+    estrategia = escolher_estrategia(
+        tamanho, chave, 100, streaming=streaming, memoria_mb=memoria_mb
+    )
+    assert estrategia == esperado
+
+
+def teste_fragmentos_alcancaveis_no_padrao_e_desligados_na_lambda(monkeypatch):
+    """Testa que o SHARD_SIZE_MB padrão fragmenta abaixo do MAX_FILE_SIZE_MB, fora da Lambda."""
+    limite = config.processamento.tamanho_max_arquivo_mb
+    tamanho = 2 * config.processamento.tamanho_fragmento_mb * MB
+    assert tamanho <= limite * MB
+    monkeypatch.delenv("AWS_LAMBDA_FUNCTION_NAME", raising=False)
+    assert (
+        escolher_estrategia(
+            tamanho,
+            "a.csv",
+            limite,
+            processos=processos_leitura(4),
+            tamanho_fragmento_mb=config.processamento.tamanho_fragmento_mb,
+        )
+        == FRAGMENTOS
+    )
+
+    monkeypatch.setenv("AWS_LAMBDA_FUNCTION_NAME", "ingestao-csv")
+    assert processos_leitura(4) == 1
+    assert (
+        escolher_estrategia(
+            tamanho,
+            "a.csv",
+            limite,
+            processos=processos_leitura(4),
+            tamanho_fragmento_mb=config.processamento.tamanho_fragmento_mb,
+            memoria_mb=4096,
+        )
+        == MEMORIA
+    )
+
+
+def teste_pipeline_move_arquivo_grande_para_falhas_sem_baixar(monkeypatch):
+    """Testa que um arquivo acima de MAX_FILE_SIZE_MB vai para FAILED_PREFIX sem nenhum GET."""
+    monkeypatch.setattr(config.processamento, "tamanho_max_arquivo_mb", 1)
+    with mock_aws():
+        s3 = boto3.client("s3", region_name="us-east-1")
+        s3.create_bucket(Bucket="raw-bucket")
+        s3.create_bucket(Bucket=config.s3.bucket_data_lake)
+        cliente_s3 = ClienteS3(regiao="us-east-1")
+        cliente_s3.escrever_no_s3(
+            b"id,valor\n" + b"1,10\n" * 300_000, "raw-bucket", "input/grande.csv"
+        )
+        downloads = []
+        cliente_s3.s3.meta.events.register(
+            "provide-client-params.s3.GetObject",
+            lambda params, **_: downloads.append(params),
+        )
+
+        resultado = PipelineIngestao(cliente_s3=cliente_s3).processar_arquivo(
+            "raw-bucket", "input/grande.csv"
+        )
+
+        assert not resultado["sucesso"]
+        assert resultado["estrategia"] == REJEITADO
+        assert "MAX_FILE_SIZE_MB" in resultado["erro"]
+        falha = f"{config.s3.prefixo_falhas}input/grande.csv"
+        assert resultado["destino_falha"] == f"raw-bucket/{falha}"
+        assert downloads == []
+        assert cliente_s3.listar_objetos("raw-bucket") == [falha]
+        assert cliente_s3.listar_objetos(config.s3.bucket_data_lake) == []
+
+
+def teste_pipeline_usa_streaming_quando_nao_cabe_na_memoria(monkeypatch):
+    """Testa que, com pouca memória, o pipeline converte em lotes usando o tamanho do evento."""
+    monkeypatch.setattr(config.processamento, "modo_streaming", False)
+    monkeypatch.setattr(config.processamento, "limite_memoria_mb", 1)
+    monkeypatch.setattr(config.processamento, "colunas_particao", [])
+    conteudo = b"id,valor\n" + b"".join(b"%d,10\n" % i for i in range(20_000))
+    with mock_aws():
+        s3 = boto3.client("s3", region_name="us-east-1")
+        s3.create_bucket(Bucket="raw-bucket")
+        s3.create_bucket(Bucket=config.s3.bucket_data_lake)
+        cliente_s3 = ClienteS3(regiao="us-east-1")
+        cliente_s3.escrever_no_s3(conteudo, "raw-bucket", "input/medio.csv")
+
+        resultado = PipelineIngestao(cliente_s3=cliente_s3).processar_arquivo(
+            "raw-bucket", "input/medio.csv", tamanho=len(conteudo)
+        )
+
+    assert resultado["sucesso"], resultado["erro"]
+    assert resultado["estrategia"] == STREAMING
+    assert resultado["linhas"] == 20_000
+
+
+@pytest.mark.parametrize("motor", ["pandas", "arrow"])
+def teste_streaming_automatico_aceita_tipos_que_mudam_no_arquivo(monkeypatch, motor):
+    """Testa que um arquivo levado ao streaming pela memória ingere como em memória.
+
+    Depois do primeiro lote (e do primeiro bloco do Arrow), uma coluna
+    inteira recebe um decimal e outra recebe texto.
+    """
+    monkeypatch.setattr(config.processamento, "modo_streaming", False)
+    monkeypatch.setattr(config.processamento, "limite_memoria_mb", 8)
+    monkeypatch.setattr(config.processamento, "tamanho_lote", 50_000)
+    monkeypatch.setattr(config.processamento, "colunas_particao", [])
+    linhas = b"".join(b"%d,%d,%d\n" % (i, i, i) for i in range(200_000))
+    conteudo = b"id,valor,codigo\n" + linhas + b"-1,5.5,abc\n-2,6,007\n"
+    with mock_aws():
+        s3 = boto3.client("s3", region_name="us-east-1")
+        s3.create_bucket(Bucket="raw-bucket")
+        s3.create_bucket(Bucket=config.s3.bucket_data_lake)
+        cliente_s3 = ClienteS3(regiao="us-east-1")
+        cliente_s3.escrever_no_s3(conteudo, "raw-bucket", "input/grande.csv")
+
+        resultado = PipelineIngestao(
+            cliente_s3=cliente_s3, motor=motor
+        ).processar_arquivo("raw-bucket", "input/grande.csv", tamanho=len(conteudo))
+        assert resultado["sucesso"], resultado["erro"]
+        bucket, chave = resultado["destinos"][0].split("/", 1)
+        tabela = pq.read_table(io.BytesIO(cliente_s3.ler_csv_do_s3(bucket, chave)))
+
+    assert resultado["estrategia"] == STREAMING
+    assert resultado["linhas"] == 200_002
+    assert tabela.column("valor").to_pylist()[-2:] == [5.5, 6.0]
+    assert tabela.column("codigo").to_pylist()[-2:] == ["abc", "007"]
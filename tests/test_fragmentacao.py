@@ -0,0 +1,110 @@
+"""
+Testes para a leitura paralela de um CSV em fragmentos de bytes.
+"""
+
+import io
+import random
+import boto3
+import pandas as pd
+import pyarrow.parquet as pq
+import pytest
+from moto import mock_aws
+from src.config.settings import config
+from src.ingestion.csv_processor import ProcessadorCSV
+from src.ingestion.dialeto import detectar_dialeto
+from src.ingestion.estrategia import FRAGMENTOS
+from src.ingestion.fragmentacao import LeitorFragmentos, fim_registro
+from src.ingestion.pipeline import PipelineIngestao
+from src.ingestion.processador_arrow import ProcessadorArrow
+from src.utils.armazenamento_local import ClienteArquivosLocal
+from src.utils.s3_utils import ClienteS3
+
+# Campos entre aspas com vírgulas, quebras de linha e aspas duplicadas
+OBSERVACOES = [
+    "simples",
+    '"com, vírgula"',
+    '"com\nquebra"',
+    '"aspas ""duplas""\nem duas"',
+    "",
+]
+
+
+def _csv(linhas: int, semente: int = 1) -> bytes:
+    aleatorio = random.Random(semente)
+    registros = ["id,nome,obs"] + [
+        f"{i},nome{i},{aleatorio.choice(OBSERVACOES)}" for i in range(linhas)
+    ]
+    return ("\n".join(registros) + "\n").encode("utf-8")
+
+
+def teste_fim_registro_ignora_quebras_entre_aspas():
+    """Testa que a fronteira é a primeira quebra de linha com as aspas fechadas."""
+    dados = b'1,"a\nb"\n2,c\n'
+
+    assert fim_registro(dados, 0, 0, b'"') == 8
+    # Começando dentro do campo (paridade 1), a quebra seguinte já fecha o registro
+    assert fim_registro(dados, 4, 1, b'"') == 8
+    assert fim_registro(dados, 8, 0, b'"') == len(dados)
+    assert fim_registro(b'1,"aberto\n', 0, 0, b'"') == -1
+
+
+@pytest.mark.parametrize("processador", [ProcessadorCSV, ProcessadorArrow])
+def teste_fragmentos_cobrem_cada_registro_uma_vez(processador):
+    """Testa que fragmentos lidos por GETs com Range refazem o CSV, com aspas e preâmbulo."""
+    conteudo = b"Relatorio de vendas\n" + _csv(5000)
+    esperado = pd.read_csv(io.BytesIO(conteudo), skiprows=1)
+    with mock_aws():
+        s3 = boto3.client("s3", region_name="us-east-1")
+        s3.create_bucket(Bucket="raw-bucket")
+        cliente_s3 = ClienteS3(regiao="us-east-1")
+        cliente_s3.escrever_no_s3(conteudo, "raw-bucket", "input/grande.csv")
+        dialeto = detectar_dialeto(conteudo[: 64 * 1024])
+
+        leitor = LeitorFragmentos(
+            cliente_s3,
+            "raw-bucket",
+            "input/grande.csv",
+            len(conteudo),
+            conteudo[: 64 * 1024],
+            dialeto,
+            processador,
+            processos=1,
+            tamanho_fragmento=64 * 1024,
+        )
+        partes = [
+            parte if hasattr(parte, "iloc") else parte.to_pandas() for parte in leitor
+        ]
+
+    lido = pd.concat(partes, ignore_index=True)
+    assert dialeto.linhas_ignoradas == 1
+    assert len(leitor.fragmentos) > 1
+    assert lido["id"].tolist() == list(range(5000))
+    assert lido["obs"].fillna("").tolist() == esperado["obs"].fillna("").tolist()
+
+
+@pytest.mark.parametrize("motor", ["pandas", "arrow"])
+def teste_pipeline_em_fragmentos_com_pool_de_processos(monkeypatch, tmp_path, motor):
+    """Testa a estratégia em fragmentos com dois processos: mesmas linhas e metadados únicos."""
+    monkeypatch.setattr(config.processamento, "processos_leitura", 2)
+    monkeypatch.setattr(config.processamento, "tamanho_fragmento_mb", 1)
+    monkeypatch.setattr(config.processamento, "colunas_particao", [])
+    conteudo = _csv(120_000)
+    assert len(conteudo) > 2 * 1024 * 1024
+    entrada = tmp_path / "raw-bucket" / "input" / "grande.csv"
+    entrada.parent.mkdir(parents=True)
+    entrada.write_bytes(conteudo)
+
+    pipeline = PipelineIngestao(
+        cliente_s3=ClienteArquivosLocal(str(tmp_path)), motor=motor
+    )
+    resultado = pipeline.processar_arquivo("raw-bucket", "input/grande.csv")
+
+    assert resultado["sucesso"], resultado["erro"]
+    assert resultado["estrategia"] == FRAGMENTOS
+    assert resultado["linhas"] == 120_000
+    tabela = pq.read_table(
+        tmp_path / config.s3.bucket_data_lake / "data" / "grande.parquet"
+    )
+    assert tabela.column("id").to_pylist() == list(range(120_000))
+    assert len(set(tabela.column("data_ingestao").to_pylist())) == 1
+    assert set(tabela.column("arquivo_origem").to_pylist()) == {"input/grande.csv"}
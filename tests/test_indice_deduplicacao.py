@@ -0,0 +1,138 @@
+"""
+Testes para o índice de deduplicação entre arquivos.
+"""
+
+from datetime import date
+import numpy as np
+import pandas as pd
+import pytest
+import boto3
+from moto import mock_aws
+from src.config.settings import config
+from src.ingestion.indice_deduplicacao import FiltroBloom, IndiceDeduplicacao
+from src.ingestion.pipeline import PipelineIngestao
+from src.utils.s3_utils import ClienteS3
+
+
+@pytest.fixture
+def cliente_s3():
+    """Fixture para criar cliente S3 mockado com buckets."""
+    with mock_aws():
+        s3 = boto3.client("s3", region_name="us-east-1")
+        s3.create_bucket(Bucket="raw-bucket")
+        s3.create_bucket(Bucket=config.s3.bucket_data_lake)
+        yield ClienteS3(regiao="us-east-1")
+
+
+@pytest.mark.parametrize("tipo", ["hashes", "bloom"])
+def teste_indice_remove_linhas_de_arquivos_anteriores(cliente_s3, tipo):
+    """Testa que linhas já gravadas na partição são removidas do próximo arquivo."""
+    primeiro = IndiceDeduplicacao(
+        cliente_s3, "raw-bucket", "ano=2024/mes=01/dia=01", tipo=tipo
+    )
+    primeiro.filtrar(pd.DataFrame({"id": [1, 2], "valor": [10, 20]}))
+    assert primeiro.salvar()
+
+    segundo = IndiceDeduplicacao(
+        cliente_s3, "raw-bucket", "ano=2024/mes=01/dia=01", tipo=tipo
+    )
+    resultado = segundo.filtrar(pd.DataFrame({"id": [2, 3], "valor": [20, 30]}))
+
+    assert resultado["id"].tolist() == [3]
+    assert segundo.linhas_removidas == 1
+
+
+def teste_filtro_bloom_serializacao_e_camadas():
+    """Testa que o filtro cresce em camadas e sobrevive à serialização."""
+    filtro = FiltroBloom(capacidade=1000, taxa_falsos_positivos=0.01)
+    hashes = np.arange(5000, dtype=np.uint64) * np.uint64(0x9E3779B97F4A7C15)
+    filtro.adicionar(hashes)
+
+    restaurado = FiltroBloom.desserializar(filtro.serializar())
+
+    assert len(restaurado.camadas) > 1
+    assert restaurado.contem(hashes).all()
+    assert len(restaurado) == 5000
+
+
+def teste_pipeline_ignora_reenvio_com_indice(cliente_s3, monkeypatch):
+    """Testa que reenviar o mesmo CSV não grava linhas repetidas."""
+    monkeypatch.setattr(config.processamento, "indice_deduplicacao", "hashes")
+    cliente_s3.escrever_no_s3(b"id,valor\n1,10\n2,20\n", "raw-bucket", "input/a.csv")
+    pipeline = PipelineIngestao(cliente_s3=cliente_s3)
+
+    primeiro = pipeline.processar_arquivo("raw-bucket", "input/a.csv")
+    segundo = pipeline.processar_arquivo("raw-bucket", "input/a.csv")
+
+    assert primeiro["linhas"] == 2
+    assert segundo["sucesso"] and segundo["linhas"] == 0
+    assert segundo["destino"] is None
+    parquets = [
+        c
+        for c in cliente_s3.listar_objetos(config.s3.bucket_data_lake)
+        if c.startswith("data/")
+    ]
+    assert len(parquets) == 1
+
+
+def teste_indice_e_do_feed_e_nao_da_data(cliente_s3, monkeypatch):
+    """Testa que outro arquivo do feed, com outros tipos inferidos, usa o mesmo índice."""
+    monkeypatch.setattr(config.processamento, "indice_deduplicacao", "hashes")
+    cliente_s3.escrever_no_s3(b"id,valor\n1,10\n2,20\n", "raw-bucket", "vendas/a.csv")
+    cliente_s3.escrever_no_s3(b"id,valor\n1,10\n3,\n", "raw-bucket", "vendas/b.csv")
+    pipeline = PipelineIngestao(cliente_s3=cliente_s3)
+
+    pipeline.processar_arquivo("raw-bucket", "vendas/a.csv")
+    segundo = pipeline.processar_arquivo("raw-bucket", "vendas/b.csv")
+
+    assert segundo["linhas"] == 1 and segundo["duplicatas_indice"] == 1
+    indices = cliente_s3.listar_objetos(config.s3.bucket_data_lake, "_indice_dedup/")
+    assert indices == [
+        f"_indice_dedup/vendas/dia={date.today().isoformat()}/indice.npy"
+    ]
+
+
+def teste_indice_grava_so_o_segmento_do_dia_e_expira_os_antigos(cliente_s3):
+    """Testa os segmentos diários: só o de hoje é regravado e os fora da janela somem."""
+
+    def indice(dia: int) -> IndiceDeduplicacao:
+        return IndiceDeduplicacao(
+            cliente_s3, "raw-bucket", "vendas", dias_retencao=3, hoje=date(2024, 1, dia)
+        )
+
+    primeiro = indice(1)
+    primeiro.filtrar(pd.DataFrame({"id": [1, 2]}))
+    assert primeiro.salvar()
+    segundo = indice(3)
+    assert segundo.filtrar(pd.DataFrame({"id": [2, 3]}))["id"].tolist() == [3]
+    assert segundo.salvar()
+    assert cliente_s3.listar_objetos("raw-bucket", "_indice_dedup/") == [
+        "_indice_dedup/vendas/dia=2024-01-01/indice.npy",
+        "_indice_dedup/vendas/dia=2024-01-03/indice.npy",
+    ]
+
+    # Em 4/1, o segmento de 1/1 saiu da janela de 3 dias: a linha 1 não é mais duplicata
+    terceiro = indice(4)
+    assert terceiro.filtrar(pd.DataFrame({"id": [1, 3]}))["id"].tolist() == [1]
+    assert terceiro.salvar()
+    assert cliente_s3.listar_objetos("raw-bucket", "_indice_dedup/") == [
+        "_indice_dedup/vendas/dia=2024-01-03/indice.npy",
+        "_indice_dedup/vendas/dia=2024-01-04/indice.npy",
+    ]
+
+
+def teste_indice_le_o_indice_unico_de_versoes_anteriores(cliente_s3):
+    """Testa que o `indice.npy` na raiz do feed ainda conta, e que subfeeds não."""
+    for feed, ids in (("vendas", [1]), ("vendas/filial", [2])):
+        antigo = IndiceDeduplicacao(cliente_s3, "raw-bucket", feed)
+        antigo.filtrar(pd.DataFrame({"id": ids}))
+        cliente_s3.escrever_no_s3(
+            antigo.estrutura.serializar(),
+            "raw-bucket",
+            f"_indice_dedup/{feed}/indice.npy",
+        )
+
+    indice = IndiceDeduplicacao(cliente_s3, "raw-bucket", "vendas", dias_retencao=30)
+    resultado = indice.filtrar(pd.DataFrame({"id": [1, 2]}))
+
+    assert resultado["id"].tolist() == [2]
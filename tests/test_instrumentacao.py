@@ -0,0 +1,106 @@
+"""
+Testes para a instrumentação por etapa.
+"""
+
+import io
+import json
+import pytest
+import boto3
+from moto import mock_aws
+from src.config.settings import config
+from src.ingestion.pipeline import PipelineIngestao
+from src.utils.instrumentacao import Instrumentacao
+from src.utils.s3_utils import ClienteS3
+
+
+def teste_desabilitada_nao_mede_nada():
+    """Testa que, desabilitada, a etapa é inerte e aceita atribuições."""
+    saida = io.StringIO()
+    instrumentacao = Instrumentacao(habilitada=False, saida=saida)
+
+    with instrumentacao.etapa("s3_get") as etapa:
+        etapa.bytes_entrada = 10
+
+    assert instrumentacao.etapa("outra") is etapa
+    assert instrumentacao.medicoes == []
+    assert saida.getvalue() == ""
+
+
+def teste_emite_linha_emf_por_etapa():
+    """Testa o documento EMF com métricas, dimensão e propriedades da etapa."""
+    saida = io.StringIO()
+    instrumentacao = Instrumentacao(
+        habilitada=True, namespace="Teste", saida=saida, origem="raw/a.csv"
+    )
+
+    with instrumentacao.etapa("limpeza") as etapa:
+        etapa.linhas = 42
+    with pytest.raises(ValueError):
+        with instrumentacao.etapa("parquet"):
+            raise ValueError("falhou")
+
+    limpeza, parquet = [json.loads(linha) for linha in saida.getvalue().splitlines()]
+    diretiva = limpeza["_aws"]["CloudWatchMetrics"][0]
+    assert diretiva["Namespace"] == "Teste"
+    assert diretiva["Dimensions"] == [["etapa"]]
+    assert {m["Name"] for m in diretiva["Metrics"]} >= {
+        "duracao_ms",
+        "cpu_ms",
+        "linhas",
+    }
+    assert limpeza["etapa"] == "limpeza" and limpeza["linhas"] == 42
+    assert limpeza["origem"] == "raw/a.csv"
+    assert parquet["erro"] == "ValueError"
+    assert set(instrumentacao.resumo()) == {"limpeza", "parquet"}
+
+
+def teste_memoria_e_o_pico_do_processo_e_o_aumento_da_etapa():
+    """Testa que a etapa informa o pico do processo e quanto ela o elevou."""
+    instrumentacao = Instrumentacao(habilitada=True, saida=io.StringIO())
+
+    with instrumentacao.etapa("leitura_csv") as etapa:
+        pass
+
+    assert etapa.memoria_processo_pico_mb > 0
+    assert 0 <= etapa.memoria_aumento_pico_mb <= etapa.memoria_processo_pico_mb
+    documento = json.loads(instrumentacao.saida.getvalue())
+    nomes = {m["Name"] for m in documento["_aws"]["CloudWatchMetrics"][0]["Metrics"]}
+    assert {"memoria_processo_pico_mb", "memoria_aumento_pico_mb"} <= nomes
+
+
+@pytest.mark.parametrize("streaming", [False, True])
+def teste_pipeline_anota_etapas_no_resultado(monkeypatch, streaming):
+    """Testa que o pipeline mede cada etapa e anota o resumo no resultado."""
+    monkeypatch.setattr(config.processamento, "modo_streaming", streaming)
+    monkeypatch.setattr(config.processamento, "deteccao_dialeto", True)
+    with mock_aws():
+        s3 = boto3.client("s3", region_name="us-east-1")
+        s3.create_bucket(Bucket="raw-bucket")
+        s3.create_bucket(Bucket=config.s3.bucket_data_lake)
+        conteudo = b"id,valor\n1,10\n1,10\n2,20\n"
+        s3.put_object(Bucket="raw-bucket", Key="input/a.csv", Body=conteudo)
+        instrumentacao = Instrumentacao(habilitada=True, saida=io.StringIO())
+        pipeline = PipelineIngestao(
+            cliente_s3=ClienteS3(regiao="us-east-1"), instrumentacao=instrumentacao
+        )
+
+        resultado = pipeline.processar_arquivo("raw-bucket", "input/a.csv")
+
+    assert resultado["sucesso"], resultado["erro"]
+    if streaming:
+        assert resultado["etapas"]["conversao_stream"]["linhas"] == 2
+        assert resultado["etapas"]["conversao_stream"]["bytes_entrada"] == len(conteudo)
+    else:
+        assert list(resultado["etapas"]) == [
+            "head",
+            "dialeto",
+            "s3_get",
+            "leitura_csv",
+            "limpeza",
+            "metadados",
+            "parquet",
+            "s3_put",
+        ]
+        assert resultado["etapas"]["leitura_csv"]["linhas"] == 3
+        assert resultado["etapas"]["limpeza"]["linhas"] == 2
+        assert resultado["etapas"]["s3_put"]["bytes_saida"] > 0
@@ -0,0 +1,138 @@
+"""
+Testes para o manifesto de ingestão.
+"""
+
+import json
+import pytest
+import boto3
+from moto import mock_aws
+from src.config.settings import config
+from src.ingestion.manifesto_ingestao import ManifestoIngestao
+from src.ingestion.pipeline import PipelineIngestao
+from src.lambda_functions import csv_ingestor
+from src.utils.s3_utils import ClienteS3
+
+
+@pytest.fixture
+def cliente_s3():
+    """Fixture para criar cliente S3 mockado com buckets."""
+    with mock_aws():
+        s3 = boto3.client("s3", region_name="us-east-1")
+        s3.create_bucket(Bucket="raw-bucket")
+        s3.create_bucket(Bucket=config.s3.bucket_data_lake)
+        yield ClienteS3(regiao="us-east-1")
+
+
+def teste_pipeline_ignora_versao_ja_ingerida(cliente_s3):
+    """Testa que a mesma versão é ignorada e uma versão nova é ingerida de novo."""
+    cliente_s3.escrever_no_s3(b"id,valor\n1,10\n2,20\n", "raw-bucket", "input/a.csv")
+    manifesto = ManifestoIngestao(cliente_s3, config.s3.bucket_data_lake)
+    pipeline = PipelineIngestao(cliente_s3=cliente_s3, manifesto=manifesto)
+
+    primeiro = pipeline.processar_arquivo("raw-bucket", "input/a.csv")
+    repetido = pipeline.processar_arquivo("raw-bucket", "input/a.csv")
+
+    assert primeiro["sucesso"] and not primeiro.get("ignorado")
+    assert repetido["sucesso"] and repetido["ignorado"]
+    assert repetido["destinos"] == primeiro["destinos"]
+    assert repetido["linhas"] == 2
+
+    cliente_s3.escrever_no_s3(
+        b"id,valor\n1,10\n2,20\n3,30\n", "raw-bucket", "input/a.csv"
+    )
+    nova_versao = pipeline.processar_arquivo("raw-bucket", "input/a.csv")
+    forcado = pipeline.processar_arquivo("raw-bucket", "input/a.csv", forcar=True)
+
+    assert not nova_versao.get("ignorado") and nova_versao["linhas"] == 3
+    assert not forcado.get("ignorado")
+    assert manifesto.metricas == {"ignorados": 1, "novos": 2}
+
+
+def _ingerir_em(cliente_s3, manifesto, chave_destino: str):
+    """Simula uma ingestão anterior de input/a.csv gravada em `chave_destino`."""
+    lago = config.s3.bucket_data_lake
+    cliente_s3.escrever_no_s3(b"PAR1", lago, chave_destino)
+    metadados = cliente_s3.obter_metadados_objeto("raw-bucket", "input/a.csv")
+    manifesto.registrar(
+        "raw-bucket",
+        "input/a.csv",
+        metadados["etag"],
+        metadados["size"],
+        [f"{lago}/{chave_destino}"],
+        2,
+    )
+
+
+def teste_reprocessamento_forcado_substitui_os_parquet_anteriores(cliente_s3):
+    """Testa que forcar apaga o Parquet da ingestão anterior em vez de duplicar as linhas."""
+    cliente_s3.escrever_no_s3(b"id,valor\n1,10\n2,20\n", "raw-bucket", "input/a.csv")
+    manifesto = ManifestoIngestao(cliente_s3, config.s3.bucket_data_lake)
+    _ingerir_em(cliente_s3, manifesto, "data/ano=2024/mes=01/dia=01/a.parquet")
+    pipeline = PipelineIngestao(cliente_s3=cliente_s3, manifesto=manifesto)
+
+    forcado = pipeline.processar_arquivo("raw-bucket", "input/a.csv", forcar=True)
+
+    assert forcado["sucesso"], forcado["erro"]
+    assert forcado["substituidos"] == 1
+    parquets = cliente_s3.listar_objetos(config.s3.bucket_data_lake, "data/")
+    assert [f"{config.s3.bucket_data_lake}/{c}" for c in parquets] == forcado[
+        "destinos"
+    ]
+    entrada = manifesto.ler("raw-bucket", "input/a.csv")
+    assert entrada["destinos"] == forcado["destinos"]
+
+
+def teste_reprocessamento_forcado_recusado_quando_nao_e_seguro(cliente_s3, monkeypatch):
+    """Testa a recusa com DEDUP_INDEX ou com o Parquet anterior já compactado."""
+    cliente_s3.escrever_no_s3(b"id,valor\n1,10\n2,20\n", "raw-bucket", "input/a.csv")
+    manifesto = ManifestoIngestao(cliente_s3, config.s3.bucket_data_lake)
+    _ingerir_em(cliente_s3, manifesto, "data/ano=2024/mes=01/dia=01/a.parquet")
+    pipeline = PipelineIngestao(cliente_s3=cliente_s3, manifesto=manifesto)
+
+    with monkeypatch.context() as contexto:
+        contexto.setattr(config.processamento, "indice_deduplicacao", "hashes")
+        com_indice = pipeline.processar_arquivo(
+            "raw-bucket", "input/a.csv", forcar=True
+        )
+    cliente_s3.deletar_objeto(
+        config.s3.bucket_data_lake, "data/ano=2024/mes=01/dia=01/a.parquet"
+    )
+    compactado = pipeline.processar_arquivo("raw-bucket", "input/a.csv", forcar=True)
+
+    assert not com_indice["sucesso"] and "DEDUP_INDEX" in com_indice["erro"]
+    assert not compactado["sucesso"] and "compactados" in compactado["erro"]
+    assert cliente_s3.listar_objetos(config.s3.bucket_data_lake, "data/") == []
+
+
+def teste_handler_usa_etag_do_evento(cliente_s3, monkeypatch):
+    """Testa que uma entrega repetida do evento é ignorada sem HEAD na origem."""
+    monkeypatch.setattr(config.processamento, "manifesto_ingestao", True)
+    monkeypatch.setattr(csv_ingestor, "_cliente_s3", cliente_s3)
+    monkeypatch.setattr(csv_ingestor, "_manifesto", None)
+    resposta = cliente_s3.s3.put_object(
+        Bucket="raw-bucket", Key="input/b.csv", Body=b"id\n1\n"
+    )
+    evento = {
+        "Records": [
+            {
+                "s3": {
+                    "bucket": {"name": "raw-bucket"},
+                    "object": {
+                        "key": "input/b.csv",
+                        "eTag": resposta["ETag"].strip('"'),
+                        "size": 5,
+                    },
+                }
+            }
+        ]
+    }
+
+    csv_ingestor.lambda_handler(evento, None)
+    heads = []
+    cliente_s3.s3.meta.events.register(
+        "before-call.s3.HeadObject", lambda **_: heads.append(1)
+    )
+    corpo = json.loads(csv_ingestor.lambda_handler(evento, None)["body"])
+
+    assert corpo["resultados"][0]["ignorado"]
+    assert heads == []
@@ -0,0 +1,114 @@
+"""
+Testes para a ingestão de CSVs pequenos em micro-lotes.
+"""
+
+import io
+import boto3
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+from moto import mock_aws
+from src.config.settings import config
+from src.ingestion.micro_lotes import dividir_em_lotes, juntar_tabelas
+from src.ingestion.pipeline import PipelineIngestao
+from src.utils.s3_utils import ClienteS3
+
+
+def teste_dividir_e_juntar_tabelas():
+    """Testa o limite de bytes por lote e a concatenação com esquemas diferentes."""
+    assert dividir_em_lotes([40, 40, 40, 200, 10], 100) == [[0, 1], [2], [3], [4]]
+
+    inteiros = pa.table({"id": [1, 2]})
+    decimais = pa.table({"id": [1.5], "extra": ["a"]})
+    texto = pa.table({"id": ["x"]})
+
+    [(indices, tabela)] = juntar_tabelas([inteiros, decimais])
+    assert indices == [0, 1]
+    assert tabela.column("id").to_pylist() == [1.0, 2.0, 1.5]
+    assert tabela.column("extra").to_pylist() == [None, None, "a"]
+    assert [indices for indices, _ in juntar_tabelas([inteiros, texto, inteiros])] == [
+        [0, 2],
+        [1],
+    ]
+
+
+@pytest.mark.parametrize("motor", ["pandas", "arrow"])
+def teste_micro_lote_grava_um_parquet_por_particao(monkeypatch, motor):
+    """Testa um Parquet para o lote inteiro, com a origem de cada linha e falhas isoladas."""
+    monkeypatch.setattr(config.processamento, "colunas_particao", [])
+    with mock_aws():
+        s3 = boto3.client("s3", region_name="us-east-1")
+        s3.create_bucket(Bucket="raw-bucket")
+        s3.create_bucket(Bucket=config.s3.bucket_data_lake)
+        arquivos = []
+        for i in range(20):
+            corpo = f"id,valor\n{i},{i * 10}\n{i + 100},{i}\n".encode()
+            s3.put_object(Bucket="raw-bucket", Key=f"eventos/{i:02d}.csv", Body=corpo)
+            arquivos.append(("raw-bucket", f"eventos/{i:02d}.csv", None, len(corpo)))
+        arquivos.insert(5, ("raw-bucket", "eventos/inexistente.csv", None, 10))
+
+        resultados = PipelineIngestao(
+            cliente_s3=ClienteS3(regiao="us-east-1"), motor=motor
+        ).processar_micro_lote(arquivos)
+        chaves = [
+            objeto["Key"]
+            for objeto in s3.list_objects_v2(Bucket=config.s3.bucket_data_lake)[
+                "Contents"
+            ]
+        ]
+        tabela = pq.read_table(
+            io.BytesIO(
+                s3.get_object(Bucket=config.s3.bucket_data_lake, Key=chaves[0])[
+                    "Body"
+                ].read()
+            )
+        )
+
+    assert [resultado["sucesso"] for resultado in resultados] == [True] * 5 + [
+        False
+    ] + [True] * 15
+    assert "inexistente" in resultados[5]["origem"] and resultados[5]["erro"]
+    assert len(chaves) == 1 and chaves[0].startswith("data/lote-")
+    assert all(
+        resultado["destinos"] == [f"{config.s3.bucket_data_lake}/{chaves[0]}"]
+        for resultado in resultados
+        if resultado["sucesso"]
+    )
+    assert all(
+        resultado["linhas"] == 2 for resultado in resultados if resultado["sucesso"]
+    )
+    assert tabela.num_rows == 40
+    assert len(set(tabela.column("data_ingestao").to_pylist())) == 1
+    origens = tabela.column("arquivo_origem").to_pylist()
+    assert origens[:2] == ["eventos/00.csv"] * 2
+    assert sorted(set(origens)) == [f"eventos/{i:02d}.csv" for i in range(20)]
+
+
+def teste_micro_lote_com_escrita_falha_nao_indexa_o_arquivo(monkeypatch):
+    """Testa que as linhas de um arquivo não gravado ficam fora do índice e o reenvio as grava."""
+    monkeypatch.setattr(config.processamento, "colunas_particao", ["regiao"])
+    monkeypatch.setattr(config.processamento, "indice_deduplicacao", "hashes")
+    with mock_aws():
+        s3 = boto3.client("s3", region_name="us-east-1")
+        s3.create_bucket(Bucket="raw-bucket")
+        s3.create_bucket(Bucket=config.s3.bucket_data_lake)
+        arquivos = []
+        for nome, regiao in (("a", "norte"), ("b", "sul")):
+            corpo = f"id,regiao\n1,{regiao}\n2,{regiao}\n".encode()
+            s3.put_object(Bucket="raw-bucket", Key=f"eventos/{nome}.csv", Body=corpo)
+            arquivos.append(("raw-bucket", f"eventos/{nome}.csv", None, len(corpo)))
+        cliente_s3 = ClienteS3(regiao="us-east-1")
+        escrever = cliente_s3.escrever_no_s3
+
+        def escrever_sem_sul(dados, bucket, chave):
+            return "regiao=sul" not in chave and escrever(dados, bucket, chave)
+
+        monkeypatch.setattr(cliente_s3, "escrever_no_s3", escrever_sem_sul)
+        pipeline = PipelineIngestao(cliente_s3=cliente_s3)
+        primeira = pipeline.processar_micro_lote(arquivos)
+        monkeypatch.setattr(cliente_s3, "escrever_no_s3", escrever)
+        reenvio = pipeline.processar_micro_lote(arquivos)
+
+    assert [resultado["sucesso"] for resultado in primeira] == [True, False]
+    assert [resultado["sucesso"] for resultado in reenvio] == [True, True]
+    assert [resultado["linhas"] for resultado in reenvio] == [0, 2]
@@ -0,0 +1,62 @@
+"""
+Testes para as opções do escritor Parquet.
+"""
+
+from io import BytesIO
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+from src.ingestion.csv_processor import ProcessadorCSV
+from src.ingestion.opcoes_parquet import OpcoesParquet
+
+TABELA = pa.table(
+    {
+        "id": [3, 1, 2, 5, 4],
+        "cidade": ["b", "a", "b", "a", "c"],
+        "valor": [30.0, 10.0, 20.0, 50.0, 40.0],
+    }
+)
+
+
+def teste_codec_ordenacao_e_dicionario():
+    """Testa que codec, nível, ordenação e dicionário chegam ao arquivo."""
+    opcoes = OpcoesParquet(
+        compressao="zstd",
+        nivel_compressao=9,
+        colunas_ordenacao=["id", "inexistente"],
+        colunas_dicionario=["cidade"],
+        estatisticas=["id"],
+    )
+    arquivo = pq.ParquetFile(BytesIO(opcoes.converter(TABELA)))
+
+    assert arquivo.read().column("id").to_pylist() == [1, 2, 3, 4, 5]
+    row_group = arquivo.metadata.row_group(0)
+    assert row_group.sorting_columns == (pq.SortingColumn(0),)
+    assert row_group.column(0).compression == "ZSTD"
+    assert row_group.column(0).statistics is not None
+    assert row_group.column(2).statistics is None
+    assert "RLE_DICTIONARY" in row_group.column(1).encodings
+    assert "RLE_DICTIONARY" not in row_group.column(2).encodings
+
+    with pytest.raises(ValueError):
+        OpcoesParquet(compressao="lzo")
+
+
+def teste_streaming_agrupa_lotes_em_row_groups():
+    """Testa que lotes pequenos são juntados em row groups do tamanho configurado."""
+    csv = b"id,valor\n" + b"".join(f"{i},{i * 10}\n".encode() for i in range(10, 0, -1))
+    destino = BytesIO()
+    processador = ProcessadorCSV(
+        OpcoesParquet(linhas_por_row_group=4, colunas_ordenacao=["id"])
+    )
+
+    processador.processar_em_lotes(BytesIO(csv), destino, "teste.csv", tamanho_lote=2)
+
+    arquivo = pq.ParquetFile(BytesIO(destino.getvalue()))
+    linhas = [
+        arquivo.metadata.row_group(i).num_rows for i in range(arquivo.num_row_groups)
+    ]
+    assert linhas == [4, 4, 2]
+    # A ordenação vale dentro de cada row group
+    assert arquivo.read_row_group(0).column("id").to_pylist() == [7, 8, 9, 10]
+    assert arquivo.metadata.num_rows == 10
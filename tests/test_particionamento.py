@@ -0,0 +1,170 @@
+"""
+Testes para o particionamento da saída Parquet.
+"""
+
+from io import BytesIO
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+import boto3
+from moto import mock_aws
+from src.config.settings import config
+from src.ingestion.opcoes_parquet import OpcoesParquet
+from src.ingestion.particionamento import EscritorParticionado, Particionador
+from src.ingestion.pipeline import PipelineIngestao, criar_processador
+from src.utils.s3_utils import ClienteS3
+
+CSV_EVENTOS = b"""id,data_venda,valor
+1,2024-01-05,10
+2,2024-02-10,20
+3,2024-01-05,30
+4,,40
+5,2024-02-11 08:30:00,50
+"""
+
+
+class DestinoEmMemoria(BytesIO):
+    """BytesIO que guarda o conteúdo ao ser fechado."""
+
+    def __init__(self, arquivos: dict, caminho: str):
+        super().__init__()
+        self.arquivos = arquivos
+        self.caminho = caminho
+
+    def close(self):
+        self.arquivos[self.caminho] = self.getvalue()
+        super().close()
+
+    def abortar(self):
+        BytesIO.close(self)
+
+    def excluir(self):
+        del self.arquivos[self.caminho]
+
+
+@pytest.fixture
+def cliente_s3():
+    """Fixture para criar cliente S3 mockado com buckets."""
+    with mock_aws():
+        s3 = boto3.client("s3", region_name="us-east-1")
+        s3.create_bucket(Bucket="raw-bucket")
+        s3.create_bucket(Bucket=config.s3.bucket_data_lake)
+        yield ClienteS3(regiao="us-east-1")
+
+
+def teste_dividir_agrupa_linhas_por_particao():
+    """Testa caminhos Hive, partição padrão para nulos e remoção das colunas de partição."""
+    tabela = pa.table(
+        {"uf": ["SP", "RJ", None, "SP"], "mes": [1, 1, 1, 2], "valor": [1, 2, 3, 4]}
+    )
+
+    partes = dict(Particionador(["uf", "mes"]).dividir(tabela))
+
+    assert sorted(partes) == [
+        "uf=RJ/mes=01",
+        "uf=SP/mes=01",
+        "uf=SP/mes=02",
+        "uf=__HIVE_DEFAULT_PARTITION__/mes=01",
+    ]
+    assert partes["uf=SP/mes=01"].column_names == ["valor"]
+    assert partes["uf=SP/mes=01"].column("valor").to_pylist() == [1]
+
+
+@pytest.mark.parametrize("motor", ["pandas", "arrow"])
+def teste_lotes_gravam_um_parquet_por_data_de_evento(motor):
+    """Testa a divisão de um CSV em várias partições pela data de evento, em lotes."""
+    particionador = Particionador(
+        ["ano", "mes", "dia"], coluna_data_evento="data_venda"
+    )
+    arquivos = {}
+
+    estatisticas = criar_processador(motor).processar_em_lotes(
+        CSV_EVENTOS,
+        lambda caminho: DestinoEmMemoria(arquivos, caminho),
+        arquivo_origem="vendas.csv",
+        tamanho_lote=2,
+        particionador=particionador,
+    )
+
+    assert estatisticas["partitions"] == {
+        "ano=2024/mes=01/dia=05": 2,
+        "ano=2024/mes=02/dia=10": 1,
+        "ano=2024/mes=02/dia=11": 1,
+        "ano=__HIVE_DEFAULT_PARTITION__/mes=__HIVE_DEFAULT_PARTITION__"
+        "/dia=__HIVE_DEFAULT_PARTITION__": 1,
+    }
+    tabela = pq.read_table(BytesIO(arquivos["ano=2024/mes=01/dia=05"]))
+    assert sorted(tabela.column("id").to_pylist()) == [1, 3]
+    assert "ano" not in tabela.column_names
+
+
+@pytest.mark.parametrize("motor", ["pandas", "arrow"])
+def teste_lotes_limitam_as_particoes_abertas(motor):
+    """Testa que, passado o limite, a partição menos usada é fechada e reaberta em outro arquivo."""
+    arquivos, abertos = {}, []
+
+    def abrir_destino(caminho, parte=0):
+        abertos[:] = [destino for destino in abertos if not destino.closed]
+        assert not abertos, "mais de uma partição aberta"
+        abertos.append(DestinoEmMemoria(arquivos, (caminho, parte)))
+        return abertos[-1]
+
+    processador = criar_processador(motor, OpcoesParquet(max_arquivos_abertos=1))
+    estatisticas = processador.processar_em_lotes(
+        CSV_EVENTOS,
+        abrir_destino,
+        arquivo_origem="vendas.csv",
+        tamanho_lote=2,
+        particionador=Particionador(
+            ["ano", "mes", "dia"], coluna_data_evento="data_venda"
+        ),
+    )
+
+    assert sorted(arquivos) == sorted(
+        (caminho, parte)
+        for caminho, partes in estatisticas["parts"].items()
+        for parte in range(len(partes))
+    )
+    if motor == "pandas":
+        # Os lotes de 2 linhas alternam entre janeiro e fevereiro
+        assert estatisticas["parts"]["ano=2024/mes=01/dia=05"] == [1, 1]
+    ids = [
+        i
+        for conteudo in arquivos.values()
+        for i in pq.read_table(BytesIO(conteudo)).column("id").to_pylist()
+    ]
+    assert sorted(ids) == [1, 2, 3, 4, 5]
+
+
+def teste_escritor_abortado_remove_particoes_ja_fechadas():
+    """Testa que abortar remove também os arquivos fechados para liberar memória."""
+    arquivos = {}
+    escritor = EscritorParticionado(
+        lambda caminho, parte=0: DestinoEmMemoria(arquivos, (caminho, parte)),
+        Particionador(["uf"]),
+        OpcoesParquet(max_arquivos_abertos=1),
+    )
+
+    escritor.escrever(pa.table({"uf": ["SP", "RJ"], "valor": [1, 2]}))
+    assert list(arquivos) == [("uf=RJ", 0)]
+    escritor.abortar()
+
+    assert arquivos == {}
+
+
+@pytest.mark.parametrize("streaming", [False, True])
+def teste_pipeline_particiona_por_data_de_evento(cliente_s3, monkeypatch, streaming):
+    """Testa que o pipeline grava um arquivo por partição de data de evento no Data Lake."""
+    monkeypatch.setattr(config.processamento, "modo_streaming", streaming)
+    monkeypatch.setattr(config.processamento, "coluna_data_evento", "data_venda")
+    cliente_s3.escrever_no_s3(CSV_EVENTOS, "raw-bucket", "input/vendas.csv")
+
+    resultado = PipelineIngestao(cliente_s3=cliente_s3).processar_arquivo(
+        "raw-bucket", "input/vendas.csv"
+    )
+
+    assert resultado["sucesso"], resultado["erro"]
+    assert resultado["linhas"] == 5
+    assert len(resultado["destinos"]) == 4
+    chaves = cliente_s3.listar_objetos(config.s3.bucket_data_lake, "data/")
+    assert "data/ano=2024/mes=02/dia=10/vendas.parquet" in chaves
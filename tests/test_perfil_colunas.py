@@ -0,0 +1,145 @@
+"""
+Testes para o perfil das colunas calculado em fluxo.
+"""
+
+import io
+import boto3
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+from moto import mock_aws
+from src.config.settings import config
+from src.ingestion.compactacao import CompactadorDataLake
+from src.ingestion.perfil_colunas import (
+    HyperLogLog,
+    PerfilDados,
+    chave_perfil,
+    perfil_particao,
+)
+from src.ingestion.pipeline import PipelineIngestao
+from src.utils.s3_utils import ClienteS3
+
+
+def teste_hyperloglog_estima_e_mescla_distintos():
+    """Testa a estimativa de distintos e que mesclar equivale a contar a união."""
+    hashes = pd.util.hash_array(np.random.default_rng(0).permutation(100_000))
+    inteiro, primeira, segunda = HyperLogLog(), HyperLogLog(), HyperLogLog()
+    inteiro.adicionar(hashes)
+    primeira.adicionar(hashes[:60_000])
+    segunda.adicionar(hashes[40_000:])
+    primeira.mesclar(segunda)
+
+    assert abs(inteiro.estimar() - 100_000) < 5_000
+    assert np.array_equal(primeira.registradores, inteiro.registradores)
+    assert (
+        HyperLogLog.desserializar(inteiro.serializar()).estimar() == inteiro.estimar()
+    )
+
+    pequeno = HyperLogLog()
+    pequeno.adicionar(hashes[:50])
+    assert abs(pequeno.estimar() - 50) <= 2
+
+
+@pytest.mark.parametrize("motor", ["pandas", "arrow"])
+def teste_streaming_grava_perfis_que_se_mesclam_na_particao(monkeypatch, motor):
+    """Testa os perfis ao lado de cada Parquet e que a mescla bate com o perfil dos dados."""
+    monkeypatch.setattr(config.processamento, "perfil_colunas", True)
+    monkeypatch.setattr(config.processamento, "modo_streaming", True)
+    monkeypatch.setattr(config.processamento, "tamanho_lote", 7)
+    monkeypatch.setattr(config.processamento, "colunas_particao", ["regiao"])
+    with mock_aws():
+        s3 = boto3.client("s3", region_name="us-east-1")
+        s3.create_bucket(Bucket="raw-bucket")
+        s3.create_bucket(Bucket=config.s3.bucket_data_lake)
+        cliente_s3 = ClienteS3(regiao="us-east-1")
+        for arquivo, deslocamento in (("a.csv", 0), ("b.csv", 40)):
+            linhas = [
+                f"{i + deslocamento},{'' if i % 5 == 0 else i * 1.5},"
+                f"{'sul' if i % 2 else 'norte'}"
+                for i in range(50)
+            ]
+            corpo = ("id,valor,regiao\n" + "\n".join(linhas) + "\n").encode()
+            s3.put_object(Bucket="raw-bucket", Key=f"vendas/{arquivo}", Body=corpo)
+            resultado = PipelineIngestao(
+                cliente_s3=cliente_s3, motor=motor
+            ).processar_arquivo("raw-bucket", f"vendas/{arquivo}")
+            assert resultado["sucesso"]
+
+        chaves = cliente_s3.listar_objetos(
+            config.s3.bucket_data_lake, "data/regiao=sul/"
+        )
+        tabela = pa.concat_tables(
+            [
+                pq.read_table(
+                    io.BytesIO(
+                        cliente_s3.ler_csv_do_s3(config.s3.bucket_data_lake, chave)
+                    )
+                )
+                for chave in chaves
+                if chave.endswith(".parquet")
+            ]
+        )
+        perfil = perfil_particao(
+            cliente_s3, config.s3.bucket_data_lake, "data/regiao=sul"
+        )
+
+    assert sorted(chave_perfil(c) for c in chaves if c.endswith(".parquet")) == sorted(
+        c for c in chaves if c.endswith(".perfil.json")
+    )
+    esperado = PerfilDados().atualizar(tabela).para_dict()["colunas"]
+    resumo = perfil.para_dict()
+    assert resumo["linhas"] == 50 and resumo["arquivos"] == 2
+    for nome in ("id", "valor"):
+        obtido = resumo["colunas"][nome]
+        for medida in (
+            "linhas",
+            "nulos",
+            "minimo",
+            "maximo",
+            "distintos_aprox",
+            "histograma",
+        ):
+            assert obtido[medida] == esperado[nome][medida]
+    assert resumo["colunas"]["valor"]["nulos"] == 10
+    assert (resumo["colunas"]["id"]["minimo"], resumo["colunas"]["id"]["maximo"]) == (
+        1,
+        89,
+    )
+    assert 35 <= resumo["colunas"]["id"]["distintos_aprox"] <= 45
+
+
+def teste_compactacao_mescla_perfis_das_origens():
+    """Testa que o arquivo compactado herda a mescla dos perfis e os das origens somem."""
+    bucket = "lake-bucket"
+    particao = "data/ano=2024/mes=01/dia=05"
+    with mock_aws():
+        boto3.client("s3", region_name="us-east-1").create_bucket(Bucket=bucket)
+        cliente_s3 = ClienteS3(regiao="us-east-1")
+        for nome, ids in (("a", [3, 1]), ("b", [2, None, 7])):
+            tabela = pa.table({"id": pa.array(ids, pa.int64())})
+            buffer = io.BytesIO()
+            pq.write_table(tabela, buffer)
+            cliente_s3.escrever_no_s3(
+                buffer.getvalue(), bucket, f"{particao}/{nome}.parquet"
+            )
+            cliente_s3.escrever_no_s3(
+                PerfilDados().atualizar(tabela).serializar(),
+                bucket,
+                chave_perfil(f"{particao}/{nome}.parquet"),
+            )
+
+        CompactadorDataLake(cliente_s3, bucket).executar()
+        chaves = cliente_s3.listar_objetos(bucket, "data/")
+        perfil = perfil_particao(cliente_s3, bucket, particao).para_dict()
+
+    compactado = next(c for c in chaves if c.endswith(".parquet"))
+    assert sorted(chaves) == sorted([compactado, chave_perfil(compactado)])
+    assert perfil["linhas"] == 5 and perfil["arquivos"] == 2
+    assert perfil["colunas"]["id"]["nulos"] == 1
+    assert (perfil["colunas"]["id"]["minimo"], perfil["colunas"]["id"]["maximo"]) == (
+        1,
+        7,
+    )
+    assert perfil["colunas"]["id"]["distintos_aprox"] == 4
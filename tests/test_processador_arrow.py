@@ -0,0 +1,128 @@
+"""
+Testes para o processador Arrow.
+"""
+
+import pytest
+import pyarrow.parquet as pq
+from io import BytesIO
+from src.ingestion.csv_processor import ProcessadorCSV
+from src.ingestion.processador_arrow import ProcessadorArrow
+from src.ingestion.registro_esquemas import DesvioEsquema
+
+
+@pytest.fixture
+def processador_arrow():
+    """Fixture para criar instância do processador Arrow."""
+    return ProcessadorArrow()
+
+
+@pytest.fixture
+def dados_csv_exemplo():
+    """Fixture com dados CSV de exemplo."""
+    conteudo_csv = """id,name,value,date
+1,Alice,100,2024-01-01
+2,Bob,200,2024-01-02
+3,Charlie,300,2024-01-03
+2,Bob,200,2024-01-02
+,,,
+"""
+    return conteudo_csv.encode("utf-8")
+
+
+def teste_limpar_dados_mantem_primeira_ocorrencia(processador_arrow, dados_csv_exemplo):
+    """Testa remoção de duplicatas e linhas vazias preservando a ordem."""
+    processador_arrow.ler_csv(dados_csv_exemplo)
+
+    tabela = processador_arrow.limpar_dados()
+
+    assert tabela.column("id").to_pylist() == [1, 2, 3]
+
+
+def teste_mesmo_resultado_que_motor_pandas(processador_arrow, dados_csv_exemplo):
+    """Testa que os dois motores produzem as mesmas linhas."""
+    processador_pandas = ProcessadorCSV()
+    for processador in (processador_arrow, processador_pandas):
+        processador.ler_csv(dados_csv_exemplo)
+        processador.limpar_dados()
+        processador.adicionar_colunas_metadados("test.csv")
+
+    df_arrow = pq.read_table(
+        BytesIO(processador_arrow.converter_para_parquet())
+    ).to_pandas()
+    df_pandas = processador_pandas.df
+
+    assert list(df_arrow.columns) == list(df_pandas.columns)
+    assert df_arrow["name"].tolist() == df_pandas["name"].tolist()
+    assert (df_arrow["arquivo_origem"] == "test.csv").all()
+
+
+def teste_processar_em_lotes(processador_arrow, dados_csv_exemplo):
+    """Testa conversão em streaming com o leitor do Arrow."""
+    destino = BytesIO()
+
+    estatisticas = processador_arrow.processar_em_lotes(
+        dados_csv_exemplo, destino, arquivo_origem="test.csv"
+    )
+
+    tabela = pq.read_table(BytesIO(destino.getvalue()))
+    assert estatisticas["row_count"] == tabela.num_rows == 3
+    assert "dia" in tabela.column_names
+
+
+# Mais de um bloco de 1 MB do leitor do Arrow: os tipos vêm só do primeiro
+LINHAS_ALEM_DO_BLOCO = 200_000
+
+
+def _csv_com_ultima_linha(ultima: bytes) -> bytes:
+    corpo = b"".join(b"%d,%d,\n" % (i, i) for i in range(LINHAS_ALEM_DO_BLOCO))
+    return b"id,valor,obs\n" + corpo + ultima
+
+
+def teste_coluna_vazia_no_primeiro_bloco_vira_texto(processador_arrow):
+    """Testa que uma coluna nula no primeiro bloco e com texto depois é gravada como texto."""
+    destino = BytesIO()
+
+    processador_arrow.processar_em_lotes(
+        _csv_com_ultima_linha(b"-1,7,nota\n"), destino, arquivo_origem="test.csv"
+    )
+
+    tabela = pq.read_table(BytesIO(destino.getvalue()))
+    assert str(tabela.schema.field("obs").type) == "string"
+    assert tabela.column("obs").to_pylist()[-1] == "nota"
+
+
+@pytest.mark.parametrize(
+    "valor, tipo, esperado", [(b"20.5", "float64", 20.5), (b"texto", "string", "texto")]
+)
+def teste_bloco_fora_dos_tipos_pede_tipos_alargados(
+    processador_arrow, valor, tipo, esperado
+):
+    """Testa que um valor fora do tipo inteiro do primeiro bloco alarga a coluna na releitura."""
+    conteudo = _csv_com_ultima_linha(b"-1," + valor + b",\n")
+
+    with pytest.raises(DesvioEsquema) as erro:
+        processador_arrow.processar_em_lotes(
+            conteudo, BytesIO(), arquivo_origem="test.csv"
+        )
+    tipos = erro.value.plano
+    assert (tipos.colunas["id"], tipos.colunas["valor"]) == ("Int64", tipo)
+
+    destino = BytesIO()
+    processador_arrow.processar_em_lotes(
+        conteudo, destino, arquivo_origem="test.csv", tipos=tipos
+    )
+
+    valores = pq.read_table(BytesIO(destino.getvalue())).column("valor").to_pylist()
+    assert valores[-1] == esperado
+    assert valores[1] in (1, "1")
+
+
+def teste_validar_e_estatisticas(processador_arrow, dados_csv_exemplo):
+    """Testa validação e estatísticas sobre a tabela."""
+    assert not processador_arrow.validar_dataframe()
+
+    processador_arrow.ler_csv(dados_csv_exemplo)
+
+    assert processador_arrow.validar_dataframe(colunas_obrigatorias=["id", "name"])
+    assert not processador_arrow.validar_dataframe(colunas_obrigatorias=["ausente"])
+    assert processador_arrow.obter_estatisticas()["row_count"] == 5
@@ -0,0 +1,162 @@
+"""
+Testes para o registro de esquemas.
+"""
+
+import io
+import pandas as pd
+import pyarrow.parquet as pq
+import pytest
+import boto3
+from moto import mock_aws
+from src.config.settings import config
+from src.ingestion.csv_processor import ProcessadorCSV
+from src.ingestion.pipeline import PipelineIngestao
+from src.ingestion.processador_arrow import ProcessadorArrow
+from src.ingestion.registro_esquemas import (
+    DesvioEsquema,
+    PlanoTipos,
+    RegistroEsquemas,
+    inferir_plano,
+)
+from src.utils.s3_utils import ClienteS3
+
+
+@pytest.fixture
+def cliente_s3():
+    """Fixture para criar cliente S3 mockado com buckets."""
+    with mock_aws():
+        s3 = boto3.client("s3", region_name="us-east-1")
+        s3.create_bucket(Bucket="raw-bucket")
+        s3.create_bucket(Bucket=config.s3.bucket_data_lake)
+        yield ClienteS3(regiao="us-east-1")
+
+
+def _coluna(dados, nome: str) -> pd.Series:
+    """Coluna de um DataFrame ou pa.Table como série do pandas."""
+    return dados[nome] if hasattr(dados, "iloc") else dados.column(nome).to_pandas()
+
+
+def teste_inferir_plano_reduz_tipos():
+    """Testa inteiros reduzidos, categorias, datas e texto livre."""
+    df = pd.DataFrame(
+        {
+            "id": [1, 2, 3, 4],
+            "grande": [1, 2, 3, 70000],
+            "uf": ["SP", "RJ", "SP", "SP"],
+            "data": ["2024-01-01", "2024-01-02", "2024-01-03", "2024-01-04"],
+            "nome": ["a", "b", "c", "d"],
+        }
+    )
+
+    plano = inferir_plano(df)
+
+    assert plano.colunas == {
+        "id": "Int8",
+        "grande": "Int32",
+        "uf": "category",
+        "data": "datetime",
+        "nome": "string",
+    }
+
+
+def teste_plano_aplicado_na_leitura_e_desvio():
+    """Testa a leitura com o plano e o desvio quando um valor não cabe."""
+    plano = PlanoTipos({"id": "Int8", "data": "datetime"})
+    processador = ProcessadorCSV()
+
+    df = processador.ler_csv(b"id,data\n1,2024-01-01\n", plano=plano)
+    assert str(df["id"].dtype) == "Int8"
+    assert pd.api.types.is_datetime64_any_dtype(df["data"])
+
+    with pytest.raises(DesvioEsquema):
+        processador.ler_csv(b"id,data\n1,ontem\n", plano=plano)
+
+    alargado = plano.mesclar(PlanoTipos({"id": "Int32", "data": "string"}))
+    assert alargado.colunas == {"id": "Int32", "data": "string"}
+    assert alargado.versao == 2
+
+
+@pytest.mark.parametrize("motor", [ProcessadorCSV, ProcessadorArrow])
+def teste_data_dia_mes_so_vira_data_com_formato_configurado(motor):
+    """Testa que dd/mm não é lida como mm/dd: sem formato configurado, fica texto."""
+    csv = b"data\n05/03/2024\n25/03/2024\n"
+    processador = motor()
+
+    processador.ler_csv(csv)
+    assert inferir_plano(processador.dados).colunas == {"data": "string"}
+
+    plano = PlanoTipos.de_json(
+        inferir_plano(processador.dados, ["%d/%m/%Y"]).para_json()
+    )
+    assert plano.colunas == {"data": "datetime"}
+    assert plano.formatos == {"data": "%d/%m/%Y"}
+
+    dados = processador.ler_csv(b"data\n05/03/2024\n", plano=plano)
+    assert _coluna(dados, "data")[0] == pd.Timestamp("2024-03-05")
+    with pytest.raises(DesvioEsquema):
+        processador.ler_csv(b"data\n2024-03-05\n", plano=plano)
+
+    processador.ler_csv(csv)
+    convertidos = processador.aplicar_plano(plano)
+    assert _coluna(convertidos, "data")[1] == pd.Timestamp("2024-03-25")
+
+
+def teste_mesclar_datas_em_formatos_diferentes_vira_texto():
+    """Testa que um formato de data diferente do registrado é um desvio para texto."""
+    plano = PlanoTipos({"data": "datetime"}, formatos={"data": "%d/%m/%Y"})
+
+    assert plano.mesclar(PlanoTipos({"data": "datetime"})).formatos == {
+        "data": "%d/%m/%Y"
+    }
+    iso = PlanoTipos({"data": "datetime"}, formatos={"data": "ISO8601"})
+    assert plano.mesclar(iso).colunas == {"data": "string"}
+
+
+def teste_registro_persiste_e_conta_metricas(cliente_s3):
+    """Testa falha, acerto e o plano recarregado do Data Lake por outro container."""
+    registro = RegistroEsquemas(cliente_s3, config.s3.bucket_data_lake)
+    cabecalho = ["id", "valor"]
+
+    assert registro.obter("vendas", cabecalho) is None
+    registro.registrar(
+        "vendas", cabecalho, PlanoTipos({"id": "Int8", "valor": "float64"})
+    )
+
+    novo_container = RegistroEsquemas(cliente_s3, config.s3.bucket_data_lake)
+    plano = novo_container.obter("vendas", cabecalho)
+
+    assert plano.colunas == {"id": "Int8", "valor": "float64"}
+    assert registro.metricas["falhas"] == 1
+    assert novo_container.metricas["acertos"] == 1
+
+
+@pytest.mark.parametrize("streaming", [False, True])
+def teste_pipeline_mantem_esquema_estavel_entre_arquivos(
+    cliente_s3, monkeypatch, streaming
+):
+    """Testa que arquivos do mesmo feed geram Parquet com o mesmo esquema, mesmo com desvio."""
+    monkeypatch.setattr(config.processamento, "modo_streaming", streaming)
+    registro = RegistroEsquemas(cliente_s3, config.s3.bucket_data_lake)
+    pipeline = PipelineIngestao(cliente_s3=cliente_s3, registro_esquemas=registro)
+    arquivos = {
+        "vendas/a.csv": b"id,uf\n1,SP\n2,SP\n3,RJ\n",
+        "vendas/b.csv": b"id,uf\n4,SP\n5,RJ\n6,RJ\n",
+        "vendas/c.csv": b"id,uf\n300,SP\n301,SP\n302,RJ\n",
+    }
+
+    esquemas = []
+    situacoes = []
+    for chave, dados in arquivos.items():
+        cliente_s3.escrever_no_s3(dados, "raw-bucket", chave)
+        resultado = pipeline.processar_arquivo("raw-bucket", chave)
+        assert resultado["sucesso"], resultado["erro"]
+        situacoes.append(resultado["esquema"])
+
+        bucket, destino = resultado["destino"].split("/", 1)
+        parquet = cliente_s3.ler_csv_do_s3(bucket, destino)
+        esquemas.append(pq.read_schema(io.BytesIO(parquet)))
+
+    assert situacoes == ["falha", "acerto", "desvio"]
+    assert esquemas[0].equals(esquemas[1])
+    assert registro.metricas == {"acertos": 2, "falhas": 1, "desvios": 1}
+    assert registro.obter("vendas", ["id", "uf"]).colunas["id"] == "Int16"
@@ -0,0 +1,83 @@
+"""
+Testes para leitura e escrita em streaming no S3.
+"""
+
+import os
+import pytest
+import boto3
+from moto import mock_aws
+from src.utils.s3_stream import MB
+from src.utils.s3_utils import ClienteS3
+
+
+@pytest.fixture
+def cliente_s3():
+    """Fixture para criar cliente S3 mockado com bucket."""
+    with mock_aws():
+        boto3.client("s3", region_name="us-east-1").create_bucket(Bucket="test-bucket")
+        yield ClienteS3(regiao="us-east-1")
+
+
+def teste_leitura_paralela_reconstroi_objeto(cliente_s3):
+    """Testa que as partes lidas com Range reconstroem o objeto."""
+    dados = os.urandom(3 * MB + 123)
+    cliente_s3.escrever_no_s3(dados, "test-bucket", "grande.bin")
+
+    with cliente_s3.abrir_leitura(
+        "test-bucket", "grande.bin", tamanho_parte_mb=1, concorrencia=3
+    ) as leitor:
+        assert leitor.read(10) == dados[:10]
+        assert leitor.read() == dados[10:]
+
+
+def teste_leitura_paralela_com_seek(cliente_s3):
+    """Testa seek para trás e para frente entre partes."""
+    dados = os.urandom(2 * MB + 10)
+    cliente_s3.escrever_no_s3(dados, "test-bucket", "grande.bin")
+
+    with cliente_s3.abrir_leitura(
+        "test-bucket", "grande.bin", tamanho_parte_mb=1
+    ) as leitor:
+        leitor.seek(-20, 2)
+        assert leitor.read() == dados[-20:]
+        leitor.seek(MB - 5)
+        inicio, fim = MB - 5, MB + 5
+        assert leitor.read(10) == dados[inicio:fim]
+
+
+def teste_escrita_multipart(cliente_s3):
+    """Testa escrita em várias partes e conclusão do upload."""
+    dados = os.urandom(11 * MB)
+
+    with cliente_s3.abrir_escrita(
+        "test-bucket", "saida.bin", tamanho_parte_mb=5
+    ) as escritor:
+        for inicio in range(0, len(dados), MB):
+            fim = inicio + MB
+            escritor.write(dados[inicio:fim])
+
+    assert cliente_s3.ler_csv_do_s3("test-bucket", "saida.bin") == dados
+
+
+def teste_escrita_pequena_usa_put_object(cliente_s3):
+    """Testa que objetos menores que uma parte são gravados de uma vez."""
+    with cliente_s3.abrir_escrita(
+        "test-bucket", "pequeno.txt", tamanho_parte_mb=5
+    ) as escritor:
+        escritor.write(b"conteudo")
+
+    assert cliente_s3.ler_csv_do_s3("test-bucket", "pequeno.txt") == b"conteudo"
+
+
+def teste_escrita_abortada_em_erro(cliente_s3):
+    """Testa que uma exceção aborta o upload sem criar o objeto."""
+    with pytest.raises(RuntimeError):
+        with cliente_s3.abrir_escrita(
+            "test-bucket", "falha.bin", tamanho_parte_mb=5
+        ) as escritor:
+            escritor.write(os.urandom(6 * MB))
+            raise RuntimeError("falha no processamento")
+
+    assert cliente_s3.listar_objetos("test-bucket") == []
+    uploads = cliente_s3.s3.list_multipart_uploads(Bucket="test-bucket")
+    assert not uploads.get("Uploads")
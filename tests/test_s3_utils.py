@@ -2,7 +2,7 @@
 Testes para o cliente S3.
 """
 import pytest
-from moto import mock_s3
+from moto import mock_aws
 import boto3
 from src.utils.s3_utils import ClienteS3
 
@@ -10,7 +10,7 @@ from src.utils.s3_utils import ClienteS3
 @pytest.fixture
 def cliente_s3():
     """Fixture para criar cliente S3 mockado."""
-    with mock_s3():
+    with mock_aws():
         yield ClienteS3(regiao='us-east-1')
 
 
@@ -107,3 +107,71 @@ def teste_obter_metadados_objeto(cliente_s3, bucket_mock):
     assert 'size' in metadados
     assert metadados['size'] == len(dados)
     assert 'last_modified' in metadados
+
+
+def teste_listagem_paginada_passa_de_mil_objetos(cliente_s3, bucket_mock):
+    """Testa que a listagem percorre todas as páginas, em série e em paralelo."""
+    s3 = boto3.client('s3', region_name='us-east-1')
+    chaves = {f"data/ano=202{i % 3}/arquivo-{i:04d}.parquet" for i in range(1100)}
+    for chave in chaves:
+        s3.put_object(Bucket=bucket_mock, Key=chave, Body=b"")
+    s3.put_object(Bucket=bucket_mock, Key="data/solto.txt", Body=b"")
+    
+    assert set(cliente_s3.listar_objetos(bucket_mock, "data/ano=")) == chaves
+    assert set(cliente_s3.iterar_objetos_paralelo(bucket_mock, "data/")) == \
+        chaves | {"data/solto.txt"}
+    assert len(cliente_s3.listar_prefixos(bucket_mock, "data/")) == 3
+
+
+def teste_deletar_objetos_em_lote(cliente_s3, bucket_mock):
+    """Testa a remoção em lotes de até 1000 chaves."""
+    s3 = boto3.client('s3', region_name='us-east-1')
+    chaves = [f"tmp/{i}" for i in range(1200)]
+    for chave in chaves:
+        s3.put_object(Bucket=bucket_mock, Key=chave, Body=b"x")
+    
+    resultado = cliente_s3.deletar_objetos(bucket_mock, iter(chaves))
+    
+    assert resultado == {'deletados': 1200, 'erros': []}
+    assert cliente_s3.listar_objetos(bucket_mock, "tmp/") == []
+
+
+def teste_mover_objetos(cliente_s3, bucket_mock):
+    """Testa a cópia paralela seguida da remoção das origens."""
+    for i in range(20):
+        cliente_s3.escrever_no_s3(f"{i}".encode(), bucket_mock, f"input/{i}.csv")
+    
+    resultado = cliente_s3.mover_objetos(
+        bucket_mock, cliente_s3.listar_objetos(bucket_mock, "input/"),
+        bucket_mock, "processed/", prefixo_origem="input/"
+    )
+    
+    assert resultado == {'movidos': 20, 'erros': []}
+    assert cliente_s3.listar_objetos(bucket_mock, "input/") == []
+    assert cliente_s3.ler_csv_do_s3(bucket_mock, "processed/7.csv") == b"7"
+
+
+def teste_mover_objetos_isola_falhas_e_destino_igual_a_origem(cliente_s3, bucket_mock, monkeypatch):
+    """Testa que uma cópia com erro qualquer e um destino igual à origem não são removidos."""
+    for nome in ("a", "b"):
+        cliente_s3.escrever_no_s3(nome.encode(), bucket_mock, f"input/{nome}.csv")
+    copiar = cliente_s3.s3.copy_object
+    
+    def copiar_com_falha(**argumentos):
+        if argumentos['Key'].endswith("b.csv"):
+            raise ConnectionError("conexão encerrada")
+        return copiar(**argumentos)
+    
+    monkeypatch.setattr(cliente_s3.s3, 'copy_object', copiar_com_falha)
+    resultado = cliente_s3.mover_objetos(
+        bucket_mock, ["input/a.csv", "input/b.csv"], bucket_mock, "processed/",
+        prefixo_origem="input/"
+    )
+    no_lugar = cliente_s3.mover_objetos(
+        bucket_mock, ["processed/a.csv"], bucket_mock, "processed/", prefixo_origem="processed/"
+    )
+    
+    assert resultado == {'movidos': 1, 'erros': ["input/b.csv"]}
+    assert no_lugar == {'movidos': 0, 'erros': ["processed/a.csv"]}
+    assert cliente_s3.listar_objetos(bucket_mock, "input/") == ["input/b.csv"]
+    assert cliente_s3.ler_csv_do_s3(bucket_mock, "processed/a.csv") == b"a"
@@ -0,0 +1,113 @@
+"""
+Testes para a validação de linhas com quarentena.
+"""
+
+import io
+import boto3
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+from moto import mock_aws
+from src.config.settings import config
+from src.ingestion.pipeline import PipelineIngestao
+from src.ingestion.validacao import ErroValidacao, RegrasValidacao, ValidadorDados
+from src.utils.s3_utils import ClienteS3
+
+REGRAS = RegrasValidacao.de_dict(
+    {
+        "obrigatorias": ["id"],
+        "colunas": {
+            "id": {"tipo": "inteiro", "nao_nulo": True, "unico": True},
+            "idade": {"tipo": "inteiro", "min": 0, "max": 150},
+            "email": {"regex": "^[^@]+@[^@]+$"},
+        },
+    }
+)
+
+CSV = (
+    b"id,idade,email\n"
+    b"1,30,ana@x.com\n"
+    b"2,abc,bruno@x.com\n"
+    b"3,200,carla\n"
+    b"1,40,ana2@x.com\n"
+    b",50,dora@x.com\n"
+    b"6,60,edu@x.com\n"
+)
+
+
+class _Destino(io.BytesIO):
+    """Destino em memória que guarda o conteúdo ao fechar."""
+
+    def close(self):
+        self.conteudo = self.getvalue()
+        super().close()
+
+
+@pytest.mark.parametrize("como_arrow", [False, True])
+def teste_filtra_linhas_invalidas_e_grava_quarentena(como_arrow):
+    """Testa as máscaras de cada regra em pandas e Arrow e o conteúdo da quarentena."""
+    dados = pd.read_csv(io.BytesIO(CSV), dtype=str)
+    if como_arrow:
+        dados = pa.Table.from_pandas(dados, preserve_index=False)
+    destino = _Destino()
+    validador = ValidadorDados(
+        REGRAS, abrir_quarentena=lambda: destino, arquivo_origem="input/a.csv"
+    )
+
+    validos = validador.filtrar(dados)
+    validador.fechar()
+
+    ids = validos.column("id").to_pylist() if como_arrow else list(validos["id"])
+    assert ids == ["1", "6"]
+    assert validador.linhas_rejeitadas == 4
+    quarentena = pq.read_table(io.BytesIO(destino.conteudo)).to_pydict()
+    assert quarentena["erros_validacao"] == [
+        "idade:tipo",
+        "idade:intervalo,email:regex",
+        "id:unico",
+        "id:nao_nulo",
+    ]
+    assert set(quarentena["arquivo_origem"]) == {"input/a.csv"}
+
+
+def teste_unicidade_entre_lotes_e_obrigatorias():
+    """Testa que a unicidade vale entre lotes e que falta de coluna obrigatória levanta erro."""
+    validador = ValidadorDados(REGRAS)
+
+    primeiro = validador.filtrar(pa.table({"id": [1, 2]}))
+    segundo = validador.filtrar(pa.table({"id": [2, 3]}))
+
+    assert primeiro.num_rows == 2
+    assert segundo.column("id").to_pylist() == [3]
+    assert validador.violacoes == {"id:unico": 1}
+    with pytest.raises(ErroValidacao):
+        validador.filtrar(pa.table({"idade": [1]}))
+
+
+@pytest.mark.parametrize("streaming", [False, True])
+def teste_pipeline_envia_invalidas_para_quarentena(monkeypatch, streaming):
+    """Testa que o pipeline grava as linhas válidas em data/ e as inválidas em FAILED_PREFIX."""
+    monkeypatch.setattr(config.processamento, "modo_streaming", streaming)
+    monkeypatch.setattr(config.processamento, "colunas_particao", [])
+    with mock_aws():
+        s3 = boto3.client("s3", region_name="us-east-1")
+        s3.create_bucket(Bucket="raw-bucket")
+        s3.create_bucket(Bucket=config.s3.bucket_data_lake)
+        cliente_s3 = ClienteS3(regiao="us-east-1")
+        cliente_s3.escrever_no_s3(CSV, "raw-bucket", "input/clientes.csv")
+
+        pipeline = PipelineIngestao(cliente_s3=cliente_s3, regras_validacao=REGRAS)
+        resultado = pipeline.processar_arquivo("raw-bucket", "input/clientes.csv")
+
+        assert resultado["sucesso"], resultado["erro"]
+        assert resultado["linhas"] == 2
+        assert resultado["quarentena"]["linhas"] == 4
+        chave = f"{config.s3.prefixo_falhas}input/clientes.parquet"
+        assert resultado["quarentena"]["destinos"] == [
+            f"{config.s3.bucket_data_lake}/{chave}"
+        ]
+        objeto = s3.get_object(Bucket=config.s3.bucket_data_lake, Key=chave)[
+            "Body"
+        ].read()
+        assert pq.read_table(io.BytesIO(objeto)).num_rows == 4